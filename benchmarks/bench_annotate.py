@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Measure `pycvs annotate` of a directory, serial, concurrent and cached.
+
+A synthetic module is served by testing/fake_cvs.py through a :fork: root;
+the server spends --latency seconds on every file annotated. The directory
+is annotated one file at a time without cache (as cvs annotate does), then
+--jobs files at a time with a cold cache, then with a warm one.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_annotate.py --files 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=200,
+                            help="files in the directory (default: 200)")
+    arg_parser.add_argument("--revisions", type=int, default=20,
+                            help="revisions of each file (default: 20)")
+    arg_parser.add_argument("--latency", type=float, default=0.05,
+                            help="seconds per file annotated (default: 0.05)")
+    arg_parser.add_argument("--jobs", type=int, default=8,
+                            help="concurrent requests (default: 8)")
+    args = arg_parser.parse_args()
+
+    os.environ["CVS_SERVER"] = "{0} {1}".format(sys.executable, FAKE_CVS)
+    os.environ["FAKE_CVS_FILES"] = str(args.files)
+    os.environ["FAKE_CVS_REVISIONS"] = str(args.revisions)
+    os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pycvs = PyCvs.__new__(PyCvs)
+        pycvs.credentials = {"root": ":fork:/cvsroot", "user": "dev",
+                             "password": "", "transport": "protocol",
+                             "annotate_cache_dir": os.path.join(tmp, "cache")}
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            os.environ["FAKE_CVS_LATENCY"] = "0"
+            with contextlib.redirect_stdout(io.StringIO()):
+                pycvs._checkout(["module"])
+            os.environ["FAKE_CVS_LATENCY"] = str(args.latency)
+            os.chdir("module")
+            runs = [("serial, no cache", 1, False),
+                    ("{0} jobs, cold cache".format(args.jobs), args.jobs,
+                     True),
+                    ("warm cache", args.jobs, True)]
+            for name, jobs, cached in runs:
+                pycvs.credentials["annotate_cache"] = cached
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    pycvs._annotate(["--no-pager", "-j", str(jobs)])
+                elapsed = time.perf_counter() - start
+                print("{0:>20}: {1:.2f}s ({2} lines)".format(
+                    name, elapsed, output.getvalue().count("\n")))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
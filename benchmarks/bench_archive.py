@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Measure `pycvs archive` of a tag, one file at a time and concurrently.
+
+A synthetic module is served by testing/fake_cvs.py through a :fork: root;
+the server spends --latency seconds on every file sent. The module is
+archived with -j 1 and with --jobs, each run in its own process to measure
+its peak RSS, which stays flat with the number of files.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_archive.py --files 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+
+
+def run(jobs, output):
+    pycvs = PyCvs.__new__(PyCvs)
+    pycvs.credentials = {"root": ":fork:/cvsroot", "user": "dev",
+                         "password": "", "transport": "protocol"}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pycvs._archive(["HEAD", "module", "-j", str(jobs), "-o", output])
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{0:>7} jobs: {1:.2f}s, {2:.1f} MB archive, peak RSS {3:.1f} MB"
+          .format(jobs, elapsed, os.path.getsize(output) / 1024 / 1024,
+                  peak / 1024))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=2000,
+                            help="files in the module (default: 2000)")
+    arg_parser.add_argument("--latency", type=float, default=0.005,
+                            help="seconds per file sent (default: 0.005)")
+    arg_parser.add_argument("--jobs", type=int, default=8,
+                            help="concurrent connections (default: 8)")
+    arg_parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    os.environ["CVS_SERVER"] = "{0} {1}".format(sys.executable, FAKE_CVS)
+    os.environ["FAKE_CVS_FILES"] = str(args.files)
+    os.environ["FAKE_CVS_LATENCY"] = str(args.latency)
+    os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "module.tar.gz")
+        if args.run is not None:
+            run(args.run, output)
+            return
+        for jobs in (1, args.jobs):
+            sys.stdout.flush()
+            subprocess.check_call([sys.executable, os.path.abspath(__file__),
+                                   "--files", str(args.files),
+                                   "--latency", str(args.latency),
+                                   "--run", str(jobs)])
+
+
+if __name__ == "__main__":
+    main()
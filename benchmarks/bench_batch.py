@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Measure many small pycvs commands run one process each and in a batch.
+
+A checkout of a synthetic module served by testing/fake_cvs.py (through a
+:fork: root) gets --commands `status` and `log -h` commands on single files,
+first as separate Python processes, each loading pycvs and its configuration
+and opening its own connection, then as one `pycvs batch`.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_batch.py --commands 200
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from pycvs import batch
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+# What the pycvs script does, without looking for the cvs executable
+RUN_ONE = ("import json, sys; from pycvs.cli import PyCvs; "
+           "PyCvs(json.loads(sys.argv.pop(1))).process()")
+
+
+def commands(count, files):
+    for i in range(count):
+        name = "dir{0:04d}/file{1:06d}.c".format(i % files // 100, i % files)
+        if i % 2:
+            yield ["log", "--no-pager", "-h", name]
+        else:
+            yield ["status", name]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--commands", type=int, default=200,
+                            help="commands to run (default: 200)")
+    arg_parser.add_argument("--files", type=int, default=1000,
+                            help="files in the module (default: 1000)")
+    args = arg_parser.parse_args()
+
+    os.environ["CVS_SERVER"] = "{0} {1}".format(sys.executable, FAKE_CVS)
+    os.environ["FAKE_CVS_FILES"] = str(args.files)
+    os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+    credentials = {"root": ":fork:/cvsroot", "user": "dev", "password": "",
+                   "transport": "protocol"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pycvs = PyCvs(credentials)
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                pycvs._checkout(["module"])
+            os.chdir("module")
+            argvs = list(commands(args.commands, args.files))
+
+            start = time.perf_counter()
+            for argv in argvs:
+                subprocess.run([sys.executable, "-c", RUN_ONE,
+                                json.dumps(credentials)] + argv,
+                               stdout=subprocess.DEVNULL, check=True)
+            separate = time.perf_counter() - start
+            print("{0:>9}: {1:.2f}s ({2:.1f} ms per command)".format(
+                "processes", separate, separate * 1000 / len(argvs)))
+
+            out = io.StringIO()
+            runner = batch.Batch(pycvs, out)
+            start = time.perf_counter()
+            failed = runner.run(json.dumps(argv) for argv in argvs)
+            elapsed = time.perf_counter() - start
+            runner.close()
+            print("{0:>9}: {1:.2f}s ({2:.1f} ms per command), {3} failed, "
+                  "{4:.0f}x faster".format(
+                      "batch", elapsed, elapsed * 1000 / len(argvs), failed,
+                      separate / elapsed))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Compare a single checkout with a checkout sharded over several processes.
+
+Both check out a synthetic module from testing/fake_cvs.py, which stands in
+for `cvs server` through a :fork: root. Every file sent can be delayed to
+model the latency of a remote server.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_checkout.py --jobs 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+
+
+def run_checkout(jobs, workdir):
+    pycvs = PyCvs.__new__(PyCvs)
+    pycvs.credentials = {"root": ":fork:/cvsroot", "user": "dev",
+                         "password": "", "transport": "protocol"}
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            pycvs._checkout(["--jobs", str(jobs), "module"])
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+    return elapsed, output.getvalue().strip().splitlines()[-2:]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=5000,
+                            help="files in the module (default: 5000)")
+    arg_parser.add_argument("--jobs", type=int, default=4,
+                            help="concurrent checkouts (default: 4)")
+    arg_parser.add_argument("--latency", type=float, default=0.002,
+                            help="seconds per file sent (default: 0.002)")
+    args = arg_parser.parse_args()
+
+    os.environ["CVS_SERVER"] = "{0} {1}".format(sys.executable, FAKE_CVS)
+    os.environ["FAKE_CVS_FILES"] = str(args.files)
+    os.environ["FAKE_CVS_LATENCY"] = str(args.latency)
+    os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {}
+        for jobs in (1, args.jobs):
+            workdir = os.path.join(tmp, str(jobs))
+            os.mkdir(workdir)
+            timings[jobs], summary = run_checkout(jobs, workdir)
+            print("{0:>3} jobs: {1:.2f}s ({2})".format(jobs, timings[jobs],
+                                                       ", ".join(summary)))
+        print("speedup: {0:.1f}x".format(timings[1] / timings[args.jobs]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Measure checkout and diff over a slow link, per compression level.
+
+A synthetic module is served by testing/fake_cvs.py through an :ext: root
+whose "ssh" runs the server on this machine, throttled to --bandwidth bytes
+per second both ways. For every level the module is checked out, then
+--changed percent of its files are rewritten and diffed. "auto" runs twice,
+after --warmup runs without compression that measure the link; the second
+run knows how well the files compress. The time, the bytes of output and the
+bytes that went through the link are printed. The synthetic files are very
+much alike, so they compress better than real sources would.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_compression.py \\
+          --files 2000 --bandwidth 1000000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+
+from pycvs import tuning
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+LEVELS = ["0", "1", "3", "6", "9", "auto"]
+
+
+def measure(pycvs, step, args):
+    """
+    Run a step, returning its seconds and its (output, wire) bytes.
+    """
+    transfers = []
+    record = tuning.Tuning.record
+
+    def recording(self, root, level, received, wire, seconds):
+        transfers.append((received, wire))
+        record(self, root, level, received, wire, seconds)
+
+    tuning.Tuning.record = recording
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                step(args)
+            except SystemExit:
+                pass
+    finally:
+        tuning.Tuning.record = record
+    elapsed = time.perf_counter() - start
+
+    return (elapsed, sum(received for received, _ in transfers),
+            sum(wire for _, wire in transfers))
+
+
+def rewrite(workdir, files, percent):
+    past = time.time() - 3600
+    for i in range(0, files, max(1, 100 // percent)):
+        path = os.path.join(workdir, "module", "dir{0:05d}".format(i // 100),
+                            "file{0:05d}.c".format(i))
+        with open(path, "w") as changed:
+            changed.write("".join("line {0} of file {1}\n".format(j, i)
+                                  for j in range(20)))
+        os.utime(path, (past, past))
+
+
+def run(level, args, tmp, tuning_file):
+    credentials = {"root": ":ext:dev@wan:/cvsroot", "user": "dev",
+                   "password": "", "transport": "protocol",
+                   "compression": level, "tuning_file": tuning_file}
+    pycvs = PyCvs(credentials)
+    workdir = os.path.join(tmp, "work-" + level)
+    os.mkdir(workdir)
+    chosen = tuning.Tuning(credentials).compression(credentials["root"])
+
+    os.chdir(workdir)
+    checkout = measure(pycvs, pycvs._checkout, ["module"])
+    rewrite(workdir, args.files, args.changed)
+    os.chdir(os.path.join(workdir, "module"))
+    diff = measure(pycvs, pycvs._diff, ["--no-pager"])
+    os.chdir(tmp)
+    shutil.rmtree(workdir)
+
+    for name, (seconds, received, wire) in (("checkout", checkout),
+                                            ("diff", diff)):
+        print("{0:>5} (-z{1}) {2:>8}: {3:6.2f}s, {4:6.2f} MB output, "
+              "{5:6.2f} MB on the link".format(
+                  level, chosen, name, seconds, received / 2 ** 20,
+                  wire / 2 ** 20))
+    sys.stdout.flush()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=2000,
+                            help="files in the module (default: 2000)")
+    arg_parser.add_argument("--bandwidth", type=int, default=1000000,
+                            help="bytes per second of the link "
+                                 "(default: 1000000)")
+    arg_parser.add_argument("--changed", type=int, default=20,
+                            help="percent of the files diffed (default: 20)")
+    arg_parser.add_argument("--levels", default=",".join(LEVELS),
+                            help="comma separated levels (default: {0})"
+                                 .format(",".join(LEVELS)))
+    arg_parser.add_argument("--warmup", type=int, default=1,
+                            help="uncompressed runs measuring the link "
+                                 "before auto (default: 1)")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = os.path.realpath(tmp)
+        # Stands in for ssh: runs the command given to the host here
+        rsh = os.path.join(tmp, "rsh")
+        with open(rsh, "w") as rsh_file:
+            rsh_file.write("#!/bin/sh\nfor command; do :; done\n"
+                           "exec sh -c \"$command\"\n")
+        os.chmod(rsh, os.stat(rsh).st_mode | stat.S_IEXEC)
+        os.environ["CVS_RSH"] = rsh
+        os.environ["CVS_SERVER"] = "{0} {1}".format(sys.executable,
+                                                    FAKE_CVS)
+        os.environ["FAKE_CVS_FILES"] = str(args.files)
+        os.environ["FAKE_CVS_BANDWIDTH"] = str(args.bandwidth)
+        os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+        for level in args.levels.split(","):
+            # Each level measures the link on its own
+            tuning_file = os.path.join(tmp, "tuning-{0}.json".format(level))
+            if level == "auto":
+                for _ in range(args.warmup):
+                    run("0", args, tmp, tuning_file)
+                run(level, args, tmp, tuning_file)
+            run(level, args, tmp, tuning_file)
+        if os.path.exists(tuning_file):
+            with open(tuning_file) as stats_file:
+                print("Measured: {0}".format(json.dumps(
+                    json.load(stats_file)["roots"])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure `pycvs conflicts` on a large synthetic working copy.
+
+Builds a working copy of --files files of --size KB (CVS/Entries included),
+--modified percent of them modified and one in a thousand with conflict
+markers near its end, then scans it with 1 and --jobs threads. Only the
+modified files are read; the stat pass over the rest is what the size of
+the working copy costs.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_conflicts.py --files 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pycvs import conflicts
+from pycvs.local import file_timestamp
+
+PER_DIR = 500
+
+
+def build(top, nfiles, size, modified):
+    line = b"x" * 79 + b"\n"
+    data = line * (size * 1024 // len(line))
+    conflict = b"<<<<<<< file.c\nmine\n=======\ntheirs\n>>>>>>> 1.2\n"
+    os.makedirs(os.path.join(top, "CVS"))
+    with open(os.path.join(top, "CVS", "Entries"), "w") as entries:
+        for i in range(0, nfiles, PER_DIR):
+            entries.write("D/dir{0:05d}////\n".format(i // PER_DIR))
+    every = max(1, int(100 / modified)) if modified else None
+    for i in range(0, nfiles, PER_DIR):
+        directory = os.path.join(top, "dir{0:05d}".format(i // PER_DIR))
+        os.makedirs(os.path.join(directory, "CVS"))
+        lines = []
+        for j in range(i, min(i + PER_DIR, nfiles)):
+            name = "file{0:07d}.c".format(j)
+            path = os.path.join(directory, name)
+            with open(path, "wb") as new_file:
+                new_file.write(data)
+                if j % 1000 == 0:
+                    new_file.write(conflict)
+            mtime = os.stat(path).st_mtime
+            if every is not None and j % every == 0:
+                # Checked out an hour earlier, modified since
+                mtime -= 3600
+            lines.append("/{0}/1.2/{1}//\n".format(name,
+                                                   file_timestamp(mtime)))
+        with open(os.path.join(directory, "CVS", "Entries"), "w") as entries:
+            entries.writelines(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=20000,
+                            help="files in the working copy (default: 20000)")
+    arg_parser.add_argument("--size", type=int, default=50,
+                            help="size of each file in KB (default: 50)")
+    arg_parser.add_argument("--modified", type=float, default=10,
+                            help="percent of modified files (default: 10)")
+    arg_parser.add_argument("--jobs", type=int, default=8,
+                            help="threads (default: 8)")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build(tmp, args.files, args.size, args.modified)
+        total = args.files * args.size / 1024 / 1024
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for jobs in (1, args.jobs):
+                start = time.perf_counter()
+                found = conflicts.scan([], jobs)
+                elapsed = time.perf_counter() - start
+                print("{0:>3} jobs: {1:.1f} GB working copy scanned in "
+                      "{2:.2f}s, {3} conflicts".format(jobs, total, elapsed,
+                                                       len(found)))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
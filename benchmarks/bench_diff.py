@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Measure `pycvs diff` on a large synthetic diff.
+
+The diff is produced by a stand-in session of --size MB and goes through the
+real _diff pipeline (stderr filtering, colors) into a sink that counts the
+bytes, as a pager would get them. The "buffered" mode runs the pipeline pycvs
+used before (whole output, filtered list, colored list, joined string) for
+comparison; it needs several times --size of memory. Each mode runs in its
+own process to measure its peak RSS.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_diff.py --size 1024
+"""
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from colorama import Fore
+
+from pycvs import protocol
+from pycvs.cli import PyCvs
+
+HUNK = ["@@ -1,8 +1,8 @@"] + [
+    " context line {0} of the unchanged part of the file".format(i)
+    for i in range(3)] + [
+    "-removed line with the old contents of the file",
+    "+added line with the new contents of the file"] + [
+    " context line {0} after the change".format(i) for i in range(3)]
+HUNK_SIZE = sum(len(line) + 1 for line in HUNK)
+
+
+def events(size):
+    sent = 0
+    index = 0
+    while sent < size:
+        path = "module/dir{0:04d}/file{1:06d}.c".format(index // 100, index)
+        yield "E", "cvs server: Diffing module/dir{0:04d}".format(
+            index // 100)
+        header = ["Index: " + path, "=" * 67,
+                  "RCS file: /cvsroot/{0},v".format(path),
+                  "retrieving revision 1.1",
+                  "diff -u -r1.1 " + path,
+                  "--- {0}\t(revision 1.1)".format(path),
+                  "+++ {0}\t(working copy)".format(path)]
+        for line in header:
+            yield "M", line
+        sent += sum(len(line) + 1 for line in header)
+        for _ in range(100):
+            for line in HUNK:
+                yield "M", line
+            sent += HUNK_SIZE
+        index += 1
+
+
+class Sink(io.RawIOBase):
+    """
+    Stand-in for the pager: counts what it gets.
+    """
+    def __init__(self):
+        self.size = 0
+        self.first = None
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.size += len(data)
+        return len(data)
+
+
+def streaming(size, sink):
+    pycvs = PyCvs.__new__(PyCvs)
+    pycvs._access_cvs = lambda cmd, stream=False, cwd=None: protocol.Session(
+        events(size), stream)
+    stdout = sys.stdout
+    sys.stdout = io.TextIOWrapper(io.BufferedWriter(sink))
+    try:
+        pycvs._diff(["--no-pager"])
+        sys.stdout.flush()
+    finally:
+        sys.stdout = stdout
+
+
+def buffered(size, sink):
+    before = b"".join(text.encode("utf-8") + b"\n"
+                      for _, text in events(size))
+    output = before.decode("utf-8")
+    output = output.split("\n")
+    output = filter(lambda x: "cvs server:" not in x, output)
+    output_colored = []
+    for line in output:
+        if line.startswith("+") and not line.startswith("+++"):
+            line = Fore.GREEN + line
+        elif line.startswith("-") and not line.startswith("---"):
+            line = Fore.RED + line
+        elif line.startswith("@@"):
+            line = Fore.CYAN + line
+        output_colored.append(line)
+    sink.write("\n".join(output_colored).encode("utf-8"))
+
+
+MODES = {"buffered": buffered, "streaming": streaming}
+
+
+def run(mode, size):
+    os.environ["PYCVS_COLOR"] = "always"
+    sink = Sink()
+    start = time.perf_counter()
+    MODES[mode](size * 1024 * 1024, sink)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{0:>9}: {1:.0f} MB in {2:.1f}s ({3:.0f} MB/s), first output "
+          "after {4:.3f}s, peak RSS {5:.1f} MB".format(
+              mode, sink.size / 1024 / 1024, elapsed,
+              sink.size / 1024 / 1024 / elapsed, sink.first - start,
+              peak / 1024))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--size", type=int, default=1024,
+                            help="size of the diff in MB (default: 1024)")
+    arg_parser.add_argument("--compare", action="store_true",
+                            help="also run the buffered pipeline")
+    arg_parser.add_argument("--mode", choices=sorted(MODES),
+                            help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.mode is not None:
+        run(args.mode, args.size)
+        return
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    modes = ["buffered", "streaming"] if args.compare else ["streaming"]
+    for mode in modes:
+        sys.stdout.flush()
+        subprocess.check_call([sys.executable, os.path.abspath(__file__),
+                               "--mode", mode, "--size", str(args.size)],
+                              env=env)
+
+
+if __name__ == "__main__":
+    main()
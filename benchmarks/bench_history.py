@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Measure building, refreshing and querying the history index.
+
+The rlog output of a synthetic module (--files files of --revisions revisions
+each, by a handful of authors, with commit messages shared by the files of a
+commit) goes through the log parser into a new index. Then a refresh adds one
+more revision to --changed files, and a few `pycvs log` queries are timed
+(to their first 20 revisions, a screen of the pager).
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_history.py \
+          --files 20000 --revisions 100
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pycvs import history, rcslog
+
+AUTHORS = ["alice", "bob", "carol", "dave", "erin", "frank", "grace"]
+WORDS = ["fix", "parser", "crash", "build", "update", "docs", "cleanup",
+         "speed", "memory", "tests", "release", "merge"]
+PREFIX = "/cvsroot/module/"
+START = 1262304000  # 2010/01/01
+
+
+def synthetic_logs(nfiles, nrevisions, first=1, day=0):
+    for i in range(nfiles):
+        revisions = []
+        for number in range(nrevisions + first - 1, first - 1, -1):
+            # The files of a directory are committed together
+            commit = (i // 50) * 7919 + number
+            date = time.strftime("%Y/%m/%d %H:%M:%S", time.gmtime(
+                START + (day + number) * 86400 + i // 50))
+            message = "{0} {1} in dir{2} (commit {3})".format(
+                WORDS[commit % len(WORDS)], WORDS[commit * 7 % len(WORDS)],
+                i // 50, commit)
+            revisions.append(rcslog.Revision(
+                "1.{0}".format(number), date, AUTHORS[commit % len(AUTHORS)],
+                "Exp", (1, 1) if number > 1 else None, None, [], message))
+        yield rcslog.FileLog(
+            "{0}dir{1:05d}/file{2:06d}.c,v".format(PREFIX, i // 50, i), None,
+            "1.{0}".format(nrevisions + first - 1), "", "", "", [], "kv",
+            nrevisions, nrevisions, "", revisions)
+
+
+def rlog_lines(logs):
+    for file_log in logs:
+        yield from rcslog.format_log(file_log)
+
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    print("{0:>32}: {1:.3f}s".format(label, elapsed))
+    return result, elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=20000,
+                            help="files in the module (default: 20000)")
+    arg_parser.add_argument("--revisions", type=int, default=100,
+                            help="revisions of each file (default: 100)")
+    arg_parser.add_argument("--changed", type=int, default=1000,
+                            help="files changed before the refresh "
+                                 "(default: 1000)")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite")
+        index = history.HistoryIndex(path)
+
+        def sync(logs):
+            added = index.add(rcslog.LogParser().parse(rlog_lines(logs)),
+                              PREFIX)
+            index.commit(time.time())
+            return added
+
+        added, elapsed = timed("build", sync, synthetic_logs(
+            args.files, args.revisions))
+        print("{0:>32}  {1} revisions, {2:.0f} revisions/s, {3:.0f} MB"
+              .format("", added, added / elapsed,
+                      os.path.getsize(path) / 1024 / 1024))
+        added, _ = timed("refresh", sync, synthetic_logs(
+            args.changed, 1, first=args.revisions + 1))
+        print("{0:>32}  {1} revisions".format("", added))
+
+        queries = [
+            ("--author bob --since 30 days",
+             {"author": "bob",
+              "since": START + (args.revisions - 30) * 86400}),
+            ("--grep crash --path dir00042",
+             {"grep": "crash", "path": "dir00042"}),
+            ("--path dir00001/file000050.c",
+             {"path": "dir00001/file000050.c"}),
+            ("--grep 'commit 7919'", {"grep": "commit 7919"}),
+        ]
+        for label, filters in queries:
+            rows, _ = timed(label, lambda: list(
+                row for _, row in zip(range(20), index.query(**filters))))
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Load and save times of the working copy stat index.
+
+Builds a synthetic index with the requested number of files (spread over
+directories of 100 files) in a temporary directory.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_index.py --files 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pycvs.index import DirState, StatIndex, digest_rules
+
+
+def build(nfiles):
+    index = StatIndex(digest_rules([]))
+    root = DirState(1, 1, 0)
+    index.add(".", root)
+    for i in range(0, nfiles, 100):
+        path = "dir{0:06d}".format(i // 100)
+        state = DirState(i + 1, i + 1, 0)
+        for j in range(100):
+            state.files["file{0:03d}.c".format(j)] = (1024, i * 100 + j,
+                                                      i + j, 0)
+        root.subdirs.append(path)
+        index.add(path, state)
+    return index
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=500000,
+                            help="number of indexed files (default: 500000)")
+    args = arg_parser.parse_args()
+
+    index = build(args.files)
+    with tempfile.TemporaryDirectory() as root:
+        os.mkdir(os.path.join(root, "CVS"))
+        start = time.perf_counter()
+        index.save(root)
+        saved = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(root, "CVS", "pycvs.idx"))
+
+        start = time.perf_counter()
+        StatIndex.load(root)
+        loaded = time.perf_counter() - start
+
+    print("{0} files: {1:.1f} MB, saved in {2:.2f}s, loaded in {3:.2f}s"
+          .format(args.files, size / 2 ** 20, saved, loaded))
+
+
+if __name__ == "__main__":
+    main()
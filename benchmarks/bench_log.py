@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure repeated `pycvs log` of a module with and without the log cache.
+
+A synthetic module with a long history is served by testing/fake_cvs.py
+through a :fork: root. The log is taken once without the cache, then with
+it: cold (everything fetched and cached), warm (only headers fetched) and
+warm after --changed files got a new revision. The server spends --latency
+seconds on the whole history of each file, header-only logs are free.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_log.py --files 5000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+
+
+def run_log(pycvs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        pycvs._log(["--no-pager"])
+    elapsed = time.perf_counter() - start
+
+    return elapsed, len(output.getvalue())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=5000,
+                            help="files in the module (default: 5000)")
+    arg_parser.add_argument("--revisions", type=int, default=50,
+                            help="revisions of each file (default: 50)")
+    arg_parser.add_argument("--changed", type=int, default=20,
+                            help="files changed before the last run "
+                                 "(default: 20)")
+    arg_parser.add_argument("--latency", type=float, default=0.02,
+                            help="seconds per file logged (default: 0.02)")
+    args = arg_parser.parse_args()
+
+    os.environ["CVS_SERVER"] = "{0} {1}".format(sys.executable, FAKE_CVS)
+    os.environ["FAKE_CVS_FILES"] = str(args.files)
+    os.environ["FAKE_CVS_REVISIONS"] = str(args.revisions)
+    os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pycvs = PyCvs.__new__(PyCvs)
+        pycvs.credentials = {"root": ":fork:/cvsroot", "user": "dev",
+                             "password": "", "transport": "protocol",
+                             "log_cache_dir": os.path.join(tmp, "cache")}
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            os.environ["FAKE_CVS_LATENCY"] = "0"
+            with contextlib.redirect_stdout(io.StringIO()):
+                pycvs._checkout(["module"])
+            os.environ["FAKE_CVS_LATENCY"] = str(args.latency)
+            os.chdir("module")
+            runs = [("no cache", False), ("cold cache", True),
+                    ("warm cache", True)]
+            for name, cached in runs:
+                pycvs.credentials["log_cache"] = cached
+                elapsed, size = run_log(pycvs)
+                print("{0:>22}: {1:.2f}s ({2:.1f} MB of log)".format(
+                    name, elapsed, size / 1024 / 1024))
+            os.environ["FAKE_CVS_CHANGED"] = str(args.changed)
+            elapsed, size = run_log(pycvs)
+            print("{0:>22}: {1:.2f}s ({2:.1f} MB of log)".format(
+                "warm, {0} changed".format(args.changed), elapsed,
+                size / 1024 / 1024))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Compare the native protocol client with spawning cvs under pexpect.
+
+Both paths check out a synthetic module from testing/fake_cvs.py, which
+stands in for the cvs executable (pexpect path) and for `cvs server`
+(protocol path, through a :fork: root).
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_protocol.py --files 5000
+"""
+import argparse
+import contextlib
+import io
+import os
+import stat
+import sys
+import tempfile
+import time
+
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+
+
+def run_checkout(transport, workdir):
+    pycvs = PyCvs.__new__(PyCvs)
+    pycvs.credentials = {"root": ":fork:/cvsroot", "user": "dev",
+                         "password": "", "transport": transport}
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pycvs._checkout(["module"])
+        return time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=5000,
+                            help="files in the module (default: 5000)")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = os.path.join(tmp, "bin")
+        os.mkdir(bin_dir)
+        wrapper = os.path.join(bin_dir, "cvs")
+        with open(wrapper, "w") as wrapper_file:
+            wrapper_file.write("#!/bin/sh\nexec {0} {1} \"$@\"\n"
+                               .format(sys.executable, FAKE_CVS))
+        os.chmod(wrapper, os.stat(wrapper).st_mode | stat.S_IEXEC)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+        os.environ["CVS_SERVER"] = wrapper
+        os.environ["FAKE_CVS_FILES"] = str(args.files)
+        os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+
+        for transport in ("pexpect", "protocol"):
+            workdir = os.path.join(tmp, transport)
+            os.mkdir(workdir)
+            elapsed = run_checkout(transport, workdir)
+            print("{0:>8}: {1} files checked out in {2:.2f}s"
+                  .format(transport, args.files, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Measure the memory held by the status of many files and the time to print it.
+
+A synthetic `cvs status` output with --files changed files (100 per
+directory, in all the kinds) is parsed; the memory the FileStatus holds is
+measured with tracemalloc, then it is printed into a sink, like a pipe.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_render.py --files 200000
+"""
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+from pycvs.parser import StatusParser
+
+STATUSES = [b"Locally Modified", b"Needs Patch", b"Locally Added",
+            b"Locally Removed", b"Needs Merge", b"File had conflicts on merge"]
+
+
+def lines(nfiles):
+    for i in range(nfiles):
+        if i % 100 == 0:
+            yield (b"cvs status: Examining module/component%03d/dir%05d\n"
+                   % (i // 10000, i // 100))
+        if i % 7 == 0:
+            yield b"? module/component%03d/dir%05d/scratch%06d.txt\n" % (
+                i // 10000, i // 100, i)
+            continue
+        yield b"=" * 67 + b"\n"
+        yield b"File: source_file_%06d.c         \tStatus: %s\n" % (
+            i, STATUSES[i % len(STATUSES)])
+
+
+class Sink(io.TextIOBase):
+    def __init__(self):
+        self.size = 0
+        self.writes = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.size += len(text)
+        self.writes += 1
+        return len(text)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--files", type=int, default=200000,
+                            help="changed files (default: 200000)")
+    args = arg_parser.parse_args()
+
+    data = list(lines(args.files))
+    tracemalloc.start()
+    files = StatusParser().parse(data)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del files
+
+    start = time.perf_counter()
+    files = StatusParser().parse(data)
+    parsed = time.perf_counter() - start
+
+    sink = Sink()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        files.print_files()
+    rendered = time.perf_counter() - start
+
+    print("{0} files: {1:.1f} MB held, parsed in {2:.2f}s, printed in "
+          "{3:.2f}s ({4:.1f} MB in {5} writes)".format(
+              args.files, held / 2 ** 20, parsed, rendered,
+              sink.size / 2 ** 20, sink.writes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure how long the pycvs script takes to start and run short commands.
+
+Each command line is run --runs times as a new process, in a checkout of a
+small synthetic module served by testing/fake_cvs.py (through a :fork: root),
+with its own ~/.pycvs. The median wall time is printed, and how much of it
+is above a bare `python3 -c pass`.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_startup.py --runs 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import stat
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pycvs.cli import PyCvs
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FAKE_CVS = os.path.join(ROOT, "testing", "fake_cvs.py")
+SCRIPT = os.path.join(ROOT, "src", "scripts", "pycvs")
+COMMANDS = [["--help"], ["unknown"], ["status", "--local"],
+            ["status", "--local", "--format=ndjson"], ["conflicts"],
+            ["status"]]
+
+
+def measure(argv, runs):
+    """
+    Returns:
+        The median wall time of the command line, in seconds.
+    """
+    times = []
+    # The first run writes the bytecode of the modules
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times[1:])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--runs", type=int, default=20,
+                            help="runs of each command (default: 20)")
+    arg_parser.add_argument("--script", default=SCRIPT,
+                            help="pycvs script to run (default: the one of "
+                                 "this tree)")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Found on the PATH by versions that look for it on start up
+        wrapper = os.path.join(tmp, "cvs")
+        with open(wrapper, "w") as wrapper_file:
+            wrapper_file.write("#!/bin/sh\nexec {0} {1} \"$@\"\n".format(
+                sys.executable, FAKE_CVS))
+        os.chmod(wrapper, os.stat(wrapper).st_mode | stat.S_IEXEC)
+        os.environ["PATH"] = tmp + os.pathsep + os.environ["PATH"]
+        os.environ["CVS_SERVER"] = wrapper
+        os.environ["FAKE_CVS_FILES"] = "100"
+        os.environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+        os.environ["HOME"] = tmp
+        # As installed: with bytecode, kept out of the tree
+        os.environ.pop("PYTHONDONTWRITEBYTECODE", None)
+        os.environ["PYTHONPYCACHEPREFIX"] = os.path.join(tmp, "pycache")
+        credentials = {"root": ":fork:/cvsroot", "user": "dev",
+                       "password": "", "transport": "protocol"}
+        with open(os.path.join(tmp, ".pycvs"), "w") as cfg_file:
+            json.dump(credentials, cfg_file)
+
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                PyCvs(credentials)._checkout(["module"])
+            os.chdir("module")
+            # Away from the second of the checkout, see suite.modify
+            past = time.time() - 3600
+            with open("dir00000/file00001.c", "a") as changed:
+                changed.write("local change\n")
+            os.utime("dir00000/file00001.c", (past, past))
+
+            python = measure([sys.executable, "-c", "pass"], args.runs)
+            print("{0:>40}: {1:6.1f} ms".format("python3 -c pass",
+                                                python * 1000))
+            for command in COMMANDS:
+                elapsed = measure([sys.executable, args.script] + command,
+                                  args.runs)
+                print("{0:>40}: {1:6.1f} ms ({2:+.1f} ms)".format(
+                    "pycvs " + " ".join(command), elapsed * 1000,
+                    (elapsed - python) * 1000))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
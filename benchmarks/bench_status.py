@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the `cvs status` parser.
+
+Generates a synthetic status output of the requested size and feeds it to
+StatusParser in chunks, as a running CVS process would.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_status.py --size 300
+"""
+import argparse
+import time
+
+from pycvs.parser import StatusParser
+
+SEPARATOR = b"=" * 67 + b"\r\n"
+BLOCK = (SEPARATOR +
+         b"File: file%06d.c         \tStatus: %s\r\n"
+         b"\r\n"
+         b"   Working revision:\t1.3\r\n"
+         b"   Repository revision:\t1.3\t/repo/module/dir/file.c,v\r\n"
+         b"   Sticky Tag:\t\t(none)\r\n"
+         b"   Sticky Date:\t\t(none)\r\n"
+         b"   Sticky Options:\t(none)\r\n"
+         b"\r\n")
+STATUSES = [b"Up-to-date"] * 7 + [b"Locally Modified", b"Needs Patch",
+                                  b"Locally Added"]
+CHUNK_SIZE = 64 * 1024
+
+
+def generate(size_mb):
+    """
+    Yield chunks of synthetic status output until size_mb is reached.
+    """
+    target = size_mb * 1024 * 1024
+    produced = 0
+    index = 0
+    while produced < target:
+        parts = [b"cvs status: Examining dir%06d\r\n" % index]
+        for i in range(100):
+            parts.append(BLOCK % (i, STATUSES[i % len(STATUSES)]))
+        index += 1
+        chunk = b"".join(parts)
+        produced += len(chunk)
+        for i in range(0, len(chunk), CHUNK_SIZE):
+            yield chunk[i:i + CHUNK_SIZE]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--size", type=int, default=300,
+                            help="output size in MB (default: 300)")
+    args = arg_parser.parse_args()
+
+    chunks = list(generate(args.size))
+    total = sum(len(chunk) for chunk in chunks)
+
+    parser = StatusParser()
+    start = time.perf_counter()
+    for chunk in chunks:
+        parser.feed(chunk)
+    files = parser.close()
+    elapsed = time.perf_counter() - start
+
+    classified = sum(len(getattr(files, kind)) for kind in vars(files))
+    print("{0:.1f} MB parsed in {1:.2f}s ({2:.1f} MB/s), {3} files classified"
+          .format(total / 2 ** 20, elapsed, total / 2 ** 20 / elapsed,
+                  classified))
+
+
+if __name__ == "__main__":
+    main()
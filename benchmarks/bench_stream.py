@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare the peak memory of reading cvs output whole and line by line.
+
+A checkout printing one "U file" line per file is fed to the counting loop
+of `pycvs checkout`, once buffered the way pycvs used to read the output of
+cvs (everything in `before`, decoded and split) and once streamed through
+pycvs.stream. Each mode runs in its own process to measure its peak RSS.
+
+    % PYTHONPATH=src/python python3 benchmarks/bench_stream.py --lines 2000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from pycvs import protocol
+from pycvs.cli import PyCvs
+
+
+def events(nlines):
+    for i in range(nlines):
+        if i % 100 == 0:
+            yield "E", "cvs server: Updating module/dir{0:06d}".format(i)
+        yield "M", "U module/dir{0:06d}/file{1:08d}.c".format(i // 100, i)
+
+
+def buffered(nlines):
+    before = b"".join(text.encode("utf-8") + b"\n"
+                      for _, text in events(nlines))
+    output = before.decode("utf-8")
+    output = output.split("\n")
+    files = 0
+    for line in output:
+        if line.startswith("U "):
+            files += 1
+    return files
+
+
+def streaming(nlines):
+    pycvs = PyCvs.__new__(PyCvs)
+    pycvs.credentials = {"root": ":pserver:dev@host:/cvsroot"}
+    pycvs._access_cvs = lambda cmd, stream=False, cwd=None: protocol.Session(
+        events(nlines), stream)
+    with contextlib.redirect_stdout(io.StringIO()):
+        files, _, _ = pycvs._checkout_module("module", "")
+    return files
+
+
+MODES = {"buffered": buffered, "streaming": streaming}
+
+
+def run(mode, nlines):
+    start = time.perf_counter()
+    files = MODES[mode](nlines)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{0:>9}: {1} files in {2:.2f}s, peak RSS {3:.1f} MB"
+          .format(mode, files, elapsed, peak / 1024))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--lines", type=int, default=1000000,
+                            help="files in the checkout (default: 1000000)")
+    arg_parser.add_argument("--mode", choices=sorted(MODES),
+                            help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.mode is not None:
+        run(args.mode, args.lines)
+        return
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    for mode in ("buffered", "streaming"):
+        sys.stdout.flush()
+        subprocess.check_call([sys.executable, os.path.abspath(__file__),
+                               "--mode", mode, "--lines", str(args.lines)],
+                              env=env)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: every command path of pycvs at several scales.
+
+A synthetic module of --scales files is served by testing/fake_cvs.py, which
+stands in for `cvs server` (the "protocol" variant, through a :fork: root)
+and for the cvs executable run under pexpect: as is ("pexpect"), with CRLF
+line endings ("crlf") or asking for the password first ("password"). For
+every variant and scale the module is checked out, updated (1% of the files
+changed on the server), then 1% of the files are modified locally and
+status, diff, log and add (1% new files) are run on the working copy.
+
+Each step runs in its own process, which reports its wall time, the cvs
+output it parsed (MB and MB/s) and its peak RSS. The results are printed
+and written as JSON to --output; with --baseline, the results of an earlier
+run (e.g. of another version) are compared with them.
+
+    % PYTHONPATH=src/python python3 benchmarks/suite.py --scales 1000,10000
+    % PYTHONPATH=src/python python3 benchmarks/suite.py --scales 1000000 \\
+          --variants protocol --output new.json --baseline old.json
+
+A million files take about 10 GB of disk in the working copy. Every
+connection starts a stand-in server, which builds the synthetic repository
+first: about 3s at a million files, which adds up in add (one connection per
+directory).
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from pycvs import stream
+from pycvs.cli import PyCvs
+
+FAKE_CVS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "testing", "fake_cvs.py")
+VERSION = 1
+COMMANDS = ["checkout", "update", "status", "diff", "log", "add"]
+VARIANTS = ["protocol", "pexpect", "crlf", "password"]
+PASSWORD = "secret"
+# Results this much slower than the baseline are flagged
+REGRESSION = 1.2
+
+
+class Counter(io.TextIOBase):
+    """
+    Stand-in for stdout: counts what the command prints.
+    """
+    def __init__(self):
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.size += len(text)
+        return len(text)
+
+
+def count_input(pycvs):
+    """
+    Count the bytes of cvs output the command reads, in both the line
+    iterators pycvs has.
+    """
+    counted = [0]
+    output_lines = stream.output_lines
+    cvs_lines = PyCvs._cvs_lines
+
+    def counting_output_lines(cvs_obj):
+        for kind, line in output_lines(cvs_obj):
+            counted[0] += len(line) + 1
+            yield kind, line
+
+    def counting_cvs_lines(cvs_obj):
+        for line in cvs_lines(cvs_obj):
+            counted[0] += len(line)
+            yield line
+
+    stream.output_lines = counting_output_lines
+    pycvs._cvs_lines = counting_cvs_lines
+
+    return counted
+
+
+def run_step(command, variant, files, workdir):
+    """
+    Run one command in this process and print its measures as JSON.
+    """
+    pycvs = PyCvs({"root": ":fork:/cvsroot", "user": "dev",
+                   "password": PASSWORD if variant == "password" else "",
+                   "transport": "protocol" if variant == "protocol"
+                   else "pexpect"})
+    if command == "checkout":
+        os.chdir(workdir)
+    else:
+        os.chdir(os.path.join(workdir, "module"))
+    if command == "add":
+        names = []
+        for i in range(max(1, files // 100)):
+            directory = os.path.join("added", "dir{0:05d}".format(i // 100))
+            os.makedirs(directory, exist_ok=True)
+            names.append(os.path.join(directory, "new{0:05d}.c".format(i)))
+            with open(names[-1], "w") as new_file:
+                new_file.write("new file\n")
+    runs = {"checkout": lambda: pycvs._checkout(["module"]),
+            "update": lambda: pycvs._update([]),
+            "status": lambda: pycvs._status([]),
+            "diff": lambda: pycvs._diff(["--no-pager"]),
+            "log": lambda: pycvs._log(["--no-pager"]),
+            "add": lambda: pycvs._add(["added"])}
+
+    counted = count_input(pycvs)
+    output = Counter()
+    code = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        try:
+            runs[command]()
+        except SystemExit as error:
+            code = error.code if isinstance(error.code, int) else 1
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "command": command, "variant": variant, "files": files,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(files / elapsed, 1),
+        "input_mb": round(counted[0] / 2 ** 20, 3),
+        "input_mb_per_second": round(counted[0] / 2 ** 20 / elapsed, 3),
+        "output_mb": round(output.size / 2 ** 20, 3),
+        "peak_rss_mb": round(peak / 1024, 1), "exit": code}))
+
+
+def modify(workdir, files):
+    """
+    Change the last 1% of the files of the working copy.
+    """
+    # Away from the second of the checkout, which Entries can not tell apart
+    past = time.time() - 3600
+    for i in range(files - max(1, files // 100), files):
+        path = os.path.join(workdir, "module", "dir{0:05d}".format(i // 100),
+                            "file{0:05d}.c".format(i))
+        with open(path, "a") as changed:
+            changed.write("local change\n")
+        os.utime(path, (past, past))
+
+
+def run_variant(variant, files, tmp):
+    """
+    Run all the commands on a fresh working copy, each in a new process.
+
+    Returns:
+        A list of results.
+    """
+    workdir = os.path.join(tmp, "{0}-{1}".format(variant, files))
+    os.mkdir(workdir)
+    env = dict(os.environ, FAKE_CVS_FILES=str(files),
+               PYTHONPATH=os.pathsep.join(sys.path))
+    if variant == "crlf":
+        env["FAKE_CVS_CRLF"] = "1"
+    if variant == "password":
+        env["FAKE_CVS_PASSWORD"] = PASSWORD
+
+    results = []
+    for command in COMMANDS:
+        if command == "update":
+            env["FAKE_CVS_CHANGED"] = str(max(1, files // 100))
+        elif command == "status":
+            modify(workdir, files)
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--step", command,
+             variant, str(files), workdir],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        if process.returncode == 0:
+            result = json.loads(process.stdout.splitlines()[-1])
+        else:
+            result = {"command": command, "variant": variant, "files": files,
+                      "error": process.stderr.strip().splitlines()[-1:]}
+        results.append(result)
+        print(format_result(result))
+        sys.stdout.flush()
+    shutil.rmtree(workdir)
+
+    return results
+
+
+def format_result(result, baseline=None):
+    line = "{0:>8} {1:>8} {2:>8} files: ".format(
+        result["variant"], result["command"], result["files"])
+    if "error" in result:
+        return line + "failed ({0})".format(" ".join(result["error"]))
+    line += ("{0:8.2f}s {1:9.0f} files/s {2:8.1f} MB/s parsed "
+             "{3:7.1f} MB RSS".format(
+                 result["seconds"], result["files_per_second"],
+                 result["input_mb_per_second"], result["peak_rss_mb"]))
+    if result["exit"] != 0:
+        line += " (exit {0})".format(result["exit"])
+    if baseline is not None and "error" not in baseline:
+        ratio = result["seconds"] / max(baseline["seconds"], 0.001)
+        line += " {0:5.2f}x time {1:5.2f}x RSS".format(
+            ratio, result["peak_rss_mb"] / baseline["peak_rss_mb"])
+        if ratio > REGRESSION:
+            line += " SLOWER"
+
+    return line
+
+
+def compare(results, path):
+    """
+    Print the results next to those of an earlier run.
+    """
+    with open(path, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(result["command"], result["variant"], result["files"]):
+                result for result in baseline["results"]}
+    print("\nCompared with {0} ({1}):".format(path, baseline["revision"]))
+    for result in results:
+        key = (result["command"], result["variant"], result["files"])
+        if key in previous:
+            print(format_result(result, previous[key]))
+
+
+def revision():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--scales", default="1000,10000,100000",
+                            help="comma separated numbers of files "
+                                 "(default: 1000,10000,100000)")
+    arg_parser.add_argument("--variants", default=",".join(VARIANTS),
+                            help="comma separated variants among {0} "
+                                 "(default: all)".format(", ".join(VARIANTS)))
+    arg_parser.add_argument("--output", default="pycvs-bench.json",
+                            help="JSON file of the results "
+                                 "(default: pycvs-bench.json)")
+    arg_parser.add_argument("--baseline",
+                            help="JSON results of an earlier run to compare")
+    arg_parser.add_argument("--step", nargs=4, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.step is not None:
+        command, variant, files, workdir = args.step
+        run_step(command, variant, int(files), workdir)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = os.path.join(tmp, "bin")
+        os.mkdir(bin_dir)
+        wrapper = os.path.join(bin_dir, "cvs")
+        with open(wrapper, "w") as wrapper_file:
+            wrapper_file.write("#!/bin/sh\nexec {0} {1} \"$@\"\n"
+                               .format(sys.executable, FAKE_CVS))
+        os.chmod(wrapper, os.stat(wrapper).st_mode | stat.S_IEXEC)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+        os.environ["CVS_SERVER"] = wrapper
+        # Keep the configuration and caches of the user out of it
+        os.environ["HOME"] = tmp
+
+        results = []
+        for files in [int(scale) for scale in args.scales.split(",")]:
+            for variant in args.variants.split(","):
+                results += run_variant(variant, files, tmp)
+
+    with open(args.output, "w") as output:
+        json.dump({"version": VERSION, "revision": revision(),
+                   "date": datetime.datetime.utcnow().isoformat() + "Z",
+                   "python": platform.python_version(),
+                   "platform": platform.platform(),
+                   "results": results}, output, indent=2)
+    print("Results written to {0}".format(args.output))
+    if args.baseline is not None:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -40,7 +40,7 @@ setup(name='pycvs',
       license='MIT',
       scripts=['src/scripts/pycvs'],
       package_dir={'': 'src/python'},
-      packages=['pycvs'],
+      packages=['pycvs', 'pycvs.commands'],
       classifiers=[
             'Programming Language :: Python :: 3',
             'Programming Language :: Python :: 3.4',
@@ -0,0 +1,307 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import os
+import shlex
+import time
+
+# Library packages
+from pycvs import conflicts, incremental, protocol
+from pycvs.data import (FILE_ADDED, FILE_MERGED, FILE_MERGING, FILE_MODIFIED,
+                        FILE_NEW, FILE_OUTDATED, FILE_REMOVED)
+from pycvs.local import WorkingCopy, is_working_dir
+from pycvs.parser import StatusParser
+
+# Operations run at a time by default
+DEFAULT_LIMIT = 8
+# Kinds of FileStatus in the order reports show them
+REPORT_KINDS = [FILE_MODIFIED, FILE_ADDED, FILE_REMOVED, FILE_MERGED,
+                FILE_MERGING, FILE_OUTDATED, FILE_NEW]
+
+# Outcome of an update: files updated, conflicted files (relative to the
+# current directory) and whether cvs succeeded.
+UpdateResult = collections.namedtuple("UpdateResult", [
+    "files", "conflicts", "succeeded"])
+# Outcome of a checkout: files and directories checked out and whether cvs
+# succeeded.
+CheckoutResult = collections.namedtuple("CheckoutResult", [
+    "files", "dirs", "succeeded"])
+# Outcome of an operation on one working copy of many: the result, or the
+# error that prevented it.
+WorkspaceResult = collections.namedtuple("WorkspaceResult", [
+    "directory", "result", "error"])
+
+
+class PyCvsError(Exception):
+    """
+    An operation could not be done, e.g. cvs could not be run.
+    """
+
+
+class AsyncPyCvs():
+    """
+    asyncio interface to pycvs, to work on many working copies at once.
+    Operations run the blocking PyCvs code in threads, at most limit of them
+    at a time, and return their results instead of printing them.
+
+        client = AsyncPyCvs(PyCvs(credentials))
+        results = await client.across(directories, client.status)
+    """
+    def __init__(self, pycvs, limit=DEFAULT_LIMIT):
+        """
+        Args:
+            pycvs(PyCvs): the PyCvs object doing the work, with its
+                configuration.
+            limit(int): operations run at a time.
+        """
+        self.pycvs = pycvs
+        self.limit = limit
+        self._executor = concurrent.futures.ThreadPoolExecutor(limit)
+        # Created on first use, in the loop of the caller
+        self._semaphore = None
+
+    async def _run(self, function, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            return await asyncio.get_event_loop().run_in_executor(
+                self._executor, functools.partial(function, *args))
+
+    async def status(self, directory=".", local=False):
+        """
+        Status of a working copy, with its conflict markers.
+
+        Args:
+            directory(str): the working copy.
+            local(bool): only look at the working copy, not at the server.
+
+        Returns:
+            A FileStatus object, paths relative to the directory.
+
+        Raises:
+            PyCvsError: the directory is not a working copy or cvs failed.
+        """
+        return await self._run(self._status, directory, local)
+
+    def _status(self, directory, local):
+        _check_working_dir(directory)
+        if local:
+            files = WorkingCopy(directory, use_index=True).status()
+        else:
+            cvs_obj = self.pycvs._access_cvs("cvs status", stream=True,
+                                             cwd=directory)
+            if cvs_obj is None:
+                raise PyCvsError("Could not get the status of {0}"
+                                 .format(directory))
+            files = StatusParser().parse(self.pycvs._cvs_lines(cvs_obj))
+        files.conflicts = [
+            conflict._replace(path=os.path.relpath(conflict.path,
+                                                   directory))
+            for conflict in conflicts.scan_status(files, directory, 1)]
+
+        return files
+
+    async def update(self, directory=".", args=()):
+        """
+        Update a working copy.
+
+        Args:
+            directory(str): the working copy.
+            args(list): options for cvs update, e.g. ["-d", "-P"].
+
+        Returns:
+            An UpdateResult.
+
+        Raises:
+            PyCvsError: the directory is not a working copy or cvs could
+                not be run.
+        """
+        return await self._run(self._update, directory, list(args))
+
+    def _update(self, directory, args):
+        _check_working_dir(directory)
+        started = time.time()
+        result = self.pycvs._update_directory(
+            directory, " ".join(shlex.quote(arg) for arg in args))
+        if result is None:
+            raise PyCvsError("Could not update {0}".format(directory))
+        files, conflicted, succeeded = result
+        root = protocol.root_of(directory)
+        # Like `pycvs update`, only updates of everything are recorded
+        whole = all(set(arg) <= set("-dP") for arg in args)
+        if whole and root is not None and (succeeded or conflicted):
+            incremental.record_update(root, started, directory)
+
+        return UpdateResult(files, conflicted, succeeded)
+
+    async def checkout(self, module, directory=".", args=()):
+        """
+        Check out a module.
+
+        Args:
+            module(str): the module.
+            directory(str): where to check it out, created when missing.
+            args(list): options for cvs checkout.
+
+        Returns:
+            A CheckoutResult.
+
+        Raises:
+            PyCvsError: cvs could not be run.
+        """
+        return await self._run(self._checkout, module, directory,
+                               list(args))
+
+    def _checkout(self, module, directory, args):
+        os.makedirs(directory, exist_ok=True)
+        result = self.pycvs._checkout_module(
+            shlex.quote(module), " ".join(shlex.quote(arg) for arg in args),
+            cwd=directory)
+        if result is None:
+            raise PyCvsError("Could not check out {0}".format(module))
+
+        return CheckoutResult(*result)
+
+    async def log(self, directory=".", paths=()):
+        """
+        Logs of the files of a working copy.
+
+        Args:
+            directory(str): the working copy.
+            paths(list): files and directories in it, everything if empty.
+
+        Returns:
+            A list of FileLog objects (see pycvs.rcslog).
+
+        Raises:
+            PyCvsError: the directory is not a working copy or cvs failed.
+        """
+        return await self._run(self._log, directory, list(paths))
+
+    def _log(self, directory, paths):
+        _check_working_dir(directory)
+        logs = self.pycvs._read_logs([shlex.quote(path) for path in paths],
+                                     cwd=directory)
+        if logs is None:
+            raise PyCvsError("Could not get the logs of {0}"
+                             .format(directory))
+
+        return logs
+
+    async def across(self, directories, operation, *args):
+        """
+        Run an operation on several working copies concurrently.
+
+        Args:
+            directories(list): the working copies.
+            operation(coroutine function): e.g. self.status, called with
+                each directory and args.
+
+        Returns:
+            A list of WorkspaceResult, in the order of the directories. A
+            failure on one working copy does not stop the others.
+        """
+        async def run(directory):
+            try:
+                return WorkspaceResult(
+                    directory, await operation(directory, *args), None)
+            except (PyCvsError, OSError) as error:
+                return WorkspaceResult(directory, None, error)
+
+        return await asyncio.gather(*(run(directory)
+                                      for directory in directories))
+
+    def close(self):
+        self._executor.shutdown()
+
+
+def _check_working_dir(directory):
+    if not is_working_dir(directory):
+        raise PyCvsError("{0} is not a CVS working copy".format(directory))
+
+
+def find_checkouts(top):
+    """
+    Find the working copies under a directory: the top directories of
+    checkouts, not their subdirectories.
+
+    Returns:
+        A sorted list of paths.
+    """
+    if is_working_dir(top):
+        return [top]
+    found = []
+    try:
+        items = sorted(os.scandir(top), key=lambda item: item.name)
+    except OSError:
+        return found
+    for item in items:
+        if item.is_dir(follow_symlinks=False) and item.name != "CVS":
+            found += find_checkouts(item.path)
+
+    return found
+
+
+def format_status(result):
+    """
+    Lines of the report of `pycvs --workspace DIR status` for a working
+    copy: a summary line, then its files.
+    """
+    if result.error is not None:
+        return ["{0}: failed ({1})".format(result.directory, result.error)]
+    files = result.result
+    counts = ["{0} {1}".format(len(getattr(files, kind)), kind)
+              for kind in REPORT_KINDS if getattr(files, kind)]
+    if files.conflicts:
+        counts.append("{0} unresolved conflicts".format(
+            len(files.conflicts)))
+    if not counts:
+        return ["{0}: clean".format(result.directory)]
+
+    lines = ["{0}: {1}".format(result.directory, ", ".join(counts))]
+    for kind in REPORT_KINDS:
+        for path in getattr(files, kind):
+            lines.append("\t{0}:\t{1}".format(kind, path.strip()))
+    for conflict in files.conflicts:
+        lines.append("\tconflict:\t{0}, lines {1}-{2}".format(
+            conflict.path, conflict.start, conflict.end))
+
+    return lines
+
+
+def format_update(result):
+    """
+    Lines of the report of `pycvs --workspace DIR update` for a working
+    copy.
+    """
+    if result.error is not None:
+        return ["{0}: failed ({1})".format(result.directory, result.error)]
+    files, conflicted, succeeded = result.result
+    line = "{0}: {1} files updated".format(result.directory, files)
+    if conflicted:
+        line += ", {0} conflicted files".format(len(conflicted))
+    if not succeeded and not conflicted:
+        line += " (cvs failed)"
+
+    return [line] + ["\tconflict:\t{0}".format(path) for path in conflicted]
@@ -0,0 +1,211 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Library packages
+from pycvs import pristine, protocol
+from pycvs.local import is_working_dir, read_entries, read_repository
+
+CACHE_DIR = os.path.expanduser("~/.pycvs-cache/annotate")
+VERSION = 1
+# Size cap of the cache, in MB
+DEFAULT_MAX_SIZE = 128
+HEADER_SEPARATOR = "*" * 15
+# cvs prints "%-12s (%-8.8s %s): " before each line: the author is cut or
+# padded to 8 characters and the date is dd-Mon-yy
+ANNOTATION_LINE = re.compile(r"(\S+) +\((.{8}) (\d\d-\w{3}-\d\d)\): ?")
+
+# One line of an annotated file: the revision that last changed it, its
+# author and date (as cvs prints it, e.g. 01-Mar-16) and the text.
+Annotation = collections.namedtuple("Annotation", ["revision", "author",
+                                                   "date", "text"])
+
+
+def parse(lines):
+    """
+    Parse the output of cvs annotate for one file.
+
+    Args:
+        lines(iterable): lines cvs printed on stdout, without their end of
+            line.
+
+    Returns:
+        A list of Annotation objects. Lines that are not annotations are
+        left out.
+    """
+    annotations = []
+    for line in lines:
+        match = ANNOTATION_LINE.match(line)
+        if match is not None:
+            annotations.append(Annotation(match.group(1),
+                                          match.group(2).rstrip(),
+                                          match.group(3),
+                                          line[match.end():]))
+
+    return annotations
+
+
+def format_annotation(annotation):
+    """
+    Format an annotated line the way cvs annotate prints it.
+    """
+    return "{0:<12} ({1:<8.8} {2}): {3}".format(*annotation)
+
+
+def is_revision(revision):
+    """
+    Whether a -r value is a revision number rather than a tag, i.e. always
+    annotates the same content.
+    """
+    return re.match(r"\d+(\.\d+)+$", revision) is not None
+
+
+def working_files(paths):
+    """
+    Find the files of the working copy to annotate.
+
+    Args:
+        paths(list): files and directories, the current directory if empty.
+            Directories are walked recursively.
+
+    Returns:
+        A generator of (path, entry) tuples, entry being the Entries line of
+        the file or None when CVS does not know it.
+    """
+    for path in paths or ["."]:
+        if os.path.isdir(path):
+            yield from _walk(path)
+            continue
+        parent, name = os.path.split(path)
+        try:
+            entry = read_entries(parent or ".").get(name)
+        except OSError:
+            entry = None
+        yield path, None if entry is None or entry.is_dir else entry
+
+
+def _walk(directory):
+    if not is_working_dir(directory):
+        return
+    subdirs = []
+    for name, entry in sorted(read_entries(directory).items()):
+        path = name if directory == "." else os.path.join(directory, name)
+        if entry.is_dir:
+            subdirs.append(path)
+        else:
+            yield path, entry
+    for subdir in subdirs:
+        yield from _walk(subdir)
+
+
+def module_path(root, path):
+    """
+    Path of a working file in the repository, relative to the root, as
+    rannotate and co take it.
+    """
+    parent, name = os.path.split(path)
+    repository = read_repository(parent or ".")
+    root_path = protocol.parse_root(root).path.rstrip("/") + "/"
+    if repository.startswith(root_path):
+        repository = repository[len(root_path):]
+
+    return "{0}/{1}".format(repository.rstrip("/"), name)
+
+
+class AnnotateCache():
+    """
+    On-disk cache of annotated files. The annotation of a given revision of
+    an RCS file never changes, so entries are only evicted, least recently
+    used first, once the cache grows past its cap. Each entry is one file:
+    the first line says what it holds, the next ones are the annotated
+    lines.
+    """
+    def __init__(self, root, path=CACHE_DIR,
+                 max_size=DEFAULT_MAX_SIZE * 1024 * 1024):
+        """
+        Args:
+            root(str): CVSROOT the RCS files belong to.
+            path(str): directory of the cache. Defaults to
+                ~/.pycvs-cache/annotate
+            max_size(int): size cap in bytes.
+        """
+        self.root = root
+        self.path = path
+        self.max_size = max_size
+
+    def _file_path(self, rcs_file, revision):
+        key = "{0}\0{1}\0{2}".format(self.root, rcs_file, revision)
+        digest = hashlib.sha1(key.encode("utf-8", "replace")).hexdigest()
+        return os.path.join(self.path, digest[:2], digest[2:] + ".json")
+
+    def _key(self, rcs_file, revision):
+        return {"version": VERSION, "root": self.root, "rcs_file": rcs_file,
+                "revision": revision}
+
+    def get(self, rcs_file, revision):
+        """
+        Returns:
+            The list of Annotation objects of a revision of an RCS file, or
+            None when it is not in the cache.
+        """
+        path = self._file_path(rcs_file, revision)
+        try:
+            with open(path, "r") as cache_file:
+                if (json.loads(cache_file.readline())
+                        != self._key(rcs_file, revision)):
+                    return None
+                annotations = [Annotation(*json.loads(line))
+                               for line in cache_file]
+            os.utime(path)
+        except (OSError, ValueError, TypeError):
+            return None
+
+        return annotations
+
+    def put(self, rcs_file, revision, annotations):
+        """
+        Store the annotation of a revision of an RCS file.
+        """
+        path = self._file_path(rcs_file, revision)
+        tmp_path = "{0}.{1}-{2}.tmp".format(path, os.getpid(),
+                                            threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w") as cache_file:
+                cache_file.write(json.dumps(self._key(rcs_file, revision))
+                                 + "\n")
+                for annotation in annotations:
+                    cache_file.write(json.dumps(list(annotation)) + "\n")
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def trim(self):
+        """
+        Evict the least recently used annotations until the cache fits its
+        cap.
+        """
+        pristine.trim(self.path, self.max_size)
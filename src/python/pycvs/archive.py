@@ -0,0 +1,110 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import io
+import sys
+import tarfile
+import time
+import zipfile
+
+# zip can not hold dates before 1980
+ZIP_EPOCH = 315619200
+# tarfile stream modes by file name suffix. Archives with other names are
+# zip files.
+TAR_MODES = [(".tar.gz", "w|gz"), (".tgz", "w|gz"), (".tar.bz2", "w|bz2"),
+             (".tar.xz", "w|xz"), (".tar", "w|")]
+
+
+def parse_listing(lines):
+    """
+    Parse the output of cvs rls -e -R: a "directory:" line followed by the
+    Entries lines of each directory.
+
+    Args:
+        lines(iterable): lines cvs printed on stdout.
+
+    Returns:
+        A generator of (path, revision, options) tuples for the files.
+    """
+    directory = None
+    for line in lines:
+        if line.startswith("/"):
+            fields = line.split("/")
+            if directory is not None and len(fields) == 6:
+                yield directory + "/" + fields[1], fields[2], fields[4]
+        elif line.endswith(":") and not line.startswith("D/"):
+            directory = line[:-1]
+
+
+class ArchiveWriter():
+    """
+    Writes files to a tar or zip archive as they come, without keeping more
+    than the file being written in memory. Tar archives are written as a
+    stream, so they can go to a pipe as well ("-" for stdout).
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path(str): archive to create. Its suffix tells the format:
+                .tar.gz/.tgz, .tar.bz2, .tar.xz, .tar or .zip. "-" writes a
+                gzipped tar to stdout.
+        """
+        self.zip_file = None
+        self.tar_file = None
+        if path == "-":
+            self.tar_file = tarfile.open(fileobj=sys.stdout.buffer,
+                                         mode="w|gz")
+            return
+        for suffix, mode in TAR_MODES:
+            if path.endswith(suffix):
+                self.tar_file = tarfile.open(path, mode)
+                return
+        self.zip_file = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, name, data, mode=0o644, mod_time=None):
+        """
+        Add a file.
+
+        Args:
+            name(str): path in the archive.
+            data(bytes): contents.
+            mode(int): permission bits.
+            mod_time(float): modification time, now when None.
+        """
+        if mod_time is None:
+            mod_time = time.time()
+        if self.tar_file is not None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = mode
+            info.mtime = int(mod_time)
+            self.tar_file.addfile(info, io.BytesIO(data))
+            return
+        info = zipfile.ZipInfo(name, time.localtime(
+            max(mod_time, ZIP_EPOCH))[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = (0o100000 | mode) << 16
+        self.zip_file.writestr(info, data)
+
+    def close(self):
+        if self.tar_file is not None:
+            self.tar_file.close()
+        else:
+            self.zip_file.close()
@@ -0,0 +1,180 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import contextlib
+import io
+import json
+import os
+import shlex
+import sys
+import time
+
+# Library packages
+from pycvs import protocol
+
+# Commands that make no sense inside a batch
+EXCLUDED_COMMANDS = ["batch", "daemon"]
+
+
+def parse_command(line):
+    """
+    Parse a line of a batch: a JSON object {"argv": [...], "cwd": ...,
+    "id": ...}, a JSON list of arguments, or a plain command line.
+
+    Returns:
+        A dict with the argv list and optionally cwd and id, or None for
+        blank and comment lines.
+
+    Raises:
+        ValueError: the line can not be understood.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        command = json.loads(line)
+    elif line.startswith("["):
+        command = {"argv": json.loads(line)}
+    else:
+        command = {"argv": shlex.split(line)}
+    argv = command.get("argv") if isinstance(command, dict) else None
+    if (not isinstance(argv, list) or not argv
+            or not all(isinstance(arg, str) for arg in argv)):
+        raise ValueError("argv must be a non-empty list of strings")
+
+    return command
+
+
+class Batch():
+    """
+    Runs many pycvs commands in a single process: the configuration is read
+    once and a connection to each CVSROOT is opened once and lent to all
+    the commands, like the daemon does for separate invocations.
+    """
+    def __init__(self, pycvs, out=None):
+        """
+        Args:
+            pycvs(PyCvs): configured instance used to run the commands.
+            out(file): where the JSON records go. Defaults to sys.stdout.
+        """
+        self.pycvs = pycvs
+        self.out = out or sys.stdout
+        # root -> connected protocol client
+        self.clients = {}
+
+    def run(self, lines):
+        """
+        Run the commands of the lines one after the other, writing a JSON
+        record for each one as soon as it finished:
+        {"id", "argv", "exit", "output", "seconds"}, or {"id", "error"}
+        for a line that could not be run.
+
+        Returns:
+            The number of commands that failed.
+        """
+        failed = 0
+        for number, line in enumerate(lines, 1):
+            try:
+                command = parse_command(line)
+            except ValueError as error:
+                record = {"id": number, "error": str(error)}
+            else:
+                if command is None:
+                    continue
+                record = self.run_command(command["argv"],
+                                          command.get("cwd"))
+                record["id"] = command.get("id", number)
+            if "error" in record or record["exit"] != 0:
+                failed += 1
+            self.out.write(json.dumps(record, sort_keys=True) + "\n")
+            self.out.flush()
+
+        return failed
+
+    def run_command(self, argv, cwd=None):
+        """
+        Run a command as `pycvs argv` would, in the cwd directory.
+
+        Returns:
+            A dict with the argv, the exit status, what the command printed
+            and how long it took.
+        """
+        if argv[0] in EXCLUDED_COMMANDS:
+            return {"argv": argv, "error": "{0} is not available in a batch"
+                    .format(argv[0])}
+        previous = os.getcwd()
+        try:
+            os.chdir(cwd or previous)
+        except OSError as error:
+            return {"argv": argv, "error": str(error)}
+
+        started = time.perf_counter()
+        output = io.StringIO()
+        argv_saved = sys.argv
+        sys.argv = ["pycvs"] + argv
+        code = 0
+        try:
+            root, client = self._client_for(
+                protocol.root_of(".") or self.pycvs.credentials.get("root"))
+            self.pycvs.sessions = {root: client} if client else None
+            with contextlib.redirect_stdout(output):
+                self.pycvs.process()
+        except SystemExit as error:
+            code = error.code if isinstance(error.code, int) else 1
+        except Exception as error:
+            output.write("pycvs batch: {0}\n".format(error))
+            code = 1
+        finally:
+            sys.argv = argv_saved
+            self.pycvs.sessions = None
+            os.chdir(previous)
+        # A command that stopped reading its output closed the connection
+        self.clients = {root: client for root, client in self.clients.items()
+                        if client.connection is not None}
+
+        return {"argv": argv, "exit": code, "output": output.getvalue(),
+                "seconds": round(time.perf_counter() - started, 3)}
+
+    def _client_for(self, root):
+        """
+        The connected protocol client of the root, opened on first use.
+
+        Returns:
+            A (root, client) tuple, client being None when the root does not
+            use the protocol or could not be reached; the command reports
+            the problem by itself then.
+        """
+        if root is None or not self.pycvs._use_protocol(root):
+            return root, None
+        if root not in self.clients:
+            client = self.pycvs._protocol_client(root)
+            try:
+                client.connect()
+            except (protocol.ProtocolError, OSError):
+                client.close()
+                return root, None
+            self.clients[root] = client
+
+        return root, self.clients[root]
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+        self.clients = {}
@@ -0,0 +1,331 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import difflib
+import time
+
+# Seconds between two revisions of the same author and message for them to
+# be in the same changeset, as cvsps -z
+DEFAULT_FUZZ = 300
+SEPARATOR = "=" * 67
+
+# A commit rebuilt from the per-file history. members is a list of
+# (path, revision, state) tuples and tags the symbolic names that point
+# right after it.
+Changeset = collections.namedtuple("Changeset", [
+    "id", "date", "author", "branch", "message", "members", "tags"])
+
+
+def previous_revision(revision):
+    """
+    The revision a revision was committed on top of: 1.4 for 1.5, the branch
+    point 1.2 for 1.2.2.1, None for 1.1.
+    """
+    parts = revision.split(".")
+    if int(parts[-1]) > 1:
+        parts[-1] = str(int(parts[-1]) - 1)
+        return ".".join(parts)
+    if len(parts) > 2:
+        return ".".join(parts[:-2])
+
+    return None
+
+
+def branch_names(tags):
+    """
+    Find the branches among the symbolic names of a file.
+
+    Args:
+        tags(iterable): (name, revision) tuples.
+
+    Returns:
+        A dict of branch names indexed by branch number, e.g. "1.2.2" for
+        the magic revision 1.2.0.2, or 1.1.1 for a vendor branch.
+    """
+    branches = {}
+    for name, revision in tags:
+        parts = revision.split(".")
+        if len(parts) > 2 and parts[-2] == "0":
+            branches[".".join(parts[:-2] + parts[-1:])] = name
+        elif len(parts) % 2 == 1:
+            branches[revision] = name
+
+    return branches
+
+
+def branch_of(revision, branches):
+    """
+    Name of the branch of a revision: HEAD for the trunk, the branch number
+    when the branch has no name.
+    """
+    parts = revision.split(".")
+    if len(parts) == 2:
+        return "HEAD"
+    number = ".".join(parts[:-1])
+
+    return branches.get(number, number)
+
+
+def group(revisions, fuzz=DEFAULT_FUZZ):
+    """
+    Group file revisions in changesets: sorting by branch, author, message
+    and date puts the revisions of a commit next to each other, so that a
+    single pass splits them, in O(n log n). Revisions with a commit id (cvs
+    1.12) are grouped by it instead.
+
+    Args:
+        revisions(iterable): (file, revision, date, author, branch, commitid,
+            message) tuples.
+        fuzz(int): largest gap in seconds between two revisions of a
+            changeset without commit id. A file revised twice in the window
+            starts a new changeset as well.
+
+    Returns:
+        A list of changesets, each a list of revisions, sorted by date.
+    """
+    ordered = sorted(revisions, key=lambda revision: (
+        revision[4], revision[3], revision[6], revision[5] or "",
+        revision[2]))
+
+    changesets = []
+    current = None
+    current_key = None
+    files = set()
+    last = 0
+    for revision in ordered:
+        key = (revision[4], revision[3], revision[6], revision[5])
+        if (key != current_key
+                or (revision[5] is None
+                    and (revision[2] - last > fuzz or revision[0] in files))):
+            current = []
+            changesets.append(current)
+            current_key = key
+            files = set()
+        current.append(revision)
+        files.add(revision[0])
+        last = revision[2]
+    changesets.sort(key=lambda changeset: (changeset[0][2],
+                                           changeset[-1][2]))
+
+    return changesets
+
+
+def update(index, fuzz=DEFAULT_FUZZ):
+    """
+    Put the revisions added to a history index since the last time in
+    changesets. Changesets recent enough to get more revisions are rebuilt,
+    keeping their numbers; the others are not looked at again.
+
+    Args:
+        index(HistoryIndex): the index.
+        fuzz(int): see group. Changing it rebuilds all the changesets.
+
+    Returns:
+        The number of changesets created or rebuilt.
+    """
+    db = index.db
+    row = db.execute("SELECT value FROM meta WHERE key = 'fuzz'").fetchone()
+    if row is None or int(row[0]) != fuzz:
+        db.execute("DELETE FROM changesets")
+        db.execute("UPDATE revisions SET changeset = NULL")
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('fuzz', ?)",
+                   (str(fuzz), ))
+
+    oldest = db.execute("SELECT MIN(date) FROM revisions "
+                        "WHERE changeset IS NULL").fetchone()[0]
+    if oldest is None:
+        return 0
+    # The changesets the new revisions may belong to are rebuilt, keeping
+    # their numbers
+    reopened = [changeset for changeset, in db.execute(
+        "SELECT id FROM changesets WHERE last >= ?", (oldest - fuzz, ))]
+    old_ids = {}
+    for changeset in reopened:
+        for file_id, revision in db.execute(
+                "SELECT file, revision FROM revisions WHERE changeset = ?",
+                (changeset, )):
+            old_ids[(file_id, revision)] = changeset
+        db.execute("UPDATE revisions SET changeset = NULL "
+                   "WHERE changeset = ?", (changeset, ))
+        db.execute("DELETE FROM changesets WHERE id = ?", (changeset, ))
+    next_id = max([db.execute("SELECT MAX(id) FROM changesets").fetchone()[0]
+                   or 0] + reopened) + 1
+
+    branches = {}
+    revisions = []
+    for row in db.execute(
+            "SELECT revisions.file, revisions.revision, revisions.date, "
+            "revisions.author, revisions.commitid, messages.text, "
+            "revisions.message FROM revisions JOIN messages "
+            "ON messages.id = revisions.message "
+            "WHERE revisions.changeset IS NULL"):
+        file_id = row[0]
+        if file_id not in branches:
+            branches[file_id] = branch_names(db.execute(
+                "SELECT name, revision FROM tags WHERE file = ?",
+                (file_id, )))
+        revisions.append((file_id, row[1], row[2], row[3],
+                          branch_of(row[1], branches[file_id]), row[4],
+                          row[5], row[6]))
+    del branches
+
+    used = set()
+    for members in group(revisions, fuzz):
+        candidates = {old_ids.get((member[0], member[1]))
+                      for member in members} - used - {None}
+        if candidates:
+            changeset = min(candidates)
+        else:
+            changeset = next_id
+            next_id += 1
+        used.add(changeset)
+        first = members[0]
+        db.execute("INSERT INTO changesets VALUES (?, ?, ?, ?, ?, ?)",
+                   (changeset, first[2], members[-1][2], first[3], first[4],
+                    first[7]))
+        db.executemany("UPDATE revisions SET changeset = ? "
+                       "WHERE file = ? AND revision = ?",
+                       ((changeset, member[0], member[1])
+                        for member in members))
+    db.commit()
+
+    return len(used)
+
+
+def query(index, author=None, since=None, branch=None, path=None):
+    """
+    Find changesets, the oldest first. All the given criteria must match.
+
+    Args:
+        index(HistoryIndex): the index, with up to date changesets.
+        author(str): login of the author.
+        since(float): oldest date, in seconds since the epoch.
+        branch(str): branch name, HEAD for the trunk.
+        path(str): file or directory the changesets touch, relative to the
+            module.
+
+    Returns:
+        A generator of Changeset objects.
+    """
+    conditions = []
+    values = []
+    if author is not None:
+        conditions.append("changesets.author = ?")
+        values.append(author)
+    if since is not None:
+        conditions.append("changesets.last >= ?")
+        values.append(int(since))
+    if branch is not None:
+        conditions.append("changesets.branch = ?")
+        values.append(branch)
+    path_condition, path_values = index.path_condition(path)
+    if path_condition is not None:
+        conditions.append("changesets.id IN (SELECT revisions.changeset "
+                          "FROM revisions JOIN files ON files.id = "
+                          "revisions.file WHERE {0})".format(path_condition))
+        values += path_values
+
+    return _changesets(index, " AND ".join(conditions) or "1", values)
+
+
+def get(index, changeset):
+    """
+    Returns:
+        The Changeset with the given number, None if there is none.
+    """
+    return next(_changesets(index, "changesets.id = ?", [changeset]), None)
+
+
+def _changesets(index, condition, values):
+    # Tags point after the newest changeset of their revisions
+    tags = collections.defaultdict(list)
+    for name, changeset in index.db.execute(
+            "SELECT tags.name, MAX(revisions.changeset) FROM tags "
+            "JOIN revisions ON revisions.file = tags.file "
+            "AND revisions.revision = tags.revision GROUP BY tags.name"):
+        tags[changeset].append(name)
+
+    rows = index.db.execute(
+        "SELECT changesets.id, changesets.date, changesets.author, "
+        "changesets.branch, messages.text, files.path, revisions.revision, "
+        "revisions.state FROM changesets "
+        "JOIN messages ON messages.id = changesets.message "
+        "JOIN revisions ON revisions.changeset = changesets.id "
+        "JOIN files ON files.id = revisions.file "
+        "WHERE {0} ORDER BY changesets.id, files.path".format(condition),
+        values)
+    current = None
+    for row in rows:
+        if current is None or current.id != row[0]:
+            if current is not None:
+                yield current
+            current = Changeset(row[0], row[1], row[2], row[3], row[4], [],
+                                sorted(tags.get(row[0], [])))
+        current.members.append(row[5:])
+    if current is not None:
+        yield current
+
+
+def format_changeset(changeset):
+    """
+    Print a changeset the way cvsps does.
+
+    Returns:
+        A generator of lines, without end of line.
+    """
+    yield "---------------------"
+    yield "PatchSet {0}".format(changeset.id)
+    yield "Date: " + time.strftime("%Y/%m/%d %H:%M:%S",
+                                   time.gmtime(changeset.date))
+    yield "Author: " + changeset.author
+    yield "Branch: " + changeset.branch
+    yield "Tag: " + (" ".join(changeset.tags) or "(none)")
+    yield "Log:"
+    yield from changeset.message.split("\n")
+    yield ""
+    yield "Members:"
+    for path, revision, state in changeset.members:
+        yield "\t{0}:{1}->{2}{3}".format(
+            path, previous_revision(revision) or "INITIAL", revision,
+            "(DEAD)" if state == "dead" else "")
+    yield ""
+
+
+def diff_lines(path, old_revision, new_revision, old, new):
+    """
+    Format the changes a changeset made to a file as a unified diff.
+
+    Args:
+        path(str): the file.
+        old_revision(str): revision before the changeset, None if the file
+            was added.
+        new_revision(str): revision of the changeset.
+        old(list): lines of the old revision, [] if it was added.
+        new(list): lines of the new revision, [] if it was removed.
+
+    Returns:
+        A generator of lines, without end of line.
+    """
+    yield "Index: " + path
+    yield SEPARATOR
+    yield from difflib.unified_diff(
+        old, new, "{0}\t{1}".format(path, old_revision or "INITIAL"),
+        "{0}\t{1}".format(path, new_revision), lineterm="")
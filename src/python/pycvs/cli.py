@@ -20,311 +20,500 @@
 # SOFTWARE.
 
 # Common python packages
+import functools
 import sys
-import getpass
-import json
 import os.path
 import re
-import shutil
-import pydoc
-
-# Additional dependencies
-import pexpect
-from colorama import Fore
+import shlex
+import threading
 
 # Library packages
-from pycvs.data import FileStatus
-from pycvs.data import (FILE_ADDED, FILE_MERGED, FILE_MERGING, FILE_MODIFIED,
-                        FILE_NEW, FILE_REMOVED, FILE_OUTDATED)
+from pycvs import (commands, config, pristine, protocol, stream, tracing,
+                   tuning)
+
+DEFAULT_JOBS = 4
+# Conservative limit for the length of the arguments of a single command
+MAX_ARGUMENTS_LENGTH = 32 * 1024
+
+
+def pop_option(args, names, default=None):
+    """
+    Remove an option and its value from a command line arguments list.
+
+    Args:
+        args(list): command line arguments. It is modified in place.
+        names(list): accepted spellings of the option, e.g. ["-j", "--jobs"].
+        default: value returned when the option is not present.
+
+    Returns:
+        The value of the option.
+    """
+    value = default
+    for i, arg in enumerate(args):
+        for name in names:
+            if arg == name and i + 1 < len(args):
+                value = args[i + 1]
+                del args[i:i + 2]
+                return value
+            if arg.startswith(name + "="):
+                value = arg[len(name) + 1:]
+                del args[i]
+                return value
+
+    return value
+
+
+def chunk_arguments(names, limit=MAX_ARGUMENTS_LENGTH):
+    """
+    Split a list of arguments in chunks whose total length fits the limit.
+
+    Args:
+        names(list): arguments to be split.
+        limit(int): maximum length of each chunk, separators included.
+
+    Returns:
+        A generator of lists.
+    """
+    chunk = []
+    length = 0
+    for name in names:
+        if chunk and length + len(name) + 1 > limit:
+            yield chunk
+            chunk = []
+            length = 0
+        chunk.append(name)
+        length += len(name) + 1
+
+    if chunk:
+        yield chunk
 
 
 class PyCvs():
     """
     Main class for pycvs project.
     """
-    CONFIGURATON_FILE = os.path.expanduser("~/.pycvs")
+    CONFIGURATON_FILE = config.FILE
+    # Connected protocol clients per CVSROOT, lent by the daemon
+    sessions = None
 
-    def __init__(self):
+    def __init__(self, credentials=None):
         """
         Initalize class loading the credentials from the configuration file.
+
+        Args:
+            credentials(dict): configuration to use instead, e.g. when pycvs
+                is used as a library. Nothing is checked nor asked then.
         """
-        if shutil.which("cvs") is None:
-            print("Could not find cvs installation")
-            exit(1)
-
-        self.credentials = {}
-
-        if not os.path.isfile(self.CONFIGURATON_FILE):
-            print("No configuration file found at {0}"
-                  .format(self.CONFIGURATON_FILE))
-
-            self.credentials["user"] = input("User: ")
-            self.credentials["password"] = getpass.getpass()
-            self.credentials["root"] = input("CVS Root: ")
-            with open(self.CONFIGURATON_FILE, "w") as cfg_file:
-                json.dump(self.credentials, cfg_file, indent=4)
-        else:
-            with open(self.CONFIGURATON_FILE, "r") as cfg_file:
-                self.credentials = json.load(cfg_file)
-
-    def _access_cvs(self, cmd):
+        if credentials is not None:
+            self.credentials = credentials
+            return
+
+        self.credentials = config.load(self.CONFIGURATON_FILE)
+
+    def _access_cvs(self, cmd, stream=False, cwd=None):
         """
         Spawn the CVS command and login the user. Also check whether the
         password was accept.
 
         Args:
             cmd(str): CVS command to be spawned.
+            stream(bool): return as soon as the first line of output arrives
+                instead of waiting for the command to finish. The remaining
+                output is then read with stream.output_lines (or
+                _cvs_lines for raw bytes). Defaults to False
 
         Returns:
-            A pexpect object containing the CVS session.
+            A pexpect object containing the CVS session, or None when the
+            password was rejected or cvs stopped answering.
         """
-        cvs_obj = pexpect.spawn(cmd)
-        cvs_obj.timeout = 300
-        value = cvs_obj.expect([pexpect.EOF, "password"])
-        if value == 1:
-            cvs_obj.sendline(self.credentials['password'])
-
-        value = cvs_obj.expect([pexpect.EOF, "Permission denied"])
+        root = self._cvs_root(cmd, cwd)
+        tuned = tuning.Tuning(self.credentials)
+        cmd = tuning.with_compression(cmd, tuned.compression(root))
+        if self._use_protocol(root):
+            return self._access_protocol(cmd, root, stream, cwd)
+
+        # Only commands run through cvs pay for importing pexpect
+        import pexpect
+
+        with tracing.span("cvs.spawn"):
+            try:
+                cvs_obj = pexpect.spawn(cmd, cwd=cwd)
+            except pexpect.ExceptionPexpect:
+                print("Could not find cvs installation")
+                exit(1)
+        # Also the longest wait for each line of a streamed output
+        cvs_obj.timeout = tuned.timeout(root)
+        try:
+            # Waits for the password prompt, or for the first line of output
+            with tracing.span("cvs.login"):
+                if stream:
+                    value = self._expect(cvs_obj, [pexpect.EOF, "password",
+                                                   "\n"])
+                else:
+                    value = self._expect(cvs_obj, [pexpect.EOF, "password"])
+            if value == 1:
+                cvs_obj.sendline(self.credentials['password'])
+            elif value == 2:
+                cvs_obj.before += cvs_obj.after
+                return cvs_obj
+
+            with tracing.span("cvs.login"):
+                # The rest of the prompt line, with the password echoed
+                if value == 1:
+                    self._expect(cvs_obj, [pexpect.EOF, "\n"])
+                if stream:
+                    value = self._expect(cvs_obj, [pexpect.EOF,
+                                                   "Permission denied", "\n"])
+                else:
+                    value = self._expect(cvs_obj, [pexpect.EOF,
+                                                   "Permission denied"])
+        except pexpect.TIMEOUT:
+            print("cvs did not answer for {0:g} seconds".format(
+                cvs_obj.timeout))
+            cvs_obj.terminate(force=True)
+            return None
         if value == 1:
             print("Invalid password for {0} (~/.pycvs)"
                   .format(self.credentials["user"]))
             return None
+        elif value == 2:
+            cvs_obj.before += cvs_obj.after
 
         return cvs_obj
 
-    def _checkout(self, args):
+    @staticmethod
+    def _expect(cvs_obj, patterns):
         """
-        Checks out the repository. Prints a resume of the checkout -- number
-        of files and directories.
+        Wait for one of the patterns, giving up only once cvs printed nothing
+        for a whole timeout: long outputs take as long as they need.
+
+        Returns:
+            The index of the pattern found.
+
+        Raises:
+            pexpect.TIMEOUT: cvs stopped printing.
         """
-        repo = args.pop()
-        opts = " ".join(args)
-        print("Checking out repository {0}".format(repo))
+        # Imported by _access_cvs
+        import pexpect
+
+        received = len(cvs_obj.buffer)
+        while True:
+            value = cvs_obj.expect(patterns + [pexpect.TIMEOUT])
+            if value < len(patterns):
+                return value
+            if len(cvs_obj.buffer) == received:
+                raise pexpect.TIMEOUT("No output from cvs")
+            received = len(cvs_obj.buffer)
+
+    def _cvs_root(self, cmd, cwd=None):
+        """
+        Find the CVSROOT a command talks to: its -d option, the working copy
+        it runs in or the configured one, in this order.
+        """
+        try:
+            global_options = protocol.split_command_line(shlex.split(cmd))[0]
+        except protocol.ProtocolError:
+            global_options = []
+        for flag, value in global_options:
+            if flag == "-d":
+                return value
+
+        root = protocol.root_of(cwd or ".")
+        if root is None:
+            root = self.credentials.get("root")
+
+        return root
+
+    def _use_protocol(self, root):
+        """
+        Whether to talk to the server directly instead of spawning cvs. By
+        default only :ext: roots go through cvs, as ssh may ask for the
+        password on the terminal. The "transport" configuration key
+        ("protocol" or "pexpect") overrides it.
+        """
+        transport = self.credentials.get("transport")
+        if transport is not None:
+            return transport == "protocol"
+        if root is None:
+            return False
+        try:
+            return protocol.parse_root(root).method != "ext"
+        except protocol.ProtocolError:
+            return False
 
+    def _access_protocol(self, cmd, root, stream=False, cwd=None):
+        """
+        Run the CVS command with the native protocol client.
+
+        Returns:
+            A protocol.Session object, or None when the server rejected the
+            credentials or could not be reached.
+        """
+        client = (self.sessions or {}).get(root)
+        # A connection runs one command at a time: the threads of commands
+        # that run several at once get their own
+        if threading.current_thread() is not threading.main_thread():
+            client = None
+        pooled = client is not None
+        if not pooled:
+            client = self._protocol_client(root)
+        try:
+            events = client.run(shlex.split(cmd), cwd or ".")
+            return protocol.Session(events, stream,
+                                    None if pooled else client.close, client)
+        except protocol.AuthenticationError:
+            print("Invalid password for {0} (~/.pycvs)"
+                  .format(self.credentials["user"]))
+        except (protocol.ProtocolError, OSError) as error:
+            print("Could not talk to the CVS server: {0}".format(error))
+        client.close()
+
+        return None
+
+    def _protocol_client(self, root):
+        """
+        A new protocol client for a CVSROOT, with its timeout, measuring its
+        transfers to tune the compression.
+        """
+        tuned = tuning.Tuning(self.credentials)
+        client = protocol.CvsClient(root, self.credentials.get("password"),
+                                    timeout=tuned.timeout(root))
+        client.monitor = functools.partial(tuned.record, root)
+
+        return client
+
+    def _pristine_store(self):
+        """
+        The pristine store of base revisions, or None when it is not enabled
+        ("pristine": true in ~/.pycvs).
+        """
+        if not self.credentials.get("pristine"):
+            return None
+        return pristine.PristineStore(
+            os.path.expanduser(self.credentials.get("pristine_dir",
+                                                    pristine.STORE_DIR)),
+            int(self.credentials.get("pristine_max_size",
+                                     pristine.DEFAULT_MAX_SIZE)) * 1024 * 1024)
+
+    @staticmethod
+    def _cvs_lines(cvs_obj):
+        """
+        Iterate over the output lines of a CVS session as they arrive.
+
+        Args:
+            cvs_obj: session returned by _access_cvs.
+
+        Returns:
+            A generator of byte lines.
+        """
+        # Whatever was consumed during the login comes first, the rest is
+        # read straight from the running process
+        yield from cvs_obj.before.splitlines(True)
+        yield from tracing.timed(cvs_obj, "cvs.output")
+
+    def _checkout_module(self, module, opts, progress=None, cwd=None):
+        """
+        Run a single cvs checkout.
+
+        Args:
+            module(str): module, or path inside a module, to check out.
+            opts(str): options for cvs checkout.
+            progress(callable): called with files=1 or dirs=1 as they are
+                checked out.
+            cwd(str): directory to check out in. Defaults to the current
+                one.
+
+        Returns:
+            A (files, directories, succeeded) tuple, or None when cvs could
+            not be run.
+        """
         spawn_str = "cvs -d {0} co {2} {1}".format(self.credentials['root'],
-                                                   repo,
+                                                   module,
                                                    opts)
-        cvs_obj = self._access_cvs(spawn_str)
-        if cvs_obj is not None:
-            output = cvs_obj.before.decode("utf-8")
-            output = output.split("\n")
-            files = 0
-            dirs = 0
-            for line in output:
+        cvs_obj = self._access_cvs(spawn_str, stream=True, cwd=cwd)
+        if cvs_obj is None:
+            return None
+
+        store = self._pristine_store()
+        checked_out = []
+        files = 0
+        dirs = 0
+        with tracing.span("checkout.module"):
+            for _, line in stream.output_lines(cvs_obj):
                 if line.startswith("U "):
                     files += 1
+                    if store is not None:
+                        checked_out.append(line[2:])
+                    if progress is not None:
+                        progress(files=1)
                 elif line.startswith("cvs server: Updating"):
                     dirs += 1
+                    if progress is not None:
+                        progress(dirs=1)
+            cvs_obj.close()
+        tracing.count("files checked out", files)
+        # The files are only complete once cvs is done
+        if checked_out:
+            store.record(checked_out, cwd or ".")
 
-            print("")
-            print("{0} files checked out".format(str(files)))
-            print("{0} directories checked out".format(str(dirs)))
+        return files, dirs, cvs_obj.exitstatus == 0
 
-    def _update(self, args=[]):
+    def _list_subdirs(self, module, root=None):
         """
-        Run the CVS update command in the current working directory.
+        List the top-level subdirectories of a module on the server, the
+        configured one by default.
 
-        Args:
-            args(list): Command line arguments list. Defaults to []
+        Returns:
+            A list of names, or None when the server can not list them (e.g.
+            cvs older than 1.12 or a module alias).
         """
-        if os.path.isfile("CVS/Repository"):
-            with open("CVS/Repository", "r") as repo_file:
-                lines = repo_file.readlines()
-            current_dir = lines[0].strip()
-        else:
-            print("Not in a CVS repository")
-            exit(1)
-        opts = " ".join(args)
-        print("Updating from {0}".format(current_dir))
-        print("")
+        spawn_str = "cvs -d {0} rls -e {1}".format(
+            root or self.credentials['root'], module)
+        cvs_obj = self._access_cvs(spawn_str, stream=True)
+        if cvs_obj is None:
+            return None
+        subdirs = []
+        for kind, line in stream.output_lines(cvs_obj):
+            match = re.match(r"D/([^/]+)/", line)
+            if kind == stream.STDOUT and match is not None:
+                subdirs.append(match.group(1))
+        cvs_obj.close()
+        if cvs_obj.exitstatus != 0:
+            return None
 
-        spawn_str = "cvs up {0}".format(opts)
-        cvs_obj = self._access_cvs(spawn_str)
-        if cvs_obj is not None:
-            output = cvs_obj.before.decode("utf-8")
-            output = output.split("\n")
-            files = 0
-            conflicts = 0
-
-            for line in output:
-                if line.startswith("U "):
-                    files += 1
-                elif line.startswith("C "):
-                    conflicts += 1
-                    filename = re.match(r"C (.*)\s", line).group(1)
-                    print("Conflict on file {0}".format(filename))
-
-            print("")
-            if files > 0:
-                print("{0} files updated".format(str(files)))
-            if conflicts > 0:
-                print("{0} conflicted files".format(str(conflicts)), end="")
-                print(" (solve them before commit!)")
-
-    def _status(self):
-        """
-        Get cvs status from the server and print and beautyful output
-        (yeah, git style).
-        """
-        if os.path.isfile("CVS/Tag"):
-            with open("CVS/Tag", "r") as tag_file:
-                lines = tag_file.readlines()
-            line = lines[0]
-            if line.startswith("N"):
-                print("On tag {0}".format(line.strip("N\n")))
-            elif line.startswith("T"):
-                print("On branch {0}".format(line.strip("T\n")))
-        else:
-            print("On branch HEAD")
-
-        spawn_str = "cvs status"
-
-        cvs_obj = self._access_cvs(spawn_str)
-        if cvs_obj is not None:
-            output = cvs_obj.before.decode("utf-8")
-            output = output.split('\n')
-
-            files = FileStatus()
-            current_dir = ""
-
-            for line in output:
-                match_file = re.match(r"File: (.*)\s+Status: (.*)\s+$", line)
-                if match_file is None:
-                    match_file = re.match(r"File: (.*)\s+Status: (.*)$", line)
-                match_dir = re.match(r".*Examining (.*)\s", line)
-                if match_dir is None:
-                    match_dir = re.match(r".*Examining (.*)$", line)
-                match_new = re.match(r"\?\s+(.*)\s", line)
-                if match_file is not None:
-                    filename = current_dir + match_file.group(1)
-                    if match_file.group(2) == "Locally Modified":
-                        files.add_file(FILE_MODIFIED, filename)
-                    elif match_file.group(2) == "Locally Added":
-                        files.add_file(FILE_ADDED, filename)
-                    elif match_file.group(2) == "Locally Removed":
-                        files.add_file(FILE_REMOVED, filename)
-                    elif match_file.group(2) == "Needs Patch":
-                        files.add_file(FILE_OUTDATED, filename)
-                    elif match_file.group(2) == "Needs Merge":
-                        files.add_file(FILE_MERGING, filename)
-                    elif match_file.group(2) == "File had conflicts on merge":
-                        files.add_file(FILE_MERGED, filename)
-                elif match_dir is not None:
-                    current_dir = match_dir.group(1) + '/'
-                elif match_new is not None:
-                    files.add_file(FILE_NEW, match_new.group(1))
-
-            files.print_files()
-
-    def _add(self, args):
-        """
-        Add the given files to CVS server, in order to be committed later on.
+        return subdirs
 
-        Args:
-            args(list): the list of files from the command line
+    def _update_directory(self, directory, opts, names=None, progress=None):
         """
-        # TODO: handle special case to add *
-        for to_add in args:
-            spawn_str = "cvs add {0}".format(to_add)
-            cvs_obj = self._access_cvs(spawn_str)
-            if cvs_obj is not None:
-                output = cvs_obj.before.decode("utf-8")
-                output = output.split('\n')
-
-                if os.path.isfile(to_add):
-                    for line in output:
-                        match = re.match(".* scheduling file `(.*)'.*", line)
-                        if match is not None:
-                            print("\tstaging {0} to commit"
-                                  .format(match.group(1)))
-                elif not to_add.endswith("CVS"):
-                    for line in output:
-                        match = re.match("Directory .* to the repository.*",
-                                         line)
-                        if match is not None:
-                            print("Directory {0} added".format(to_add))
-                    files = os.listdir(to_add)
-                    files = map(lambda x: "{0}/{1}".format(to_add, x), files)
-                    self._add(files)
-
-    def _diff(self, args):
-        """
-        Found the diff between revisions.
+        Run a single cvs update.
 
         Args:
-            args(list): Command line arguments for diff
+            directory(str): directory to run cvs in.
+            opts(str): options for cvs update.
+            names(list): files and directories to update. Everything when
+                None.
+            progress(callable): called with files=1 or dirs=1 as they are
+                updated.
+
+        Returns:
+            A (files updated, conflicted files, succeeded) tuple, the
+            conflicted files relative to the current directory. None when
+            cvs could not be run.
         """
-        # I do like unified diff syntax
-        if "-u" not in args:
-            args.insert(0, "-u")
-
-        opts = " ".join(args)
-        spawn_str = "cvs diff {0}".format(opts)
-        cvs_obj = self._access_cvs(spawn_str)
-        if cvs_obj is not None:
-            output = cvs_obj.before.decode("utf-8")
-            output = output.split("\n")
-            output = filter(lambda x: "cvs server:" not in x, output)
-            output_colored = []
-            for line in output:
-                if line.startswith("+") and not line.startswith("+++"):
-                    line = Fore.GREEN + line
-                elif line.startswith("-") and not line.startswith("---"):
-                    line = Fore.RED + line
-                elif line.startswith("@@"):
-                    line = Fore.CYAN + line
-                output_colored.append(line)
-            pydoc.pipepager("\n".join(output_colored), cmd="less -R")
-
-    def _log(self, args):
+        spawn_str = "cvs up {0}".format(opts)
+        if names is not None:
+            spawn_str += " " + " ".join(shlex.quote(name) for name in names)
+        cvs_obj = self._access_cvs(spawn_str, stream=True,
+                                   cwd=None if directory == "." else directory)
+        if cvs_obj is None:
+            return None
+
+        store = self._pristine_store()
+        updated = []
+        files = 0
+        conflicts = []
+        with tracing.span("update.directory"):
+            for kind, line in stream.output_lines(cvs_obj):
+                if progress is not None and kind == stream.STDERR:
+                    if re.match(r"cvs \w+: Updating ", line):
+                        progress(dirs=1)
+                elif line.startswith("U "):
+                    files += 1
+                    if progress is not None:
+                        progress(files=1)
+                if store is not None and line.startswith(("U ", "P ")):
+                    updated.append(line[2:])
+                elif line.startswith("C "):
+                    filename = line[2:].rstrip()
+                    if directory != ".":
+                        filename = os.path.join(directory, filename)
+                    conflicts.append(filename)
+            cvs_obj.close()
+        tracing.count("files updated", files)
+        if updated:
+            store.record(updated, directory)
+
+        return files, conflicts, cvs_obj.exitstatus == 0
+
+    def _read_logs(self, args, cwd=None):
         """
-        Display the log of commits of files.
+        Run cvs log and parse its output.
 
         Args:
-            args(list): Command line arguments for log
+            args(list): Command line arguments for log, quoted.
+            cwd(str): directory to run cvs in. Defaults to the current one.
+
+        Returns:
+            A list of FileLog objects, or None when cvs failed.
         """
-        opts = " ".join(args)
-        spawn_str = "cvs log {0}".format(opts)
-        cvs_obj = self._access_cvs(spawn_str)
-        if cvs_obj is not None:
-            output = cvs_obj.before.decode("utf-8")
-            pydoc.pipepager(output, cmd="less -R")
+        from pycvs import rcslog
+
+        spawn_str = "cvs log {0}".format(" ".join(args))
+        cvs_obj = self._access_cvs(spawn_str, stream=True, cwd=cwd)
+        if cvs_obj is None:
+            return None
+        logs = list(rcslog.LogParser().parse(
+            line for kind, line in stream.output_lines(cvs_obj)
+            if kind == stream.STDOUT))
+        cvs_obj.close()
+        if cvs_obj.exitstatus != 0:
+            return None
+
+        return logs
 
     def process(self):
         """
-        Process the user input.
+        Process the user input. With --profile, a table of the time spent in
+        each phase of the command is printed on stderr at the end; with
+        $PYCVS_TRACE set, a Chrome trace of them is written to that file.
+        """
+        profile = "--profile" in sys.argv
+        if profile:
+            sys.argv.remove("--profile")
+        trace_path = os.environ.get(tracing.TRACE_VARIABLE)
+        name = sys.argv[1] if len(sys.argv) > 1 else "pycvs"
+        # Commands of a batch are traced by the batch
+        if tracing.enabled() or not (profile or trace_path):
+            with tracing.span(name):
+                self._dispatch()
+            return
+
+        recorder = tracing.enable()
+        try:
+            with tracing.span(name):
+                self._dispatch()
+        finally:
+            tracing.disable()
+            if profile:
+                recorder.print_summary()
+            if trace_path:
+                recorder.write_trace(trace_path)
+
+    def _dispatch(self):
+        """
+        Run the command of the command line.
         """
+        found = commands.parse(sys.argv[1:])
+        if found is None:
+            return
+        command, args = found
         try:
-            command = sys.argv[1]
+            commands.load(command).run(self, args)
         except IndexError:
-            print("Nothing to do")
-        else:
-            if command == "checkout" or command == "co":
-                try:
-                    self._checkout(sys.argv[2:])
-                except IndexError:
-                    print("Missing arguments for {0} command".format(command))
-            elif command == "status":
-                self._status()
-            elif command == "add":
-                try:
-                    self._add(sys.argv[2:])
-                except IndexError:
-                    print("Missing arguments for {0} command".format(command))
-            elif command == "update" or command == "up":
-                try:
-                    self._update(sys.argv[2:])
-                except IndexError:
-                    self._update()
-            elif command == "diff":
-                try:
-                    self._diff(sys.argv[2:])
-                except IndexError:
-                    print("Missing diff parameters")
-            elif command == "log":
-                try:
-                    self._log(sys.argv[2:])
-                except IndexError:
-                    print("Missing arguments for {0} command".format(command))
-            else:
-                print("Unknown command {0}".format(command))
+            print("Missing arguments for {0} command".format(sys.argv[1]))
+
+    # The commands, for the programs that use PyCvs as a library
+    _checkout = commands.method("checkout")
+    _update = commands.method("update")
+    _status = commands.method("status")
+    _add = commands.method("add")
+    _diff = commands.method("diff")
+    _log = commands.method("log")
+    _annotate = commands.method("annotate")
+    _compare = commands.method("compare")
+    _archive = commands.method("archive")
+    _conflicts = commands.method("conflicts")
+    _changesets = commands.method("changesets")
+    _batch = commands.method("batch")
+    _daemon = commands.method("daemon")
+    _workspace = commands.method("workspace")
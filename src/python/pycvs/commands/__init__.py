@@ -0,0 +1,154 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import importlib
+import os
+import sys
+
+# A command of the pycvs command line. Its module in this package, named
+# after it, has a run(pycvs, args) function; it is imported only when the
+# command runs, with the dependencies only it needs. config tells whether it
+# needs the configuration (and so a PyCvs object), served whether a running
+# daemon serves it.
+Command = collections.namedtuple("Command", ["name", "aliases", "summary",
+                                             "config", "served"])
+
+COMMANDS = [
+    Command("checkout", ["co"], "check out a module", True, False),
+    Command("update", ["up"], "update the working copy", True, True),
+    Command("status", [], "list the changed files", True, True),
+    Command("add", [], "add files and directories recursively", True, False),
+    Command("diff", [], "show the changes of the working files", True, True),
+    Command("log", [], "show the history of files", True, True),
+    Command("annotate", ["ann"], "show the last change of each line", True,
+            False),
+    Command("compare", [], "compare two tags of a module", True, False),
+    Command("archive", [], "write a tag of a module to an archive", True,
+            False),
+    Command("conflicts", [], "list the unresolved conflicts", True, False),
+    Command("changesets", [], "list the commits of the module", True, False),
+    Command("batch", [], "run many commands in one process", True, False),
+    Command("daemon", [], "serve commands from the background", True, False),
+    Command("workspace", ["--workspace"], "status or update working copies",
+            True, False),
+    Command("help", ["--help", "-h"], "list the commands", False, False),
+]
+
+_BY_NAME = {name: command for command in COMMANDS
+            for name in [command.name] + command.aliases}
+
+
+def find(name):
+    """
+    Find a command by its name or alias, e.g. "co". Options are looked up
+    without their value, e.g. --workspace=DIR.
+
+    Returns:
+        A Command, or None when there is none.
+    """
+    if name.startswith("--"):
+        name = name.split("=", 1)[0]
+
+    return _BY_NAME.get(name)
+
+
+def load(command):
+    """
+    Import the module of a command.
+
+    Returns:
+        The module, whose run(pycvs, args) runs the command.
+    """
+    return importlib.import_module("pycvs.commands." + command.name)
+
+
+def method(name):
+    """
+    Make a method of PyCvs that runs a command, e.g. PyCvs._status(args).
+
+    Args:
+        name(str): name of the command.
+
+    Returns:
+        A function taking the PyCvs object and the command line arguments
+        of the command, none by default.
+    """
+    def run(pycvs, args=None):
+        load(_BY_NAME[name]).run(pycvs, [] if args is None else args)
+
+    run.__name__ = "_" + name
+    return run
+
+
+def parse(argv):
+    """
+    Find the command of a command line, telling the user when there is
+    none.
+
+    Args:
+        argv(list): the command line, without the program.
+
+    Returns:
+        A (command, arguments) tuple, or None when there is nothing to run.
+    """
+    if not argv:
+        print("Nothing to do")
+        return None
+    command = find(argv[0])
+    if command is None:
+        print("Unknown command {0}".format(argv[0]))
+        return None
+
+    # Commands given as options, e.g. --workspace DIR, parse them themselves
+    return command, argv if argv[0].startswith("-") else argv[1:]
+
+
+def main():
+    """
+    Run the command line of the pycvs script. Commands served by a running
+    daemon go to it; the configuration is read only by the commands that
+    need it.
+
+    Returns:
+        The exit status.
+    """
+    found = parse([arg for arg in sys.argv[1:] if arg != "--profile"])
+    if found is None:
+        return 0
+    command, args = found
+    if not command.config:
+        load(command).run(None, args)
+        return 0
+    from pycvs import config
+
+    # The daemon does not profile the commands it serves, --profile runs
+    # them here
+    if (command.served and "--profile" not in sys.argv
+            and os.path.exists(config.SOCKET_PATH)):
+        from pycvs.daemon import run_client
+
+        code = run_client(sys.argv[1:])
+        if code is not None:
+            return code
+
+    from pycvs.cli import PyCvs
+    PyCvs().process()
+    return 0
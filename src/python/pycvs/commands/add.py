@@ -0,0 +1,128 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import concurrent.futures
+import os
+import re
+import shlex
+
+# Library packages
+from pycvs import stream
+from pycvs.cli import DEFAULT_JOBS, chunk_arguments, pop_option
+from pycvs.local import IgnoreRules, add_candidates, is_working_dir
+
+
+def run(pycvs, args):
+    """
+    Add the given files to CVS server, in order to be committed later on.
+    Directories are added recursively: all the new files of a directory
+    go in a single cvs invocation and independent directories are added
+    concurrently.
+
+    Args:
+        args(list): the list of files from the command line. The number
+            of concurrent cvs processes can be given with -j/--jobs.
+    """
+    jobs = int(pop_option(args, ["-j", "--jobs"],
+                          pycvs.credentials.get("jobs", DEFAULT_JOBS)))
+    rules = IgnoreRules()
+
+    # Explicitly given files are added even if they would be ignored
+    batches = collections.OrderedDict()
+    tracked_dirs = []
+    for to_add in args:
+        to_add = os.path.normpath(to_add)
+        parent, name = os.path.split(to_add)
+        if name == "CVS":
+            continue
+        if os.path.isdir(to_add) and is_working_dir(to_add):
+            tracked_dirs.append(to_add)
+        else:
+            batches.setdefault(parent or ".", []).append(name)
+
+    files = 0
+    dirs = 0
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        running = set()
+
+        def schedule(directory):
+            new_files, subdirs, tracked = add_candidates(directory, rules)
+            if new_files or subdirs:
+                running.add(pool.submit(_add_batch, pycvs, directory,
+                                        subdirs + new_files))
+            for subdir in tracked:
+                schedule(os.path.join(directory, subdir))
+
+        for parent, names in batches.items():
+            running.add(pool.submit(_add_batch, pycvs, parent, names))
+        for directory in tracked_dirs:
+            schedule(directory)
+
+        while running:
+            done, running = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                staged, added_dirs = future.result()
+                for directory in added_dirs:
+                    print("Directory {0} added".format(directory))
+                    dirs += 1
+                    schedule(directory)
+                for filename in staged:
+                    print("\tstaging {0} to commit".format(filename))
+                    files += 1
+
+    print("")
+    print("{0} files staged to commit".format(str(files)))
+    print("{0} directories added".format(str(dirs)))
+
+
+def _add_batch(pycvs, directory, names):
+    """
+    Run `cvs add` inside a directory for the given names, split in as
+    few invocations as the argument length limit allows.
+
+    Args:
+        directory(str): directory where the names are.
+        names(list): files and directories to be added.
+
+    Returns:
+        A (staged files, added directories) tuple of path lists.
+    """
+    staged = []
+    added_dirs = []
+    for chunk in chunk_arguments(names):
+        spawn_str = "cvs add {0}".format(
+            " ".join(shlex.quote(name) for name in chunk))
+        cvs_obj = pycvs._access_cvs(spawn_str, stream=True, cwd=directory)
+        if cvs_obj is None:
+            continue
+
+        for _, line in stream.output_lines(cvs_obj):
+            match = re.match(".* scheduling file `(.*)'.*", line)
+            if match is not None:
+                staged.append(os.path.normpath(
+                    os.path.join(directory, match.group(1))))
+        for name in chunk:
+            path = os.path.normpath(os.path.join(directory, name))
+            if os.path.isdir(path) and is_working_dir(path):
+                added_dirs.append(path)
+
+    return staged, added_dirs
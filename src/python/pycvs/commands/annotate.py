@@ -0,0 +1,164 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import concurrent.futures
+import functools
+import os
+import shlex
+import sys
+
+# Additional dependencies
+from colorama import Fore
+
+# Library packages
+from pycvs import annotate, pristine, protocol, stream
+from pycvs.cli import DEFAULT_JOBS, pop_option
+
+
+def run(pycvs, args):
+    """
+    Show the lines of files with the revision, author and date of their
+    last change. Files are annotated at their working revision, so the
+    annotations never change and are cached in ~/.pycvs-cache/annotate
+    ("annotate_cache_dir"), the least recently used ones evicted past
+    "annotate_max_size" MB. The files the cache does not have are
+    annotated by the server, jobs at a time.
+
+    Args:
+        args(list): Command line arguments: files and directories
+            (recursively), -r REV or -D DATE to annotate other revisions
+            (only revision numbers are cached), -j/--jobs concurrent
+            requests and --no-pager.
+    """
+    use_pager = "--no-pager" not in args
+    if not use_pager:
+        args.remove("--no-pager")
+    jobs = int(pop_option(args, ["-j", "--jobs"],
+                          pycvs.credentials.get("jobs", DEFAULT_JOBS)))
+    revision = pop_option(args, ["-r"])
+    date = pop_option(args, ["-D"])
+    root = protocol.root_of(".")
+    if root is None:
+        print("Not in a CVS repository")
+        exit(1)
+
+    options = []
+    if revision is not None:
+        options += ["-r", revision]
+    if date is not None:
+        options += ["-D", date]
+    cache = None
+    if (pycvs.credentials.get("annotate_cache", True) and date is None
+            and (revision is None or annotate.is_revision(revision))):
+        cache = annotate.AnnotateCache(
+            root, os.path.expanduser(pycvs.credentials.get(
+                "annotate_cache_dir", annotate.CACHE_DIR)),
+            int(pycvs.credentials.get("annotate_max_size",
+                                      annotate.DEFAULT_MAX_SIZE))
+            * 1024 * 1024)
+
+    def fetch(path, file_options):
+        spawn_str = "cvs -d {0} -Q rannotate {1}".format(
+            root, " ".join(shlex.quote(arg) for arg in file_options + [
+                annotate.module_path(root, path)]))
+        cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+        if cvs_obj is None:
+            return None
+        annotations = annotate.parse(
+            line for kind, line in stream.output_lines(cvs_obj)
+            if kind == stream.STDOUT)
+        cvs_obj.close()
+        return annotations if cvs_obj.exitstatus == 0 else None
+
+    pager = stream.Pager(use_pager)
+    results = []
+    try:
+        with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+            for path, entry in annotate.working_files(args):
+                if entry is None or not annotate.is_revision(
+                        entry.revision):
+                    print("Nothing known about {0}".format(path),
+                          file=sys.stderr)
+                    continue
+                if entry.options == "-kb":
+                    print("Skipping binary file {0}".format(path),
+                          file=sys.stderr)
+                    continue
+                file_revision = revision or entry.revision
+                file_options = options or ["-r", file_revision]
+                annotations = None
+                if cache is not None:
+                    rcs_file = pristine.rcs_file(*os.path.split(path))
+                    annotations = cache.get(rcs_file, file_revision)
+                if annotations is None:
+                    annotations = pool.submit(fetch, path, file_options)
+                    if cache is not None:
+                        annotations.add_done_callback(functools.partial(
+                            _cache_annotations, cache, rcs_file,
+                            file_revision))
+                results.append((path, file_revision, annotations))
+            for path, file_revision, annotations in results:
+                if isinstance(annotations, concurrent.futures.Future):
+                    annotations = annotations.result()
+                if annotations is None:
+                    pager.write("Could not annotate {0}".format(path))
+                    continue
+                _page_annotations(pager, path, file_revision, annotations)
+    except BrokenPipeError:
+        for _, _, annotations in results:
+            if isinstance(annotations, concurrent.futures.Future):
+                annotations.cancel()
+    finally:
+        pager.close()
+        if cache is not None:
+            cache.trim()
+
+
+def _cache_annotations(cache, rcs_file, revision, future):
+    if not future.cancelled() and future.result() is not None:
+        cache.put(rcs_file, revision, future.result())
+
+
+def _page_annotations(pager, path, revision, annotations):
+    """
+    Write the annotated lines of a file to the pager, as one block. With
+    colors, the revision, author and date are colored like the hunk
+    headers of a diff, and the lines of the annotated revision itself
+    like the lines it added.
+    """
+    lines = ["Annotations for {0}".format(path),
+             annotate.HEADER_SEPARATOR]
+    for annotation in annotations:
+        line = annotate.format_annotation(annotation)
+        if pager.colors:
+            line = _color_annotation(line, annotation, revision)
+        lines.append(line)
+    pager.write("\n".join(lines), True)
+
+
+def _color_annotation(line, annotation, revision):
+    """
+    Color an annotated line, its last change being in the given
+    revision or an older one.
+    """
+    prefix = len(line) - len(annotation.text)
+    color = Fore.GREEN if annotation.revision == revision else Fore.CYAN
+
+    return color + line[:prefix] + Fore.RESET + line[prefix:]
@@ -0,0 +1,119 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import concurrent.futures
+import os
+import shlex
+import threading
+
+# Library packages
+from pycvs import archive, protocol, stream, tuning
+from pycvs.cli import DEFAULT_JOBS, pop_option
+
+
+def run(pycvs, args):
+    """
+    Write a tag of a module to a tar or zip archive, without working
+    copy or temporary files. The files are listed by the server, fetched
+    by jobs concurrent connections and written in order as they arrive,
+    so that only a few of them are in memory at a time.
+
+    Args:
+        args(list): Command line arguments: the tag and the module,
+            -o/--output archive (module-tag.tar.gz by default, "-" for
+            stdout), --prefix for the top directory in the archive (the
+            module by default) and -j/--jobs.
+    """
+    output = pop_option(args, ["-o", "--output"])
+    prefix = pop_option(args, ["--prefix"])
+    jobs = int(pop_option(args, ["-j", "--jobs"],
+                          pycvs.credentials.get("jobs", DEFAULT_JOBS)))
+    tag, module = args[0], args[1].rstrip("/")
+    if output is None:
+        output = "{0}-{1}.tar.gz".format(os.path.basename(module), tag)
+    root = pycvs.credentials["root"]
+
+    spawn_str = "cvs -d {0} -Q rls -e -R -r {1} {2}".format(
+        root, shlex.quote(tag), shlex.quote(module))
+    cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+    if cvs_obj is None:
+        return
+    files = list(archive.parse_listing(
+        line for kind, line in stream.output_lines(cvs_obj)
+        if kind == stream.STDOUT))
+    cvs_obj.close()
+    if cvs_obj.exitstatus != 0:
+        print("Could not list {0} at {1}".format(module, tag))
+        return
+
+    level = tuning.Tuning(pycvs.credentials).compression(root)
+    # One connection per thread, reused for all its files
+    local = threading.local()
+    clients = []
+
+    def fetch(item):
+        path, revision, _ = item
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = pycvs._protocol_client(root)
+            clients.append(client)
+        collector = protocol.ContentCollector()
+        try:
+            for _ in client.run(["cvs", "-z{0}".format(level), "-Q",
+                                 "export", "-r", revision, path],
+                                applier=collector):
+                pass
+        except (protocol.ProtocolError, OSError):
+            client.close()
+            return None
+        if client.failed or not collector.files:
+            return None
+        return collector.files[0]
+
+    if output != "-":
+        print("Archiving {0} {1} in {2}".format(module, tag, output))
+    writer = archive.ArchiveWriter(output)
+    progress = stream.Progress("archived")
+    failed = None
+    try:
+        with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+            results = stream.ordered(pool, fetch, files, jobs)
+            for (path, _, _), contents in zip(files, results):
+                if contents is None:
+                    failed = path
+                    results.close()
+                    break
+                name = path if prefix is None else (
+                    prefix.rstrip("/") + path[len(module):])
+                writer.add(name, contents.data, contents.mode,
+                           contents.mod_time)
+                progress(files=1)
+    finally:
+        progress.done()
+        writer.close()
+        for client in clients:
+            client.close()
+
+    if failed is not None:
+        print("Could not fetch {0}".format(failed))
+        if output != "-":
+            os.remove(output)
+    elif output != "-":
+        print("{0} files archived".format(progress.files))
@@ -0,0 +1,47 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import sys
+
+# Library packages
+from pycvs import batch
+
+
+def run(pycvs, args):
+    """
+    Run many commands in this process, one per line of a file or of
+    stdin, and write a JSON record with the result of each one. Exits
+    with 1 when some failed.
+
+    Args:
+        args(list): Command line arguments: the file, stdin when missing
+            or "-".
+    """
+    runner = batch.Batch(pycvs)
+    try:
+        if not args or args[0] == "-":
+            failed = runner.run(sys.stdin)
+        else:
+            with open(args[0], "r") as commands:
+                failed = runner.run(commands)
+    finally:
+        runner.close()
+    if failed:
+        exit(1)
@@ -0,0 +1,133 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import concurrent.futures
+import shlex
+
+# Library packages
+from pycvs import changesets, history, protocol, stream
+from pycvs.cli import DEFAULT_JOBS, pop_option
+from pycvs.commands.diff import page_diff
+from pycvs.commands.log import history_index
+from pycvs.local import read_repository
+
+
+def run(pycvs, args):
+    """
+    List the commits of the module, rebuilt from the history index as
+    cvsps does. Given changeset numbers, show those changesets with their
+    diffs, the revisions fetched concurrently.
+
+    Args:
+        args(list): Command line arguments: changeset numbers, filters
+            --author, --since, --branch and --path, --fuzz seconds (see
+            changesets.group), -j/--jobs concurrent fetches and
+            --no-pager.
+    """
+    use_pager = "--no-pager" not in args
+    if not use_pager:
+        args.remove("--no-pager")
+    jobs = int(pop_option(args, ["-j", "--jobs"],
+                          pycvs.credentials.get("jobs", DEFAULT_JOBS)))
+    fuzz = int(pop_option(args, ["--fuzz"], pycvs.credentials.get(
+        "changeset_fuzz", changesets.DEFAULT_FUZZ)))
+    filters = {name: pop_option(args, ["--" + name])
+               for name in ("author", "since", "branch", "path")}
+    root = protocol.root_of(".")
+    if root is None:
+        print("Not in a CVS repository")
+        exit(1)
+    if filters["since"] is not None:
+        try:
+            filters["since"] = history.parse_since(filters["since"])
+        except ValueError:
+            print("Invalid date {0}".format(filters["since"]))
+            return
+    try:
+        numbers = [int(arg) for arg in args]
+    except ValueError:
+        print("Invalid changeset number")
+        return
+
+    index = history_index(pycvs, root)
+    if index is None:
+        return
+    changesets.update(index, fuzz)
+
+    pager = stream.Pager(use_pager)
+    try:
+        if not numbers:
+            for changeset in changesets.query(index, **filters):
+                pager.write("\n".join(
+                    changesets.format_changeset(changeset)), True)
+        for number in numbers:
+            changeset = changesets.get(index, number)
+            if changeset is None:
+                pager.write("Unknown changeset {0}".format(number))
+                continue
+            pager.write("\n".join(
+                changesets.format_changeset(changeset)), True)
+            _changeset_diff(pycvs, root, changeset, jobs, pager)
+    except BrokenPipeError:
+        pass
+    finally:
+        pager.close()
+        index.close()
+
+
+def _changeset_diff(pycvs, root, changeset, jobs, pager):
+    """
+    Show the diffs of a changeset, fetching the revisions before and
+    after it of its files, jobs at a time.
+    """
+    module = read_repository()
+    root_path = protocol.parse_root(root).path.rstrip("/") + "/"
+    if module.startswith(root_path):
+        module = module[len(root_path):]
+
+    def fetch(path, revision):
+        if revision is None:
+            return []
+        spawn_str = "cvs -d {0} -Q co -p -r {1} {2}".format(
+            root, revision, shlex.quote(module + "/" + path))
+        cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+        if cvs_obj is None:
+            return None
+        lines = [line for kind, line in stream.output_lines(cvs_obj)
+                 if kind == stream.STDOUT]
+        cvs_obj.close()
+        return lines if cvs_obj.exitstatus == 0 else None
+
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        fetches = []
+        for path, revision, state in changeset.members:
+            old_revision = changesets.previous_revision(revision)
+            fetches.append((path, old_revision, revision,
+                            pool.submit(fetch, path, old_revision),
+                            pool.submit(fetch, path, None if state ==
+                                        "dead" else revision)))
+        for path, old_revision, revision, old, new in fetches:
+            old, new = old.result(), new.result()
+            if old is None or new is None:
+                pager.write("Could not fetch {0} {1}".format(path,
+                                                             revision))
+                continue
+            page_diff(pager, changesets.diff_lines(
+                path, old_revision, revision, old, new))
@@ -0,0 +1,116 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import concurrent.futures
+
+# Library packages
+from pycvs import stream
+from pycvs.cli import pop_option
+
+# Times a failed shard of a parallel checkout is tried again
+SHARD_RETRIES = 2
+
+
+def run(pycvs, args):
+    """
+    Checks out the repository. Prints a resume of the checkout -- number
+    of files and directories.
+
+    Args:
+        args(list): Command line arguments list, the module last. With
+            --jobs N the top-level subdirectories of the module are
+            checked out by N concurrent cvs processes.
+    """
+    # -j is the join option of cvs checkout
+    jobs = int(pop_option(args, ["--jobs"], 1))
+    repo = args.pop()
+    opts = " ".join(args)
+    print("Checking out repository {0}".format(repo))
+
+    shards = None
+    # With -d the layout is not the one of the repository
+    if jobs > 1 and "-d" not in args:
+        shards = pycvs._list_subdirs(repo)
+    progress = stream.Progress("checked out")
+    if shards:
+        result = _checkout_sharded(pycvs, repo, opts, shards, jobs,
+                                   progress)
+    else:
+        result = pycvs._checkout_module(repo, opts, progress)
+    progress.done()
+    store = pycvs._pristine_store()
+    if store is not None:
+        store.trim()
+
+    if result is not None:
+        files, dirs, _ = result
+        print("")
+        print("{0} files checked out".format(str(files)))
+        print("{0} directories checked out".format(str(dirs)))
+
+
+def _checkout_sharded(pycvs, repo, opts, shards, jobs, progress=None):
+    """
+    Check out a module one top-level subdirectory per cvs process. Shards
+    that fail are retried one at a time afterwards.
+
+    Returns:
+        A (files, directories, succeeded) tuple with the totals of all the
+        shards, or None when cvs could not be run.
+    """
+    # The top directory and its files first, the shards go inside it
+    result = pycvs._checkout_module(repo, "-l " + opts, progress)
+    if result is None:
+        return None
+    files, dirs, succeeded = result
+
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        futures = collections.OrderedDict(
+            (pool.submit(pycvs._checkout_module, repo + "/" + shard, opts,
+                         progress), shard) for shard in shards)
+        for future, shard in futures.items():
+            result = future.result()
+            if result is None or not result[2]:
+                failed.append(shard)
+            if result is not None:
+                files += result[0]
+                if result[2]:
+                    dirs += result[1]
+
+    for shard in failed:
+        for _ in range(SHARD_RETRIES):
+            print("Retrying checkout of {0}/{1}".format(repo, shard))
+            result = pycvs._checkout_module(repo + "/" + shard, opts,
+                                            progress)
+            if result is None:
+                continue
+            # A retry only gets the files still missing, but goes
+            # through all the directories again
+            files += result[0]
+            if result[2]:
+                dirs += result[1]
+                break
+        else:
+            print("Could not check out {0}/{1}".format(repo, shard))
+            succeeded = False
+
+    return files, dirs, succeeded
@@ -0,0 +1,153 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import concurrent.futures
+import functools
+import shlex
+
+# Additional dependencies
+from colorama import Fore
+
+# Library packages
+from pycvs import compare, protocol, stream
+from pycvs.cli import DEFAULT_JOBS, pop_option
+from pycvs.commands.diff import page_diff
+from pycvs.data import FILE_ADDED, FILE_REMOVED
+from pycvs.local import is_working_dir, read_repository
+
+
+def run(pycvs, args):
+    """
+    Compare two tags (or branches, dates with -D...) of a module on the
+    server, without working copy: list the files modified, added and
+    removed between them and, with --diff, show their differences. The
+    top-level subdirectories of the module are compared by concurrent
+    cvs rdiff processes and the output streamed in order.
+
+    Args:
+        args(list): Command line arguments: the two tags and the module,
+            the one of the working copy by default. --diff, -j/--jobs
+            and --no-pager.
+    """
+    use_pager = "--no-pager" not in args
+    if not use_pager:
+        args.remove("--no-pager")
+    show_diff = "--diff" in args
+    if show_diff:
+        args.remove("--diff")
+    jobs = int(pop_option(args, ["-j", "--jobs"],
+                          pycvs.credentials.get("jobs", DEFAULT_JOBS)))
+    tags = ["-r", shlex.quote(args[0]), "-r", shlex.quote(args[1])]
+    root = pycvs.credentials["root"]
+    if len(args) > 2:
+        module = args[2]
+    elif is_working_dir("."):
+        root = protocol.root_of(".")
+        module = read_repository()
+        root_path = protocol.parse_root(root).path.rstrip("/") + "/"
+        if module.startswith(root_path):
+            module = module[len(root_path):]
+    else:
+        print("Missing module for compare command")
+        return
+
+    opened = []
+
+    def rdiff(options, shard):
+        # Only starts cvs, the output waits for its turn to be read
+        path, shard_options = shard
+        spawn_str = "cvs -d {0} -Q rdiff {1} {2}".format(
+            root, " ".join(options + tags + shard_options),
+            shlex.quote(path))
+        cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+        if cvs_obj is not None:
+            opened.append(cvs_obj)
+        return cvs_obj
+
+    shards = compare.shards(module, pycvs._list_subdirs(module, root)
+                            if jobs > 1 else None)
+    pager = stream.Pager(use_pager)
+    totals = collections.Counter()
+    # The shard being read counts as one of the jobs
+    ahead = max(jobs - 1, 0)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+            results = stream.ordered(
+                pool, functools.partial(rdiff, ["-s"]), shards, ahead)
+            for (path, _), cvs_obj in zip(shards, results):
+                if cvs_obj is not None:
+                    for change in compare.parse_summary(_stdout(cvs_obj)):
+                        totals[change.kind] += 1
+                        line = compare.format_change(change)
+                        if pager.colors:
+                            line = _color_change(line, change.kind)
+                        pager.write(line)
+                if not _succeeded(cvs_obj):
+                    pager.write("Could not compare {0}".format(path))
+            pager.write(compare.format_totals(totals), True)
+            if show_diff:
+                results = stream.ordered(
+                    pool, functools.partial(rdiff, ["-u"]), shards, ahead)
+                for (path, _), cvs_obj in zip(shards, results):
+                    if cvs_obj is not None:
+                        page_diff(pager, _stdout(cvs_obj))
+                    if not _succeeded(cvs_obj):
+                        pager.write("Could not diff {0}".format(path))
+    except BrokenPipeError:
+        results.close()
+    finally:
+        # Those started ahead when the reader went away
+        for cvs_obj in opened:
+            if cvs_obj.exitstatus is None:
+                cvs_obj.terminate(force=True)
+        pager.close()
+
+
+def _stdout(cvs_obj):
+    """
+    The lines cvs printed on stdout, as they arrive.
+    """
+    for kind, line in stream.output_lines(cvs_obj):
+        if kind == stream.STDOUT:
+            yield line
+
+
+def _succeeded(cvs_obj):
+    """
+    Whether a session read to the end succeeded, None counting as failed.
+    """
+    if cvs_obj is None:
+        return False
+    cvs_obj.close()
+
+    return cvs_obj.exitstatus == 0
+
+
+def _color_change(line, kind):
+    """
+    Color a line of the summary of a comparison like the lines of a diff.
+    """
+    if kind == FILE_ADDED:
+        return Fore.GREEN + line
+    if kind == FILE_REMOVED:
+        return Fore.RED + line
+
+    return Fore.CYAN + line
@@ -0,0 +1,47 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# Library packages
+from pycvs import conflicts
+from pycvs.cli import DEFAULT_JOBS, pop_option
+from pycvs.local import is_working_dir
+
+
+def run(pycvs, args):
+    """
+    List the conflict markers left in the modified and merged files,
+    e.g. before a commit. Exits with 1 when there are some.
+
+    Args:
+        args(list): Command line arguments: files and directories, the
+            current directory by default, and -j/--jobs files scanned at
+            a time.
+    """
+    jobs = int(pop_option(args, ["-j", "--jobs"],
+                          pycvs.credentials.get("jobs", DEFAULT_JOBS)))
+    if not is_working_dir("."):
+        print("Not in a CVS repository")
+        exit(1)
+
+    found = conflicts.scan(args, jobs)
+    for conflict in found:
+        print(conflicts.format_conflict(conflict))
+    if found:
+        exit(1)
@@ -0,0 +1,48 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import sys
+
+# Library packages
+from pycvs import daemon
+from pycvs.cli import pop_option
+
+
+def run(pycvs, args):
+    """
+    Run the background daemon that serves status, update, diff and log
+    from warm connections. It stops after being idle for a while.
+
+    Args:
+        args(list): Command line arguments: --idle-timeout seconds and
+            --max-per-root for the concurrent commands per CVSROOT.
+    """
+    idle_timeout = pop_option(args, ["--idle-timeout"],
+                              pycvs.credentials.get(
+                                  "daemon_idle_timeout",
+                                  daemon.DEFAULT_IDLE_TIMEOUT))
+    max_per_root = pop_option(args, ["--max-per-root"],
+                              pycvs.credentials.get(
+                                  "daemon_max_per_root",
+                                  daemon.DEFAULT_MAX_PER_ROOT))
+    print("pycvs daemon listening on {0}".format(daemon.SOCKET_PATH))
+    sys.stdout.flush()
+    daemon.Daemon(pycvs, idle_timeout=int(idle_timeout),
+                  max_per_root=int(max_per_root)).serve_forever()
@@ -0,0 +1,133 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import shlex
+
+# Additional dependencies
+from colorama import Fore
+
+# Library packages
+from pycvs import pristine, stream, tracing
+from pycvs.local import is_working_dir
+
+
+def run(pycvs, args):
+    """
+    Found the diff between revisions. The output goes to the pager as it
+    arrives from the server. With the pristine store enabled, the diffs
+    against the base revisions are done locally, and only the files whose
+    base revision is missing are diffed by the server.
+
+    Args:
+        args(list): Command line arguments for diff. With --no-pager the
+            output goes straight to stdout, as it does when stdout is not
+            a terminal.
+    """
+    # I do like unified diff syntax
+    if "-u" not in args:
+        args.insert(0, "-u")
+    use_pager = "--no-pager" not in args
+    if not use_pager:
+        args.remove("--no-pager")
+
+    pager = None
+    store = pycvs._pristine_store()
+    # Only plain diffs of the working files against BASE
+    if (store is not None and is_working_dir(".")
+            and all(arg == "-u" or not arg.startswith("-")
+                    for arg in args)):
+        pager = stream.Pager(use_pager)
+        try:
+            missing = _diff_local(
+                store, [arg for arg in args if arg != "-u"], pager)
+        except BrokenPipeError:
+            missing = []
+        if not missing:
+            pager.close()
+            return
+        args = ["-u"] + [shlex.quote(path) for path in missing]
+
+    opts = " ".join(args)
+    spawn_str = "cvs diff {0}".format(opts)
+    cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+    if cvs_obj is not None:
+        pager = pager or stream.Pager(use_pager)
+        try:
+            page_diff(pager, (
+                line for kind, line in stream.output_lines(cvs_obj)
+                if kind != stream.STDERR))
+        except BrokenPipeError:
+            # The pager was quit before the end, stop cvs as well
+            cvs_obj.terminate(force=True)
+        finally:
+            pager.close()
+    elif pager is not None:
+        pager.close()
+
+
+def _diff_local(store, paths, pager):
+    """
+    Diff the changed working files against the base revisions of the
+    pristine store.
+
+    Args:
+        store(PristineStore): the store.
+        paths(list): files and directories to diff, everything if empty.
+        pager(Pager): where the diffs go.
+
+    Returns:
+        The changed files whose base revision is not in the store.
+    """
+    missing = []
+    for path in pristine.changed_files(paths):
+        lines = store.diff(path)
+        if lines is None:
+            missing.append(path)
+        else:
+            page_diff(pager, lines)
+
+    return missing
+
+
+def page_diff(pager, lines):
+    """
+    Write the lines of a unified diff to the pager, colored if it shows
+    colors.
+    """
+    with tracing.span("diff.render"):
+        for line in lines:
+            boundary = line.startswith("Index: ")
+            if pager.colors:
+                line = _color_diff(line)
+            pager.write(line, boundary)
+
+
+def _color_diff(line):
+    """
+    Color a line of a unified diff.
+    """
+    if line.startswith("+") and not line.startswith("+++"):
+        line = Fore.GREEN + line
+    elif line.startswith("-") and not line.startswith("---"):
+        line = Fore.RED + line
+    elif line.startswith("@@"):
+        line = Fore.CYAN + line
+
+    return line
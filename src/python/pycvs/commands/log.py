@@ -0,0 +1,234 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import os
+import shlex
+import sys
+import time
+
+# Library packages
+from pycvs import history, incremental, protocol, rcslog, stream, tracing
+from pycvs.cli import chunk_arguments, pop_option
+from pycvs.local import read_repository
+
+
+def run(pycvs, args):
+    """
+    Display the log of commits of files. Unless the log cache is disabled
+    ("log_cache": false in ~/.pycvs), the logs of files that did not change
+    since the last time come from the cache.
+
+    Args:
+        args(list): Command line arguments for log. --no-pager works as
+            for diff. --author, --since, --grep and --path look up the
+            revisions in the local history index instead.
+    """
+    use_pager = "--no-pager" not in args
+    if not use_pager:
+        args.remove("--no-pager")
+    filters = {name: pop_option(args, ["--" + name])
+               for name in history.FILTERS}
+    if any(value is not None for value in filters.values()):
+        _log_history(pycvs, filters, use_pager)
+        return
+
+    root = protocol.root_of(".")
+    pager = stream.Pager(use_pager)
+    try:
+        # Only complete logs are cached, not selections of revisions
+        if (pycvs.credentials.get("log_cache", True) and root is not None
+                and not any(arg.startswith("-") for arg in args)):
+            cache = rcslog.LogCache(root, os.path.expanduser(
+                pycvs.credentials.get("log_cache_dir", rcslog.CACHE_DIR)))
+            if _log_cached(pycvs, cache, args, pager):
+                return
+
+        opts = " ".join(args)
+        spawn_str = "cvs log {0}".format(opts)
+        cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+        if cvs_obj is None:
+            return
+        try:
+            with tracing.span("log.render"):
+                for _, line in stream.output_lines(cvs_obj):
+                    pager.write(line, line.startswith("RCS file: "))
+        except BrokenPipeError:
+            cvs_obj.terminate(force=True)
+    except BrokenPipeError:
+        pass
+    finally:
+        pager.close()
+
+
+def _log_history(pycvs, filters, use_pager):
+    """
+    Display the revisions of the history index matching the filters,
+    the newest first.
+
+    Args:
+        filters(dict): values of --author, --since, --grep and --path,
+            None when not given.
+        use_pager(bool): whether to use the pager.
+    """
+    root = protocol.root_of(".")
+    if root is None:
+        print("Not in a CVS repository")
+        exit(1)
+    since = filters["since"]
+    if since is not None:
+        try:
+            since = history.parse_since(since)
+        except ValueError:
+            print("Invalid date {0}".format(filters["since"]))
+            return
+
+    index = history_index(pycvs, root)
+    if index is None:
+        return
+    pager = stream.Pager(use_pager)
+    try:
+        for row in index.query(filters["author"], since, filters["grep"],
+                               filters["path"]):
+            pager.write("\n".join(history.format_revision(row)), True)
+    except BrokenPipeError:
+        pass
+    finally:
+        pager.close()
+        index.close()
+
+
+def history_index(pycvs, root):
+    """
+    Open the history index of the working copy, building it or bringing
+    it up to date first when it is older than "history_refresh" seconds.
+
+    Returns:
+        A HistoryIndex object, or None when it could not be built.
+    """
+    repository = read_repository()
+    index = history.HistoryIndex.open(
+        root, repository, os.path.expanduser(pycvs.credentials.get(
+            "history_dir", history.HISTORY_DIR)))
+    synced = index.synced()
+    started = time.time()
+    refresh = float(pycvs.credentials.get("history_refresh",
+                                          history.DEFAULT_REFRESH))
+    if synced is not None and started - synced < refresh:
+        return index
+
+    if synced is None:
+        print("Building the history index, this can take a while",
+              file=sys.stderr)
+        options = []
+    else:
+        since = time.strftime(
+            "%Y/%m/%d %H:%M:%S",
+            time.gmtime(synced - incremental.CLOCK_SLACK))
+        options = ["-S", "-d", ">" + since + " UTC"]
+    spawn_str = "cvs -d {0} rlog {1}".format(
+        root, " ".join(shlex.quote(arg) for arg in
+                       options + [repository]))
+    cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+    if cvs_obj is not None:
+        if not repository.startswith("/"):
+            repository = protocol.parse_root(root).path + "/" + repository
+        index.add(rcslog.LogParser().parse(
+            line for kind, line in stream.output_lines(cvs_obj)
+            if kind == stream.STDOUT), repository.rstrip("/") + "/")
+        cvs_obj.close()
+        if cvs_obj.exitstatus == 0:
+            index.commit(started)
+            return index
+        index.rollback()
+
+    if synced is None:
+        print("Could not build the history index")
+        index.close()
+        return None
+    print("Could not bring the history index up to date")
+    return index
+
+
+def _log_cached(pycvs, cache, paths, pager):
+    """
+    Display the logs of files, asking the server only for the headers of
+    the files and for the complete logs of the ones the cache does not
+    have (or has outdated).
+
+    Args:
+        cache(LogCache): the cache.
+        paths(list): files and directories, everything if empty.
+        pager(Pager): where the logs go.
+
+    Returns:
+        Whether the logs could be displayed. Nothing was displayed when
+        they could not.
+    """
+    spawn_str = "cvs log {0}".format(" ".join(
+        ["-h"] + [shlex.quote(path) for path in paths]))
+    cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+    if cvs_obj is None:
+        return False
+    headers = []
+    # The messages of cvs (e.g. "Logging dir") with the number of headers
+    # before them, to show them where cvs log does
+    messages = collections.deque()
+
+    def stdout():
+        for kind, line in stream.output_lines(cvs_obj):
+            if kind == stream.STDOUT:
+                yield line
+            else:
+                messages.append((len(headers), line))
+
+    for header in rcslog.LogParser().parse(stdout()):
+        headers.append(header)
+    cvs_obj.close()
+    if cvs_obj.exitstatus != 0:
+        return False
+
+    stale = [header.working_file for header in headers
+             if not cache.fresh(header)]
+    # Headers of the logs just fetched, which may be newer than the
+    # first ones. Complete logs are kept only when they could not be
+    # cached.
+    fetched = {}
+    for chunk in chunk_arguments(stale):
+        logs = pycvs._read_logs([shlex.quote(name) for name in chunk])
+        if logs is None:
+            return False
+        for file_log in logs:
+            if cache.put(file_log):
+                file_log = file_log._replace(revisions=[])
+            fetched[file_log.rcs_file] = file_log
+
+    for position, header in enumerate(headers):
+        while messages and messages[0][0] <= position:
+            pager.write(messages.popleft()[1])
+        file_log = fetched.get(header.rcs_file, header)
+        if not file_log.revisions:
+            file_log = cache.get(file_log) or file_log
+        # A whole file at once, the pager flushes it right away
+        pager.write("\n".join(rcslog.format_log(file_log)), True)
+    for _, message in messages:
+        pager.write(message)
+
+    return True
@@ -0,0 +1,98 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import functools
+import json
+
+# Library packages
+from pycvs import conflicts, stream, tracing
+from pycvs.cli import DEFAULT_JOBS, pop_option
+from pycvs.data import FileStatus
+from pycvs.local import WorkingCopy, is_working_dir, read_tag
+from pycvs.parser import StatusParser
+
+
+def run(pycvs, args):
+    """
+    Get cvs status from the server and print and beautyful output
+    (yeah, git style).
+
+    Args:
+        args(list): Command line arguments list. With --local the status
+            is computed from the working copy only. With --format=ndjson
+            a JSON object is printed per line instead, for each file as
+            soon as it is classified.
+
+    The conflict markers left in the changed files are listed as well.
+    """
+    output_format = pop_option(args, ["--format"], "text")
+    if output_format not in ("text", "ndjson"):
+        print("Unknown format {0}".format(output_format))
+        exit(1)
+    out = None
+    files = FileStatus()
+    if output_format == "ndjson":
+        out = stream.Pager(False)
+        files.listener = functools.partial(_write_record,
+                                           out)
+
+    tag = read_tag()
+    if out is not None:
+        kind = {"N": "tag", "D": "date"}.get(tag[0] if tag else "T")
+        out.write(json.dumps({"kind": kind or "branch",
+                              "name": tag[1] if tag else "HEAD"}))
+    elif tag is None:
+        print("On branch HEAD")
+    elif tag[0] == "N":
+        print("On tag {0}".format(tag[1]))
+    elif tag[0] == "T":
+        print("On branch {0}".format(tag[1]))
+
+    if "--local" in args:
+        if not is_working_dir("."):
+            print("Not in a CVS repository")
+            exit(1)
+        WorkingCopy(use_index=True).status(files)
+    else:
+        cvs_obj = pycvs._access_cvs("cvs status", stream=True)
+        if cvs_obj is None:
+            return
+        StatusParser(files).parse(pycvs._cvs_lines(cvs_obj))
+    if is_working_dir("."):
+        files.conflicts = conflicts.scan_status(files, ".", int(
+            pycvs.credentials.get("jobs", DEFAULT_JOBS)))
+
+    if out is None:
+        with tracing.span("status.render"):
+            files.print_files()
+        return
+    for conflict in files.conflicts:
+        out.write(json.dumps({
+            "kind": "conflict", "path": conflict.path,
+            "start": conflict.start, "end": conflict.end,
+            "local": conflict.local, "other": conflict.other}))
+    out.close()
+
+
+def _write_record(out, kind, path, is_dir):
+    record = {"kind": kind, "path": path.strip()}
+    if is_dir:
+        record["directory"] = True
+    out.write(json.dumps(record))
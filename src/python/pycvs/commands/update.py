@@ -0,0 +1,152 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import concurrent.futures
+import os
+import shlex
+import time
+
+# Library packages
+from pycvs import incremental, protocol, stream
+from pycvs.cli import DEFAULT_JOBS, chunk_arguments, pop_option
+from pycvs.local import read_repository
+
+# Update options that still update everything as it is
+UPDATE_FLAGS = ["-d", "-P", "-dP", "-Pd"]
+
+
+def run(pycvs, args):
+    """
+    Run the CVS update command in the current working directory.
+
+    Args:
+        args(list): Command line arguments list. With --incremental only
+            the files changed on the server since the last update are
+            updated, --jobs directories at a time.
+    """
+    if os.path.isfile("CVS/Repository"):
+        with open("CVS/Repository", "r") as repo_file:
+            lines = repo_file.readlines()
+        current_dir = lines[0].strip()
+    else:
+        print("Not in a CVS repository")
+        exit(1)
+    args = list(args)
+    jobs = pycvs.credentials.get("jobs", DEFAULT_JOBS)
+    changes_only = "--incremental" in args
+    if changes_only:
+        args.remove("--incremental")
+        # -j is the merge option of cvs update
+        jobs = pop_option(args, ["--jobs"], jobs)
+    jobs = int(jobs)
+    opts = " ".join(args)
+    print("Updating from {0}".format(current_dir))
+    print("")
+
+    # Only a plain update of everything tells what changed since when
+    whole = all(arg in UPDATE_FLAGS for arg in args)
+    root = protocol.root_of(".")
+    started = time.time()
+    progress = stream.Progress("updated")
+    result = None
+    if changes_only and whole and root is not None:
+        result = _update_incremental(pycvs, root, args, jobs, progress)
+    if changes_only and result is None:
+        print("No usable record of the last update, updating everything")
+        print("")
+    if result is None:
+        result = pycvs._update_directory(".", opts, progress=progress)
+    progress.done()
+    store = pycvs._pristine_store()
+    if store is not None:
+        store.trim()
+    if result is None:
+        return
+
+    files, conflicts, succeeded = result
+    for filename in conflicts:
+        print("Conflict on file {0}".format(filename))
+
+    print("")
+    if files > 0:
+        print("{0} files updated".format(str(files)))
+    if conflicts:
+        print("{0} conflicted files".format(str(len(conflicts))), end="")
+        print(" (solve them before commit!)")
+
+    # cvs fails on conflicts, but the update itself went through
+    if whole and root is not None and (succeeded or conflicts):
+        incremental.record_update(root, started)
+
+
+def _update_incremental(pycvs, root, args, jobs, progress=None):
+    """
+    Update only the files the server changed since the last recorded
+    update, the directories concurrently.
+
+    Returns:
+        The same as _update_directory, or None when a full update is
+        needed instead.
+    """
+    state = incremental.load_update(root)
+    if state is None:
+        return None
+
+    repository = read_repository()
+    spawn_str = "cvs -d {0} rlog {1} {2}".format(
+        root, " ".join(shlex.quote(arg) for arg in
+                       incremental.rlog_arguments(state)),
+        shlex.quote(repository))
+    cvs_obj = pycvs._access_cvs(spawn_str, stream=True)
+    if cvs_obj is None:
+        return None
+    paths = incremental.changed_paths(
+        (line for kind, line in stream.output_lines(cvs_obj)
+         if kind == stream.STDOUT),
+        protocol.parse_root(root).path, repository)
+    cvs_obj.close()
+    if cvs_obj.exitstatus != 0:
+        return None
+
+    batches = incremental.plan_batches(
+        paths, new_dirs=any("d" in arg for arg in args))
+
+    files = 0
+    conflicts = []
+    succeeded = True
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        futures = []
+        for directory, (names, new_dirs) in batches.items():
+            opts = " ".join(args if not new_dirs or "-d" in args
+                            else args + ["-d"])
+            for chunk in chunk_arguments(names):
+                futures.append(pool.submit(pycvs._update_directory,
+                                           directory, opts, chunk,
+                                           progress))
+        for future in futures:
+            result = future.result()
+            if result is None:
+                succeeded = False
+                continue
+            files += result[0]
+            conflicts += result[1]
+            succeeded = succeeded and result[2]
+
+    return files, conflicts, succeeded
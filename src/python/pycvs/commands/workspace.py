@@ -0,0 +1,88 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import asyncio
+
+# Library packages
+from pycvs import aio
+from pycvs.cli import pop_option
+
+
+def run(pycvs, args):
+    """
+    Get the status of, or update, all the working copies under a
+    directory concurrently and print a report of them all. Exits with 1
+    when some failed.
+
+    Args:
+        args(list): Command line arguments: --workspace DIR, then status
+            (optionally --local) or update and its options. --jobs sets
+            the working copies handled at a time.
+    """
+    top = pop_option(args, ["--workspace"])
+    if top is None or not args:
+        raise IndexError
+    # -j is the merge option of cvs update
+    limit = int(pop_option(args, ["--jobs"],
+                           pycvs.credentials.get("jobs", aio.DEFAULT_LIMIT)))
+    command = args.pop(0)
+    checkouts = aio.find_checkouts(top)
+    if not checkouts:
+        print("No CVS working copy in {0}".format(top))
+        exit(1)
+
+    client = aio.AsyncPyCvs(pycvs, limit)
+    try:
+        if command == "status":
+            results = _run(client.across(
+                checkouts, client.status, "--local" in args))
+            report = aio.format_status
+        elif command == "update" or command == "up":
+            results = _run(client.across(checkouts, client.update, args))
+            report = aio.format_update
+        else:
+            print("Unknown workspace command {0}".format(command))
+            exit(1)
+    finally:
+        client.close()
+
+    failed = 0
+    for result in results:
+        for line in report(result):
+            print(line)
+        # cvs fails on conflicts, but the update itself went through
+        if result.error is not None or (
+                report is aio.format_update and not any(
+                    result.result[1:])):
+            failed += 1
+    print("\n{0} working copies, {1} failed".format(len(results), failed))
+    if failed:
+        exit(1)
+
+
+def _run(coroutine):
+    """
+    Run a coroutine in a new event loop (asyncio.run needs Python 3.7).
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
@@ -0,0 +1,106 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import re
+
+# Library packages
+from pycvs.data import FILE_ADDED, FILE_MODIFIED, FILE_REMOVED
+
+# What cvs rdiff -s prints for each file. Old versions say "is removed; not
+# included in release tag X" without the revision.
+CHANGED_LINE = re.compile(r"File (.+) changed from revision (\S+) to (\S+)$")
+ADDED_LINE = re.compile(r"File (.+) is new; .* revision (\S+)$")
+REMOVED_LINE = re.compile(r"File (.+) is removed; (?:.* revision (\S+)|.*)$")
+
+# A file that differs between two tags. kind is FILE_MODIFIED, FILE_ADDED or
+# FILE_REMOVED; old and new the revisions, None on the side the file is
+# missing from (or not known).
+Change = collections.namedtuple("Change", ["kind", "path", "old", "new"])
+
+
+def parse_summary(lines):
+    """
+    Parse the output of cvs rdiff -s.
+
+    Args:
+        lines(iterable): lines cvs printed on stdout.
+
+    Returns:
+        A generator of Change objects.
+    """
+    for line in lines:
+        match = CHANGED_LINE.match(line)
+        if match is not None:
+            yield Change(FILE_MODIFIED, *match.groups())
+            continue
+        match = ADDED_LINE.match(line)
+        if match is not None:
+            yield Change(FILE_ADDED, match.group(1), None, match.group(2))
+            continue
+        match = REMOVED_LINE.match(line)
+        if match is not None:
+            yield Change(FILE_REMOVED, match.group(1), match.group(2), None)
+
+
+def format_change(change):
+    """
+    Format a line of the summary of a comparison.
+    """
+    if change.kind == FILE_ADDED:
+        revisions = change.new
+    elif change.kind == FILE_REMOVED:
+        revisions = change.old or ""
+    else:
+        revisions = "{0} -> {1}".format(change.old, change.new)
+
+    return "{0:<9} {1} {2}".format(change.kind, change.path,
+                                   revisions).rstrip()
+
+
+def format_totals(totals):
+    """
+    Format the last line of the summary of a comparison.
+
+    Args:
+        totals(Counter): number of changes of each kind.
+    """
+    return "{0} modified, {1} added, {2} removed".format(
+        totals[FILE_MODIFIED], totals[FILE_ADDED], totals[FILE_REMOVED])
+
+
+def shards(module, subdirs):
+    """
+    Split the comparison of a module in one cvs rdiff per top-level
+    subdirectory, the files of the top directory on their own.
+
+    Args:
+        module(str): the module.
+        subdirs(list): its top-level subdirectories, None when they are not
+            known.
+
+    Returns:
+        A list of (path, options) tuples.
+    """
+    if not subdirs:
+        return [(module, [])]
+
+    return [(module, ["-l"])] + [(module + "/" + subdir, [])
+                                 for subdir in subdirs]
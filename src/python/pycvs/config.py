@@ -0,0 +1,71 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import json
+import os
+
+FILE = os.path.expanduser("~/.pycvs")
+# Where the daemon listens
+SOCKET_PATH = os.path.expanduser("~/.pycvs.sock")
+
+# Parsed configuration files by path, with the (mtime, size) they had
+_cache = {}
+
+
+def load(path=FILE):
+    """
+    Read the configuration file, asking for the credentials and writing it
+    first when there is none. The parsed configuration is kept while the
+    file does not change, for the daemon, batches and library users that
+    create several PyCvs objects.
+
+    Args:
+        path(str): the configuration file.
+
+    Returns:
+        A dict, which the caller may change.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return dict(_create(path))
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, "r") as cfg_file:
+            cached = _cache[path] = (key, json.load(cfg_file))
+
+    return dict(cached[1])
+
+
+def _create(path):
+    # Only the first run needs it
+    import getpass
+
+    print("No configuration file found at {0}".format(path))
+    credentials = {}
+    credentials["user"] = input("User: ")
+    credentials["password"] = getpass.getpass()
+    credentials["root"] = input("CVS Root: ")
+    with open(path, "w") as cfg_file:
+        json.dump(credentials, cfg_file, indent=4)
+
+    return credentials
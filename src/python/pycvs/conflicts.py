@@ -0,0 +1,188 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import mmap
+import os
+import re
+
+# Library packages
+from pycvs import tracing
+from pycvs.local import read_entries
+from pycvs.pristine import changed_files
+
+START_MARKER = b"<<<<<<< "
+END_MARKER = b">>>>>>> "
+# Copy of the working file cvs keeps before merging changes in it
+BACKUP_FILE = re.compile(r"\.#(.+)\.(\d+(?:\.\d+)+)$")
+
+# Conflict markers left in a file: start and end are the line numbers of the
+# <<<<<<< and >>>>>>> lines, local the revision the working file was based on
+# before the merge (None when its .#file.revision copy is gone) and other the
+# revision merged in.
+Conflict = collections.namedtuple("Conflict", ["path", "start", "end",
+                                               "local", "other"])
+# Fewer files are scanned in this thread: starting threads (and importing
+# the pool) costs more than it saves
+POOL_MIN_FILES = 16
+
+
+def scan_file(path):
+    """
+    Find the conflict markers left in a file. The file is mapped in memory
+    and searched for the markers, so files without conflicts (the usual
+    case) are read at the speed of memchr and never copied.
+
+    Returns:
+        A list of Conflict objects.
+    """
+    try:
+        with open(path, "rb") as scanned:
+            if os.fstat(scanned.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(scanned.fileno(), 0,
+                           access=mmap.ACCESS_READ) as data:
+                return _scan(path, data)
+    except OSError:
+        return []
+
+
+def _scan(path, data):
+    conflicts = []
+    local = None
+    line = 1
+    counted = 0
+    position = _find_marker(data, START_MARKER, 0)
+    while position != -1:
+        end = _find_marker(data, END_MARKER, position)
+        if end == -1:
+            break
+        line += data[counted:position].count(b"\n")
+        start_line = line
+        line += data[position:end].count(b"\n")
+        counted = end
+        if not conflicts:
+            local = base_revision(path)
+        eol = data.find(b"\n", end)
+        label = data[end + len(END_MARKER):eol if eol != -1 else len(data)]
+        conflicts.append(Conflict(path, start_line, line, local,
+                                  label.strip().decode("utf-8", "replace")))
+        position = _find_marker(data, START_MARKER, end)
+
+    return conflicts
+
+
+def _find_marker(data, marker, position):
+    """
+    Find a marker at the start of a line, from position on.
+    """
+    position = data.find(marker, position)
+    while position > 0 and data[position - 1] != ord("\n"):
+        position = data.find(marker, position + 1)
+
+    return position
+
+
+def base_revision(path):
+    """
+    The revision a merged working file was based on, from the copy of it cvs
+    saved as .#file.revision, the newest one when there are several.
+    """
+    parent, name = os.path.split(path)
+    newest = None
+    try:
+        for item in os.scandir(parent or "."):
+            match = BACKUP_FILE.match(item.name)
+            if match is not None and match.group(1) == name:
+                mtime = item.stat().st_mtime
+                if newest is None or mtime > newest[0]:
+                    newest = (mtime, match.group(2))
+    except OSError:
+        return None
+
+    return newest[1] if newest is not None else None
+
+
+def scan(paths=None, jobs=4):
+    """
+    Find the conflict markers left in the modified and merged files of the
+    working copy, jobs files at a time. Binary (-kb) files are skipped.
+
+    Args:
+        paths(list): files and directories to look at. The current directory
+            when empty.
+        jobs(int): files scanned concurrently.
+
+    Returns:
+        A list of Conflict objects, sorted by path and line.
+    """
+    entries = {}
+    candidates = []
+    for path in changed_files(paths):
+        parent, name = os.path.split(path)
+        if parent not in entries:
+            entries[parent] = read_entries(parent or ".")
+        entry = entries[parent].get(name)
+        if entry is not None and entry.options != "-kb":
+            candidates.append(path)
+
+    conflicts = []
+    with tracing.span("conflicts.scan"):
+        if jobs > 1 and len(candidates) >= POOL_MIN_FILES:
+            import concurrent.futures
+            with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+                for found in pool.map(scan_file, candidates):
+                    conflicts += found
+        else:
+            for path in candidates:
+                conflicts += scan_file(path)
+
+    return sorted(conflicts)
+
+
+def scan_status(files, directory=".", jobs=4):
+    """
+    Find the conflict markers left in the files a status found changed,
+    without looking at the rest of the working copy again.
+
+    Args:
+        files(FileStatus): the status of the working copy.
+        directory(str): the working copy, its paths are relative to it.
+        jobs(int): files scanned concurrently.
+
+    Returns:
+        A list of Conflict objects, sorted by path and line.
+    """
+    # cvs status pads the names of the files
+    paths = [os.path.join(directory, path.strip()) for path in
+             files.modified + files.merging + files.merged]
+    if not paths:
+        return []
+
+    return scan(paths, jobs)
+
+
+def format_conflict(conflict):
+    """
+    Format a conflict as path:lines: revisions.
+    """
+    return "{0}:{1}-{2}: working copy ({3}) vs {4}".format(
+        conflict.path, conflict.start, conflict.end,
+        conflict.local or "?", conflict.other)
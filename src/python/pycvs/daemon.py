@@ -0,0 +1,363 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Only light modules here: the client side runs before anything else is
+# imported, to keep the thin client start up fast.
+import collections
+import json
+import os
+import re
+import select
+import socket
+import sys
+import time
+
+# Library packages
+from pycvs.config import SOCKET_PATH
+
+DEFAULT_IDLE_TIMEOUT = 600
+DEFAULT_MAX_PER_ROOT = 4
+
+# Sent by the daemon after the output of a command
+EXIT_TRAILER = re.compile(rb"\0pycvs-exit (-?\d+)\n$")
+TRAILER_MAX = 32
+
+
+def run_client(argv, socket_path=SOCKET_PATH):
+    """
+    Run a command through the daemon, copying its output to stdout.
+
+    Args:
+        argv(list): command line arguments, without the program name.
+        socket_path(str): where the daemon listens.
+
+    Returns:
+        The exit status of the command, or None when no daemon is running
+        and the command must run directly.
+    """
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path)
+    except OSError:
+        return None
+
+    request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    pager = None
+    out = sys.stdout.buffer
+    if sys.stdout.isatty():
+        # The daemon only sees a socket: colors are decided here, and the
+        # output is paged here
+        request["env"].setdefault("PYCVS_COLOR", "always")
+        if argv[0] in ("diff", "log") and "--no-pager" not in argv:
+            import subprocess
+            pager = subprocess.Popen(["less", "-R"], stdin=subprocess.PIPE)
+            out = pager.stdin
+
+    try:
+        code = _exchange(sock, request, out)
+    except BrokenPipeError:
+        # The pager was closed before the end of the output
+        code = 0
+    if pager is not None:
+        try:
+            pager.stdin.close()
+        except BrokenPipeError:
+            pass
+        pager.wait()
+
+    return code
+
+
+def _exchange(sock, request, out):
+    """
+    Send a request and copy the output of the command to out.
+
+    Returns:
+        The exit status of the command.
+    """
+    with sock:
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+
+        tail = b""
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            data = tail + data
+            out.write(data[:-TRAILER_MAX])
+            tail = data[-TRAILER_MAX:]
+        out.flush()
+
+    match = EXIT_TRAILER.search(tail)
+    if match is None:
+        # The daemon died in the middle of the command
+        out.write(tail)
+        out.flush()
+        return 1
+    out.write(tail[:match.start()])
+    out.flush()
+
+    return int(match.group(1))
+
+
+class Daemon():
+    """
+    Background server that keeps the configuration loaded and authenticated
+    protocol connections open per CVSROOT. Every request runs in a forked
+    child, so commands get a warm interpreter and their own working directory
+    without spawning anything.
+    """
+    def __init__(self, pycvs, socket_path=SOCKET_PATH,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 max_per_root=DEFAULT_MAX_PER_ROOT):
+        """
+        Args:
+            pycvs(PyCvs): configured instance used to run the commands.
+            socket_path(str): Unix socket to listen on.
+            idle_timeout(int): seconds after which unused connections are
+                closed, and the daemon exits if there is nothing to do.
+            max_per_root(int): commands running at once on the same CVSROOT.
+        """
+        self.pycvs = pycvs
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.max_per_root = max_per_root
+        # root -> list of (client, last use)
+        self.pool = collections.defaultdict(list)
+        # pid -> (root, client)
+        self.children = {}
+        self.running = collections.Counter()
+        self.queue = collections.deque()
+        self.config_mtime = self._config_mtime()
+
+    def serve_forever(self):
+        """
+        Serve requests until idle for longer than the idle timeout.
+        """
+        if os.path.exists(self.socket_path):
+            # A previous daemon may still be alive
+            if daemon_alive(self.socket_path):
+                print("pycvs daemon already running on {0}"
+                      .format(self.socket_path))
+                return
+            os.remove(self.socket_path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        listener.listen(64)
+        last_activity = time.monotonic()
+        try:
+            while True:
+                self._reap()
+                self._dispatch(listener)
+                self._expire()
+                if self.children or self.queue:
+                    last_activity = time.monotonic()
+                elif time.monotonic() - last_activity > self.idle_timeout:
+                    break
+
+                ready, _, _ = select.select([listener], [], [], 0.2)
+                if ready:
+                    conn, _ = listener.accept()
+                    request = self._read_request(conn)
+                    if request is None:
+                        conn.close()
+                    else:
+                        self.queue.append((conn, request))
+        finally:
+            listener.close()
+            os.remove(self.socket_path)
+            for clients in self.pool.values():
+                for client, _ in clients:
+                    client.close()
+
+    @staticmethod
+    def _read_request(conn):
+        conn.settimeout(5)
+        data = b""
+        try:
+            while not data.endswith(b"\n"):
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            request = json.loads(data.decode("utf-8"))
+        except (OSError, ValueError):
+            return None
+        conn.settimeout(None)
+
+        return request
+
+    def _dispatch(self, listener):
+        """
+        Start the queued requests whose root is below its concurrency limit.
+        """
+        self._reload_config()
+        waiting = collections.deque()
+        while self.queue:
+            conn, request = self.queue.popleft()
+            root = self._root_of(request)
+            if self.running[root] >= self.max_per_root:
+                waiting.append((conn, request))
+                continue
+            client = self._client_for(root)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                self._run_child(conn, request, root, client)
+            conn.close()
+            self.children[pid] = (root, client)
+            self.running[root] += 1
+        self.queue = waiting
+
+    def _root_of(self, request):
+        from pycvs import protocol
+
+        root = protocol.root_of(request["cwd"])
+        return root or self.pycvs.credentials.get("root")
+
+    def _client_for(self, root):
+        """
+        A connected protocol client for the root: an idle one from the pool
+        or a new one. None if the root does not use the protocol.
+        """
+        from pycvs import protocol
+
+        if root is None or not self.pycvs._use_protocol(root):
+            return None
+        # A client that just got its output back may be sending the next
+        # command before the child that served it is gone
+        deadline = time.monotonic() + 0.05
+        while (not self.pool[root] and self.running[root]
+               and time.monotonic() < deadline):
+            time.sleep(0.001)
+            self._reap()
+        if self.pool[root]:
+            client, _ = self.pool[root].pop()
+            return client
+
+        client = self.pycvs._protocol_client(root)
+        try:
+            client.connect()
+        except (protocol.ProtocolError, OSError):
+            # Let the command report the problem by itself
+            client.close()
+            return None
+
+        return client
+
+    def _run_child(self, conn, request, root, client):
+        """
+        Run a request in the forked child. Never returns.
+        """
+        code = 1
+        try:
+            os.dup2(conn.fileno(), 1)
+            os.dup2(conn.fileno(), 2)
+            sys.stdout = open(1, "w", buffering=1, closefd=False)
+            sys.stderr = sys.stdout
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            sys.argv = ["pycvs"] + request["argv"]
+            self.pycvs.sessions = {root: client} if client else None
+            try:
+                self.pycvs.process()
+                code = 0
+            except SystemExit as error:
+                code = error.code if isinstance(error.code, int) else 1
+        except Exception as error:
+            print("pycvs daemon: {0}".format(error))
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.write(1, b"\0pycvs-exit " + str(code).encode() + b"\n")
+            # The exit status only tells the daemon whether the connection
+            # can be used again, the client got the real one above. The
+            # zlib state of a compressed one stays in this process.
+            reusable = (client is not None and client.connection is not None
+                        and not client.compression)
+            os._exit(0 if reusable else 1)
+
+    def _reap(self):
+        """
+        Collect finished children, giving their connections back to the pool.
+        """
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid not in self.children:
+                continue
+            root, client = self.children.pop(pid)
+            self.running[root] -= 1
+            if client is None:
+                continue
+            if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+                self.pool[root].append((client, time.monotonic()))
+            else:
+                client.close()
+
+    def _expire(self):
+        """
+        Close the connections idle for longer than the idle timeout.
+        """
+        now = time.monotonic()
+        for root, clients in self.pool.items():
+            for client, last_use in clients:
+                if now - last_use > self.idle_timeout:
+                    client.close()
+            clients[:] = [(client, last_use) for client, last_use in clients
+                          if now - last_use <= self.idle_timeout]
+
+    def _config_mtime(self):
+        try:
+            return os.stat(self.pycvs.CONFIGURATON_FILE).st_mtime
+        except OSError:
+            return None
+
+    def _reload_config(self):
+        mtime = self._config_mtime()
+        if mtime is not None and mtime != self.config_mtime:
+            self.config_mtime = mtime
+            with open(self.pycvs.CONFIGURATON_FILE, "r") as cfg_file:
+                self.pycvs.credentials = json.load(cfg_file)
+
+
+def daemon_alive(socket_path=SOCKET_PATH):
+    """
+    Whether a daemon answers on the socket.
+    """
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path)
+    except OSError:
+        return False
+    sock.close()
+
+    return True
@@ -18,7 +18,7 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-import os
+import sys
 
 # Additional dependencies
 from colorama import Fore, Style
@@ -32,75 +32,136 @@ FILE_MERGING = 'merging'
 FILE_MERGED = 'merged'
 FILE_REMOVED = 'removed'
 
+FILE_KINDS = [FILE_NEW, FILE_MODIFIED, FILE_ADDED, FILE_OUTDATED,
+              FILE_MERGING, FILE_MERGED, FILE_REMOVED]
+
+# Sections of `pycvs status`, in order: kind, title, hint, color and label of
+# the files
+SECTIONS = [
+    (FILE_NEW, "Untracked files:",
+     " (use pycvs add <file>... to add them for commit)", Fore.RED, ""),
+    (FILE_MODIFIED, "Changes staged for commit:",
+     " (use cvs commit... to check them in)", Fore.GREEN, "modified:\t"),
+    (FILE_ADDED, "New files staged for commit:",
+     " (use cvs commit... to check them in)", Fore.RED, "new file:\t"),
+    (FILE_OUTDATED, "Outdated files:",
+     " (use pycvs up <file>... to update them)", Fore.CYAN, "outdated:\t"),
+    (FILE_MERGING, "Changes that need to be merged before commit:",
+     " (use pycvs up <file>... to update them)", Fore.CYAN, "to merge:\t"),
+    (FILE_MERGED, "Files that had conflicts and need to be committed:",
+     " (use cvs commit <file>... to check them in)", Fore.GREEN,
+     "merged:\t"),
+    (FILE_REMOVED, "Removed files staged for commit:",
+     " (use cvs commit <file>... to check them in)", Fore.YELLOW,
+     "removed:\t"),
+]
+# Kinds that leave something to commit
+COMMITTABLE = [FILE_NEW, FILE_MODIFIED, FILE_ADDED, FILE_MERGED, FILE_REMOVED]
+
 
 class FileStatus():
-    def __init__(self):
-        self.modified = []
-        self.new = []
-        self.added = []
-        self.outdated = []
-        self.merging = []
-        self.merged = []
-        self.removed = []
+    """
+    Files of a working copy by kind. The names are kept grouped by their
+    directory, whose prefix (e.g. "lib/", "" at the top) is stored once. The
+    lists of paths (modified, new...) are built when asked for.
+    """
+    def __init__(self, listener=None):
+        """
+        Args:
+            listener(callable): called with the kind, the path and whether
+                it is a directory of every entry as it is added, e.g. to
+                stream them.
+        """
+        # kind -> {directory prefix: [names]}
+        self._groups = {kind: {} for kind in FILE_KINDS}
+        # (directory prefix, name) of the entries that are directories
+        self._dirs = set()
+        self.listener = listener
+        # Conflict objects (see pycvs.conflicts) of the markers left in the
+        # files
+        self.conflicts = []
+
+    def add(self, kind, directory, name, is_dir=False):
+        """
+        Add an entry.
+
+        Args:
+            kind(str): one of the FILE_* kinds.
+            directory(str): prefix of its directory, "" or ending with "/".
+            name(str): its name in the directory.
+            is_dir(bool): whether it is a directory.
+        """
+        groups = self._groups[kind]
+        names = groups.get(directory)
+        if names is None:
+            names = groups[sys.intern(directory)] = []
+        names.append(name)
+        if is_dir:
+            self._dirs.add((directory, name))
+        if self.listener is not None:
+            self.listener(kind, directory + name, is_dir)
 
     def add_file(self, kind, filename):
-        kind_list = getattr(self, kind)
-        kind_list.append(filename)
-        setattr(self, kind, kind_list)
-
-    def print_files(self):
-        if len(self.new) != 0:
-            print("Untracked files:")
-            print(" (use pycvs add <file>... to add them for commit)\n")
-            for file in self.new:
-                print(Fore.RED, "\t{0}".format(file))
-            print(Style.RESET_ALL, "")
-        if len(self.modified) != 0:
-            print("Changes staged for commit:")
-            print(" (use cvs commit... to check them in)\n")
-            for file in self.modified:
-                print(Fore.GREEN, "\tmodified:\t", end="")
-                print("{0}".format(file))
-            print(Style.RESET_ALL, "")
-        if len(self.added) != 0:
-            print("New files staged for commit:")
-            print(" (use cvs commit... to check them in)\n")
-            for file in self.added:
-                if os.path.isfile(file.strip()):
-                    print(Fore.RED, "\tnew file:\t", end=""),
-                else:
-                    print(Fore.RED, "\tnew directory:\t", end="")
-                print("{0}".format(file))
-            print(Style.RESET_ALL, "")
-        if len(self.outdated) != 0:
-            print("Outdated files:")
-            print(" (use pycvs up <file>... to update them)\n")
-            for file in self.outdated:
-                print(Fore.CYAN, "\toutdated:\t", end="")
-                print(file)
-            print(Style.RESET_ALL, "")
-        if len(self.merging) != 0:
-            print("Changes that need to be merged before commit:")
-            print(" (use pycvs up <file>... to update them)\n")
-            for file in self.merging:
-                print(Fore.CYAN, "\tto merge:\t", end="")
-                print(file)
-            print(Style.RESET_ALL, "")
-        if len(self.merged) != 0:
-            print("Files that had conflicts and need to be committed:")
-            print(" (use cvs commit <file>... to check them in)\n")
-            for file in self.merged:
-                print(Fore.GREEN, "\tmerged:\t", end="")
-                print("{0}".format(file))
-            print(Style.RESET_ALL, "")
-        if len(self.removed) != 0:
-            print("Removed files staged for commit:")
-            print(" (use cvs commit <file>... to check them in)\n")
-            for filename in self.removed:
-                print(Fore.YELLOW, "\tremoved:\t", end="")
-                print(filename)
-            print(Style.RESET_ALL, "")
-
-        if (self.new == [] and self.modified == [] and self.added == []
-                and self.merged == [] and self.removed == []):
-            print("nothing to commit, working directory clean")
+        directory, slash, name = filename.rpartition("/")
+        self.add(kind, directory + slash, name)
+
+    def paths(self, kind):
+        """
+        The paths of the entries of a kind.
+        """
+        return [directory + name
+                for directory, names in self._groups[kind].items()
+                for name in names]
+
+    def count(self, kind):
+        return sum(len(names) for names in self._groups[kind].values())
+
+    def is_dir(self, path):
+        directory, slash, name = path.rpartition("/")
+        return (directory + slash, name) in self._dirs
+
+    new = property(lambda self: self.paths(FILE_NEW))
+    modified = property(lambda self: self.paths(FILE_MODIFIED))
+    added = property(lambda self: self.paths(FILE_ADDED))
+    outdated = property(lambda self: self.paths(FILE_OUTDATED))
+    merging = property(lambda self: self.paths(FILE_MERGING))
+    merged = property(lambda self: self.paths(FILE_MERGED))
+    removed = property(lambda self: self.paths(FILE_REMOVED))
+
+    def print_files(self, out=None):
+        """
+        Print the files section by section, each in a single write.
+
+        Args:
+            out(file): where to print. Defaults to sys.stdout.
+        """
+        out = out or sys.stdout
+        for kind, title, hint, color, label in SECTIONS:
+            groups = self._groups[kind]
+            if not groups:
+                continue
+            lines = [title, "\n", hint, "\n\n"]
+            prefix = color + " \t" + label
+            for directory, names in groups.items():
+                for name in names:
+                    if kind == FILE_ADDED and (directory, name) in self._dirs:
+                        lines.append(color + " \tnew directory:\t")
+                    else:
+                        lines.append(prefix)
+                    lines.append(directory)
+                    lines.append(name)
+                    lines.append("\n")
+            lines.append(Style.RESET_ALL + " \n")
+            out.write("".join(lines))
+
+        if self.conflicts:
+            lines = ["Unresolved conflicts:\n",
+                     " (fix the conflict markers before cvs commit)\n\n"]
+            for conflict in self.conflicts:
+                lines.append("{0} \tconflict:\t{1}, lines {2}-{3}\n".format(
+                    Fore.RED, conflict.path, conflict.start, conflict.end))
+            lines.append(Style.RESET_ALL + " \n")
+            out.write("".join(lines))
+
+        if not any(self._groups[kind] for kind in COMMITTABLE):
+            out.write("nothing to commit, working directory clean\n")
@@ -0,0 +1,351 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+# Library packages
+from pycvs.rcslog import parse_date
+
+HISTORY_DIR = os.path.expanduser("~/.pycvs-cache/history")
+VERSION = 2
+# Options of `pycvs log` answered by the index
+FILTERS = ["author", "since", "grep", "path"]
+# Seconds the index is used as it is before asking the server for news
+DEFAULT_REFRESH = 600
+RELATIVE_DATE = re.compile(r"(\d+) ?(d|days?|w|weeks?)( ago)?$")
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+CREATE TABLE messages (id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+CREATE TABLE revisions (
+    file INTEGER NOT NULL,
+    revision TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    author TEXT NOT NULL,
+    state TEXT NOT NULL,
+    added INTEGER,
+    removed INTEGER,
+    commitid TEXT,
+    message INTEGER NOT NULL,
+    changeset INTEGER,
+    PRIMARY KEY (file, revision)
+) WITHOUT ROWID;
+CREATE INDEX revisions_date ON revisions (date);
+CREATE INDEX revisions_author ON revisions (author, date);
+CREATE INDEX revisions_message ON revisions (message);
+CREATE INDEX revisions_changeset ON revisions (changeset);
+CREATE TABLE tags (
+    file INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    PRIMARY KEY (file, name)
+) WITHOUT ROWID;
+CREATE TABLE changesets (
+    id INTEGER PRIMARY KEY,
+    date INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    author TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    message INTEGER NOT NULL
+);
+CREATE INDEX changesets_last ON changesets (last);
+"""
+# Full text search of the messages, when sqlite has FTS5
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE messages_fts USING fts5 (
+    text, content='messages', content_rowid='id');
+"""
+
+
+def parse_since(text):
+    """
+    Turn the value of --since in seconds since the epoch: a date
+    (2016-03-20, 2016/03/20 10:00[:00]) in UTC, or a number of days or
+    weeks ago ("30 days", "2w").
+
+    Raises:
+        ValueError: the value is not understood.
+    """
+    text = text.strip()
+    match = RELATIVE_DATE.match(text)
+    if match is not None:
+        days = int(match.group(1)) * (7 if match.group(2)[0] == "w" else 1)
+        return time.time() - days * 24 * 3600
+
+    date, _, clock = text.partition(" ")
+    clock = clock.strip() or "00:00"
+    if clock.count(":") == 1:
+        clock += ":00"
+
+    return parse_date("{0} {1}".format(date.replace("-", "/"), clock))
+
+
+class HistoryIndex():
+    """
+    Local SQLite index of the history of a module, built from `cvs rlog`
+    and kept up to date with the revisions committed since the last sync.
+    Revisions can be looked up by path, author, date and message words.
+    The symbolic names of the files and the changesets rebuilt from the
+    revisions (see pycvs.changesets) are kept as well.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path(str): the database file. It is created when missing.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != VERSION:
+            self._create()
+        # Losing the last sync on a power failure only means doing it again
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.fts = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'"
+        ).fetchone() is not None
+        self._files = None
+
+    @classmethod
+    def open(cls, root, repository, directory=HISTORY_DIR):
+        """
+        Open the index of a module.
+
+        Args:
+            root(str): CVSROOT of the module.
+            repository(str): the module, as in CVS/Repository.
+            directory(str): where the indexes live. Defaults to
+                ~/.pycvs-cache/history
+
+        Returns:
+            A HistoryIndex object.
+        """
+        key = "{0}\0{1}".format(root, repository)
+        digest = hashlib.sha1(key.encode("utf-8", "replace")).hexdigest()
+
+        return cls(os.path.join(directory, digest + ".sqlite"))
+
+    def _create(self):
+        """
+        Start over with an empty database, e.g. after a format change.
+        """
+        self.db.close()
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # Without FTS5 --grep scans the messages
+            pass
+        self.db.execute("PRAGMA user_version = {0}".format(VERSION))
+        self.db.commit()
+
+    def synced(self):
+        """
+        Returns:
+            The time the last successful sync started at, None when the
+            index was never built.
+        """
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'synced'").fetchone()
+        return float(row[0]) if row is not None else None
+
+    def add(self, file_logs, prefix):
+        """
+        Add the revisions of parsed rlog output and the current symbolic
+        names of its files. Revisions already known are left as they are.
+        Nothing is saved until commit is called.
+
+        Args:
+            file_logs(iterable): FileLog objects.
+            prefix(str): repository directory of the module, e.g.
+                "/cvsroot/module/". It is removed from the RCS file names.
+
+        Returns:
+            The number of revisions added.
+        """
+        if self._files is None:
+            self._files = dict(self.db.execute("SELECT path, id FROM files"))
+        files = self._files
+        # The files of a commit share the message, stored once
+        messages = {}
+        execute = self.db.execute
+        added = 0
+        for file_log in file_logs:
+            path = self._path_of(file_log.rcs_file, prefix)
+            if path is None:
+                continue
+            file_id = files.get(path)
+            if file_id is None:
+                file_id = execute("INSERT INTO files (path) VALUES (?)",
+                                  (path, )).lastrowid
+                files[path] = file_id
+
+            rows = []
+            for revision in file_log.revisions:
+                message_id = messages.get(revision.message)
+                if message_id is None:
+                    message_id = execute(
+                        "INSERT INTO messages (text) VALUES (?)",
+                        (revision.message, )).lastrowid
+                    if self.fts:
+                        execute("INSERT INTO messages_fts (rowid, text) "
+                                "VALUES (?, ?)", (message_id,
+                                                  revision.message))
+                    messages[revision.message] = message_id
+                lines = revision.lines or (None, None)
+                rows.append((file_id, revision.revision,
+                             parse_date(revision.date), revision.author,
+                             revision.state, lines[0], lines[1],
+                             revision.commitid, message_id))
+            changes = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO revisions VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)", rows)
+            added += self.db.total_changes - changes
+
+            execute("DELETE FROM tags WHERE file = ?", (file_id, ))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO tags VALUES (?, ?, ?)",
+                ((file_id, name, revision)
+                 for name, revision in file_log.symbolic_names))
+
+        return added
+
+    @staticmethod
+    def _path_of(rcs_file, prefix):
+        if not rcs_file.startswith(prefix) or not rcs_file.endswith(",v"):
+            return None
+        parts = rcs_file[len(prefix):-2].split("/")
+        # Removed files live in the Attic of their directory
+        if len(parts) > 1 and parts[-2] == "Attic":
+            del parts[-2]
+
+        return "/".join(parts)
+
+    def commit(self, started):
+        """
+        Save what was added, recording a successful sync.
+
+        Args:
+            started(float): time the sync started at.
+        """
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('synced', ?)",
+                        (repr(started), ))
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+        self._files = None
+
+    def query(self, author=None, since=None, grep=None, path=None):
+        """
+        Find revisions, the newest first. All the given criteria must match.
+
+        Args:
+            author(str): login of the author.
+            since(float): oldest date, in seconds since the epoch.
+            grep(str): words of the message.
+            path(str): file or directory relative to the module.
+
+        Returns:
+            A generator of (path, revision, date, author, state, lines,
+            message) tuples, date in seconds since the epoch and lines an
+            (added, removed) tuple or None.
+        """
+        conditions = []
+        values = []
+        if author is not None:
+            conditions.append("revisions.author = ?")
+            values.append(author)
+        if since is not None:
+            conditions.append("revisions.date >= ?")
+            values.append(int(since))
+        if grep is not None:
+            if self.fts:
+                conditions.append("revisions.message IN (SELECT rowid FROM "
+                                  "messages_fts WHERE messages_fts MATCH ?)")
+                values.append('"{0}"'.format(grep.replace('"', '""')))
+            else:
+                conditions.append("messages.text LIKE ?")
+                values.append("%{0}%".format(grep))
+        path_condition, path_values = self.path_condition(path)
+        if path_condition is not None:
+            conditions.append(path_condition)
+            values += path_values
+
+        sql = ("SELECT files.path, revisions.revision, revisions.date, "
+               "revisions.author, revisions.state, revisions.added, "
+               "revisions.removed, messages.text FROM revisions "
+               "JOIN files ON files.id = revisions.file "
+               "JOIN messages ON messages.id = revisions.message")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY revisions.date DESC, files.path"
+
+        for row in self.db.execute(sql, values):
+            lines = (row[5], row[6]) if row[5] is not None else None
+            yield row[:5] + (lines, row[7])
+
+    @staticmethod
+    def path_condition(path):
+        """
+        SQL condition on files.path matching a file or anything below a
+        directory, using the unique index.
+
+        Returns:
+            A (condition, values) tuple, (None, []) when everything matches.
+        """
+        path = os.path.normpath(path) if path is not None else "."
+        if path == ".":
+            return None, []
+
+        return ("(files.path = ? OR (files.path > ? AND files.path < ?))",
+                [path, path + "/", path + "0"])
+
+    def close(self):
+        self.db.close()
+
+
+def format_revision(row):
+    """
+    Print a revision found by HistoryIndex.query.
+
+    Returns:
+        A generator of lines, without end of line.
+    """
+    path, revision, date, author, state, lines, message = row
+    yield "{0} {1}".format(path, revision)
+    fields = ["date: " + time.strftime("%Y/%m/%d %H:%M:%S",
+                                       time.gmtime(date)),
+              "author: " + author, "state: " + state]
+    if lines is not None:
+        fields.append("lines: +{0} -{1}".format(*lines))
+    yield ";  ".join(fields) + ";"
+    yield from message.split("\n")
+    yield ""
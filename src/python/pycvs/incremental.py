@@ -0,0 +1,177 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import json
+import os
+import time
+
+# Library packages
+from pycvs.local import (is_working_dir, read_entries, read_repository,
+                         read_tag)
+
+STATE_FILE = os.path.join("CVS", "pycvs.update")
+VERSION = 1
+# Changes committed this long before the last update are asked for again,
+# for the commits that happened while it ran and the clock of the server
+CLOCK_SLACK = 300
+
+
+def record_update(root, started, directory="."):
+    """
+    Remember that a full update of the directory succeeded.
+
+    Args:
+        root(str): CVSROOT of the working copy.
+        started(float): time the update started at.
+        directory(str): top directory of the update. Defaults to "."
+    """
+    tag = read_tag(directory)
+    state = {"version": VERSION, "root": root, "started": started,
+             "repository": read_repository(directory),
+             "tag": "".join(tag) if tag else ""}
+    path = os.path.join(directory, STATE_FILE)
+    with open(path + ".tmp", "w") as state_file:
+        json.dump(state, state_file)
+    os.replace(path + ".tmp", path)
+
+
+def load_update(root, directory="."):
+    """
+    Read what the last successful update of the directory recorded.
+
+    Args:
+        root(str): CVSROOT of the working copy.
+        directory(str): top directory of the update. Defaults to "."
+
+    Returns:
+        The state as a dict, or None when there is none or it does not match
+        the working copy anymore: another root, repository or branch. Static
+        tags and dates are never updated incrementally.
+    """
+    try:
+        with open(os.path.join(directory, STATE_FILE), "r") as state_file:
+            state = json.load(state_file)
+        repository = read_repository(directory)
+    except (OSError, ValueError):
+        return None
+
+    tag = read_tag(directory)
+    if (not isinstance(state, dict) or state.get("version") != VERSION
+            or state.get("root") != root
+            or state.get("repository") != repository
+            or state.get("tag") != ("".join(tag) if tag else "")
+            or not isinstance(state.get("started"), (int, float))):
+        return None
+    if tag is not None and tag[0] != "T":
+        return None
+
+    return state
+
+
+def rlog_arguments(state):
+    """
+    Options of `cvs rlog` listing the files changed since the recorded
+    update, on the recorded branch.
+    """
+    since = time.strftime("%Y/%m/%d %H:%M:%S",
+                          time.gmtime(state["started"] - CLOCK_SLACK))
+    branch = "-r" + state["tag"][1:] if state["tag"] else "-b"
+
+    return ["-R", "-S", "-d", ">" + since + " UTC", branch]
+
+
+def changed_paths(output, root_path, repository):
+    """
+    Turn the RCS file names printed by `cvs rlog -R` in paths relative to
+    the top of the working copy.
+
+    Args:
+        output(iterable): rlog output lines.
+        root_path(str): repository directory of the CVSROOT.
+        repository(str): repository of the working copy, as in
+            CVS/Repository.
+
+    Returns:
+        A list of (path, removed) tuples. Removed files are the ones in the
+        Attic, dead on the branch.
+    """
+    if not repository.startswith("/"):
+        repository = root_path + "/" + repository
+    prefix = repository.rstrip("/") + "/"
+
+    paths = []
+    for line in output:
+        line = line.strip()
+        if not line.startswith(prefix) or not line.endswith(",v"):
+            continue
+        parts = line[len(prefix):-2].split("/")
+        # Removed files live in the Attic of their directory
+        removed = len(parts) > 1 and parts[-2] == "Attic"
+        if removed:
+            del parts[-2]
+        paths.append(("/".join(parts), removed))
+
+    return paths
+
+
+def plan_batches(paths, new_dirs=False, top="."):
+    """
+    Group changed paths by the working directory to update them from.
+
+    Args:
+        paths(list): (path, removed) tuples from changed_paths.
+        new_dirs(bool): whether directories missing from the working copy
+            are created (update -d). Their changes are skipped otherwise.
+        top(str): top directory of the working copy. Defaults to "."
+
+    Returns:
+        An OrderedDict of directory -> (names, has new directories), sorted
+        by directory.
+    """
+    batches = {}
+    entries = {}
+    for path, removed in sorted(set(paths)):
+        directory, name = os.path.split(path)
+        directory = directory or "."
+        if is_working_dir(os.path.join(top, directory)):
+            if directory not in entries:
+                entries[directory] = read_entries(os.path.join(top,
+                                                               directory))
+            # Added and removed since the last update: nothing to do
+            if not removed or name in entries[directory]:
+                batches.setdefault(directory, (set(), False))[0].add(name)
+            continue
+        if removed or not new_dirs:
+            continue
+        # Ask the closest directory we have for the missing one
+        parts = path.split("/")[:-1]
+        while parts and not is_working_dir(os.path.join(top, *parts[:-1])):
+            parts.pop()
+        if not parts:
+            continue
+        parent = "/".join(parts[:-1]) or "."
+        names, _ = batches.setdefault(parent, (set(), True))
+        names.add(parts[-1])
+        batches[parent] = (names, True)
+
+    return collections.OrderedDict(
+        (directory, (sorted(names), has_new))
+        for directory, (names, has_new) in sorted(batches.items()))
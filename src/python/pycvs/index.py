@@ -0,0 +1,238 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import hashlib
+import os
+import struct
+import zlib
+
+# Library packages
+from pycvs.data import (FILE_ADDED, FILE_MERGED, FILE_MODIFIED, FILE_NEW,
+                        FILE_REMOVED)
+
+INDEX_FILE = os.path.join("CVS", "pycvs.idx")
+MAGIC = b"PYCVSIDX"
+VERSION = 1
+
+# magic, version, number of dirs, number of files, ignore rules digest, crc32
+HEADER = struct.Struct("<8sHII16sI")
+# parent index, mtime_ns, entries signature, .cvsignore signature
+DIR_RECORD = struct.Struct("<iqqq")
+# dir index, size, mtime_ns, inode, status code
+FILE_RECORD = struct.Struct("<IQqQB")
+
+# Status codes as stored on disk. RACY marks files modified too close to the
+# index creation to trust their stat data.
+STATUS_CODES = [None, FILE_MODIFIED, FILE_ADDED, FILE_REMOVED, FILE_MERGED,
+                FILE_NEW]
+CODE_OF = {kind: code for code, kind in enumerate(STATUS_CODES)}
+RACY = 255
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+
+class CorruptIndex(Exception):
+    """
+    Raised when an index file can not be used and must be rebuilt.
+    """
+
+
+class DirState():
+    """
+    What the index knows about one directory of the working copy.
+    """
+    def __init__(self, mtime_ns=0, entries_sig=0, ignore_sig=0):
+        self.mtime_ns = mtime_ns
+        self.entries_sig = entries_sig
+        self.ignore_sig = ignore_sig
+        # name -> (size, mtime_ns, inode, status code)
+        self.files = {}
+        self.unknown = []
+        self.subdirs = []
+
+
+class StatIndex():
+    """
+    On-disk cache of the stat data and last known status of every file of a
+    working copy, in the spirit of git's index.
+    """
+    def __init__(self, rules_digest=b""):
+        """
+        Args:
+            rules_digest(bytes): digest of the global ignore rules the index
+                was built with. See digest_rules.
+        """
+        self.rules_digest = rules_digest
+        self.dirs = {}
+
+    def get(self, directory):
+        """
+        Args:
+            directory(str): directory relative to the top of the working copy.
+
+        Returns:
+            A DirState, or None when the directory is unknown.
+        """
+        return self.dirs.get(directory)
+
+    def add(self, directory, state):
+        self.dirs[directory] = state
+
+    @classmethod
+    def load(cls, root="."):
+        """
+        Read the index of a working copy.
+
+        Args:
+            root(str): top directory of the working copy. Defaults to "."
+
+        Returns:
+            A StatIndex object.
+
+        Raises:
+            CorruptIndex: the file is missing, truncated, corrupt or of
+                another version.
+        """
+        try:
+            with open(os.path.join(root, INDEX_FILE), "rb") as index_file:
+                data = index_file.read()
+        except OSError as error:
+            raise CorruptIndex(str(error))
+
+        if len(data) < HEADER.size:
+            raise CorruptIndex("truncated header")
+        magic, version, ndirs, nfiles, digest, crc = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise CorruptIndex("unknown format")
+        body = memoryview(data)[HEADER.size:]
+        if zlib.crc32(body) != crc:
+            raise CorruptIndex("checksum mismatch")
+
+        dirs_end = ndirs * DIR_RECORD.size
+        files_end = dirs_end + nfiles * FILE_RECORD.size
+        if len(body) < files_end:
+            raise CorruptIndex("truncated records")
+        names = bytes(body[files_end:]).split(b"\0")
+        if len(names) != ndirs + nfiles:
+            raise CorruptIndex("inconsistent name table")
+        names = [os.fsdecode(name) for name in names]
+
+        index = cls(digest)
+        paths = names[:ndirs]
+        states = []
+        for path, record in zip(paths,
+                                DIR_RECORD.iter_unpack(body[:dirs_end])):
+            parent, mtime_ns, entries_sig, ignore_sig = record
+            state = DirState(mtime_ns, entries_sig, ignore_sig)
+            if parent >= len(states):
+                raise CorruptIndex("directory listed before its parent")
+            if parent >= 0:
+                states[parent].subdirs.append(path)
+            states.append(state)
+            index.dirs[path] = state
+
+        records = FILE_RECORD.iter_unpack(body[dirs_end:files_end])
+        for name, (dir_index, size, mtime_ns, ino, code) in zip(
+                names[ndirs:], records):
+            if dir_index >= ndirs:
+                raise CorruptIndex("file record out of range")
+            state = states[dir_index]
+            if code == CODE_OF[FILE_NEW]:
+                state.unknown.append(name)
+            else:
+                state.files[name] = (size, mtime_ns, ino, code)
+
+        return index
+
+    def save(self, root="."):
+        """
+        Write the index atomically next to the other CVS administrative files
+        of the top directory.
+
+        Args:
+            root(str): top directory of the working copy. Defaults to "."
+        """
+        paths = list(self.dirs)
+        position = {path: i for i, path in enumerate(paths)}
+        parents = {}
+        for path in paths:
+            for subdir in self.dirs[path].subdirs:
+                parents[subdir] = position[path]
+
+        dir_records = []
+        file_records = []
+        file_names = []
+        for i, path in enumerate(paths):
+            state = self.dirs[path]
+            dir_records.append(DIR_RECORD.pack(parents.get(path, -1),
+                                               state.mtime_ns,
+                                               state.entries_sig,
+                                               state.ignore_sig))
+            for name, (size, mtime_ns, ino, code) in state.files.items():
+                file_records.append(FILE_RECORD.pack(i, size, mtime_ns, ino,
+                                                     code))
+                file_names.append(name)
+            for name in state.unknown:
+                file_records.append(FILE_RECORD.pack(i, 0, 0, 0,
+                                                     CODE_OF[FILE_NEW]))
+                file_names.append(name)
+
+        body = b"".join([b"".join(dir_records), b"".join(file_records),
+                         b"\0".join(os.fsencode(name)
+                                    for name in paths + file_names)])
+        header = HEADER.pack(MAGIC, VERSION, len(dir_records),
+                             len(file_records), self.rules_digest,
+                             zlib.crc32(body))
+
+        path = os.path.join(root, INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as index_file:
+            index_file.write(header)
+            index_file.write(body)
+        os.replace(tmp_path, path)
+
+
+def digest_rules(patterns):
+    """
+    Digest of a list of ignore patterns, to notice when they change.
+    """
+    return hashlib.md5("\0".join(patterns).encode("utf-8")).digest()
+
+
+def stat_signature(*paths):
+    """
+    Combine the modification times of several files in a single number. Files
+    that do not exist count as zero.
+
+    Returns:
+        A (signature, newest mtime_ns) tuple.
+    """
+    signature = 0
+    newest = 0
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            value = 0
+        else:
+            value = stat.st_mtime_ns ^ stat.st_size
+            newest = max(newest, stat.st_mtime_ns)
+        signature = (signature * 31 + value) & 0x7fffffffffffffff
+
+    return signature, newest
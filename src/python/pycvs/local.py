@@ -0,0 +1,433 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import fnmatch
+import os
+import re
+import time
+
+# Library packages
+from pycvs import index, tracing
+from pycvs.data import FileStatus
+from pycvs.data import (FILE_ADDED, FILE_MERGED, FILE_MODIFIED, FILE_NEW,
+                        FILE_REMOVED)
+
+# Same list cvs itself ignores when looking for unknown files
+DEFAULT_IGNORE = ["RCS", "SCCS", "CVS", "CVS.adm", "RCSLOG", "cvslog.*",
+                  "tags", "TAGS", ".make.state", ".nse_depinfo", "*~", "#*",
+                  ".#*", ",*", "_$*", "*$", "*.old", "*.bak", "*.BAK",
+                  "*.orig", "*.rej", ".del-*", "*.a", "*.olb", "*.o", "*.obj",
+                  "*.so", "*.exe", "*.Z", "*.elc", "*.ln", "core"]
+
+# One line of CVS/Entries. Directories have is_dir set and no revision.
+Entry = collections.namedtuple("Entry", ["name", "revision", "timestamp",
+                                         "options", "tag", "is_dir"])
+
+
+def read_entries(directory):
+    """
+    Read the CVS/Entries file of a directory, applying CVS/Entries.Log.
+
+    Args:
+        directory(str): working copy directory.
+
+    Returns:
+        A dict of Entry objects indexed by name.
+    """
+    entries = {}
+    admin = os.path.join(directory, "CVS")
+    with open(os.path.join(admin, "Entries"), "r") as entries_file:
+        for line in entries_file:
+            entry = _parse_entry(line)
+            if entry is not None:
+                entries[entry.name] = entry
+
+    log_path = os.path.join(admin, "Entries.Log")
+    if os.path.isfile(log_path):
+        with open(log_path, "r") as log_file:
+            for line in log_file:
+                entry = _parse_entry(line[2:])
+                if entry is None:
+                    continue
+                if line.startswith("A "):
+                    entries[entry.name] = entry
+                elif line.startswith("R "):
+                    entries.pop(entry.name, None)
+
+    return entries
+
+
+def _parse_entry(line):
+    """
+    Parse a single Entries line.
+
+    Returns:
+        An Entry, or None for blank and malformed lines.
+    """
+    is_dir = line.startswith("D/")
+    if is_dir:
+        line = line[1:]
+    fields = line.rstrip("\n").split("/")
+    if len(fields) != 6 or fields[1] == "":
+        return None
+
+    return Entry(fields[1], fields[2], fields[3], fields[4], fields[5],
+                 is_dir)
+
+
+def read_tag(directory="."):
+    """
+    Read the sticky tag of a directory.
+
+    Args:
+        directory(str): working copy directory. Defaults to "."
+
+    Returns:
+        A (kind, name) tuple, where kind is "T" for branches, "N" for tags
+        and "D" for dates; or None when there is no sticky tag.
+    """
+    tag_path = os.path.join(directory, "CVS", "Tag")
+    if not os.path.isfile(tag_path):
+        return None
+    with open(tag_path, "r") as tag_file:
+        line = tag_file.readline().rstrip("\n")
+    if not line:
+        return None
+
+    return line[0], line[1:]
+
+
+def read_repository(directory="."):
+    """
+    Read the repository path a working copy directory comes from.
+
+    Args:
+        directory(str): working copy directory. Defaults to "."
+
+    Returns:
+        The repository path as written in CVS/Repository.
+    """
+    with open(os.path.join(directory, "CVS", "Repository"), "r") as repo:
+        return repo.readline().strip()
+
+
+def is_working_dir(directory):
+    """
+    Whether the directory is managed by CVS.
+    """
+    return os.path.isfile(os.path.join(directory, "CVS", "Entries"))
+
+
+def file_timestamp(mtime):
+    """
+    Format a modification time the way CVS stores it in Entries.
+    """
+    return time.asctime(time.gmtime(mtime))
+
+
+class IgnoreRules():
+    """
+    Patterns of files that cvs does not report as unknown: the default list,
+    ~/.cvsignore, $CVSIGNORE and the .cvsignore of each directory.
+    """
+    def __init__(self, patterns=None):
+        """
+        Args:
+            patterns(list): base patterns. Defaults to the global cvs ones.
+        """
+        if patterns is None:
+            patterns = self._global_patterns()
+        self.patterns = patterns
+        self._regex = self._compile(patterns)
+
+    @staticmethod
+    def _global_patterns():
+        patterns = list(DEFAULT_IGNORE)
+        home_ignore = os.path.expanduser("~/.cvsignore")
+        if os.path.isfile(home_ignore):
+            with open(home_ignore, "r") as ignore_file:
+                patterns = _apply_patterns(patterns, ignore_file.read())
+        return _apply_patterns(patterns, os.environ.get("CVSIGNORE", ""))
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        return re.compile("|".join(fnmatch.translate(pattern)
+                                   for pattern in patterns))
+
+    def for_directory(self, directory):
+        """
+        Rules for a given directory, adding its .cvsignore (if any).
+
+        Args:
+            directory(str): directory about to be scanned.
+
+        Returns:
+            An IgnoreRules object. It is self if nothing changes.
+        """
+        ignore_path = os.path.join(directory, ".cvsignore")
+        if not os.path.isfile(ignore_path):
+            return self
+        with open(ignore_path, "r") as ignore_file:
+            content = ignore_file.read()
+
+        return IgnoreRules(_apply_patterns(self.patterns, content))
+
+    def ignored(self, name):
+        """
+        Whether a file name matches any of the patterns.
+        """
+        return self._regex is not None and self._regex.match(name) is not None
+
+
+def _apply_patterns(patterns, content):
+    """
+    Add whitespace separated patterns to a list. A "!" clears the list.
+    """
+    patterns = list(patterns)
+    for pattern in content.split():
+        if pattern == "!":
+            patterns = []
+        else:
+            patterns.append(pattern)
+
+    return patterns
+
+
+def add_candidates(directory, rules):
+    """
+    Find what `cvs add` should schedule inside a directory: everything that is
+    not tracked yet, leaving out CVS bookkeeping and ignored files.
+
+    Args:
+        directory(str): directory to look into.
+        rules(IgnoreRules): rules of the parent directories.
+
+    Returns:
+        A (files, subdirs, tracked_subdirs) tuple of sorted name lists. The
+        last one lists subdirectories already in CVS, which may still hold
+        new files.
+    """
+    entries = read_entries(directory) if is_working_dir(directory) else {}
+    rules = rules.for_directory(directory)
+
+    files = []
+    subdirs = []
+    tracked_subdirs = []
+    for item in os.scandir(directory):
+        if item.name == "CVS":
+            continue
+        is_dir = item.is_dir()
+        if item.name in entries:
+            if is_dir and is_working_dir(item.path):
+                tracked_subdirs.append(item.name)
+        elif not rules.ignored(item.name):
+            (subdirs if is_dir else files).append(item.name)
+
+    return sorted(files), sorted(subdirs), sorted(tracked_subdirs)
+
+
+class WorkingCopy():
+    """
+    Offline view of a CVS working copy, built from the CVS administrative
+    files and the file system only.
+    """
+    def __init__(self, root=".", use_index=False):
+        """
+        Args:
+            root(str): top directory of the working copy. Defaults to "."
+            use_index(bool): keep a stat index (see pycvs.index) of the
+                working copy to avoid classifying unchanged files and
+                listing unchanged directories again. Defaults to False
+        """
+        self.root = root
+        self.use_index = use_index
+
+    def status(self, files=None):
+        """
+        Classify the files of the working copy the way `cvs status` does for
+        local changes: modified, added, removed, conflicts and unknown.
+        Outdated files can only be known by asking the server.
+
+        Args:
+            files(FileStatus): object to be filled. A new one is created when
+                not given.
+
+        Returns:
+            The filled FileStatus object.
+        """
+        if files is None:
+            files = FileStatus()
+        rules = IgnoreRules()
+        digest = index.digest_rules(rules.patterns)
+
+        old_index = None
+        if self.use_index:
+            try:
+                old_index = index.StatIndex.load(self.root)
+            except index.CorruptIndex:
+                old_index = None
+            else:
+                if old_index.rules_digest != digest:
+                    old_index = None
+        new_index = index.StatIndex(digest)
+
+        # Anything modified after this point can not be trusted next time
+        self._racy_limit = int(time.time() * 10 ** 9) - index.RACY_WINDOW_NS
+        with tracing.span("local.scan"):
+            self._scan(".", rules, files, old_index, new_index)
+
+        if self.use_index:
+            try:
+                new_index.save(self.root)
+            except OSError:
+                # Read-only working copies just do not get the speed up
+                pass
+
+        return files
+
+    def _scan(self, directory, rules, files, old_index, new_index):
+        path = os.path.normpath(os.path.join(self.root, directory))
+        admin = os.path.join(path, "CVS")
+        prefix = "" if directory == "." else directory + "/"
+
+        entries_sig, entries_mtime = index.stat_signature(
+            os.path.join(admin, "Entries"),
+            os.path.join(admin, "Entries.Log"))
+        if not self._trusted(entries_mtime):
+            entries_sig = 0
+        state = index.DirState(
+            self._trusted(os.stat(path).st_mtime_ns), entries_sig,
+            index.stat_signature(os.path.join(path, ".cvsignore"))[0])
+        new_index.add(directory, state)
+
+        cached = old_index.get(directory) if old_index else None
+        entries_valid = (cached is not None and state.entries_sig != 0
+                         and cached.entries_sig == state.entries_sig)
+        cached_files = cached.files if entries_valid else {}
+        entries = None
+
+        if (entries_valid and state.mtime_ns != 0
+                and cached.mtime_ns == state.mtime_ns
+                and cached.ignore_sig == state.ignore_sig):
+            # Nothing was created or deleted here since the last run
+            tracked = list(cached.files)
+            state.unknown = list(cached.unknown)
+            state.subdirs = list(cached.subdirs)
+        else:
+            entries = read_entries(path)
+            tracked, state.unknown, state.subdirs = self._list(
+                path, prefix, entries, rules.for_directory(path))
+
+        file_prefix = directory + "/"
+        for name in tracked:
+            try:
+                stat = os.lstat(os.path.join(path, name))
+            except FileNotFoundError:
+                stat = None
+            signature = ((stat.st_size, stat.st_mtime_ns, stat.st_ino)
+                         if stat is not None else (0, 0, 0))
+
+            cached_file = cached_files.get(name)
+            if (cached_file is not None and cached_file[3] != index.RACY
+                    and cached_file[:3] == signature):
+                code = cached_file[3]
+                kind = index.STATUS_CODES[code]
+            else:
+                if entries is None:
+                    entries = read_entries(path)
+                kind = self.classify(entries[name], stat)
+                code = index.CODE_OF[kind]
+                if stat is not None and not self._trusted(stat.st_mtime_ns):
+                    code = index.RACY
+            state.files[name] = signature + (code, )
+
+            if kind is not None:
+                files.add(kind, file_prefix, name)
+
+        for name in state.unknown:
+            files.add(FILE_NEW, prefix, name)
+
+        for subdir in sorted(state.subdirs):
+            self._scan(subdir, rules, files, old_index, new_index)
+
+    def _trusted(self, mtime_ns):
+        """
+        The given modification time, or 0 if it is too recent to rely on.
+        """
+        return mtime_ns if mtime_ns < self._racy_limit else 0
+
+    @staticmethod
+    def _list(path, prefix, entries, rules):
+        """
+        Split the contents of a directory in tracked files, unknown files and
+        working copy subdirectories.
+        """
+        present = {item.name: item for item in os.scandir(path)}
+
+        tracked = []
+        subdirs = []
+        for name, entry in entries.items():
+            if not entry.is_dir:
+                tracked.append(name)
+            elif name in present and is_working_dir(present[name].path):
+                subdirs.append(prefix + name)
+
+        unknown = []
+        for name, item in present.items():
+            if name in entries or rules.ignored(name):
+                continue
+            if item.is_dir() and is_working_dir(item.path):
+                # Directory checked out but not yet in Entries
+                subdirs.append(prefix + name)
+            else:
+                unknown.append(name)
+
+        return tracked, unknown, subdirs
+
+    @staticmethod
+    def classify(entry, stat):
+        """
+        Find the local status of a tracked file.
+
+        Args:
+            entry(Entry): the Entries line of the file.
+            stat(os.stat_result): the file on disk, None if it does not exist.
+
+        Returns:
+            One of the FILE_* kinds, or None when there is nothing to report.
+        """
+        if entry.revision == "0":
+            return FILE_ADDED if stat is not None else None
+        if entry.revision.startswith("-"):
+            return FILE_REMOVED
+        if stat is None:
+            # Lost files are restored on the next update
+            return None
+
+        timestamp, _, conflict = entry.timestamp.partition("+")
+        if conflict:
+            return FILE_MERGED
+        if timestamp != file_timestamp(stat.st_mtime):
+            return FILE_MODIFIED
+
+        return None
@@ -0,0 +1,127 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import re
+
+# Library packages
+from pycvs import tracing
+from pycvs.data import FileStatus
+from pycvs.data import (FILE_ADDED, FILE_KINDS, FILE_MERGED, FILE_MERGING,
+                        FILE_MODIFIED, FILE_NEW, FILE_REMOVED, FILE_OUTDATED)
+
+# Every interesting line of `cvs status` is recognized by this single
+# expression. The named group that matched last tells which kind of line it is.
+STATUS_TOKENS = re.compile(rb"File: (?P<file>.*)\s+Status: (?P<status>.*?)\s*$"
+                           rb"|[^:]*: Examining (?P<dir>.*?)\s*$"
+                           rb"|\?\s+(?P<new>.*?)\s*$")
+
+# Maps the status string reported by the server to the FileStatus kind.
+STATUS_KINDS = {
+    b"Locally Modified": FILE_MODIFIED,
+    b"Locally Added": FILE_ADDED,
+    b"Locally Removed": FILE_REMOVED,
+    b"Needs Patch": FILE_OUTDATED,
+    b"Needs Merge": FILE_MERGING,
+    b"File had conflicts on merge": FILE_MERGED,
+}
+
+
+class StatusParser():
+    """
+    Incremental parser for the output of `cvs status`. Lines (or raw chunks)
+    can be fed as soon as they arrive from the CVS process and the result is
+    accumulated into a FileStatus object.
+    """
+    def __init__(self, files=None):
+        """
+        Args:
+            files(FileStatus): object to be filled. A new one is created when
+                not given.
+        """
+        self.files = files if files is not None else FileStatus()
+        self.current_dir = ""
+        self._pending = b""
+
+    def parse_line(self, line):
+        """
+        Parse a single line of output.
+
+        Args:
+            line(bytes): output line, with or without its line terminator.
+        """
+        match = STATUS_TOKENS.match(line)
+        if match is None:
+            return
+
+        token = match.lastgroup
+        if token == "status":
+            kind = STATUS_KINDS.get(match.group("status"))
+            if kind is not None:
+                self.files.add(kind, self.current_dir,
+                               match.group("file").decode("utf-8"))
+        elif token == "dir":
+            self.current_dir = match.group("dir").decode("utf-8") + "/"
+        elif token == "new":
+            self.files.add_file(FILE_NEW, match.group("new").decode("utf-8"))
+
+    def parse(self, lines):
+        """
+        Parse all the lines of an iterable, e.g. a running CVS session.
+
+        Args:
+            lines(iterable): byte lines.
+
+        Returns:
+            The filled FileStatus object.
+        """
+        parse_line = self.parse_line
+        with tracing.span("status.parse"):
+            for line in lines:
+                parse_line(line)
+        if tracing.enabled():
+            tracing.count("files classified", sum(
+                self.files.count(kind) for kind in FILE_KINDS))
+
+        return self.files
+
+    def feed(self, data):
+        """
+        Parse a raw chunk of output. Incomplete trailing lines are kept until
+        the next chunk (or close) arrives.
+
+        Args:
+            data(bytes): chunk of output.
+        """
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        self.parse(lines)
+
+    def close(self):
+        """
+        Flush any pending data.
+
+        Returns:
+            The filled FileStatus object.
+        """
+        if self._pending:
+            self.parse_line(self._pending)
+            self._pending = b""
+
+        return self.files
@@ -0,0 +1,339 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import difflib
+import hashlib
+import os
+import threading
+import time
+import zlib
+
+# Library packages
+from pycvs import protocol
+from pycvs.data import FILE_MERGED, FILE_MODIFIED
+from pycvs.local import WorkingCopy, read_entries, read_repository
+
+STORE_DIR = os.path.expanduser("~/.pycvs-pristine")
+BASE_FILE = os.path.join("CVS", "pycvs.base")
+# Size cap of the store, in MB
+DEFAULT_MAX_SIZE = 512
+SEPARATOR = "=" * 67
+
+
+class PristineStore():
+    """
+    Compressed copies of the revisions checked out, in the spirit of
+    Subversion's pristine store. Each content is stored once, named by its
+    sha1, and shared by all the working copies; every working directory maps
+    its files to their copies in CVS/pycvs.base. Beyond the size cap the
+    least recently used copies are evicted.
+    """
+    # Several threads may record files of the same directory
+    _lock = threading.Lock()
+
+    def __init__(self, path=STORE_DIR,
+                 max_size=DEFAULT_MAX_SIZE * 1024 * 1024):
+        """
+        Args:
+            path(str): directory of the store. Defaults to ~/.pycvs-pristine
+            max_size(int): size cap in bytes.
+        """
+        self.path = path
+        self.max_size = max_size
+
+    def _object_path(self, digest):
+        return os.path.join(self.path, digest[:2], digest[2:])
+
+    def put(self, data):
+        """
+        Store a content, if it is not there yet.
+
+        Returns:
+            The digest of the content.
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        path = self._object_path(digest)
+        try:
+            # Already there: it counts as used
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = "{0}.{1}-{2}.tmp".format(path, os.getpid(),
+                                                threading.get_ident())
+            with open(tmp_path, "wb") as object_file:
+                object_file.write(zlib.compress(data))
+            os.replace(tmp_path, path)
+
+        return digest
+
+    def get(self, digest):
+        """
+        Returns:
+            The content of the given digest, or None when it is not in the
+            store (or is damaged).
+        """
+        path = self._object_path(digest)
+        try:
+            with open(path, "rb") as object_file:
+                data = zlib.decompress(object_file.read())
+            os.utime(path)
+        except (OSError, zlib.error):
+            return None
+        if hashlib.sha1(data).hexdigest() != digest:
+            return None
+
+        return data
+
+    def record(self, paths, directory="."):
+        """
+        Save the working files just checked out or updated as the base of
+        their revisions. Files merged by cvs must not be given.
+
+        Args:
+            paths(iterable): files as printed by cvs, relative to directory.
+            directory(str): directory cvs ran in. Defaults to "."
+        """
+        by_dir = {}
+        for path in paths:
+            parent, name = os.path.split(os.path.join(directory, path))
+            by_dir.setdefault(parent or ".", []).append(name)
+
+        for parent, names in by_dir.items():
+            try:
+                entries = read_entries(parent)
+            except OSError:
+                continue
+            bases = {}
+            for name in names:
+                entry = entries.get(name)
+                if entry is None or entry.is_dir:
+                    continue
+                try:
+                    with open(os.path.join(parent, name), "rb") as new_file:
+                        data = new_file.read()
+                except OSError:
+                    continue
+                bases[name] = (entry.revision, entry.options, self.put(data))
+            with self._lock:
+                known = read_bases(parent)
+                known.update(bases)
+                write_bases(parent, {name: base for name, base in
+                                     known.items() if name in entries})
+
+    def base(self, path, entry):
+        """
+        The base revision of a working file.
+
+        Args:
+            path(str): the working file.
+            entry(Entry): its Entries line.
+
+        Returns:
+            The content, or None when the store does not have it.
+        """
+        parent, name = os.path.split(path)
+        known = read_bases(parent or ".").get(name)
+        if known is None or known[:2] != (entry.revision, entry.options):
+            return None
+
+        return self.get(known[2])
+
+    def diff(self, path):
+        """
+        Diff a working file against its base revision.
+
+        Returns:
+            A generator of the lines `cvs diff -u` prints for it, or None when
+            the base revision is not in the store. Binary (-kb) files are
+            always left to the server.
+        """
+        parent, name = os.path.split(path)
+        parent = parent or "."
+        entry = read_entries(parent).get(name)
+        if entry is None or entry.is_dir or entry.options == "-kb":
+            return None
+        base = self.base(path, entry)
+        if base is None:
+            return None
+
+        return unified_diff(path, entry, base, rcs_file(parent, name))
+
+    def trim(self):
+        """
+        Evict the least recently used copies until the store fits its cap.
+        """
+        trim(self.path, self.max_size)
+
+
+def trim(path, max_size):
+    """
+    Evict the least recently used files of a store laid out in
+    subdirectories (ab/cdef...) until it takes at most max_size bytes. Reads
+    of the files must touch them for their mtime to tell how recently they
+    were used.
+    """
+    try:
+        subdirs = [item.path for item in os.scandir(path) if item.is_dir()]
+    except FileNotFoundError:
+        return
+
+    objects = []
+    total = 0
+    for subdir in subdirs:
+        for item in os.scandir(subdir):
+            stat = item.stat()
+            objects.append((stat.st_mtime_ns, stat.st_size, item.path))
+            total += stat.st_size
+    if total <= max_size:
+        return
+
+    objects.sort()
+    for _, size, object_path in objects:
+        if total <= max_size:
+            break
+        try:
+            os.remove(object_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def read_bases(directory):
+    """
+    Read the CVS/pycvs.base file of a directory.
+
+    Returns:
+        A dict of (revision, options, digest) tuples indexed by file name.
+    """
+    bases = {}
+    try:
+        with open(os.path.join(directory, BASE_FILE), "r") as base_file:
+            for line in base_file:
+                fields = line.rstrip("\n").split("/")
+                if len(fields) == 4:
+                    bases[fields[0]] = tuple(fields[1:])
+    except OSError:
+        pass
+
+    return bases
+
+
+def write_bases(directory, bases):
+    path = os.path.join(directory, BASE_FILE)
+    with open(path + ".tmp", "w") as base_file:
+        for name, base in sorted(bases.items()):
+            base_file.write("/".join((name, ) + base) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def changed_files(paths=None):
+    """
+    Find the files `cvs diff` compares with their base revision: modified
+    files and files with merged changes.
+
+    Args:
+        paths(list): files and directories to look at. The current directory
+            when empty.
+
+    Returns:
+        A list of paths.
+    """
+    changed = []
+    for path in paths or ["."]:
+        if os.path.isdir(path):
+            # Only the directory the command runs in keeps an index
+            files = WorkingCopy(path, use_index=os.path.normpath(path) ==
+                                ".").status()
+            for name in files.modified + files.merged:
+                changed.append(os.path.normpath(os.path.join(path, name)))
+            continue
+        parent, name = os.path.split(path)
+        entry = read_entries(parent or ".").get(name)
+        if entry is None or entry.is_dir:
+            continue
+        try:
+            stat = os.lstat(path)
+        except FileNotFoundError:
+            continue
+        if WorkingCopy.classify(entry, stat) in (FILE_MODIFIED, FILE_MERGED):
+            changed.append(os.path.normpath(path))
+
+    return changed
+
+
+def rcs_file(directory, name):
+    """
+    Path of the RCS file of a working file on the server, as cvs shows it.
+    """
+    repository = read_repository(directory)
+    root = protocol.root_of(directory)
+    if not repository.startswith("/") and root is not None:
+        try:
+            repository = protocol.parse_root(root).path + "/" + repository
+        except protocol.ProtocolError:
+            pass
+
+    return "{0}/{1},v".format(repository, name)
+
+
+def unified_diff(path, entry, base, rcs_path):
+    """
+    Format the differences between a base revision and the working file
+    like `cvs diff -u` does.
+
+    Args:
+        path(str): the working file.
+        entry(Entry): its Entries line.
+        base(bytes): content of the base revision.
+        rcs_path(str): RCS file of the working file.
+
+    Returns:
+        A generator of lines, without end of line. Nothing is generated when
+        the contents are the same.
+    """
+    with open(path, "rb") as working_file:
+        working = working_file.read()
+    if working == base:
+        return
+
+    yield "Index: " + path
+    yield SEPARATOR
+    yield "RCS file: " + rcs_path
+    yield "retrieving revision " + entry.revision
+    yield "diff -u -r{0} {1}".format(entry.revision, path)
+    # The base is dated with its checkout time, as found in Entries
+    try:
+        checked_out = time.strptime(entry.timestamp.partition("+")[0])
+        base_date = time.strftime("%d %b %Y %H:%M:%S -0000", checked_out)
+    except ValueError:
+        base_date = entry.timestamp
+    working_date = time.strftime("%d %b %Y %H:%M:%S -0000",
+                                 time.gmtime(os.path.getmtime(path)))
+    yield from difflib.unified_diff(
+        _lines(base), _lines(working),
+        "{0}\t{1}\t{2}".format(path, base_date, entry.revision),
+        "{0}\t{1}".format(path, working_date), lineterm="")
+
+
+def _lines(data):
+    lines = data.decode("utf-8", "replace").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
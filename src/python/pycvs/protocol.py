@@ -0,0 +1,1109 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import io
+import os
+import re
+import shlex
+import shutil
+import time
+import zlib
+
+# Library packages
+from pycvs import tracing
+from pycvs.local import (IgnoreRules, WorkingCopy, file_timestamp,
+                         is_working_dir, read_entries, read_repository,
+                         read_tag)
+
+PSERVER_PORT = 2401
+
+CvsRoot = collections.namedtuple("CvsRoot", ["method", "user", "host", "port",
+                                             "path", "string"])
+
+# Responses this client understands. Anything else makes the server fall
+# back to the plain ones (e.g. M instead of MT).
+VALID_RESPONSES = ["ok", "error", "Valid-requests", "Checked-in", "New-entry",
+                   "Checksum", "Copy-file", "Updated", "Created",
+                   "Update-existing", "Merged", "Mode", "Mod-time", "Removed",
+                   "Remove-entry", "Set-static-directory",
+                   "Clear-static-directory", "Set-sticky", "Clear-sticky",
+                   "Template", "Clear-template", "Notified",
+                   "Module-expansion", "Wrapper-rcsOption", "M", "Mbinary",
+                   "E", "F"]
+
+# Canonical request name of each command and its aliases
+COMMANDS = {"co": "co", "checkout": "co", "get": "co",
+            "update": "update", "up": "update", "upd": "update",
+            "status": "status", "stat": "status", "st": "status",
+            "diff": "diff", "di": "diff", "dif": "diff",
+            "log": "log", "lo": "log",
+            "rlog": "rlog", "rl": "rlog",
+            "add": "add", "ad": "add", "new": "add",
+            "remove": "remove", "rm": "remove", "delete": "remove",
+            "commit": "ci", "ci": "ci", "com": "ci",
+            "annotate": "annotate", "ann": "annotate", "blame": "annotate",
+            "rannotate": "rannotate", "rann": "rannotate",
+            "rdiff": "rdiff", "patch": "rdiff", "pa": "rdiff",
+            "export": "export", "exp": "export", "ex": "export",
+            "tag": "tag", "ta": "tag", "rtag": "rtag", "rt": "rtag",
+            "ls": "ls", "rls": "rls"}
+
+# Options taking a separate value, per command
+OPTIONS_WITH_VALUE = {"co": "kdrDj", "update": "kIrDjW", "status": "",
+                      "diff": "CDFILUWkr", "log": "ds", "rlog": "ds",
+                      "add": "km", "remove": "", "ci": "mrF",
+                      "annotate": "rD", "rannotate": "rD",
+                      "rdiff": "VkrD", "export": "kdrD", "tag": "rD",
+                      "rtag": "rD", "ls": "rD", "rls": "rD"}
+# Options whose value, if any, is attached to the flag, e.g. log -rBRANCH
+OPTIONS_WITH_OPTIONAL_VALUE = {"log": "rw", "rlog": "rw"}
+GLOBAL_OPTIONS_WITH_VALUE = "desTz"
+# Bytes read and decompressed at once from a compressed stream
+INFLATE_CHUNK = 64 * 1024
+
+# Commands that work on the files of a working copy, instead of the
+# repository, and whether they need the content of modified files.
+WORKING_COPY_COMMANDS = {"update": True, "diff": True, "ci": True,
+                         "status": False, "log": False, "annotate": False,
+                         "add": False, "remove": False, "tag": False}
+
+# Password scrambling of the pserver method (from cvs' scramble.c)
+SCRAMBLE_TABLE = bytes([
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+    16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31,
+    114, 120, 53, 79, 96, 109, 72, 108, 70, 64, 76, 67, 116, 74, 68, 87,
+    111, 52, 75, 119, 49, 34, 82, 81, 95, 65, 112, 86, 118, 110, 122, 105,
+    41, 57, 83, 43, 46, 102, 40, 89, 38, 103, 45, 50, 42, 123, 91, 35,
+    125, 55, 54, 66, 124, 126, 59, 47, 92, 71, 115, 78, 88, 107, 106, 56,
+    36, 121, 117, 104, 101, 100, 69, 73, 99, 63, 94, 93, 39, 37, 61, 48,
+    58, 113, 32, 90, 44, 98, 60, 51, 33, 97, 62, 77, 84, 80, 85, 223,
+    225, 216, 187, 166, 229, 189, 222, 188, 141, 249, 148, 200, 184, 136,
+    248, 190, 199, 170, 181, 204, 138, 232, 218, 183, 255, 234, 220, 247,
+    213, 203, 226, 193, 174, 172, 228, 252, 217, 201, 131, 230, 197, 211,
+    145, 238, 161, 179, 160, 212, 207, 221, 254, 173, 202, 146, 224, 151,
+    140, 196, 205, 130, 135, 133, 143, 246, 192, 159, 244, 239, 185, 168,
+    215, 144, 139, 165, 180, 157, 147, 186, 214, 176, 227, 231, 219, 169,
+    175, 156, 206, 198, 129, 164, 150, 210, 154, 177, 134, 127, 182, 128,
+    158, 208, 162, 132, 167, 209, 149, 241, 153, 251, 237, 236, 171, 195,
+    243, 233, 253, 240, 194, 250, 191, 155, 142, 137, 245, 235, 163, 242,
+    178, 152])
+
+
+class ProtocolError(Exception):
+    """
+    Raised when the server sends something this client does not understand
+    or closes the connection unexpectedly.
+    """
+
+
+class AuthenticationError(ProtocolError):
+    """
+    Raised when the server rejects the credentials.
+    """
+
+
+def parse_root(root):
+    """
+    Parse a CVSROOT string.
+
+    Args:
+        root(str): e.g. ":pserver:user@host:/cvsroot" or "/var/cvs".
+
+    Returns:
+        A CvsRoot tuple.
+    """
+    string = root
+    method = None
+    match = re.match(r":(\w+)(?:;[^:]*)?:(.*)", root)
+    if match is not None:
+        method, root = match.groups()
+
+    user = host = port = None
+    if method in (None, "pserver", "ext", "gserver", "server"):
+        match = re.match(r"(?:([^@/]+)@)?([^:/]+):(\d*)(/.*)", root)
+        if match is not None:
+            user, host, port, root = match.groups()
+            port = int(port) if port else None
+            method = method or "ext"
+    method = method or "local"
+    if method == "pserver" and host is None:
+        raise ProtocolError("Invalid CVSROOT {0}".format(string))
+
+    return CvsRoot(method, user, host, port, root.rstrip("/"), string)
+
+
+def scramble(password):
+    """
+    Scramble a password for the pserver authentication.
+    """
+    data = password.encode("utf-8").translate(SCRAMBLE_TABLE)
+
+    return b"A" + data
+
+
+def parse_mode(mode):
+    """
+    Convert a protocol mode string ("u=rw,g=r,o=r") to permission bits.
+    """
+    bits = 0
+    for part in mode.split(","):
+        who, _, perms = part.partition("=")
+        shift = {"u": 6, "g": 3, "o": 0}.get(who)
+        if shift is None:
+            continue
+        for perm, value in (("r", 4), ("w", 2), ("x", 1)):
+            if perm in perms:
+                bits |= value << shift
+
+    return bits
+
+
+def parse_mod_time(text):
+    """
+    Convert the date of a Mod-time response ("20 Mar 2016 10:00:00 -0000")
+    to a timestamp.
+    """
+    # Slow to import and only needed when files arrive
+    import email.utils
+
+    return email.utils.parsedate_to_datetime(text).timestamp()
+
+
+def format_mode(bits):
+    """
+    Convert permission bits to a protocol mode string.
+    """
+    parts = []
+    for who, shift in (("u", 6), ("g", 3), ("o", 0)):
+        perms = "".join(perm for perm, value in (("r", 4), ("w", 2), ("x", 1))
+                        if bits >> shift & value)
+        parts.append("{0}={1}".format(who, perms))
+
+    return ",".join(parts)
+
+
+class Connection():
+    """
+    A byte stream to a CVS server.
+    """
+    def __init__(self, rfile, wfile, process=None, sock=None):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.process = process
+        self.sock = sock
+
+    @classmethod
+    def open(cls, root, password=None, timeout=None):
+        """
+        Connect to the server of a CVSROOT.
+
+        Args:
+            root(CvsRoot): where to connect.
+            password(str): password for pserver roots.
+            timeout(float): seconds a pserver connection may stay silent
+                before reading from it fails with socket.timeout. None waits
+                forever.
+
+        Returns:
+            A Connection object.
+
+        Raises:
+            AuthenticationError: the server rejected the password.
+        """
+        if root.method == "pserver":
+            return cls._open_pserver(root, password, timeout)
+
+        server = shlex.split(os.environ.get("CVS_SERVER", "cvs"))
+        if root.method == "ext":
+            rsh = shlex.split(os.environ.get("CVS_RSH", "ssh"))
+            if root.user is not None:
+                rsh += ["-l", root.user]
+            argv = rsh + [root.host, " ".join(server + ["server"])]
+        elif root.method in ("fork", "local"):
+            argv = server + ["server"]
+        else:
+            raise ProtocolError("Unsupported access method {0}"
+                                .format(root.method))
+
+        # Not imported by the commands that never connect
+        import subprocess
+
+        process = subprocess.Popen(argv, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE)
+        return cls(process.stdout, process.stdin, process=process)
+
+    @classmethod
+    def _open_pserver(cls, root, password, timeout):
+        import socket
+
+        sock = socket.create_connection((root.host,
+                                         root.port or PSERVER_PORT), timeout)
+        rfile = sock.makefile("rb")
+        wfile = sock.makefile("wb")
+        wfile.write(b"BEGIN AUTH REQUEST\n" +
+                    root.path.encode("utf-8") + b"\n" +
+                    (root.user or "").encode("utf-8") + b"\n" +
+                    scramble(password or "") + b"\n" +
+                    b"END AUTH REQUEST\n")
+        wfile.flush()
+
+        answer = rfile.readline()
+        if answer.startswith(b"I LOVE YOU"):
+            return cls(rfile, wfile, sock=sock)
+        sock.close()
+        if answer.startswith(b"I HATE YOU"):
+            raise AuthenticationError("Authentication failed for {0}"
+                                      .format(root.string))
+        raise ProtocolError(answer.decode("utf-8", "replace").strip())
+
+    def compress(self, level):
+        """
+        Compress the rest of the stream both ways, as a zlib stream (the
+        Gzip-stream request of the protocol).
+        """
+        self.wfile = _Deflate(self.wfile, level)
+        self.rfile = io.BufferedReader(_Inflate(self.rfile), INFLATE_CHUNK)
+
+    def close(self):
+        for stream in (self.wfile, self.rfile):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        if self.sock is not None:
+            self.sock.close()
+        if self.process is not None:
+            self.process.wait()
+
+
+class _Deflate():
+    """
+    Compressing writer. What was written goes out when it is flushed.
+    """
+    def __init__(self, raw, level):
+        self.raw = raw
+        self._compressor = zlib.compressobj(level)
+
+    def write(self, data):
+        self.raw.write(self._compressor.compress(data))
+
+    def flush(self):
+        self.raw.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self.raw.flush()
+
+    def close(self):
+        try:
+            self.raw.write(self._compressor.flush())
+            self.raw.flush()
+        finally:
+            self.raw.close()
+
+
+class _Inflate(io.RawIOBase):
+    """
+    Decompressing reader, to put under an io.BufferedReader.
+    """
+    def __init__(self, raw):
+        self.raw = raw
+        # Compressed bytes read so far
+        self.received = 0
+        self._decompressor = zlib.decompressobj()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            data = self._decompressor.unconsumed_tail
+            if not data:
+                data = self.raw.read1(INFLATE_CHUNK)
+                if not data:
+                    return 0
+                self.received += len(data)
+            inflated = self._decompressor.decompress(data, len(buffer))
+            if inflated:
+                buffer[:len(inflated)] = inflated
+                return len(inflated)
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def split_command_line(argv):
+    """
+    Split a cvs command line in its parts.
+
+    Args:
+        argv(list): e.g. ["cvs", "-d", root, "co", "-P", "module"].
+
+    Returns:
+        A (global options, command, options, file arguments) tuple. Options
+        are lists of (flag, value) tuples, value is None for plain flags.
+    """
+    args = list(argv[1:] if argv and os.path.basename(argv[0]) == "cvs"
+                else argv)
+    global_options = _getopt(args, GLOBAL_OPTIONS_WITH_VALUE)
+    if not args:
+        raise ProtocolError("Missing cvs command")
+    command = COMMANDS.get(args.pop(0))
+    if command is None:
+        raise ProtocolError("Unsupported cvs command {0}".format(argv))
+    options = _getopt(args, OPTIONS_WITH_VALUE[command],
+                      OPTIONS_WITH_OPTIONAL_VALUE.get(command, ""),
+                      stop=False)
+
+    return global_options, command, options, args
+
+
+def _getopt(args, with_value, optional="", stop=True):
+    """
+    Extract the options from args (modified in place).
+
+    Args:
+        optional(str): flags that take the rest of the argument as value.
+            They are kept as a single flag, e.g. ("-rBRANCH", None).
+        stop(bool): stop at the first non option, as cvs does for the global
+            options. Otherwise options and arguments can be mixed.
+    """
+    options = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--":
+            del args[i]
+            break
+        if not arg.startswith("-") or arg == "-":
+            if stop:
+                break
+            i += 1
+            continue
+        del args[i]
+        flags = arg[1:]
+        while flags:
+            flag, flags = "-" + flags[0], flags[1:]
+            if flag[1] in optional:
+                options.append((flag + flags, None))
+                break
+            if flag[1] in with_value:
+                if not flags:
+                    if i >= len(args):
+                        raise ProtocolError("Option {0} needs a value"
+                                            .format(flag))
+                    flags = args.pop(i)
+                options.append((flag, flags))
+                break
+            options.append((flag, None))
+
+    return options
+
+
+class CvsClient():
+    """
+    Client side of the CVS protocol. A client holds one connection and can
+    run several commands on it.
+    """
+    def __init__(self, root, password=None, connection=None, timeout=None):
+        """
+        Args:
+            root(str): CVSROOT of the server.
+            password(str): password for pserver roots.
+            connection(Connection): an already open connection, mostly for
+                testing. Opened on demand when not given.
+            timeout(float): seconds of silence of a pserver connection after
+                which reading fails. None waits forever.
+        """
+        self.root = parse_root(root)
+        self.password = password
+        self.connection = connection
+        self.timeout = timeout
+        self.valid_requests = None
+        # Whether the last command ended with an error
+        self.failed = False
+        # Level of the compression of the connection (-z), 0 for none
+        self.compression = 0
+        # Called with (compression level, bytes received, bytes on the wire,
+        # seconds) after each command that completed
+        self.monitor = None
+        # Bytes of responses read, and how many before compression started
+        self.received = 0
+        self._plain_received = 0
+
+    def connect(self):
+        """
+        Open the connection (if needed) and negotiate the protocol.
+        """
+        if self.connection is None:
+            self.connection = Connection.open(self.root, self.password,
+                                              self.timeout)
+        if self.valid_requests is not None:
+            return
+
+        self._request("Root {0}".format(self.root.path))
+        self._request("Valid-responses {0}".format(" ".join(VALID_RESPONSES)))
+        self._request("valid-requests")
+        self._flush()
+        self.valid_requests = set()
+        for kind, text in self._responses(None):
+            if kind == "Valid-requests":
+                self.valid_requests = set(text.split())
+        if "UseUnchanged" in self.valid_requests:
+            self._request("UseUnchanged")
+        # Nothing left in the buffer for the children of the daemon to
+        # send twice
+        self._flush()
+
+    def compress(self, level):
+        """
+        Compress what the client and the server send each other from now on,
+        when the server can. The level of a connection can not be changed
+        once it is compressed.
+
+        Args:
+            level(int): zlib compression level, 1 to 9. 0 does nothing.
+        """
+        if not 0 <= level <= 9:
+            raise ProtocolError("Compression level must be between 0 and 9")
+        if (level == 0 or self.compression
+                or "Gzip-stream" not in self.valid_requests):
+            return
+        self._request("Gzip-stream {0}".format(level))
+        self._flush()
+        self.connection.compress(level)
+        self.compression = level
+        self._plain_received = self.received
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+            self.valid_requests = None
+            self.compression = 0
+
+    def run(self, argv, cwd=".", applier=None):
+        """
+        Run a cvs command line on the server, applying to the working copy
+        the files the server sends back.
+
+        Args:
+            argv(list): command line, as it would be given to cvs.
+            cwd(str): directory the command runs in. Defaults to "."
+            applier: what to do with the files instead, e.g. a
+                ContentCollector. Defaults to a ResponseApplier of cwd.
+
+        Returns:
+            A generator of ("M" or "E", text) tuples with the messages of the
+            server, in the order they arrive. The command finished when the
+            generator is exhausted.
+
+        Raises:
+            AuthenticationError: the server rejected the credentials.
+        """
+        global_options, command, options, args = split_command_line(argv)
+        with tracing.span("cvs.connect"):
+            self.connect()
+        self.failed = False
+        started = (time.monotonic(), self.received, self._wire_received())
+
+        for flag, value in global_options:
+            if flag in ("-q", "-Q", "-n", "-t", "-r", "-l"):
+                self._request("Global_option {0}".format(flag))
+            elif flag == "-z":
+                try:
+                    self.compress(int(value))
+                except ValueError:
+                    raise ProtocolError("Invalid compression level {0}"
+                                        .format(value))
+
+        if command in WORKING_COPY_COMMANDS:
+            local = any(flag == "-l" for flag, _ in options)
+            with tracing.span("cvs.send"):
+                self._send_working_copy(
+                    cwd, args, WORKING_COPY_COMMANDS[command],
+                    recursive=not local,
+                    questionable=command in ("update", "status"))
+
+        for flag, value in options:
+            self._argument(flag)
+            if value is not None:
+                self._argument(value)
+        self._argument("--")
+        for arg in args:
+            self._argument(arg)
+
+        if command in WORKING_COPY_COMMANDS:
+            self._directory(".", self._repository(cwd))
+        else:
+            self._directory(".", self.root.path)
+        self._request(command)
+        self._flush()
+
+        return self._output(applier or ResponseApplier(cwd, self.root),
+                            command, args, started)
+
+    def _output(self, applier, command, args, started):
+        try:
+            for kind, text in self._responses(applier):
+                if kind in ("M", "E"):
+                    yield kind, text
+        finally:
+            applier.flush()
+
+        if self.monitor is not None:
+            self.monitor(self.compression, self.received - started[1],
+                         self._wire_received() - started[2],
+                         time.monotonic() - started[0])
+
+        if command == "add" and not self.failed:
+            applier.add_directories(args)
+
+    def _send_working_copy(self, cwd, args, contents, recursive=True,
+                           questionable=False):
+        """
+        Tell the server about the files of the working copy the command works
+        on: their revision and whether they were modified.
+        """
+        targets = collections.OrderedDict()
+        for arg in args or ["."]:
+            path = os.path.normpath(os.path.join(cwd, arg))
+            if os.path.isdir(path):
+                targets.setdefault(os.path.normpath(arg), None)
+            else:
+                directory, name = os.path.split(os.path.normpath(arg))
+                names = targets.setdefault(directory or ".", set())
+                if names is not None:
+                    names.add(name)
+
+        rules = IgnoreRules()
+        for directory, names in targets.items():
+            path = os.path.join(cwd, directory)
+            if is_working_dir(path):
+                self._send_directory(cwd, directory, names, contents,
+                                     recursive and names is None,
+                                     questionable, rules)
+            elif names is None:
+                # New directory, e.g. for add
+                parent, name = os.path.split(directory)
+                parent_path = os.path.join(cwd, parent or ".")
+                if is_working_dir(parent_path):
+                    self._directory(directory, self._repository(parent_path) +
+                                    "/" + name)
+
+    def _send_directory(self, cwd, directory, names, contents, recursive,
+                        questionable, rules):
+        path = os.path.join(cwd, directory)
+        self._directory(directory, self._repository(path))
+        tag = read_tag(path)
+        if tag is not None:
+            self._request("Sticky {0}{1}".format(*tag))
+        if os.path.isfile(os.path.join(path, "CVS", "Entries.Static")):
+            self._request("Static-directory")
+
+        entries = read_entries(path)
+        subdirs = []
+        for name, entry in entries.items():
+            if entry.is_dir:
+                subdirs.append(name)
+                continue
+            if names is not None and name not in names:
+                continue
+            self._send_file(path, entry, contents)
+        for name in sorted(names or []):
+            # Files named on the command line but not in CVS yet
+            if name not in entries and os.path.isfile(os.path.join(path,
+                                                                   name)):
+                self._send_contents(path, name, contents)
+
+        if questionable and names is None:
+            local_rules = rules.for_directory(path)
+            for name in sorted(os.listdir(path)):
+                if (name not in entries and name != "CVS"
+                        and not local_rules.ignored(name)
+                        and "Questionable" in self.valid_requests):
+                    self._request("Questionable {0}".format(name))
+
+        if recursive:
+            for subdir in subdirs:
+                sub_path = os.path.join(path, subdir)
+                if is_working_dir(sub_path):
+                    self._send_directory(
+                        cwd, os.path.normpath(os.path.join(directory, subdir)),
+                        None, contents, True, questionable, rules)
+
+    def _send_file(self, path, entry, contents):
+        file_path = os.path.join(path, entry.name)
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            stat = None
+
+        timestamp = ""
+        _, _, conflict = entry.timestamp.partition("+")
+        if conflict:
+            unchanged = (stat is not None and
+                         file_timestamp(stat.st_mtime) == conflict)
+            timestamp = "+=" if unchanged else "+modified"
+        self._request("Entry /{0}/{1}/{2}/{3}/{4}".format(
+            entry.name, entry.revision, timestamp, entry.options, entry.tag))
+        if stat is None:
+            return
+
+        if WorkingCopy.classify(entry, stat) is None:
+            self._request("Unchanged {0}".format(entry.name))
+        else:
+            self._send_contents(path, entry.name, contents)
+
+    def _send_contents(self, path, name, contents):
+        """
+        Tell the server a file was modified, sending its contents only if the
+        command needs them.
+        """
+        if not contents and "Is-modified" in self.valid_requests:
+            self._request("Is-modified {0}".format(name))
+            return
+
+        file_path = os.path.join(path, name)
+        with open(file_path, "rb") as modified_file:
+            data = modified_file.read()
+        self._request("Modified {0}".format(name))
+        self._request(format_mode(os.stat(file_path).st_mode & 0o777))
+        self._request(str(len(data)))
+        self.connection.wfile.write(data)
+
+    def _repository(self, path):
+        """
+        Full repository path of a working copy directory.
+        """
+        repository = read_repository(path)
+        if not repository.startswith("/"):
+            repository = self.root.path + "/" + repository
+
+        return repository
+
+    def _directory(self, local, repository):
+        self._request("Directory {0}".format(local))
+        self._request(repository)
+
+    def _argument(self, value):
+        lines = value.split("\n")
+        self._request("Argument {0}".format(lines[0]))
+        for line in lines[1:]:
+            self._request("Argumentx {0}".format(line))
+
+    def _request(self, line):
+        self.connection.wfile.write(line.encode("utf-8", "surrogateescape") +
+                                    b"\n")
+
+    def _flush(self):
+        self.connection.wfile.flush()
+
+    def _readline(self):
+        line = self.connection.rfile.readline()
+        if not line.endswith(b"\n"):
+            raise ProtocolError("Connection closed by the server")
+        self.received += len(line)
+
+        return line[:-1].decode("utf-8", "surrogateescape")
+
+    def _read(self, size):
+        data = self.connection.rfile.read(size)
+        if len(data) != size:
+            raise ProtocolError("Connection closed by the server")
+        self.received += size
+
+        return data
+
+    def _wire_received(self):
+        """
+        Bytes read from the connection as they came, compressed or not.
+        """
+        if self.compression:
+            return self.connection.rfile.raw.received + self._plain_received
+        return self.received
+
+    def _responses(self, applier):
+        """
+        Read responses until the command ends, giving the applier the ones
+        that change the working copy.
+
+        Returns:
+            A generator of (response name, text) tuples.
+        """
+        while True:
+            line = self._readline()
+            name, _, text = line.partition(" ")
+            if name == "ok":
+                return
+            if name == "error":
+                # The command failed (or, for diff, found differences)
+                _, _, message = text.partition(" ")
+                if message:
+                    yield "E", message
+                self.failed = True
+                return
+            if name in ("M", "E", "Valid-requests", "Module-expansion"):
+                yield name, text
+            elif name == "Mbinary":
+                yield "M", self._read(int(self._readline())).decode(
+                    "utf-8", "replace")
+            elif name in ("F", "Checksum", "Wrapper-rcsOption"):
+                pass
+            elif name in FILE_RESPONSES:
+                lines = [self._readline()
+                         for _ in range(FILE_RESPONSES[name])]
+                data = None
+                if name in ("Updated", "Created", "Update-existing",
+                            "Merged", "Template"):
+                    size = self._readline()
+                    if size.startswith("z"):
+                        raise ProtocolError("Compressed file contents were "
+                                            "not requested")
+                    data = self._read(int(size))
+                if applier is not None:
+                    applier.apply(name, text, lines, data)
+            elif name in ("Mod-time", "Mode"):
+                if applier is not None:
+                    applier.apply(name, text, [], None)
+            else:
+                raise ProtocolError("Unexpected response {0}".format(line))
+
+
+# Number of lines following each response that carries a pathname
+FILE_RESPONSES = {"Updated": 3, "Created": 3, "Update-existing": 3,
+                  "Merged": 3, "Checked-in": 2, "New-entry": 2,
+                  "Removed": 1, "Remove-entry": 1, "Set-sticky": 2,
+                  "Clear-sticky": 1, "Set-static-directory": 1,
+                  "Clear-static-directory": 1, "Template": 1,
+                  "Clear-template": 1, "Notified": 1, "Copy-file": 2}
+
+
+class ResponseApplier():
+    """
+    Applies the responses of the server to the working copy: writes files,
+    CVS administrative directories and Entries.
+    """
+    def __init__(self, cwd, root):
+        """
+        Args:
+            cwd(str): directory the command runs in.
+            root(CvsRoot): root of the server, written in CVS/Root.
+        """
+        self.cwd = cwd
+        self.root = root
+        self.mod_time = None
+        # Entries of the directories touched, written once at the end
+        self.entries = {}
+        # Lines for the Entries.Log of directories only given a new
+        # subdirectory, which are appended to instead of rewritten
+        self.log = {}
+
+    def apply(self, name, pathname, lines, data):
+        """
+        Apply one response.
+
+        Args:
+            name(str): response name.
+            pathname(str): first argument of the response.
+            lines(list): the lines following it.
+            data(bytes): file contents, for the responses that have them.
+        """
+        if name == "Mod-time":
+            self.mod_time = parse_mod_time(pathname)
+            return
+        if name == "Mode":
+            return
+
+        local_dir = os.path.normpath(os.path.join(self.cwd, pathname))
+        repository = lines[0]
+        if name in ("Updated", "Created", "Update-existing", "Merged",
+                    "Checked-in", "New-entry", "Removed", "Remove-entry",
+                    "Copy-file", "Notified"):
+            filename = os.path.basename(repository)
+            self._ensure_admin(local_dir, os.path.dirname(repository))
+        else:
+            filename = None
+            self._ensure_admin(local_dir, repository)
+        file_path = os.path.join(local_dir, filename or "")
+
+        if name in ("Updated", "Created", "Update-existing", "Merged"):
+            entry, mode = lines[1], lines[2]
+            if os.path.exists(file_path):
+                os.chmod(file_path, 0o600)
+            with open(file_path, "wb") as local_file:
+                local_file.write(data)
+            os.chmod(file_path, parse_mode(mode))
+            if self.mod_time is not None:
+                os.utime(file_path, (self.mod_time, self.mod_time))
+                self.mod_time = None
+            if name == "Merged":
+                conflict = entry.split("/")[3].startswith("+")
+                timestamp = "Result of merge"
+                if conflict:
+                    timestamp += "+" + file_timestamp(
+                        os.stat(file_path).st_mtime)
+            else:
+                timestamp = file_timestamp(os.stat(file_path).st_mtime)
+            self._set_entry(local_dir, entry, timestamp)
+        elif name == "Checked-in":
+            entry = lines[1]
+            revision = entry.split("/")[2]
+            timestamp = None
+            if (revision != "0" and not revision.startswith("-")
+                    and os.path.isfile(file_path)):
+                timestamp = file_timestamp(os.stat(file_path).st_mtime)
+            self._set_entry(local_dir, entry, timestamp)
+        elif name == "New-entry":
+            self._set_entry(local_dir, lines[1],
+                            "dummy timestamp from new-entry")
+        elif name in ("Removed", "Remove-entry"):
+            if name == "Removed" and os.path.isfile(file_path):
+                os.remove(file_path)
+            self._entries_of(local_dir).pop(filename, None)
+        elif name == "Copy-file":
+            shutil.copy2(file_path, os.path.join(local_dir, lines[1]))
+        elif name == "Set-sticky":
+            with open(os.path.join(local_dir, "CVS", "Tag"), "w") as tag:
+                tag.write(lines[1] + "\n")
+        elif name == "Clear-sticky":
+            tag_path = os.path.join(local_dir, "CVS", "Tag")
+            if os.path.isfile(tag_path):
+                os.remove(tag_path)
+        elif name == "Set-static-directory":
+            open(os.path.join(local_dir, "CVS", "Entries.Static"), "w").close()
+        elif name == "Clear-static-directory":
+            static_path = os.path.join(local_dir, "CVS", "Entries.Static")
+            if os.path.isfile(static_path):
+                os.remove(static_path)
+
+    def add_directories(self, args):
+        """
+        Create the administrative files of directories added with `cvs add`,
+        once the server accepted them.
+        """
+        for arg in args:
+            path = os.path.normpath(os.path.join(self.cwd, arg))
+            parent = os.path.dirname(path) or "."
+            if not os.path.isdir(path) or is_working_dir(path):
+                continue
+            if not is_working_dir(parent):
+                continue
+            repository = read_repository(parent)
+            if not repository.startswith("/"):
+                repository = self.root.path + "/" + repository
+            self._ensure_admin(path, repository + "/" + os.path.basename(path))
+            tag_path = os.path.join(parent, "CVS", "Tag")
+            if os.path.isfile(tag_path):
+                shutil.copy(tag_path, os.path.join(path, "CVS", "Tag"))
+        self.flush()
+
+    def _ensure_admin(self, local_dir, repository):
+        """
+        Create the CVS folder of a directory the first time the server talks
+        about it.
+        """
+        if local_dir in self.entries or is_working_dir(local_dir):
+            return
+        parent = os.path.dirname(local_dir) or "."
+        if (os.path.normpath(parent) != os.path.normpath(self.cwd)
+                and local_dir != parent):
+            self._ensure_admin(parent, os.path.dirname(repository))
+        admin = os.path.join(local_dir, "CVS")
+        os.makedirs(admin, exist_ok=True)
+        relative = repository
+        if repository.startswith(self.root.path + "/"):
+            relative = repository[len(self.root.path) + 1:]
+        elif repository == self.root.path:
+            relative = "."
+        with open(os.path.join(admin, "Root"), "w") as root_file:
+            root_file.write(self.root.string + "\n")
+        with open(os.path.join(admin, "Repository"), "w") as repo_file:
+            repo_file.write(relative + "\n")
+        self.entries[local_dir] = collections.OrderedDict()
+
+        if local_dir != parent and (parent in self.entries
+                                    or is_working_dir(parent)):
+            name = os.path.basename(local_dir)
+            line = "D/{0}////".format(name)
+            if parent in self.entries:
+                self.entries[parent][name] = line
+            else:
+                # Like cvs does: checkouts of sibling directories running
+                # at the same time must not overwrite each other's Entries
+                self.log.setdefault(parent, []).append(line)
+
+    def _entries_of(self, local_dir):
+        entries = self.entries.get(local_dir)
+        if entries is None:
+            entries = collections.OrderedDict()
+            if is_working_dir(local_dir):
+                for name, entry in read_entries(local_dir).items():
+                    entries[name] = "{0}/{1}/{2}/{3}/{4}/{5}".format(
+                        "D" if entry.is_dir else "", name, entry.revision,
+                        entry.timestamp, entry.options, entry.tag)
+            for line in self.log.pop(local_dir, []):
+                entries[line.split("/")[1]] = line
+            self.entries[local_dir] = entries
+
+        return entries
+
+    def _set_entry(self, local_dir, line, timestamp=None):
+        fields = line.split("/")
+        if timestamp is not None:
+            fields[3] = timestamp
+        self._entries_of(local_dir)[fields[1]] = "/".join(fields)
+
+    def flush(self):
+        """
+        Write the Entries files of all the directories touched.
+        """
+        for local_dir, entries in self.entries.items():
+            lines = sorted(entries.values(), key=lambda line: (
+                line.startswith("D"), line))
+            content = "".join(line + "\n" for line in lines)
+            entries_path = os.path.join(local_dir, "CVS", "Entries")
+            with open(entries_path + ".tmp", "w") as entries_file:
+                entries_file.write(content)
+            os.replace(entries_path + ".tmp", entries_path)
+            log_path = os.path.join(local_dir, "CVS", "Entries.Log")
+            if os.path.isfile(log_path):
+                os.remove(log_path)
+        for local_dir, lines in self.log.items():
+            log_path = os.path.join(local_dir, "CVS", "Entries.Log")
+            with open(log_path, "a") as log_file:
+                log_file.write("".join("A " + line + "\n" for line in lines))
+        self.entries = {}
+        self.log = {}
+
+
+# A file sent by the server: its path in the repository, Entries line,
+# permission bits, modification time (None when the server did not send it)
+# and contents.
+FileContents = collections.namedtuple("FileContents", [
+    "repository", "entry", "mode", "mod_time", "data"])
+
+
+class ContentCollector():
+    """
+    Keeps the files the server sends in memory instead of writing them to a
+    working copy, for commands like export whose files go somewhere else.
+    """
+    def __init__(self):
+        # FileContents objects, in the order they came
+        self.files = []
+        self.mod_time = None
+
+    def apply(self, name, pathname, lines, data):
+        """
+        Apply one response, see ResponseApplier.apply.
+        """
+        if name == "Mod-time":
+            self.mod_time = parse_mod_time(pathname)
+        elif name in ("Updated", "Created", "Update-existing", "Merged"):
+            self.files.append(FileContents(lines[0], lines[1],
+                                           parse_mode(lines[2]),
+                                           self.mod_time, data))
+            self.mod_time = None
+
+    def flush(self):
+        pass
+
+
+class Session():
+    """
+    Output of a command run through the protocol, with the same interface
+    the pexpect sessions have for the rest of pycvs: `before` holds the
+    output already read and iterating gives the rest of it line by line.
+    The output method tells stdout and stderr lines apart.
+    """
+    def __init__(self, events, stream=False, on_close=None, client=None):
+        """
+        Args:
+            events(iterable): (stream, text) tuples from CvsClient.run.
+            stream(bool): leave the output to be read by iteration. Otherwise
+                everything is read into `before` right away.
+            on_close(callable): called once the output was read.
+            client(CvsClient): client running the command, to know whether
+                it failed.
+        """
+        self.exitstatus = None
+        self._client = client
+        self._events = self._read(events, on_close, client)
+        self._buffered = []
+        self.before = b""
+        if not stream:
+            self._buffered = list(self._events)
+            self.before = b"".join(_encode(text)
+                                   for _, text in self._buffered)
+
+    def _read(self, events, on_close, client):
+        try:
+            yield from events
+            self.exitstatus = 1 if client is not None and client.failed else 0
+        finally:
+            if on_close is not None:
+                on_close()
+
+    def output(self):
+        """
+        Iterate over the output as it arrives.
+
+        Returns:
+            A generator of ("M" or "E", text) tuples, for stdout and stderr
+            lines. Bytes that are not UTF-8 are kept as surrogates.
+        """
+        buffered, self._buffered = self._buffered, []
+        yield from buffered
+        yield from self._events
+
+    def close(self):
+        """
+        Read the rest of the output, like closing a pexpect session waits for
+        the process to end. `exitstatus` is set afterwards.
+        """
+        for _ in self._events:
+            pass
+
+    def terminate(self, force=False):
+        """
+        Stop reading the output before the end, e.g. when the reader is gone.
+        The connection can not be used anymore after it.
+        """
+        self._events.close()
+        if self._client is not None:
+            self._client.close()
+
+    def __iter__(self):
+        return (_encode(text) for _, text in self._events)
+
+
+def _encode(text):
+    return text.encode("utf-8", "surrogateescape") + b"\n"
+
+
+def root_of(directory="."):
+    """
+    CVSROOT of a working copy directory, or None if it has none.
+    """
+    root_path = os.path.join(directory, "CVS", "Root")
+    if not os.path.isfile(root_path):
+        return None
+    with open(root_path, "r") as root_file:
+        return root_file.readline().strip()
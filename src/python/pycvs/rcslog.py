@@ -0,0 +1,362 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import calendar
+import collections
+import hashlib
+import json
+import os
+import re
+
+CACHE_DIR = os.path.expanduser("~/.pycvs-cache/log")
+VERSION = 1
+
+REVISION_SEPARATOR = "-" * 28
+FILE_SEPARATOR = "=" * 77
+REVISION_LINE = re.compile(r"revision (\d+(\.\d+)+)")
+# Old cvs prints 2016/03/20 10:00:00, cvs 1.12 2016-03-20 10:00:00 +0000
+REVISION_DATE = re.compile(r"(\d{4})[/-](\d\d)[/-](\d\d) (\d\d):(\d\d):(\d\d)"
+                           r"(?: ([+-])(\d\d)(\d\d))?$")
+
+# The log of a file. symbolic_names is a list of (name, revision) tuples and
+# revisions a list of Revision, newest first. total and selected are the
+# revision counts of the RCS file and of the log; selected and description
+# are None in header-only logs (log -h).
+FileLog = collections.namedtuple("FileLog", [
+    "rcs_file", "working_file", "head", "branch", "locks", "access",
+    "symbolic_names", "keyword", "total", "selected", "description",
+    "revisions"])
+
+# One revision of a file. lines is an (added, removed) tuple, None for the
+# first revision; branches a list of branch numbers.
+Revision = collections.namedtuple("Revision", [
+    "revision", "date", "author", "state", "lines", "commitid", "branches",
+    "message"])
+
+
+def parse_date(date):
+    """
+    Turn the date of a revision, as printed by cvs log, in seconds since the
+    epoch.
+
+    Raises:
+        ValueError: the date is in an unknown format.
+    """
+    # Much faster than strptime, which matters for long histories
+    match = REVISION_DATE.match(date)
+    if match is None:
+        raise ValueError("unknown date format: {0}".format(date))
+    fields = match.groups()
+    seconds = calendar.timegm([int(field) for field in fields[:6]])
+    if fields[6] is not None:
+        offset = int(fields[7]) * 3600 + int(fields[8]) * 60
+        seconds += -offset if fields[6] == "+" else offset
+
+    return seconds
+
+
+class LogParser():
+    """
+    Streaming parser for the output of `cvs log` and `cvs rlog`: lines are
+    fed as they arrive and the log of each file comes out as soon as its
+    last line is read, so that only one file is kept in memory.
+    """
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._header = None
+        self._section = None
+        self._revisions = []
+        self._revision = None
+        self._message = []
+        # A separator line is only one if a revision follows, it may also be
+        # part of a message
+        self._separator = False
+
+    def parse(self, lines):
+        """
+        Parse all the lines of an iterable, e.g. a running CVS session.
+
+        Args:
+            lines(iterable): output lines (str), without stderr messages.
+
+        Returns:
+            A generator of FileLog objects.
+        """
+        parse_line = self.parse_line
+        for line in lines:
+            file_log = parse_line(line)
+            if file_log is not None:
+                yield file_log
+
+    def parse_line(self, line):
+        """
+        Parse a single line of output.
+
+        Returns:
+            The FileLog of a file when the line was its last one, None
+            otherwise.
+        """
+        line = line.rstrip("\r\n")
+        if self._separator:
+            self._separator = False
+            match = REVISION_LINE.match(line)
+            if match is not None:
+                self._end_revision()
+                self._revision = {"revision": match.group(1)}
+                return None
+            self._message.append(REVISION_SEPARATOR)
+
+        if line == FILE_SEPARATOR and self._header is not None:
+            return self._end_file()
+        if self._header is None:
+            if line.startswith("RCS file: "):
+                self._header = {"rcs_file": line[10:], "working_file": None,
+                                "head": None, "branch": "", "locks": "",
+                                "access": "", "symbolic_names": [],
+                                "keyword": "", "total": 0, "selected": None,
+                                "description": None}
+            return None
+        if line == REVISION_SEPARATOR:
+            self._separator = True
+        elif self._revision is not None:
+            self._revision_line(line)
+        elif self._section == "description":
+            self._header["description"].append(line)
+        else:
+            self._header_line(line)
+
+        return None
+
+    def _header_line(self, line):
+        header = self._header
+        if line.startswith("\t"):
+            if self._section == "symbolic names":
+                name, _, revision = line.strip().partition(": ")
+                header["symbolic_names"].append((name, revision))
+            elif self._section == "locks":
+                header["locks"] += "\n" + line
+            return
+        key, _, value = line.partition(":")
+        value = value.strip()
+        self._section = key
+        if key == "Working file":
+            header["working_file"] = value
+        elif key == "head":
+            header["head"] = value
+        elif key in ("branch", "locks"):
+            header[key] = value
+        elif key == "access list":
+            header["access"] = value
+        elif key == "keyword substitution":
+            header["keyword"] = value
+        elif key == "total revisions":
+            counts = re.findall(r"\d+", value)
+            header["total"] = int(counts[0]) if counts else 0
+            if len(counts) > 1:
+                header["selected"] = int(counts[1])
+        elif key == "description":
+            header["description"] = []
+
+    def _revision_line(self, line):
+        revision = self._revision
+        if "date" not in revision and line.startswith("date: "):
+            for field in line.rstrip(";").split(";"):
+                key, _, value = field.strip().partition(": ")
+                revision[key] = value
+        elif "branches" not in revision and not self._message \
+                and line.startswith("branches:"):
+            revision["branches"] = [branch.strip() for branch in
+                                    line[9:].split(";") if branch.strip()]
+        else:
+            self._message.append(line)
+
+    def _end_revision(self):
+        revision = self._revision
+        if revision is None:
+            return
+        lines = re.match(r"\+(\d+) -(\d+)", revision.get("lines", ""))
+        self._revisions.append(Revision(
+            revision["revision"], revision.get("date", ""),
+            revision.get("author", ""), revision.get("state", ""),
+            (int(lines.group(1)), int(lines.group(2))) if lines else None,
+            revision.get("commitid"), revision.get("branches", []),
+            "\n".join(self._message)))
+        self._revision = None
+        self._message = []
+
+    def _end_file(self):
+        self._end_revision()
+        header = self._header
+        if header["description"] is not None:
+            header["description"] = "\n".join(header["description"])
+        file_log = FileLog(revisions=self._revisions, **header)
+        self._reset()
+        return file_log
+
+
+def format_log(file_log):
+    """
+    Print back a FileLog the way `cvs log` does.
+
+    Returns:
+        A generator of lines, without end of line.
+    """
+    yield ""
+    yield "RCS file: " + file_log.rcs_file
+    if file_log.working_file is not None:
+        yield "Working file: " + file_log.working_file
+    yield "head: " + file_log.head
+    yield "branch: " + file_log.branch if file_log.branch else "branch:"
+    yield "locks: " + file_log.locks if file_log.locks else "locks:"
+    yield "access list: " + file_log.access if file_log.access \
+        else "access list:"
+    yield "symbolic names:"
+    for name, revision in file_log.symbolic_names:
+        yield "\t{0}: {1}".format(name, revision)
+    yield "keyword substitution: " + file_log.keyword
+    if file_log.selected is None:
+        yield "total revisions: {0}".format(file_log.total)
+    else:
+        yield "total revisions: {0};\tselected revisions: {1}".format(
+            file_log.total, file_log.selected)
+    if file_log.description is not None:
+        yield "description:"
+        if file_log.description:
+            yield from file_log.description.split("\n")
+    for revision in file_log.revisions:
+        yield REVISION_SEPARATOR
+        yield "revision " + revision.revision
+        fields = ["date: " + revision.date, "author: " + revision.author,
+                  "state: " + revision.state]
+        if revision.lines is not None:
+            fields.append("lines: +{0} -{1}".format(*revision.lines))
+        if revision.commitid is not None:
+            fields.append("commitid: " + revision.commitid)
+        yield ";  ".join(fields) + ";"
+        if revision.branches:
+            yield "branches:  " + ";  ".join(revision.branches) + ";"
+        yield from revision.message.split("\n")
+    yield FILE_SEPARATOR
+
+
+class LogCache():
+    """
+    On-disk cache of the logs of RCS files, one file per RCS file. A cached
+    log stays valid as long as the head and the number of revisions of its
+    RCS file do not change, which a header-only log (log -h) tells cheaply.
+    The first line of a cache file says which log it holds, the second one
+    has the revisions.
+    """
+    def __init__(self, root, path=CACHE_DIR):
+        """
+        Args:
+            root(str): CVSROOT the RCS files belong to.
+            path(str): directory of the cache. Defaults to ~/.pycvs-cache/log
+        """
+        self.root = root
+        self.path = path
+
+    def _file_path(self, rcs_file):
+        key = "{0}\0{1}".format(self.root, rcs_file)
+        digest = hashlib.sha1(key.encode("utf-8", "replace")).hexdigest()
+        return os.path.join(self.path, digest[:2], digest[2:] + ".json")
+
+    def _key(self, header):
+        return {"version": VERSION, "root": self.root,
+                "rcs_file": header.rcs_file, "head": header.head,
+                "total": header.total}
+
+    def fresh(self, header):
+        """
+        Whether the cache has the current log of a file, without loading it.
+
+        Args:
+            header(FileLog): current (header-only) log of the file.
+        """
+        try:
+            with open(self._file_path(header.rcs_file), "r") as cache_file:
+                key = json.loads(cache_file.readline())
+        except (OSError, ValueError):
+            return False
+
+        return (isinstance(key, dict)
+                and key.pop("description", None) is not None
+                and key == self._key(header))
+
+    def get(self, header):
+        """
+        Find the complete log of a file.
+
+        Args:
+            header(FileLog): current (header-only) log of the file.
+
+        Returns:
+            The cached FileLog, with the working file, symbolic names and
+            other header fields of the given one; None when there is none
+            or it is outdated.
+        """
+        try:
+            with open(self._file_path(header.rcs_file), "r") as cache_file:
+                key = json.loads(cache_file.readline())
+                if not isinstance(key, dict):
+                    return None
+                description = key.pop("description", None)
+                if description is None or key != self._key(header):
+                    return None
+                revisions = [
+                    Revision(number, date, author, state,
+                             tuple(lines) if lines else None, commitid,
+                             branches, message)
+                    for number, date, author, state, lines, commitid,
+                    branches, message in json.loads(cache_file.readline())]
+        except (OSError, ValueError, TypeError):
+            return None
+
+        return header._replace(
+            selected=header.selected if header.selected is not None
+            else len(revisions),
+            description=description, revisions=revisions)
+
+    def put(self, file_log):
+        """
+        Store the complete log of a file. Logs of selected revisions only
+        (log -r, -d...) must not be given.
+
+        Returns:
+            Whether the log could be stored.
+        """
+        path = self._file_path(file_log.rcs_file)
+        key = self._key(file_log)
+        key["description"] = file_log.description or ""
+        tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w") as cache_file:
+                cache_file.write(json.dumps(key) + "\n")
+                cache_file.write(json.dumps(
+                    [list(revision) for revision in file_log.revisions])
+                    + "\n")
+            os.replace(tmp_path, path)
+        except OSError:
+            return False
+
+        return True
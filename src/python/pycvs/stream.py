@@ -0,0 +1,240 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import io
+import os
+import re
+import shlex
+import sys
+import threading
+import time
+
+# Library packages
+from pycvs import protocol, tracing
+
+STDOUT = "M"
+STDERR = "E"
+
+# The terminal of a pexpect session mixes stdout and stderr. cvs starts all
+# of its own messages with the program and command names, e.g.
+# "cvs server: Updating dir" or "cvs [update aborted]: ...", while the lines
+# of files, diffs and logs never start that way.
+CVS_MESSAGE = re.compile(rb"cvs(\.exe)? (\[[\w-]+ aborted\]|[\w-]+): ")
+
+PAGER = "less -R"
+# Longest time a line waits in the pager buffer while more output arrives,
+# checked every CLOCK_LINES lines
+FLUSH_INTERVAL = 0.1
+CLOCK_LINES = 64
+
+
+def output_lines(cvs_obj):
+    """
+    Iterate over the output of a CVS session as it arrives, keeping only one
+    line in memory at a time.
+
+    Args:
+        cvs_obj: session returned by PyCvs._access_cvs, opened with
+            stream=True. Sessions that were read to the end already give the
+            lines of their `before`.
+
+    Returns:
+        A generator of (stream, line) tuples: stream is STDOUT or STDERR and
+        line a str without its end of line.
+    """
+    if isinstance(cvs_obj, protocol.Session):
+        for kind, text in tracing.timed(cvs_obj.output(), "cvs.output",
+                                        _event_size):
+            # str.isascii needs Python 3.7
+            try:
+                text.encode("ascii")
+            except UnicodeEncodeError:
+                text = text.encode("utf-8", "surrogateescape").decode(
+                    "utf-8", "replace")
+            yield kind, text
+        return
+
+    lines = cvs_obj.before.splitlines(True)
+    # pexpect is imported by whoever spawned cvs
+    pexpect = sys.modules.get("pexpect")
+    if pexpect is not None and isinstance(cvs_obj, pexpect.spawn):
+        lines = _chain(lines, cvs_obj)
+    for line in tracing.timed(lines, "cvs.output"):
+        kind = STDERR if CVS_MESSAGE.match(line) else STDOUT
+        yield kind, _decode(line)
+
+
+def ordered(pool, function, items, ahead):
+    """
+    Run a function on items in a thread pool and give the results in the
+    order of the items, as they become available. Only up to ahead items
+    are run ahead of the result being consumed, so that at most that many
+    results wait in memory.
+
+    Args:
+        pool(Executor): the pool.
+        function(callable): called with each item.
+        items(iterable): the items.
+        ahead(int): how many items to run ahead.
+
+    Returns:
+        A generator of the results. Closing it cancels the items not started
+        yet.
+    """
+    pending = collections.deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(function, item))
+            if len(pending) > ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _event_size(event):
+    return len(event[1]) + 1
+
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
+
+
+def _decode(line):
+    return line.rstrip(b"\r\n").decode("utf-8", "replace")
+
+
+class Progress():
+    """
+    Live "N files / M dirs" counter for long commands, drawn on the terminal
+    at most every interval seconds. It can be shared by several threads.
+    Nothing is drawn when the output is not a terminal.
+    """
+    def __init__(self, verb="checked out", out=None, interval=0.1):
+        """
+        Args:
+            verb(str): what happens to the files, e.g. "updated".
+            out(file): where to draw. Defaults to sys.stderr.
+            interval(float): minimum seconds between two draws.
+        """
+        self.verb = verb
+        self.out = out or sys.stderr
+        self.interval = interval
+        self.files = 0
+        self.dirs = 0
+        self._lock = threading.Lock()
+        self._drawn = 0
+        self._enabled = self.out.isatty()
+
+    def __call__(self, files=0, dirs=0):
+        """
+        Count more files and directories.
+        """
+        with self._lock:
+            self.files += files
+            self.dirs += dirs
+            if not self._enabled:
+                return
+            now = time.monotonic()
+            if now - self._drawn >= self.interval:
+                self._drawn = now
+                self.out.write("\r{0} files / {1} dirs {2}".format(
+                    self.files, self.dirs, self.verb))
+                self.out.flush()
+
+    def done(self):
+        """
+        Erase the counter, before printing the final summary.
+        """
+        with self._lock:
+            if self._enabled and self._drawn:
+                self.out.write("\r\033[K")
+                self.out.flush()
+
+
+class Pager():
+    """
+    Destination of long outputs: less when stdout is a terminal, stdout
+    itself otherwise. Lines are written as they come; once the pipe to less
+    is full, writing blocks until it reads more, which in turn stops reading
+    from cvs.
+    """
+    def __init__(self, enabled=True, out=None, cmd=PAGER):
+        """
+        Args:
+            enabled(bool): whether to use the pager at all (--no-pager).
+            out(file): text stream to write to without pager. Defaults to
+                sys.stdout.
+            cmd(str): pager command line.
+        """
+        out = out or sys.stdout
+        self.process = None
+        if enabled and out.isatty():
+            import subprocess
+
+            self.process = subprocess.Popen(shlex.split(cmd),
+                                            stdin=subprocess.PIPE)
+            out = io.TextIOWrapper(self.process.stdin, errors="replace")
+        self.out = out
+        # $PYCVS_COLOR set to "always" or "never" overrides the terminal
+        color = os.environ.get("PYCVS_COLOR")
+        if color in ("always", "never"):
+            self.colors = color == "always"
+        else:
+            self.colors = self.process is not None or out.isatty()
+        self._flushed = time.monotonic()
+        self._unflushed = 0
+
+    def write(self, line, boundary=False):
+        """
+        Write a line, flushing it out at a boundary (e.g. the start of the
+        next file of a diff) or when it waited for FLUSH_INTERVAL.
+
+        Raises:
+            BrokenPipeError: the pager was closed.
+        """
+        self.out.write(line + "\n")
+        self._unflushed += 1
+        # Reading the clock costs more than writing, look at it now and then
+        if boundary or self._unflushed >= CLOCK_LINES:
+            now = time.monotonic()
+            if boundary or now - self._flushed > FLUSH_INTERVAL:
+                self.out.flush()
+                self._flushed = now
+            self._unflushed = 0
+
+    def close(self):
+        """
+        Flush the output and wait for the user to quit the pager.
+        """
+        try:
+            self.out.flush()
+        except BrokenPipeError:
+            pass
+        if self.process is not None:
+            try:
+                self.out.close()
+            except BrokenPipeError:
+                pass
+            self.process.wait()
@@ -0,0 +1,231 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+# Where to write a Chrome trace (chrome://tracing, Perfetto) of a command
+TRACE_VARIABLE = "PYCVS_TRACE"
+
+# The recorder in use, None when tracing is off: everything below then
+# returns right away, without looking at the clock.
+_recorder = None
+
+
+class _NullSpan():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    """
+    Start recording spans and counters.
+
+    Returns:
+        The Recorder.
+    """
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def disable():
+    global _recorder
+    _recorder = None
+
+
+def enabled():
+    return _recorder is not None
+
+
+def span(name):
+    """
+    Context manager timing a phase of a command, e.g. "status.parse".
+    """
+    if _recorder is None:
+        return _NULL_SPAN
+    return _Span(_recorder, name)
+
+
+def count(name, amount=1):
+    """
+    Add to a counter, e.g. "files classified".
+    """
+    if _recorder is not None:
+        _recorder.count(name, amount)
+
+
+def timed(iterable, name, size=len):
+    """
+    Time the waits for the items of an iterable, e.g. for the output of cvs
+    to arrive, as the phase name, and count the items and their size in
+    "<name> lines" and "<name> bytes".
+
+    Args:
+        iterable(iterable): the items.
+        name(str): the phase.
+        size(callable): size of an item.
+
+    Returns:
+        The iterable itself when tracing is off, a generator of its items
+        otherwise.
+    """
+    if _recorder is None:
+        return iterable
+    return _recorder.timed(iterable, name, size)
+
+
+class _Span():
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.recorder.push(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.pop()
+        return False
+
+
+class Recorder():
+    """
+    Collects the spans and counters of a command. Spans nest per thread: the
+    time of a span includes the spans run inside it, its self time does not.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        # name -> [calls, total seconds, self seconds]
+        self.totals = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        # (name, thread id, start, duration) of the spans, for the trace
+        self.events = []
+        self._lock = threading.Lock()
+        self._stacks = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._stacks, "stack", None)
+        if stack is None:
+            stack = self._stacks.stack = []
+        return stack
+
+    def push(self, name):
+        # [name, start, seconds spent in nested spans]
+        self._stack().append([name, time.perf_counter(), 0.0])
+
+    def pop(self):
+        stack = self._stack()
+        name, start, nested = stack.pop()
+        duration = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += duration
+        self._record(name, start, duration, duration - nested)
+
+    def _record(self, name, start, duration, own):
+        with self._lock:
+            totals = self.totals.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] += own
+            self.events.append((name, threading.get_ident(), start,
+                                duration))
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timed(self, iterable, name, size):
+        clock = time.perf_counter
+        iterator = iter(iterable)
+        started = clock()
+        waited = 0.0
+        items = 0
+        total_size = 0
+        try:
+            while True:
+                before = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    waited += clock() - before
+                    break
+                waited += clock() - before
+                items += 1
+                total_size += size(item)
+                yield item
+        finally:
+            stack = self._stack()
+            if stack:
+                stack[-1][2] += waited
+            self._record(name, started, waited, waited)
+            self.count(name + " lines", items)
+            self.count(name + " bytes", total_size)
+
+    def summary(self):
+        """
+        Lines of a table of the phases, the longest first, and counters.
+        """
+        lines = ["{0:<24} {1:>7} {2:>10} {3:>10}".format(
+            "phase", "calls", "total (s)", "self (s)")]
+        for name, (calls, total, own) in sorted(
+                self.totals.items(), key=lambda item: -item[1][1]):
+            lines.append("{0:<24} {1:>7} {2:>10.3f} {3:>10.3f}".format(
+                name, calls, total, own))
+        if self.counters:
+            lines.append("")
+            lines.append("{0:<24} {1:>7}".format("counter", "value"))
+            for name, value in self.counters.items():
+                lines.append("{0:<24} {1:>7}".format(name, value))
+
+        return lines
+
+    def print_summary(self, out=None):
+        out = out or sys.stderr
+        for line in self.summary():
+            out.write(line + "\n")
+        out.flush()
+
+    def write_trace(self, path):
+        """
+        Write the spans and counters in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "pid": pid, "tid": tid,
+                   "ts": round((start - self.started) * 1e6, 1),
+                   "dur": round(duration * 1e6, 1)}
+                  for name, tid, start, duration in self.events]
+        events.append({"name": "counters", "ph": "C", "pid": pid,
+                       "ts": round((time.perf_counter() - self.started)
+                                   * 1e6, 1),
+                       "args": dict(self.counters)})
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"},
+                      trace_file)
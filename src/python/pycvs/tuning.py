@@ -0,0 +1,226 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Gerson Carlos
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import json
+import os
+import shlex
+import threading
+
+# Library packages
+from pycvs import protocol
+
+STATS_FILE = os.path.expanduser("~/.pycvs-cache/tuning.json")
+VERSION = 1
+# Seconds a command may go without any output before it is given up
+DEFAULT_TIMEOUT = 300
+# Level of the remote roots whose link was not measured yet, the one the cvs
+# manual suggests
+DEFAULT_LEVEL = 3
+# Access methods whose server runs on this machine
+LOCAL_METHODS = ("fork", "local")
+# Smaller transfers say more about the latency than about the throughput of
+# the link, they are not measured
+MIN_SAMPLE = 256 * 1024
+# Weight of the last transfer in the averages
+WEIGHT = 0.3
+# How much smaller the data gets at level 6 (2.0 for a third of the size),
+# until it was measured: about what source code gets
+DEFAULT_GAIN = 2.0
+# Rough throughput of zlib per level (bytes/s, compressing on the server and
+# decompressing here) and how much of the gain of level 6 it gets
+LEVELS = {1: (60 * 2 ** 20, 0.85), 3: (40 * 2 ** 20, 0.9),
+          6: (20 * 2 ** 20, 1.0), 9: (8 * 2 ** 20, 1.02)}
+# Above this share of the throughput of its level, a compressed transfer was
+# limited by zlib rather than by the link
+ZLIB_BOUND = 0.75
+
+# Measures of the roots by stats file, loaded on first use
+_stats = {}
+_lock = threading.Lock()
+
+
+def choose_level(measures):
+    """
+    The compression level that moves the output of a root the fastest.
+
+    Args:
+        measures(dict): what was measured on the root: "throughput" of the
+            link in bytes/s (None when it is faster than zlib, missing when
+            not measured yet) and "gain" of the compression, or None.
+
+    Returns:
+        A level, 0 for no compression.
+    """
+    if measures is None or "throughput" not in measures:
+        return DEFAULT_LEVEL
+    throughput = measures["throughput"]
+    if throughput is None:
+        # Faster than zlib went, no measure without compression yet
+        return 0
+    gain = measures.get("gain", DEFAULT_GAIN)
+
+    def seconds(level):
+        # Time to get a byte of output through the link
+        if level == 0:
+            return 1 / throughput
+        speed, share = LEVELS[level]
+        return 1 / (throughput * (1 + gain * share)) + 1 / speed
+
+    return min([0] + sorted(LEVELS), key=seconds)
+
+
+def with_compression(cmd, level):
+    """
+    Add -z level to a cvs command line, unless it has a -z of its own.
+    """
+    if not level or not cmd.startswith("cvs "):
+        return cmd
+    try:
+        global_options = protocol.split_command_line(shlex.split(cmd))[0]
+    except (protocol.ProtocolError, ValueError):
+        return cmd
+    if any(flag == "-z" for flag, _ in global_options):
+        return cmd
+
+    return "cvs -z{0} {1}".format(level, cmd[4:])
+
+
+class Tuning():
+    """
+    Connection settings of each CVSROOT: the compression level (cvs -z) and
+    the inactivity timeout. ~/.pycvs sets them for all the roots
+    ("compression", "timeout") and for some of them ("roots": {root:
+    {...}}). The "auto" compression level, the default, comes from the
+    throughput and compression gain measured on the previous transfers of
+    the root, kept in ~/.pycvs-cache/tuning.json ("tuning_file").
+    """
+    def __init__(self, credentials, path=None):
+        """
+        Args:
+            credentials(dict): the configuration.
+            path(str): file of the measures. Defaults to "tuning_file" or
+                ~/.pycvs-cache/tuning.json.
+        """
+        self.credentials = credentials
+        self.path = path or os.path.expanduser(
+            credentials.get("tuning_file", STATS_FILE))
+
+    def settings(self, root):
+        """
+        The settings of a root, those of all the roots included.
+        """
+        settings = {key: self.credentials[key]
+                    for key in ("compression", "timeout")
+                    if key in self.credentials}
+        settings.update(self.credentials.get("roots", {}).get(root, {}))
+
+        return settings
+
+    def compression(self, root):
+        """
+        Compression level of a root, 0 for none.
+        """
+        level = self.settings(root).get("compression", "auto")
+        if level != "auto":
+            return int(level)
+        if not self._remote(root):
+            return 0
+        with _lock:
+            return choose_level(self._load().get(root))
+
+    def timeout(self, root):
+        """
+        Seconds without output after which a command of the root is given
+        up, None to wait forever ("timeout": 0).
+        """
+        return float(self.settings(root).get("timeout",
+                                             DEFAULT_TIMEOUT)) or None
+
+    def record(self, root, level, received, wire, seconds):
+        """
+        Measure the link of a root with a transfer, as
+        protocol.CvsClient.monitor.
+
+        Args:
+            root(str): the CVSROOT.
+            level(int): compression level of the transfer.
+            received(int): bytes of output.
+            wire(int): bytes that went through the link for them.
+            seconds(float): time of the transfer.
+        """
+        if received < MIN_SAMPLE or seconds <= 0 or not self._remote(root):
+            return
+        speed, share = LEVELS.get(level, LEVELS[6])
+        # Compressed to little, the transfer mostly measures the latency
+        throughput = wire / seconds if wire >= MIN_SAMPLE else False
+        if level and received / seconds > ZLIB_BOUND * speed:
+            # The link may be much faster than zlib let it look: measure it
+            # without compression next time
+            throughput = None
+        with _lock:
+            stats = self._load()
+            measures = stats.setdefault(root, {"runs": 0})
+            previous = measures.get("throughput", False)
+            if throughput is not False:
+                if previous and throughput is not None:
+                    throughput = previous + WEIGHT * (throughput - previous)
+                measures["throughput"] = throughput
+            if level:
+                gain = (received / max(wire, 1) - 1) / share
+                previous = measures.get("gain", gain)
+                measures["gain"] = previous + WEIGHT * (gain - previous)
+            measures["level"] = level
+            measures["runs"] += 1
+            self._save(stats)
+
+    @staticmethod
+    def _remote(root):
+        if root is None:
+            return False
+        try:
+            return protocol.parse_root(root).method not in LOCAL_METHODS
+        except protocol.ProtocolError:
+            return False
+
+    def _load(self):
+        stats = _stats.get(self.path)
+        if stats is None:
+            try:
+                with open(self.path, "r") as stats_file:
+                    data = json.load(stats_file)
+                stats = data["roots"] if data["version"] == VERSION else {}
+            except (OSError, ValueError, KeyError, TypeError):
+                stats = {}
+            _stats[self.path] = stats
+
+        return stats
+
+    def _save(self, stats):
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            temporary = "{0}.{1}".format(self.path, os.getpid())
+            with open(temporary, "w") as stats_file:
+                json.dump({"version": VERSION, "roots": stats}, stats_file,
+                          indent=1, sort_keys=True)
+            os.replace(temporary, self.path)
+        except OSError:
+            # Only the next choice of level is lost
+            pass
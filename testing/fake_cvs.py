@@ -0,0 +1,775 @@
+#!/usr/bin/env python3
+"""
+Stand-in for a CVS server, used by the tests and the benchmarks.
+
+As a module it provides FakeRepository and FakeServer, which speaks the
+client/server protocol over any pair of binary streams. As a script it can be
+used in place of the cvs executable:
+
+    fake_cvs.py server            serve the protocol on stdin/stdout
+    fake_cvs.py [-d root] <cmd>   run a command and print its output
+
+The repository is synthetic, sized by $FAKE_CVS_FILES (default 1000 files).
+With $FAKE_CVS_PASSWORD set, commands ask for that password first, and with
+$FAKE_CVS_CRLF set they end their lines with CRLF, like cvs on Windows.
+$FAKE_CVS_LATENCY adds a delay in seconds to every file sent and
+$FAKE_CVS_BANDWIDTH limits the bytes per second the server sends and receives,
+to stand in for a slow link.
+"""
+import collections
+import difflib
+import io
+import os
+import socket
+import sys
+import threading
+import time
+import zlib
+
+ROOT = "/cvsroot"
+SEPARATOR = "=" * 67
+
+VALID_REQUESTS = ["Root", "Valid-responses", "valid-requests", "UseUnchanged",
+                  "Directory", "Entry", "Modified", "Is-modified",
+                  "Unchanged", "Questionable", "Sticky", "Static-directory",
+                  "Argument", "Argumentx", "Global_option", "co", "update",
+                  "status", "diff", "log", "rlog", "add", "export", "rdiff",
+                  "rls", "annotate", "rannotate", "Gzip-stream"]
+
+
+class FakeRepository():
+    """
+    In-memory repository: path -> list of (revision, author, date, message,
+    contents) tuples, newest last.
+    """
+    def __init__(self, files=None, root=ROOT):
+        self.root = root
+        self.files = collections.OrderedDict()
+        # name -> {path: revision}
+        self.tags = {}
+        for path, data in sorted((files or {}).items()):
+            self.commit(path, data)
+
+    @classmethod
+    def synthetic(cls, nfiles, per_dir=100, module="module", revisions=1):
+        """
+        A repository with nfiles small files, per_dir in each directory, each
+        with the given number of revisions.
+        """
+        repository = cls()
+        data = b"".join(b"line %d\n" % i for i in range(20))
+        history = [("1.1", "dev", "2020/01/01 10:00:00", "initial import",
+                    data)]
+        for i in range(2, revisions + 1):
+            history.append(("1.{0}".format(i), "dev{0}".format(i % 7),
+                            "2020/01/{0:02d} 10:00:00".format(i % 28 + 1),
+                            "change number {0}".format(i), data))
+        for i in range(nfiles):
+            path = "{0}/dir{1:05d}/file{2:05d}.c".format(module, i // per_dir,
+                                                       i)
+            repository.files[path] = list(history)
+        return repository
+
+    def commit(self, path, data, author="dev", date="2020/01/01 10:00:00",
+               message="change"):
+        revisions = self.files.setdefault(path, [])
+        revision = "1.{0}".format(len(revisions) + 1)
+        revisions.append((revision, author, date, message, data))
+        return revision
+
+    def head(self, path):
+        revisions = self.files.get(path)
+        return revisions[-1] if revisions else None
+
+    def tag(self, name, paths=None):
+        """
+        Tag the head revisions of the given files, all of them by default.
+        """
+        self.tags[name] = {path: self.head(path)[0]
+                           for path in paths or self.files}
+
+    def revision(self, path, tag):
+        """
+        The (revision, author, date, message, contents) tuple a tag or
+        revision number selects, None when the file does not have it.
+        """
+        if tag == "HEAD":
+            return self.head(path)
+        tag = self.tags.get(tag, {}).get(path, tag)
+        for revision in self.files.get(path, []):
+            if revision[0] == tag:
+                return revision
+        return None
+
+
+class FakeServer():
+    """
+    Server side of the protocol, good enough for pycvs' own client.
+    """
+    # Seconds spent on every file sent, to stand in for a remote server
+    latency = 0.0
+
+    def __init__(self, repository, rfile, wfile):
+        self.repository = repository
+        self.rfile = rfile
+        self.wfile = wfile
+        self.requests = []
+        self._reset()
+
+    def _reset(self):
+        self.dirs = collections.OrderedDict()
+        self.current = None
+        self.arguments = []
+
+    def serve(self):
+        """
+        Answer requests until the client closes the connection.
+        """
+        # Clients that stop reading close it without a word
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                line = line.decode("utf-8").rstrip("\n")
+                self.requests.append(line)
+                name, _, arg = line.partition(" ")
+                handler = getattr(self, "_req_" + name.replace("-", "_"),
+                                  None)
+                if handler is None:
+                    self._send("error  unrecognized request `{0}'"
+                               .format(name))
+                else:
+                    handler(arg)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _send(self, line):
+        self.wfile.write(line.encode("utf-8") + b"\n")
+
+    def _readline(self):
+        return self.rfile.readline().decode("utf-8").rstrip("\n")
+
+    def _req_Root(self, arg):
+        pass
+
+    def _req_Valid_responses(self, arg):
+        pass
+
+    def _req_valid_requests(self, arg):
+        self._send("Valid-requests " + " ".join(VALID_REQUESTS))
+        self._send("ok")
+
+    def _req_UseUnchanged(self, arg):
+        pass
+
+    def _req_Global_option(self, arg):
+        pass
+
+    def _req_Gzip_stream(self, arg):
+        self.rfile = io.BufferedReader(Inflating(self.rfile))
+        self.wfile = Deflating(self.wfile, int(arg))
+
+    def _req_Sticky(self, arg):
+        pass
+
+    def _req_Static_directory(self, arg):
+        pass
+
+    def _req_Directory(self, arg):
+        repository = self._readline()
+        relative = repository[len(self.repository.root) + 1:]
+        self.current = self.dirs.setdefault(arg, {
+            "repository": relative, "entries": collections.OrderedDict(),
+            "state": {}, "data": {}, "questionable": []})
+
+    def _req_Entry(self, arg):
+        fields = arg.split("/")
+        self.current["entries"][fields[1]] = fields
+
+    def _req_Modified(self, arg):
+        self._readline()
+        size = int(self._readline())
+        self.current["state"][arg] = "modified"
+        self.current["data"][arg] = self.rfile.read(size)
+
+    def _req_Is_modified(self, arg):
+        self.current["state"][arg] = "modified"
+
+    def _req_Unchanged(self, arg):
+        self.current["state"][arg] = "unchanged"
+
+    def _req_Questionable(self, arg):
+        self.current["questionable"].append(arg)
+
+    def _req_Argument(self, arg):
+        self.arguments.append(arg)
+
+    def _req_Argumentx(self, arg):
+        self.arguments[-1] += "\n" + arg
+
+    def _command(self, name, handler):
+        options = []
+        args = list(self.arguments)
+        if "--" in args:
+            index = args.index("--")
+            options, args = args[:index], args[index + 1:]
+        status = handler(options, args)
+        self._send("error 1 " if status else "ok")
+        self._reset()
+
+    def _req_co(self, arg):
+        self._command("co", self._checkout)
+
+    def _req_export(self, arg):
+        self._command("export", self._checkout)
+
+    def _req_status(self, arg):
+        self._command("status", self._status)
+
+    def _req_update(self, arg):
+        self._command("update", self._update)
+
+    def _req_diff(self, arg):
+        self._command("diff", self._diff)
+
+    def _req_log(self, arg):
+        self._command("log", self._log)
+
+    def _req_add(self, arg):
+        self._command("add", self._add)
+
+    def _req_rlog(self, arg):
+        self._command("rlog", self._rlog)
+
+    def _req_rls(self, arg):
+        self._command("rls", self._rls)
+
+    def _req_rdiff(self, arg):
+        self._command("rdiff", self._rdiff)
+
+    def _req_rannotate(self, arg):
+        self._command("rannotate", self._rannotate)
+
+    # Commands
+
+    def _checkout(self, options, args):
+        if "-p" in options:
+            return self._checkout_pipe(options, args)
+        last_dir = None
+        local = "-l" in options
+        tag = options[options.index("-r") + 1] if "-r" in options else "HEAD"
+        for path in self.repository.files:
+            if not any(path == arg or path.startswith(arg.rstrip("/") + "/")
+                       for arg in args):
+                continue
+            if local and os.path.dirname(path) not in args:
+                continue
+            revision = self.repository.revision(path, tag)
+            if revision is None:
+                continue
+            directory = os.path.dirname(path)
+            if directory != last_dir:
+                self._send("E cvs server: Updating {0}".format(directory))
+                last_dir = directory
+            self._send("M U {0}".format(path))
+            self._updated("Updated", directory, path, revision=revision)
+
+    def _checkout_pipe(self, options, args):
+        revision = None
+        for i, option in enumerate(options):
+            if option == "-r":
+                revision = options[i + 1]
+            elif option.startswith("-r"):
+                revision = option[2:]
+        for arg in args:
+            revisions = self.repository.files.get(arg, [])
+            if revision is not None:
+                revisions = [item for item in revisions
+                             if item[0] == revision]
+            if not revisions:
+                self._send("E cvs [checkout aborted]: no such tag {0}"
+                           .format(revision))
+                return True
+            for line in revisions[-1][4].decode("utf-8").splitlines():
+                self._send("M " + line)
+
+    def _updated(self, response, local_dir, path, conflict=False,
+                 revision=None):
+        revision, _, _, _, data = revision or self.repository.head(path)
+        self._send("{0} {1}/".format(response, local_dir))
+        self._send("{0}/{1}".format(self.repository.root, path))
+        self._send("/{0}/{1}/{2}//".format(os.path.basename(path), revision,
+                                          "+" if conflict else ""))
+        self._send("u=rw,g=r,o=r")
+        self._send(str(len(data)))
+        self.wfile.write(data)
+        if self.latency:
+            self.wfile.flush()
+            time.sleep(self.latency)
+
+    def _files(self):
+        """
+        The files the client told about, as (local path, repository path,
+        entry fields, state) tuples, directory by directory.
+        """
+        for local_dir, info in self.dirs.items():
+            yield local_dir, info, [
+                (self._local(local_dir, name),
+                 info["repository"] + "/" + name, fields,
+                 info["state"].get(name, "lost"))
+                for name, fields in info["entries"].items()]
+
+    @staticmethod
+    def _local(local_dir, name):
+        return name if local_dir == "." else local_dir + "/" + name
+
+    def _file_status(self, path, fields, state):
+        head = self.repository.head(path)
+        revision = fields[2]
+        if revision == "0":
+            return "Locally Added"
+        if revision.startswith("-"):
+            return "Locally Removed"
+        if state == "lost":
+            return "Needs Checkout"
+        newer = head is not None and head[0] != revision
+        if fields[3].startswith("+"):
+            return "File had conflicts on merge"
+        if state == "modified":
+            return "Needs Merge" if newer else "Locally Modified"
+        return "Needs Patch" if newer else "Up-to-date"
+
+    def _status(self, options, args):
+        for local_dir, info, files in self._files():
+            for name in info["questionable"]:
+                self._send("M ? {0}".format(self._local(local_dir, name)))
+            self._send("E cvs server: Examining {0}".format(local_dir))
+            for local, path, fields, state in files:
+                head = self.repository.head(path)
+                self._send("M " + SEPARATOR)
+                self._send("M File: {0}\t\tStatus: {1}".format(
+                    fields[1], self._file_status(path, fields, state)))
+                self._send("M ")
+                self._send("M    Working revision:\t{0}".format(fields[2]))
+                self._send("M    Repository revision:\t{0}\t{1}/{2},v".format(
+                    head[0] if head else "No revision control file",
+                    self.repository.root, path))
+                self._send("M ")
+
+    def _update(self, options, args):
+        conflicts = False
+        by_dir = collections.defaultdict(list)
+        for path in self.repository.files:
+            by_dir[os.path.dirname(path)].append(path)
+        for local_dir, info, files in self._files():
+            self._send("E cvs server: Updating {0}".format(local_dir))
+            for name in info["questionable"]:
+                self._send("M ? {0}".format(self._local(local_dir, name)))
+            for local, path, fields, state in files:
+                status = self._file_status(path, fields, state)
+                if status in ("Needs Patch", "Needs Checkout"):
+                    self._send("M U {0}".format(local))
+                    self._updated("Updated", local_dir, path)
+                elif status == "Needs Merge":
+                    self._send("M C {0}".format(local))
+                    self._updated("Merged", local_dir, path, conflict=True)
+                    conflicts = True
+                elif status == "Locally Modified":
+                    self._send("M M {0}".format(local))
+                elif status == "Locally Added":
+                    self._send("M A {0}".format(local))
+                elif status == "Locally Removed":
+                    self._send("M R {0}".format(local))
+            # Files added to the repository since the last update
+            prefix = info["repository"] + "/"
+            for path in by_dir[info["repository"]]:
+                name = path[len(prefix):]
+                local = self._local(local_dir, name)
+                if (name not in info["entries"]
+                        and (not args or local in args)):
+                    self._send("M U {0}".format(local))
+                    self._updated("Updated", local_dir, path)
+        if "-d" in options:
+            # New directories named on the command line
+            for arg in args:
+                parent = self.dirs.get(os.path.dirname(arg) or ".")
+                if arg in self.dirs or parent is None:
+                    continue
+                prefix = parent["repository"] + "/" + os.path.basename(arg)
+                last_dir = None
+                for path in self.repository.files:
+                    if not path.startswith(prefix + "/"):
+                        continue
+                    local_dir = arg + os.path.dirname(path)[len(prefix):]
+                    if local_dir != last_dir:
+                        self._send("E cvs server: Updating {0}"
+                                   .format(local_dir))
+                        last_dir = local_dir
+                    self._send("M U {0}/{1}".format(local_dir,
+                                                    os.path.basename(path)))
+                    self._updated("Updated", local_dir, path)
+        return conflicts
+
+    def _diff(self, options, args):
+        different = False
+        for local_dir, info, files in self._files():
+            for local, path, fields, state in files:
+                if state != "modified":
+                    continue
+                different = True
+                old = self.repository.head(path)[4].decode("utf-8")
+                new = info["data"][fields[1]].decode("utf-8")
+                self._send("M Index: {0}".format(local))
+                self._send("M " + SEPARATOR)
+                self._send("M RCS file: {0}/{1},v".format(
+                    self.repository.root, path))
+                self._send("M retrieving revision {0}".format(fields[2]))
+                self._send("M diff -u -r{0} {1}".format(fields[2], local))
+                for line in difflib.unified_diff(
+                        old.splitlines(), new.splitlines(),
+                        "{0}\t(revision {1})".format(local, fields[2]),
+                        "{0}\t(working copy)".format(local), lineterm=""):
+                    self._send("M " + line)
+        return different
+
+    def _log(self, options, args):
+        for local_dir, info, files in self._files():
+            self._send("E cvs server: Logging {0}".format(local_dir))
+            for local, path, fields, state in files:
+                revisions = self.repository.files.get(path, [])
+                self._log_file(path, local, revisions, "-h" in options)
+
+    def _rlog(self, options, args):
+        since = None
+        if "-d" in options:
+            # Only the ">date" form, in the format of the dates stored
+            since = options[options.index("-d") + 1].lstrip(">")
+            since = since.replace(" UTC", "")
+        for path, revisions in self.repository.files.items():
+            if not any(path == arg or path.startswith(arg.rstrip("/") + "/")
+                       for arg in args):
+                continue
+            selected = [revision for revision in revisions
+                        if since is None or revision[2] > since]
+            if "-S" in options and not selected:
+                continue
+            if "-R" in options:
+                self._send("M {0}/{1},v".format(self.repository.root, path))
+            else:
+                self._log_file(path, None, selected)
+
+    def _log_file(self, path, local, revisions, header_only=False):
+        self._send("M ")
+        self._send("M RCS file: {0}/{1},v".format(self.repository.root, path))
+        if local is not None:
+            self._send("M Working file: {0}".format(local))
+        self._send("M head: {0}".format(self.repository.head(path)[0]))
+        self._send("M branch:")
+        self._send("M locks: strict")
+        self._send("M access list:")
+        self._send("M symbolic names:")
+        self._send("M keyword substitution: kv")
+        total = len(self.repository.files[path])
+        if header_only:
+            self._send("M total revisions: {0}".format(total))
+            self._send("M " + "=" * 77)
+            return
+        self._send("M total revisions: {0};\tselected revisions: {1}"
+                   .format(total, len(revisions)))
+        self._send("M description:")
+        for revision, author, date, message, _ in reversed(revisions):
+            self._send("M ----------------------------")
+            self._send("M revision {0}".format(revision))
+            self._send("M date: {0};  author: {1};  state: Exp;"
+                       .format(date, author))
+            self._send("M " + message)
+        self._send("M " + "=" * 77)
+        # Reading the whole history of an RCS file costs like sending it
+        if self.latency:
+            self.wfile.flush()
+            time.sleep(self.latency)
+
+    def _rls(self, options, args):
+        tag = options[options.index("-r") + 1] if "-r" in options else "HEAD"
+        for arg in args:
+            pending = [arg.rstrip("/")]
+            while pending:
+                directory = pending.pop(0)
+                prefix = directory + "/"
+                names = collections.OrderedDict()
+                for path in self.repository.files:
+                    if path.startswith(prefix):
+                        name, slash, _ = path[len(prefix):].partition("/")
+                        if slash:
+                            names[name] = None
+                        elif self.repository.revision(path, tag):
+                            names[name] = path
+                if not names and directory == arg.rstrip("/"):
+                    self._send("E cvs [rls aborted]: no such directory "
+                               "`{0}'".format(arg))
+                    return True
+                if "-R" in options:
+                    if directory != arg.rstrip("/"):
+                        self._send("M ")
+                    self._send("M {0}:".format(directory))
+                for name, path in names.items():
+                    if path is None and "-R" in options:
+                        pending.append(prefix + name)
+                    if "-e" not in options:
+                        self._send("M " + name)
+                    elif path is None:
+                        self._send("M D/{0}////".format(name))
+                    else:
+                        revision, _, date, _, _ = self.repository.revision(
+                            path, tag)
+                        date = time.strftime("%a %b %d %H:%M:%S %Y",
+                                             time.strptime(
+                                                 date, "%Y/%m/%d %H:%M:%S"))
+                        self._send("M /{0}/{1}/{2}//".format(name, revision,
+                                                             date))
+
+    def _rdiff(self, options, args):
+        tags = [option[2:] or options[i + 1]
+                for i, option in enumerate(options)
+                if option.startswith("-r")]
+        for path in self.repository.files:
+            if not any(path == arg or path.startswith(arg.rstrip("/") + "/")
+                       for arg in args):
+                continue
+            if "-l" in options and os.path.dirname(path) not in args:
+                continue
+            old = self.repository.revision(path, tags[0])
+            new = self.repository.revision(path, tags[1])
+            if old == new:
+                continue
+            if "-s" in options:
+                if old is None:
+                    self._send("M File {0} is new; {1} revision {2}".format(
+                        path, tags[1], new[0]))
+                elif new is None:
+                    self._send("M File {0} is removed; {1} revision {2}"
+                               .format(path, tags[0], old[0]))
+                else:
+                    self._send("M File {0} changed from revision {1} to {2}"
+                               .format(path, old[0], new[0]))
+                continue
+            self._send("M Index: {0}".format(path))
+            self._send("M diff -u {0} {1}".format(
+                "{0}:{1}".format(path, old[0]) if old else "/dev/null",
+                "{0}:{1}".format(path, new[0]) if new else "/dev/null"))
+            for line in difflib.unified_diff(
+                    old[4].decode("utf-8").splitlines() if old else [],
+                    new[4].decode("utf-8").splitlines() if new else [],
+                    "{0}:{1}".format(path, old[0]) if old else "/dev/null",
+                    path if new else "/dev/null", lineterm=""):
+                self._send("M " + line)
+
+    def _rannotate(self, options, args):
+        revision = None
+        if "-r" in options:
+            revision = options[options.index("-r") + 1]
+        for arg in args:
+            revisions = self.repository.files.get(arg, [])
+            if revision is not None:
+                numbers = [item[0] for item in revisions]
+                if revision not in numbers:
+                    self._send("E cvs [rannotate aborted]: no such tag {0}"
+                               .format(revision))
+                    return True
+                revisions = revisions[:numbers.index(revision) + 1]
+            self._send("E Annotations for {0}".format(arg))
+            self._send("E ***************")
+            for annotation, line in annotate(revisions):
+                self._send("M {0:<12} ({1:<8.8} {2}): {3}".format(
+                    annotation[0], annotation[1], annotation[2], line))
+            if self.latency:
+                self.wfile.flush()
+                time.sleep(self.latency)
+
+    def _add(self, options, args):
+        for arg in args:
+            local_dir, name = os.path.split(arg)
+            info = self.dirs.get(local_dir or ".")
+            if arg in self.dirs:
+                self._send("M Directory {0}/{1} added to the repository"
+                           .format(self.repository.root,
+                                   self.dirs[arg]["repository"]))
+            elif info is not None and name not in info["entries"]:
+                self._send("E cvs server: scheduling file `{0}' for addition"
+                           .format(arg))
+                self._send("Checked-in {0}/".format(local_dir or "."))
+                self._send("{0}/{1}/{2}".format(self.repository.root,
+                                                info["repository"], name))
+                self._send("/{0}/0/dummy timestamp//".format(name))
+
+
+def annotate(revisions):
+    """
+    Annotate the last of a list of revisions.
+
+    Returns:
+        A list of ((revision, author, date) of the last change, line) tuples.
+    """
+    lines = []
+    for revision, author, date, _, data in revisions:
+        new = data.decode("utf-8").splitlines()
+        date = time.strftime("%d-%b-%y", time.strptime(date,
+                                                       "%Y/%m/%d %H:%M:%S"))
+        matcher = difflib.SequenceMatcher(None, [line for _, line in lines],
+                                          new, autojunk=False)
+        annotated = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                annotated.extend(lines[i1:i2])
+            else:
+                annotated.extend(((revision, author, date), line)
+                                 for line in new[j1:j2])
+        lines = annotated
+    return lines
+
+
+class Deflating():
+    """
+    Compressing writer of the Gzip-stream request.
+    """
+    def __init__(self, raw, level):
+        self.raw = raw
+        self.compressor = zlib.compressobj(level)
+
+    def write(self, data):
+        self.raw.write(self.compressor.compress(data))
+
+    def flush(self):
+        self.raw.write(self.compressor.flush(zlib.Z_SYNC_FLUSH))
+        self.raw.flush()
+
+
+class Inflating(io.RawIOBase):
+    """
+    Decompressing reader of the Gzip-stream request, to buffer.
+    """
+    def __init__(self, raw):
+        self.raw = raw
+        self.decompressor = zlib.decompressobj()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            data = self.decompressor.unconsumed_tail or self.raw.read1(65536)
+            if not data:
+                return 0
+            inflated = self.decompressor.decompress(data, len(buffer))
+            if inflated:
+                buffer[:len(inflated)] = inflated
+                return len(inflated)
+
+
+class Throttled():
+    """
+    Stream that moves at most bandwidth bytes per second, in either
+    direction.
+    """
+    # Bytes let through at once
+    burst = 16 * 1024
+
+    def __init__(self, raw, bandwidth):
+        self.raw = raw
+        self.bandwidth = bandwidth
+        self.due = time.monotonic()
+        self.pending = 0
+
+    def _wait(self, size):
+        self.due = max(self.due, time.monotonic()) + size / self.bandwidth
+        time.sleep(max(0, self.due - time.monotonic()))
+
+    def write(self, data):
+        self.raw.write(data)
+        self.pending += len(data)
+        if self.pending >= self.burst:
+            self.flush()
+
+    def flush(self):
+        self._wait(self.pending)
+        self.pending = 0
+        self.raw.flush()
+
+    def readline(self):
+        line = self.raw.readline()
+        self._wait(len(line))
+        return line
+
+    def read(self, size):
+        data = self.raw.read(size)
+        self._wait(len(data))
+        return data
+
+    def read1(self, size):
+        data = self.raw.read1(min(size, self.burst))
+        self._wait(len(data))
+        return data
+
+
+def start(repository):
+    """
+    Run a FakeServer in a thread, connected to a socket pair.
+
+    Returns:
+        A (client rfile, client wfile, server) tuple.
+    """
+    client, server_sock = socket.socketpair()
+    server = FakeServer(repository, server_sock.makefile("rb"),
+                        server_sock.makefile("wb"))
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    return client.makefile("rb"), client.makefile("wb"), server
+
+
+def main(argv):
+    repository = FakeRepository.synthetic(
+        int(os.environ.get("FAKE_CVS_FILES", "1000")),
+        revisions=int(os.environ.get("FAKE_CVS_REVISIONS", "1")))
+    # Files committed to once more, e.g. since a previous run
+    for path in list(repository.files)[
+            :int(os.environ.get("FAKE_CVS_CHANGED", "0"))]:
+        repository.commit(path, b"changed\n", date="2020/02/01 10:00:00")
+    FakeServer.latency = float(os.environ.get("FAKE_CVS_LATENCY", "0"))
+    if argv[1:] == ["server"]:
+        rfile, wfile = sys.stdin.buffer, sys.stdout.buffer
+        bandwidth = float(os.environ.get("FAKE_CVS_BANDWIDTH", "0"))
+        if bandwidth:
+            rfile, wfile = (Throttled(rfile, bandwidth),
+                            Throttled(wfile, bandwidth))
+        server = FakeServer(repository, rfile, wfile)
+        server.serve()
+        return 0
+
+    password = os.environ.get("FAKE_CVS_PASSWORD")
+    if password is not None:
+        sys.stdout.write("CVS password: ")
+        sys.stdout.flush()
+        if sys.stdin.readline().strip() != password:
+            sys.stdout.write("cvs [login aborted]: Permission denied\n")
+            return 1
+
+    # Text mode: the output a real cvs would print, produced by running
+    # pycvs' own protocol client against the stand-in server
+    from pycvs.protocol import Connection, CvsClient
+    rfile, wfile, _ = start(repository)
+    client = CvsClient(":fork:" + ROOT, connection=Connection(rfile, wfile))
+    args = list(argv[1:])
+    if args[:1] == ["-d"]:
+        args = args[2:]
+    end = "\r\n" if os.environ.get("FAKE_CVS_CRLF") else "\n"
+    for kind, text in client.run(["cvs"] + args):
+        stream = sys.stdout if kind == "M" else sys.stderr
+        stream.write(text + end)
+    return 1 if client.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
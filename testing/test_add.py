@@ -0,0 +1,85 @@
+import pytest
+from pycvs.cli import PyCvs, chunk_arguments
+
+# Imports for mocking
+import os
+import shlex
+
+
+def get_class(mocker):
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+
+    obj = PyCvs()
+    obj.credentials = {}
+    return obj
+
+
+def fake_cvs(mocker, calls):
+    """
+    Mimic `cvs add`: directories get their CVS folder and files are scheduled.
+    """
+    def access_cvs(cmd, stream=False, cwd=None):
+        names = shlex.split(cmd)[2:]
+        calls.append((cwd, names))
+        lines = []
+        for name in names:
+            path = os.path.join(cwd, name)
+            if os.path.isdir(path):
+                os.makedirs(os.path.join(path, "CVS"))
+                with open(os.path.join(path, "CVS", "Entries"), "w") as f:
+                    f.write("D\n")
+                lines.append("Directory /cvsroot/{0} added to the repository"
+                             .format(name))
+            else:
+                lines.append("cvs add: scheduling file `{0}' for addition"
+                             .format(name))
+        cvs_obj = mocker.MagicMock()
+        cvs_obj.before = "\n".join(lines).encode("utf-8")
+        return cvs_obj
+
+    return access_cvs
+
+
+def test_add_tree(tmp_path, mocker, monkeypatch):
+    os.makedirs(str(tmp_path / "CVS"))
+    (tmp_path / "CVS" / "Entries").write_text("D\n")
+    os.makedirs(str(tmp_path / "foo" / "bar"))
+    for name in ("a.py", "b.py", "a.o"):
+        (tmp_path / "foo" / name).write_text("x")
+    (tmp_path / "foo" / "bar" / "c.py").write_text("x")
+    monkeypatch.chdir(str(tmp_path))
+
+    obj = get_class(mocker)
+    calls = []
+    mocker.patch.object(PyCvs, '_access_cvs', side_effect=fake_cvs(mocker,
+                                                                   calls))
+    pint = mocker.patch('builtins.print')
+
+    obj._add(["foo/", "-j", "2"])
+
+    # One invocation per directory, ignored files left out
+    assert sorted(calls) == [(".", ["foo"]),
+                             ("foo", ["bar", "a.py", "b.py"]),
+                             (os.path.join("foo", "bar"), ["c.py"])]
+    pint.assert_any_call("Directory foo added")
+    pint.assert_any_call("\tstaging foo/a.py to commit")
+    pint.assert_any_call("\tstaging foo/bar/c.py to commit")
+    pint.assert_any_call("3 files staged to commit")
+    pint.assert_any_call("2 directories added")
+
+
+def test_add_skips_cvs_dir(mocker):
+    obj = get_class(mocker)
+    access = mocker.patch.object(PyCvs, '_access_cvs')
+    mocker.patch('builtins.print')
+
+    obj._add(["foo/CVS"])
+
+    access.assert_not_called()
+
+
+def test_chunk_arguments():
+    chunks = list(chunk_arguments(["aaaa", "bbbb", "cccc"], limit=10))
+
+    assert chunks == [["aaaa", "bbbb"], ["cccc"]]
@@ -0,0 +1,138 @@
+import pytest
+from pycvs import aio, protocol
+from pycvs.cli import PyCvs
+from pycvs.commands.workspace import _run as run
+
+# Imports for mocking
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import fake_cvs
+
+
+@pytest.fixture
+def workspace(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({
+        "module/top.c": b"one\ntwo\n",
+        "module/a/a.c": b"a\n"})
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    obj = PyCvs({"root": ":pserver:dev@host:/cvsroot",
+                 "password": "secret", "user": "dev"})
+    monkeypatch.chdir(str(tmp_path))
+    client = aio.AsyncPyCvs(obj, limit=2)
+
+    async def checkout():
+        return await asyncio.gather(client.checkout("module", "one"),
+                                    client.checkout("module", "two"))
+
+    assert run(checkout()) == [(2, 2, True), (2, 2, True)]
+    yield obj, client, repository
+    client.close()
+
+
+def test_status(workspace):
+    obj, client, repository = workspace
+    with open(os.path.join("one", "module", "top.c"), "w") as changed:
+        changed.write("<<<<<<< top.c\nmine\n=======\n>>>>>>> 1.2\n")
+    past = time.time() - 3600
+    os.utime(os.path.join("one", "module", "top.c"), (past, past))
+    open(os.path.join("two", "module", "new.c"), "w").close()
+
+    checkouts = aio.find_checkouts(".")
+    local = run(client.across(checkouts, client.status, True))
+    remote = run(client.across(checkouts + ["missing"], client.status))
+
+    assert checkouts == ["./one/module", "./two/module"]
+    assert local[0].result.modified == ["./top.c"]
+    assert [conflict[:3] for conflict in local[0].result.conflicts] == [
+        ("top.c", 1, 4)]
+    assert local[1].result.new == ["new.c"]
+    assert [path.strip() for path in remote[0].result.modified] == ["./top.c"]
+    assert remote[1].error is None
+    assert isinstance(remote[2].error, aio.PyCvsError)
+    assert aio.format_status(local[0]) == [
+        "./one/module: 1 modified, 1 unresolved conflicts",
+        "\tmodified:\t./top.c", "\tconflict:\ttop.c, lines 1-4"]
+    assert aio.format_status(remote[2]) == [
+        "missing: failed (missing is not a CVS working copy)"]
+
+
+def test_update_and_log(workspace):
+    obj, client, repository = workspace
+    repository.commit("module/top.c", b"one\ntwo\nthree\n")
+
+    results = run(client.across(["one/module", "two/module"],
+                                client.update, ["-d"]))
+    logs = run(client.log("one/module", ["top.c"]))
+
+    assert [result.result for result in results] == [(1, [], True)] * 2
+    with open(os.path.join("two", "module", "top.c")) as updated:
+        assert updated.read() == "one\ntwo\nthree\n"
+    assert os.path.exists(os.path.join("one", "module", "CVS",
+                                       "pycvs.update"))
+    assert [log.working_file for log in logs] == ["top.c"]
+    assert aio.format_update(results[0]) == ["one/module: 1 files updated"]
+
+
+def test_limit(workspace, mocker):
+    obj, client, repository = workspace
+    running = []
+    highest = []
+    lock = threading.Lock()
+
+    def update_directory(directory, opts):
+        with lock:
+            running.append(directory)
+            highest.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(directory)
+        return 0, [], True
+
+    mocker.patch.object(obj, '_update_directory',
+                        side_effect=update_directory)
+    mocker.patch('pycvs.aio.is_working_dir', return_value=True)
+    mocker.patch('pycvs.protocol.root_of', return_value=None)
+
+    directories = ["copy{0}".format(i) for i in range(6)]
+    results = run(client.across(directories, client.update))
+
+    assert [result.error for result in results] == [None] * 6
+    assert max(highest) == 2
+
+
+def test_workspace(workspace, mocker, monkeypatch, capsys):
+    obj, client, repository = workspace
+    open(os.path.join("two", "module", "new.c"), "w").close()
+    monkeypatch.setattr(sys, "argv", ["pycvs", "--workspace", ".",
+                                      "status", "--local"])
+
+    obj.process()
+
+    assert capsys.readouterr().out == (
+        "./one/module: clean\n"
+        "./two/module: 1 new\n"
+        "\tnew:\tnew.c\n"
+        "\n2 working copies, 0 failed\n")
+
+
+def test_workspace_update_merge(workspace, mocker, monkeypatch, capsys):
+    obj, client, repository = workspace
+    update = mocker.patch.object(PyCvs, '_update_directory',
+                                 return_value=(0, [], True))
+    # -j REL_1 is for cvs update, not the working copies at a time
+    monkeypatch.setattr(sys, "argv", ["pycvs", "--workspace", ".",
+                                      "update", "-j", "REL_1"])
+
+    obj.process()
+
+    assert sorted(call[0][:2] for call in update.call_args_list) == [
+        ("./one/module", "-j REL_1"), ("./two/module", "-j REL_1")]
@@ -0,0 +1,116 @@
+import pytest
+from pycvs import annotate, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import os
+from colorama import Fore
+
+import fake_cvs
+
+
+def test_parse():
+    lines = ["1.1          (alice    01-Mar-16): int main()",
+             "1.12.2.1     (averylon 10-Mar-16): {",
+             "1.2          (bob      10-Mar-16): ",
+             "1.1          (alice    01-Mar-16):     return 0; // (x): y"]
+
+    annotations = annotate.parse(lines)
+
+    assert annotations == [
+        ("1.1", "alice", "01-Mar-16", "int main()"),
+        ("1.12.2.1", "averylon", "10-Mar-16", "{"),
+        ("1.2", "bob", "10-Mar-16", ""),
+        ("1.1", "alice", "01-Mar-16", "    return 0; // (x): y")]
+    assert [annotate.format_annotation(annotation)
+            for annotation in annotations] == lines
+
+
+def test_cache(tmp_path):
+    cache = annotate.AnnotateCache(":pserver:dev@host:/cvsroot",
+                                   str(tmp_path), max_size=200)
+    first = [annotate.Annotation("1.1", "alice", "01-Mar-16", "x")]
+    second = [annotate.Annotation("1.2", "bob", "10-Mar-16", "y")]
+
+    cache.put("/cvsroot/module/x.c,v", "1.1", first)
+    cache.put("/cvsroot/module/x.c,v", "1.2", second)
+    os.utime(cache._file_path("/cvsroot/module/x.c,v", "1.1"), (0, 0))
+    cache.trim()
+
+    assert cache.get("/cvsroot/module/x.c,v", "1.1") is None
+    assert cache.get("/cvsroot/module/x.c,v", "1.2") == second
+    assert annotate.AnnotateCache(":pserver:other:/cvsroot",
+                                  str(tmp_path)).get(
+        "/cvsroot/module/x.c,v", "1.2") is None
+
+
+@pytest.fixture
+def working_copy(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository()
+    repository.commit("module/top.c", b"one\ntwo\n", author="alice",
+                      date="2016/03/01 10:00:00")
+    repository.commit("module/top.c", b"one\n2\nthree\n", author="bob",
+                      date="2016/03/10 10:00:00")
+    repository.commit("module/a/x.c", b"x\n", author="carol",
+                      date="2016/03/02 10:00:00")
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    opened = mocker.patch.object(protocol.Connection, 'open',
+                                 side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev",
+                       "annotate_cache_dir": str(tmp_path / "cache")}
+    monkeypatch.chdir(str(tmp_path))
+    mocker.patch('builtins.print')
+    obj._checkout(["module"])
+    monkeypatch.chdir(str(tmp_path / "module"))
+    return obj, opened, repository
+
+
+def test_annotate(working_copy, capsys, mocker):
+    obj, opened, repository = working_copy
+    spy = mocker.spy(PyCvs, '_access_cvs')
+
+    obj._annotate(["--no-pager"])
+    output = capsys.readouterr().out
+
+    assert output == (
+        "Annotations for top.c\n"
+        "***************\n"
+        "1.1          (alice    01-Mar-16): one\n"
+        "1.2          (bob      10-Mar-16): 2\n"
+        "1.2          (bob      10-Mar-16): three\n"
+        "Annotations for a/x.c\n"
+        "***************\n"
+        "1.1          (carol    02-Mar-16): x\n")
+    assert sorted(call[0][1] for call in spy.call_args_list) == [
+        "cvs -d :pserver:dev@host:/cvsroot -Q rannotate -r 1.1 module/a/x.c",
+        "cvs -d :pserver:dev@host:/cvsroot -Q rannotate -r 1.2 module/top.c"]
+
+    # The working revisions are cached
+    calls = opened.call_count
+    obj._annotate(["--no-pager", "top.c", "a"])
+    assert capsys.readouterr().out == output
+    assert opened.call_count == calls
+
+
+def test_annotate_revision(working_copy, capsys, monkeypatch):
+    obj, opened, repository = working_copy
+    monkeypatch.setenv("PYCVS_COLOR", "always")
+
+    obj._annotate(["--no-pager", "-r", "1.1", "top.c"])
+    obj._annotate(["--no-pager", "-r", "1.7", "top.c"])
+
+    assert capsys.readouterr().out == (
+        "Annotations for top.c\n"
+        "***************\n" + Fore.GREEN +
+        "1.1          (alice    01-Mar-16): " + Fore.RESET + "one\n"
+        + Fore.GREEN +
+        "1.1          (alice    01-Mar-16): " + Fore.RESET + "two\n"
+        "Could not annotate top.c\n")
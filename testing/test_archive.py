@@ -0,0 +1,85 @@
+import pytest
+from pycvs import archive, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import tarfile
+import zipfile
+
+import fake_cvs
+
+
+def test_parse_listing():
+    lines = ["module:",
+             "/top.c/1.1/Tue Mar  1 10:00:00 2016//",
+             "D/a////",
+             "",
+             "module/a:",
+             "/logo.png/1.3/Tue Mar  1 10:00:00 2016/-kb/"]
+
+    assert list(archive.parse_listing(lines)) == [
+        ("module/top.c", "1.1", ""),
+        ("module/a/logo.png", "1.3", "-kb")]
+
+
+@pytest.fixture
+def pycvs(mocker):
+    repository = fake_cvs.FakeRepository({
+        "module/top.c": b"top\n",
+        "module/a/x.c": b"x\r\n",
+        "module/a/logo.png": bytes(range(256)),
+        "module/b/y.c": b"y"})
+    repository.tag("REL_1")
+    repository.commit("module/a/x.c", b"x2\n")
+    repository.commit("module/b/new.c", b"new\n")
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    opened = mocker.patch.object(protocol.Connection, 'open',
+                                 side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev"}
+    mocker.patch('builtins.print')
+    return obj, opened
+
+
+EXPECTED = {"a/logo.png": bytes(range(256)), "a/x.c": b"x\r\n",
+            "top.c": b"top\n", "b/y.c": b"y"}
+
+
+def test_archive_tar(pycvs, tmp_path):
+    obj, opened = pycvs
+    output = tmp_path / "module-REL_1.tar.gz"
+
+    obj._archive(["REL_1", "module", "-j", "2", "-o", str(output)])
+
+    with tarfile.open(str(output)) as tar_file:
+        members = tar_file.getmembers()
+        contents = {member.name: tar_file.extractfile(member).read()
+                    for member in members}
+    assert contents == {"module/" + name: data
+                        for name, data in EXPECTED.items()}
+    assert [member.name for member in members] == [
+        "module/top.c", "module/a/logo.png", "module/a/x.c", "module/b/y.c"]
+    assert members[0].mode == 0o644
+    # The listing, then one connection per worker
+    assert opened.call_count <= 3
+
+
+def test_archive_zip(pycvs, tmp_path):
+    obj, opened = pycvs
+    output = tmp_path / "release.zip"
+
+    obj._archive(["REL_1", "module", "--prefix", "release-1.0",
+                  "-o", str(output)])
+
+    with zipfile.ZipFile(str(output)) as zip_file:
+        contents = {name: zip_file.read(name)
+                    for name in zip_file.namelist()}
+    assert contents == {"release-1.0/" + name: data
+                        for name, data in EXPECTED.items()}
@@ -0,0 +1,82 @@
+import pytest
+from pycvs import batch, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import io
+import json
+import sys
+
+import fake_cvs
+from test_protocol import checkout
+
+
+def test_parse_command():
+    assert batch.parse_command("log -h 'a b.c'") == {
+        "argv": ["log", "-h", "a b.c"]}
+    assert batch.parse_command('["status", "--local"]') == {
+        "argv": ["status", "--local"]}
+    assert batch.parse_command(
+        '{"id": "x", "argv": ["status"], "cwd": "/tmp"}') == {
+        "id": "x", "argv": ["status"], "cwd": "/tmp"}
+    assert batch.parse_command("  # comment") is None
+    with pytest.raises(ValueError):
+        batch.parse_command('{"argv": []}')
+    with pytest.raises(ValueError):
+        batch.parse_command('{"argv": ')
+
+
+def test_batch(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n",
+                                          "module/b.c": b"b\n"})
+    checkout(tmp_path, repository)
+    (tmp_path / "module" / "a.c").write_text("changed\n")
+    servers = []
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        servers.append(server)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    obj = PyCvs({"root": ":fork:/cvsroot", "password": "", "user": "dev",
+                 "log_cache_dir": str(tmp_path / "cache")})
+    monkeypatch.chdir(str(tmp_path))
+    out = io.StringIO()
+    lines = ['{"id": "first", "argv": ["status"], "cwd": "module"}',
+             "",
+             '["status", "--local"]',
+             "{broken",
+             "daemon",
+             '{"argv": ["conflicts"], "cwd": "module"}',
+             '{"argv": ["log", "--no-pager", "b.c"], "cwd": "module"}']
+
+    failed = batch.Batch(obj, out).run(lines)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert failed == 3
+    assert [record["id"] for record in records] == ["first", 3, 4, 5, 6, 7]
+    assert records[0]["exit"] == 0
+    assert "./a.c" in records[0]["output"]
+    # Not a working copy
+    assert records[1]["exit"] == 1
+    assert "error" in records[2] and "error" in records[3]
+    assert records[4] == {"id": 6, "argv": ["conflicts"], "exit": 0,
+                          "output": "", "seconds": records[4]["seconds"]}
+    assert "RCS file: /cvsroot/module/b.c,v" in records[5]["output"]
+    # All the commands went through the same connection
+    assert len(servers) == 1
+    assert servers[0].requests.count("valid-requests") == 1
+    assert str(tmp_path) == str(tmp_path.cwd())
+
+
+def test_batch_command(mocker, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["pycvs", "batch"])
+    monkeypatch.setattr(sys, "stdin", io.StringIO("nothing\n"))
+    obj = PyCvs({})
+
+    obj.process()
+
+    record = json.loads(capsys.readouterr().out)
+    assert record["output"] == "Unknown command nothing\n"
+    assert record["exit"] == 0
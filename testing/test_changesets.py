@@ -0,0 +1,128 @@
+import pytest
+from pycvs import changesets, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import time
+
+import fake_cvs
+
+
+def test_previous_revision():
+    assert changesets.previous_revision("1.5") == "1.4"
+    assert changesets.previous_revision("1.2.2.1") == "1.2"
+    assert changesets.previous_revision("1.2.2.3") == "1.2.2.2"
+    assert changesets.previous_revision("1.1") is None
+
+
+def test_branch_of():
+    branches = changesets.branch_names([("REL_1", "1.2"),
+                                        ("FEATURE", "1.2.0.2"),
+                                        ("VENDOR", "1.1.1")])
+
+    assert changesets.branch_of("1.3", branches) == "HEAD"
+    assert changesets.branch_of("1.2.2.1", branches) == "FEATURE"
+    assert changesets.branch_of("1.1.1.1", branches) == "VENDOR"
+    assert changesets.branch_of("1.3.4.1", branches) == "1.3.4"
+
+
+def test_group():
+    revisions = [
+        # file, revision, date, author, branch, commitid, message
+        ("a", "1.2", 1000, "bob", "HEAD", None, "fix"),
+        ("b", "1.5", 1100, "bob", "HEAD", None, "fix"),
+        ("c", "1.1", 1050, "alice", "HEAD", None, "fix"),
+        ("a", "1.3", 1200, "bob", "HEAD", None, "fix"),
+        ("d", "1.1", 2000, "bob", "HEAD", None, "fix"),
+        ("e", "1.1.2.1", 1010, "bob", "BR", None, "fix"),
+        ("f", "1.1", 5000, "carol", "HEAD", "X1", "big"),
+        ("g", "1.1", 9000, "carol", "HEAD", "X1", "big"),
+    ]
+
+    groups = changesets.group(revisions, fuzz=300)
+
+    assert [[member[:2] for member in members] for members in groups] == [
+        [("a", "1.2"), ("b", "1.5")],
+        [("e", "1.1.2.1")],
+        [("c", "1.1")],
+        [("a", "1.3")],
+        [("d", "1.1")],
+        [("f", "1.1"), ("g", "1.1")]]
+
+
+@pytest.fixture
+def working_copy(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository()
+    repository.commit("module/top.c", b"top\n", author="alice",
+                      date="2016/03/01 10:00:00", message="Initial import")
+    repository.commit("module/a/x.c", b"x\n", author="alice",
+                      date="2016/03/01 10:00:30", message="Initial import")
+    repository.commit("module/a/x.c", b"x2\n", author="bob",
+                      date="2016/03/10 10:00:00", message="Fix x")
+    repository.commit("module/top.c", b"top2\n", author="bob",
+                      date="2016/03/10 10:01:00", message="Fix x")
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev",
+                       "history_dir": str(tmp_path / "history"),
+                       "history_refresh": 0}
+    monkeypatch.chdir(str(tmp_path))
+    mocker.patch('builtins.print')
+    obj._checkout(["module"])
+    monkeypatch.chdir(str(tmp_path / "module"))
+    return obj, repository
+
+
+def test_list_changesets(working_copy, capsys):
+    obj, repository = working_copy
+
+    obj._changesets(["--no-pager"])
+
+    output = capsys.readouterr().out
+    assert "PatchSet 1\nDate: 2016/03/01 10:00:00\nAuthor: alice\n" \
+        "Branch: HEAD\nTag: (none)\nLog:\nInitial import\n\nMembers:\n" \
+        "\ta/x.c:INITIAL->1.1\n\ttop.c:INITIAL->1.1\n" in output
+    assert "\ta/x.c:1.1->1.2\n\ttop.c:1.1->1.2\n" in output
+    assert "PatchSet 3" not in output
+
+
+def test_changesets_are_kept(working_copy, capsys):
+    obj, repository = working_copy
+    obj._changesets(["--no-pager"])
+    now = time.strftime("%Y/%m/%d %H:%M:%S", time.gmtime())
+    repository.commit("module/top.c", b"top3\n", author="carol",
+                      date=now, message="Third")
+    capsys.readouterr()
+
+    obj._changesets(["--no-pager", "--author", "carol"])
+
+    output = capsys.readouterr().out
+    assert "PatchSet 3\n" in output
+    assert "\ttop.c:1.2->1.3\n" in output
+
+
+def test_show_changeset(working_copy, capsys, mocker):
+    obj, repository = working_copy
+    spy = mocker.spy(PyCvs, '_access_cvs')
+
+    obj._changesets(["--no-pager", "2"])
+
+    output = capsys.readouterr().out
+    assert "Index: a/x.c\n" in output
+    assert "-x\n+x2\n" in output
+    assert "-top\n+top2\n" in output
+    fetched = sorted(call[0][1] for call in spy.call_args_list
+                     if " co -p " in call[0][1])
+    assert fetched == [
+        "cvs -d :pserver:dev@host:/cvsroot -Q co -p -r 1.1 module/a/x.c",
+        "cvs -d :pserver:dev@host:/cvsroot -Q co -p -r 1.1 module/top.c",
+        "cvs -d :pserver:dev@host:/cvsroot -Q co -p -r 1.2 module/a/x.c",
+        "cvs -d :pserver:dev@host:/cvsroot -Q co -p -r 1.2 module/top.c"]
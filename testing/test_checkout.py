@@ -0,0 +1,118 @@
+import pytest
+from pycvs import protocol
+from pycvs.cli import PyCvs
+from pycvs.local import WorkingCopy, read_entries
+
+# Imports for mocking
+import os
+
+import fake_cvs
+
+
+def get_pycvs(mocker, repository):
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev"}
+    return obj
+
+
+def list_tree(path):
+    tree = []
+    for directory, dirs, names in os.walk(path):
+        dirs.sort()
+        for name in sorted(names):
+            if not name.startswith("Entries"):
+                tree.append(os.path.relpath(os.path.join(directory, name),
+                                            path))
+    return tree
+
+
+@pytest.fixture
+def repository():
+    files = {"module/top.c": b"top\n"}
+    for shard in ("a", "b", "c"):
+        files["module/{0}/x.c".format(shard)] = b"x\n"
+        files["module/{0}/deep/y.c".format(shard)] = b"y\n"
+    return fake_cvs.FakeRepository(files)
+
+
+def test_parallel_checkout(tmp_path, mocker, monkeypatch, repository):
+    obj = get_pycvs(mocker, repository)
+    pint = mocker.patch('builtins.print')
+    monkeypatch.chdir(str(tmp_path))
+    os.mkdir("serial")
+    os.mkdir("parallel")
+
+    monkeypatch.chdir(str(tmp_path / "serial"))
+    obj._checkout(["module"])
+    serial_calls = pint.call_args_list[:]
+    pint.reset_mock()
+    monkeypatch.chdir(str(tmp_path / "parallel"))
+    obj._checkout(["--jobs", "3", "module"])
+
+    assert pint.call_args_list == serial_calls
+    pint.assert_any_call("7 files checked out")
+    pint.assert_any_call("7 directories checked out")
+    assert list_tree(str(tmp_path / "parallel")) == \
+        list_tree(str(tmp_path / "serial"))
+    entries = read_entries(str(tmp_path / "parallel" / "module"))
+    assert sorted(name for name, entry in entries.items()
+                  if entry.is_dir) == ["a", "b", "c"]
+    assert WorkingCopy(str(tmp_path / "parallel" / "module")).status() \
+        .modified == []
+
+
+def test_failed_shard_is_retried(tmp_path, mocker, monkeypatch, repository):
+    obj = get_pycvs(mocker, repository)
+    pint = mocker.patch('builtins.print')
+    monkeypatch.chdir(str(tmp_path))
+    original = PyCvs._checkout_module
+    calls = []
+
+    def flaky(self, module, opts, progress=None):
+        calls.append(module)
+        if module == "module/b" and calls.count(module) == 1:
+            return 0, 0, False
+        return original(self, module, opts, progress)
+
+    monkeypatch.setattr(PyCvs, "_checkout_module", flaky)
+
+    obj._checkout(["--jobs=2", "module"])
+
+    assert calls.count("module/b") == 2
+    assert calls.count("module/a") == 1
+    pint.assert_any_call("Retrying checkout of module/b")
+    pint.assert_any_call("7 files checked out")
+    assert (tmp_path / "module" / "b" / "deep" / "y.c").read_bytes() == b"y\n"
+
+
+def test_parallel_checkout_without_rls(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({"module/a/x.c": b"x\n"})
+    obj = get_pycvs(mocker, repository)
+    mocker.patch.object(PyCvs, '_list_subdirs', return_value=None)
+    pint = mocker.patch('builtins.print')
+    monkeypatch.chdir(str(tmp_path))
+
+    obj._checkout(["--jobs", "4", "module"])
+
+    pint.assert_any_call("1 files checked out")
+    assert (tmp_path / "module" / "a" / "x.c").read_bytes() == b"x\n"
+
+
+def test_checkout_join_option(mocker):
+    obj = get_pycvs(mocker, fake_cvs.FakeRepository({}))
+    mocker.patch('builtins.print')
+    checkout = mocker.patch.object(PyCvs, '_checkout_module')
+    checkout.return_value = None
+
+    # -j TAG is the join of cvs, not a number of jobs
+    obj._checkout(["-j", "TAG", "module"])
+
+    checkout.assert_called_once_with("module", "-j TAG", mocker.ANY)
@@ -0,0 +1,108 @@
+import pytest
+from pycvs import compare, protocol, stream
+from pycvs.cli import PyCvs
+
+import fake_cvs
+
+
+def test_parse_summary():
+    lines = ["File module/a.c changed from revision 1.1 to 1.2",
+             "File module/new file.c is new; REL_2 revision 1.1",
+             "File module/old.c is removed; REL_1 revision 1.3",
+             "File module/older.c is removed; not included in release tag "
+             "REL_2",
+             "cvs rdiff: Diffing module"]
+
+    changes = list(compare.parse_summary(lines))
+
+    assert changes == [("modified", "module/a.c", "1.1", "1.2"),
+                       ("added", "module/new file.c", None, "1.1"),
+                       ("removed", "module/old.c", "1.3", None),
+                       ("removed", "module/older.c", None, None)]
+    assert [compare.format_change(change) for change in changes] == [
+        "modified  module/a.c 1.1 -> 1.2",
+        "added     module/new file.c 1.1",
+        "removed   module/old.c 1.3",
+        "removed   module/older.c"]
+
+
+@pytest.fixture
+def pycvs(mocker):
+    repository = fake_cvs.FakeRepository({
+        "module/top.c": b"top\n",
+        "module/a/x.c": b"x\n",
+        "module/a/gone.c": b"gone\n",
+        "module/b/y.c": b"y\n"})
+    repository.tag("REL_1")
+    repository.commit("module/a/x.c", b"x2\n")
+    repository.commit("module/b/new.c", b"new\n")
+    repository.tag("REL_2", [path for path in repository.files
+                             if path != "module/a/gone.c"])
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev"}
+    return obj
+
+
+def test_compare(pycvs, capsys, mocker):
+    spy = mocker.spy(PyCvs, '_access_cvs')
+
+    pycvs._compare(["REL_1", "REL_2", "module", "-j", "4", "--no-pager"])
+
+    assert capsys.readouterr().out == (
+        "removed   module/a/gone.c 1.1\n"
+        "modified  module/a/x.c 1.1 -> 1.2\n"
+        "added     module/b/new.c 1.1\n"
+        "1 modified, 1 added, 1 removed\n")
+    root = "cvs -d :pserver:dev@host:/cvsroot "
+    assert sorted(call[0][1] for call in spy.call_args_list) == [
+        root + "-Q rdiff -s -r REL_1 -r REL_2 -l module",
+        root + "-Q rdiff -s -r REL_1 -r REL_2 module/a",
+        root + "-Q rdiff -s -r REL_1 -r REL_2 module/b",
+        root + "rls -e module"]
+
+
+def test_compare_diff(pycvs, capsys):
+    pycvs._compare(["REL_1", "REL_2", "module", "--diff", "--no-pager"])
+
+    output = capsys.readouterr().out
+    assert output.startswith("removed   module/a/gone.c 1.1\n")
+    assert ("Index: module/a/x.c\n"
+            "diff -u module/a/x.c:1.1 module/a/x.c:1.2\n"
+            "--- module/a/x.c:1.1\n"
+            "+++ module/a/x.c\n"
+            "@@ -1 +1 @@\n"
+            "-x\n"
+            "+x2\n") in output
+    assert "+++ /dev/null\n@@ -1 +0,0 @@\n-gone\n" in output
+    assert "--- /dev/null\n+++ module/b/new.c\n" in output
+
+
+def test_compare_reader_gone(pycvs, mocker):
+    mocker.patch.object(stream.Pager, 'write', side_effect=BrokenPipeError)
+    terminate = mocker.spy(protocol.Session, 'terminate')
+    opened = []
+    access = PyCvs._access_cvs
+
+    def access_cvs(self, *args, **kwargs):
+        cvs_obj = access(self, *args, **kwargs)
+        opened.append(cvs_obj)
+        return cvs_obj
+
+    mocker.patch.object(PyCvs, '_access_cvs', access_cvs)
+
+    pycvs._compare(["REL_1", "REL_2", "module", "-j", "4", "--no-pager"])
+
+    # The shards started ahead are not left running
+    terminated = [call[0][0] for call in terminate.call_args_list]
+    assert terminated
+    assert all(cvs_obj.exitstatus is not None or cvs_obj in terminated
+               for cvs_obj in opened)
@@ -0,0 +1,123 @@
+import pytest
+from pycvs import conflicts, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import os
+import time
+
+import fake_cvs
+
+MERGED = (b"one\n"
+          b"<<<<<<< top.c\n"
+          b"mine\n"
+          b"=======\n"
+          b"theirs\n"
+          b">>>>>>> 1.2\n"
+          b"two\n"
+          b"  <<<<<<< not a marker\n"
+          b"<<<<<<< top.c\n"
+          b"=======\n"
+          b">>>>>>> 1.2")
+
+
+def edit(path, data):
+    with open(path, "wb") as changed:
+        changed.write(data)
+    past = time.time() - 3600
+    os.utime(path, (past, past))
+
+
+def test_scan_file(tmp_path):
+    path = tmp_path / "top.c"
+    path.write_bytes(MERGED)
+    (tmp_path / ".#top.c.1.1").write_bytes(b"one\nmine\ntwo\n")
+    (tmp_path / "empty.c").write_bytes(b"")
+
+    assert conflicts.scan_file(str(path)) == [
+        (str(path), 2, 6, "1.1", "1.2"),
+        (str(path), 9, 11, "1.1", "1.2")]
+    assert conflicts.scan_file(str(tmp_path / "empty.c")) == []
+
+
+@pytest.fixture
+def working_copy(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({
+        "module/top.c": b"one\ntwo\n",
+        "module/clean.c": b"clean\n",
+        "module/a/logo.png": b"<<<<<<< top.c\n>>>>>>> 1.2\n"})
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev"}
+    monkeypatch.chdir(str(tmp_path))
+    printed = mocker.patch('builtins.print')
+    obj._checkout(["module"])
+    monkeypatch.chdir(str(tmp_path / "module"))
+
+    edit("top.c", MERGED)
+    edit(os.path.join("a", "logo.png"), b"<<<<<<< x\n>>>>>>> 1.3\n")
+    with open(os.path.join("a", "CVS", "Entries")) as entries:
+        lines = entries.read().replace("//\n", "/-kb/\n")
+    with open(os.path.join("a", "CVS", "Entries"), "w") as entries:
+        entries.write(lines)
+    printed.reset_mock()
+    return obj, printed
+
+
+def test_conflicts(working_copy, mocker):
+    obj, printed = working_copy
+
+    with pytest.raises(SystemExit):
+        obj._conflicts([])
+
+    # The binary file is not looked at
+    assert printed.call_args_list == [
+        mocker.call("top.c:2-6: working copy (?) vs 1.2"),
+        mocker.call("top.c:9-11: working copy (?) vs 1.2")]
+
+
+def test_status_lists_conflicts(working_copy, capsys):
+    obj, printed = working_copy
+
+    obj._status(["--local"])
+
+    output = capsys.readouterr().out
+    assert "Unresolved conflicts:\n" in output
+    assert "\tconflict:\ttop.c, lines 2-6\n" in output
+
+
+def test_status_scans_changed_files_only(working_copy, mocker):
+    obj, printed = working_copy
+    scan_file = mocker.spy(conflicts, 'scan_file')
+
+    obj._status(["--local"])
+
+    # Only the file the status found modified, no second walk
+    assert [call[0][0] for call in scan_file.call_args_list] == ["top.c"]
+    assert not os.path.exists(os.path.join("a", "CVS", "pycvs.idx"))
+
+
+def test_conflicts_in_subdirectory(working_copy):
+    obj, printed = working_copy
+
+    assert conflicts.scan(["a"]) == []
+    # The index is only kept for the directory the command runs in
+    assert not os.path.exists(os.path.join("a", "CVS", "pycvs.idx"))
+
+
+def test_status_from_server_lists_conflicts(working_copy, capsys):
+    obj, printed = working_copy
+
+    obj._status([])
+
+    output = capsys.readouterr().out
+    assert "Unresolved conflicts:\n" in output
+    assert "\tconflict:\ttop.c, lines 2-6\n" in output
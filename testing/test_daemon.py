@@ -0,0 +1,83 @@
+import pytest
+from pycvs import daemon, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import os
+import threading
+import time
+
+import fake_cvs
+from test_protocol import checkout
+
+
+def start_daemon(mocker, socket_path, repository, **credentials):
+    rfile, wfile, server = fake_cvs.start(repository)
+    mocker.patch.object(protocol.Connection, 'open',
+                        return_value=protocol.Connection(rfile, wfile))
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    pycvs = PyCvs()
+    pycvs.credentials = dict({"root": ":fork:/cvsroot", "password": "",
+                              "user": "dev"}, **credentials)
+    instance = daemon.Daemon(pycvs, socket_path=socket_path, idle_timeout=1)
+    thread = threading.Thread(target=instance.serve_forever, daemon=True)
+    thread.start()
+    while not os.path.exists(socket_path):
+        time.sleep(0.01)
+
+    return thread, server
+
+
+def test_no_daemon(tmp_path):
+    assert daemon.run_client(["status"], str(tmp_path / "none.sock")) is None
+
+
+def test_status_through_daemon(tmp_path, mocker, monkeypatch, capsysbinary):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n",
+                                          "module/b.c": b"b\n"})
+    checkout(tmp_path, repository)
+    (tmp_path / "module" / "a.c").write_text("changed\n")
+    socket_path = str(tmp_path / "pycvs.sock")
+    thread, server = start_daemon(mocker, socket_path, repository)
+    monkeypatch.chdir(str(tmp_path / "module"))
+
+    first = daemon.run_client(["status"], socket_path)
+    second = daemon.run_client(["status"], socket_path)
+    output = capsysbinary.readouterr().out
+
+    assert first == 0 and second == 0
+    assert output.count(b"On branch HEAD") == 2
+    assert output.count(b"./a.c") == 2
+    # Both commands used the same warm connection
+    assert server.requests.count("valid-requests") == 1
+    thread.join(5)
+    assert not os.path.exists(socket_path)
+
+
+def test_compressed_through_daemon(tmp_path, mocker, monkeypatch,
+                                   capsysbinary):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n"})
+    checkout(tmp_path, repository)
+    (tmp_path / "module" / "a.c").write_text("changed\n")
+    socket_path = str(tmp_path / "pycvs.sock")
+    servers = []
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        servers.append(server)
+        return protocol.Connection(rfile, wfile)
+
+    thread, _ = start_daemon(mocker, socket_path, repository, compression=3)
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    monkeypatch.chdir(str(tmp_path / "module"))
+
+    codes = [daemon.run_client(["status"], socket_path) for _ in range(3)]
+    output = capsysbinary.readouterr().out
+
+    assert codes == [0, 0, 0]
+    assert output.count(b"./a.c") == 3
+    # A compressed connection is not handed to the next command
+    assert len(servers) == 3
+    assert all("Gzip-stream 3" in server.requests for server in servers)
+    thread.join(5)
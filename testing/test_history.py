@@ -0,0 +1,98 @@
+import pytest
+from pycvs import history, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import calendar
+import time
+
+import fake_cvs
+
+
+def now():
+    return time.strftime("%Y/%m/%d %H:%M:%S", time.gmtime())
+
+
+def test_parse_since():
+    expected = calendar.timegm((2016, 3, 20, 0, 0, 0))
+
+    assert history.parse_since("2016-03-20") == expected
+    assert history.parse_since("2016/03/20 10:30") == expected + 37800
+    assert abs(history.parse_since("2 weeks ago") -
+               (time.time() - 14 * 86400)) < 5
+    with pytest.raises(ValueError):
+        history.parse_since("last month")
+
+
+@pytest.fixture
+def working_copy(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository()
+    repository.commit("module/top.c", b"top\n", author="alice",
+                      date="2016/03/01 10:00:00", message="Initial import")
+    repository.commit("module/a/x.c", b"x\n", author="alice",
+                      date="2016/03/01 10:00:00", message="Initial import")
+    repository.commit("module/a/x.c", b"x2\n", author="bob",
+                      date="2016/03/10 10:00:00", message="Fix the parser")
+    repository.commit("module/ab.c", b"ab\n", author="bob",
+                      date="2016/03/20 10:00:00", message="Add ab")
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev",
+                       "history_dir": str(tmp_path / "history")}
+    monkeypatch.chdir(str(tmp_path))
+    mocker.patch('builtins.print')
+    obj._checkout(["module"])
+    monkeypatch.chdir(str(tmp_path / "module"))
+
+    spawned = []
+    access_cvs = obj._access_cvs
+
+    def spy(cmd, *args, **kwargs):
+        spawned.append(cmd)
+        return access_cvs(cmd, *args, **kwargs)
+    obj._access_cvs = spy
+
+    return obj, repository, spawned
+
+
+def found(capsys):
+    return [line for line in capsys.readouterr().out.split("\n")
+            if line.endswith((" 1.1", " 1.2"))]
+
+
+def test_log_filters(working_copy, capsys):
+    obj, repository, spawned = working_copy
+
+    obj._log(["--no-pager", "--author", "bob"])
+    assert found(capsys) == ["ab.c 1.1", "a/x.c 1.2"]
+    obj._log(["--no-pager", "--path", "a"])
+    assert found(capsys) == ["a/x.c 1.2", "a/x.c 1.1"]
+    obj._log(["--no-pager", "--grep", "parser"])
+    assert found(capsys) == ["a/x.c 1.2"]
+    obj._log(["--no-pager", "--since", "2016-03-05", "--author", "alice"])
+    assert found(capsys) == []
+
+    # Built once, then used as it is
+    assert spawned == ["cvs -d :pserver:dev@host:/cvsroot rlog module"]
+
+
+def test_log_refreshes_the_index(working_copy, capsys):
+    obj, repository, spawned = working_copy
+    obj._log(["--no-pager", "--author", "carol"])
+    assert found(capsys) == []
+    repository.commit("module/top.c", b"top2\n", author="carol",
+                      date=now(), message="Update top")
+    obj.credentials["history_refresh"] = 0
+
+    obj._log(["--no-pager", "--author", "carol"])
+
+    assert found(capsys) == ["top.c 1.2"]
+    assert "rlog -S -d '>" in spawned[1]
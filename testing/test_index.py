@@ -0,0 +1,64 @@
+import pytest
+from pycvs import local
+from pycvs.index import INDEX_FILE, CorruptIndex, StatIndex
+from pycvs.local import WorkingCopy
+
+import os
+
+from test_local import make_tree
+
+OLD = 1000000000
+
+
+def age_tree(root):
+    """
+    Move every mtime of the tree far enough in the past to be trusted.
+    """
+    for path, dirs, names in os.walk(root):
+        for name in names:
+            full = os.path.join(path, name)
+            if os.stat(full).st_mtime > OLD:
+                os.utime(full, (OLD + 5, OLD + 5))
+        os.utime(path, (OLD + 5, OLD + 5))
+
+
+def test_index_reused(tmp_path, mocker):
+    root = str(tmp_path)
+    make_tree(root)
+    age_tree(root)
+    first = WorkingCopy(root, use_index=True).status()
+    assert os.path.isfile(os.path.join(root, INDEX_FILE))
+
+    spy = mocker.spy(local, "read_entries")
+    second = WorkingCopy(root, use_index=True).status()
+
+    assert spy.call_count == 0
+    assert vars(second) == vars(first)
+
+
+def test_index_detects_changes(tmp_path, mocker):
+    root = str(tmp_path)
+    make_tree(root)
+    age_tree(root)
+    WorkingCopy(root, use_index=True).status()
+
+    os.utime(os.path.join(root, "clean.py"), (OLD + 60, OLD + 60))
+    spy = mocker.spy(local, "read_entries")
+    files = WorkingCopy(root, use_index=True).status()
+
+    assert spy.call_count == 1
+    assert sorted(files.modified) == ["./clean.py", "lib/modified.py"]
+
+
+def test_corrupt_index_rebuilt(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    with open(os.path.join(root, INDEX_FILE), "wb") as index_file:
+        index_file.write(b"PYCVSIDX garbage")
+
+    with pytest.raises(CorruptIndex):
+        StatIndex.load(root)
+    files = WorkingCopy(root, use_index=True).status()
+
+    assert files.modified == ["lib/modified.py"]
+    assert "." in StatIndex.load(root).dirs
@@ -0,0 +1,103 @@
+import pytest
+from pycvs.data import FILE_KINDS
+from pycvs.local import IgnoreRules, WorkingCopy, file_timestamp, read_entries
+from pycvs.parser import StatusParser
+
+import os
+
+
+def make_tree(root):
+    """
+    Build a small working copy with one file in each interesting state.
+    """
+    def write(path, entries):
+        os.makedirs(os.path.join(root, path, "CVS"))
+        with open(os.path.join(root, path, "CVS", "Entries"), "w") as f:
+            f.write(entries)
+        with open(os.path.join(root, path, "CVS", "Repository"), "w") as f:
+            f.write("module/" + path + "\n")
+
+    clean = os.path.join(root, "clean.py")
+    modified = os.path.join(root, "lib", "modified.py")
+    os.makedirs(os.path.join(root, "lib"))
+    for path in (clean, modified, os.path.join(root, "added.py"),
+                 os.path.join(root, "notes.txt"),
+                 os.path.join(root, "lib", "conflict.py"),
+                 os.path.join(root, "lib", "build.o")):
+        with open(path, "w") as f:
+            f.write("content\n")
+    os.utime(clean, (1000000000, 1000000000))
+    os.utime(modified, (1000000000, 1000000000))
+    stamp = file_timestamp(1000000000)
+
+    write(".", "/clean.py/1.1/{0}//\n"
+               "/added.py/0/dummy timestamp//\n"
+               "/gone.py/-1.2/{0}//\n"
+               "D/lib////\n".format(stamp))
+    write("lib", "/modified.py/1.4/Thu Jan  1 00:00:00 1970//\n"
+                 "/conflict.py/1.2/Result of merge+{0}//\n"
+                 "/.cvsignore/1.1/{0}//\n"
+                 "D\n".format(stamp))
+    with open(os.path.join(root, "lib", ".cvsignore"), "w") as f:
+        f.write("*.tmp\n")
+    os.utime(os.path.join(root, "lib", ".cvsignore"),
+             (1000000000, 1000000000))
+    with open(os.path.join(root, "lib", "cache.tmp"), "w") as f:
+        f.write("ignored\n")
+
+
+# What `cvs status` reports for the same tree
+SERVER_OUTPUT = b"""? notes.txt\r
+cvs status: Examining .\r
+File: clean.py         \tStatus: Up-to-date\r
+File: added.py         \tStatus: Locally Added\r
+File: no file gone.py  \tStatus: Locally Removed\r
+cvs status: Examining lib\r
+File: modified.py      \tStatus: Locally Modified\r
+File: conflict.py      \tStatus: File had conflicts on merge\r
+"""
+
+
+def test_local_status(tmp_path):
+    make_tree(str(tmp_path))
+
+    files = WorkingCopy(str(tmp_path)).status()
+
+    assert files.modified == ["lib/modified.py"]
+    assert files.added == ["./added.py"]
+    assert files.removed == ["./gone.py"]
+    assert files.merged == ["lib/conflict.py"]
+    assert files.new == ["notes.txt"]
+
+
+def test_local_matches_server(tmp_path):
+    make_tree(str(tmp_path))
+
+    local = WorkingCopy(str(tmp_path)).status()
+    server = StatusParser().parse(SERVER_OUTPUT.splitlines())
+
+    for kind in FILE_KINDS + ["conflicts"]:
+        server_files = [name.replace("no file ", "").strip()
+                        for name in getattr(server, kind)]
+        assert sorted(getattr(local, kind)) == sorted(server_files)
+
+
+def test_entries_log(tmp_path):
+    os.makedirs(os.path.join(str(tmp_path), "CVS"))
+    with open(os.path.join(str(tmp_path), "CVS", "Entries"), "w") as f:
+        f.write("/a.py/1.1/Thu Jan  1 00:00:00 1970//\nD\n")
+    with open(os.path.join(str(tmp_path), "CVS", "Entries.Log"), "w") as f:
+        f.write("A /b.py/0/dummy timestamp//\nR /a.py/1.1///\n")
+
+    entries = read_entries(str(tmp_path))
+
+    assert list(entries) == ["b.py"]
+    assert entries["b.py"].revision == "0"
+
+
+def test_ignore_rules():
+    rules = IgnoreRules(["*.o", "core"])
+
+    assert rules.ignored("main.o")
+    assert rules.ignored("core")
+    assert not rules.ignored("main.c")
@@ -0,0 +1,46 @@
+import pytest
+from pycvs.parser import StatusParser
+
+STATUS_OUTPUT = b"""cvs status: Examining .\r
+===================================================================\r
+File: main.py          \tStatus: Up-to-date\r
+\r
+   Working revision:\t1.1\r
+===================================================================\r
+File: setup.py         \tStatus: Needs Patch\r
+\r
+cvs status: Examining lib\r
+===================================================================\r
+File: util.py          \tStatus: Needs Merge\r
+\r
+===================================================================\r
+File: new.py           \tStatus: Locally Added\r
+? lib/scratch.txt\r
+"""
+
+
+def test_parse_lines():
+    files = StatusParser().parse(STATUS_OUTPUT.splitlines(True))
+
+    assert files.outdated == ["./setup.py         "]
+    assert files.merging == ["lib/util.py          "]
+    assert files.added == ["lib/new.py           "]
+    assert files.new == ["lib/scratch.txt"]
+    assert files.modified == []
+
+
+def test_feed_chunks_matches_lines():
+    parser = StatusParser()
+    # Split the output at awkward places, even in the middle of a line
+    for i in range(0, len(STATUS_OUTPUT), 7):
+        parser.feed(STATUS_OUTPUT[i:i + 7])
+    files = parser.close()
+
+    expected = StatusParser().parse(STATUS_OUTPUT.splitlines())
+    assert files.__dict__ == expected.__dict__
+
+
+def test_untracked_without_crlf():
+    files = StatusParser().parse([b"? bla"])
+
+    assert files.new == ["bla"]
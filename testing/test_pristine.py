@@ -0,0 +1,129 @@
+import pytest
+from pycvs import pristine, protocol
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import os
+import time
+
+import fake_cvs
+
+
+def get_pycvs(mocker, repository, store_dir):
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    opened = mocker.patch.object(protocol.Connection, 'open',
+                                 side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev",
+                       "pristine": True, "pristine_dir": str(store_dir)}
+    return obj, opened
+
+
+def edit(path, data):
+    with open(path, "wb") as changed:
+        changed.write(data)
+    past = time.time() - 3600
+    os.utime(path, (past, past))
+
+
+def hunks(output):
+    return [line for line in output.split("\n")
+            if not line.startswith(("---", "+++"))]
+
+
+@pytest.fixture
+def working_copy(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({
+        "module/top.c": b"one\ntwo\nthree\n",
+        "module/a/x.c": b"x\n"})
+    obj, opened = get_pycvs(mocker, repository, tmp_path / "store")
+    monkeypatch.chdir(str(tmp_path))
+    mocker.patch('builtins.print')
+    obj._checkout(["module"])
+    monkeypatch.chdir(str(tmp_path / "module"))
+    return obj, opened, repository
+
+
+def test_checkout_fills_the_store(working_copy):
+    obj, opened, repository = working_copy
+
+    bases = pristine.read_bases("a")
+
+    assert list(bases) == ["x.c"]
+    assert bases["x.c"][0] == "1.1"
+    assert obj._pristine_store().get(bases["x.c"][2]) == b"x\n"
+
+
+def test_diff_is_local(working_copy, capsys):
+    obj, opened, repository = working_copy
+    edit("top.c", b"one\n2\nthree\n")
+    edit(os.path.join("a", "x.c"), b"y\n")
+    capsys.readouterr()
+    local_calls = opened.call_count
+
+    obj._diff(["--no-pager"])
+    local = capsys.readouterr().out
+    assert opened.call_count == local_calls
+
+    obj.credentials["pristine"] = False
+    obj._diff(["--no-pager"])
+    remote = capsys.readouterr().out
+
+    assert "--- top.c\t" in local
+    assert "+++ a/x.c\t" in local
+    assert sorted(hunks(local)) == sorted(hunks(remote))
+
+
+def test_diff_falls_back_to_the_server(working_copy, capsys, tmp_path):
+    obj, opened, repository = working_copy
+    edit("top.c", b"one\n2\nthree\n")
+    edit(os.path.join("a", "x.c"), b"y\n")
+    digest = pristine.read_bases(".")["top.c"][2]
+    os.remove(os.path.join(str(tmp_path / "store"), digest[:2], digest[2:]))
+    capsys.readouterr()
+    spawned = []
+    access_cvs = obj._access_cvs
+
+    def spy(cmd, *args, **kwargs):
+        spawned.append(cmd)
+        return access_cvs(cmd, *args, **kwargs)
+    obj._access_cvs = spy
+
+    obj._diff(["--no-pager"])
+
+    output = capsys.readouterr().out
+    assert spawned == ["cvs diff -u top.c"]
+    assert "Index: top.c" in output
+    assert "Index: a/x.c" in output
+
+
+def test_update_refreshes_the_base(working_copy):
+    obj, opened, repository = working_copy
+    repository.commit("module/a/x.c", b"x2\n")
+
+    obj._update([])
+
+    bases = pristine.read_bases("a")
+    assert bases["x.c"][0] == "1.2"
+    assert obj._pristine_store().get(bases["x.c"][2]) == b"x2\n"
+
+
+def test_trim_evicts_the_least_recently_used(tmp_path):
+    store = pristine.PristineStore(str(tmp_path), max_size=0)
+    digests = [store.put(os.urandom(1000)) for _ in range(3)]
+    for age, digest in zip([30, 10, 20], digests):
+        past = time.time() - age
+        os.utime(store._object_path(digest), (past, past))
+    store.max_size = os.path.getsize(store._object_path(digests[0])) * 2
+
+    store.trim()
+
+    assert store.get(digests[0]) is None
+    assert store.get(digests[1]) is not None
+    assert store.get(digests[2]) is not None
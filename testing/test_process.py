@@ -1,4 +1,5 @@
 import pytest
+from pycvs import commands, config
 from pycvs.cli import PyCvs
 
 # Imports for mocking
@@ -42,8 +43,65 @@ def test_co_no_parameter(mocker):
 def test_checkout_parameters(mocker):
     obj = get_class(mocker)
     mocker.patch.object(sys, 'argv', ['pycvs', 'co', 'module/', 'to', 'test'])
-    check = mocker.patch.object(PyCvs, '_checkout')
+    check = mocker.patch('pycvs.commands.checkout.run')
 
     obj.process()
 
-    check.assert_called_once_with(['module/', 'to', 'test'])
\ No newline at end of file
+    check.assert_called_once_with(obj, ['module/', 'to', 'test'])
+
+def test_help_needs_no_configuration(mocker, capsys):
+    mocker.patch.object(sys, 'argv', ['pycvs', '--help'])
+    init = mocker.patch.object(PyCvs, '__init__')
+
+    assert commands.main() == 0
+
+    assert not init.called
+    out = capsys.readouterr().out
+    assert "checkout, co" in out
+    assert "--workspace" in out
+
+
+def test_unknown_command_needs_no_configuration(mocker):
+    mocker.patch.object(sys, 'argv', ['pycvs', 'frobnicate'])
+    init = mocker.patch.object(PyCvs, '__init__')
+    pint = mocker.patch('builtins.print')
+
+    commands.main()
+
+    assert not init.called
+    pint.assert_called_once_with("Unknown command frobnicate")
+
+
+def test_find_commands():
+    assert commands.find("up").name == "update"
+    assert commands.find("--workspace=src").name == "workspace"
+    assert commands.find("frobnicate") is None
+
+
+def test_configuration_is_cached(tmp_path):
+    path = str(tmp_path / "pycvs.json")
+    with open(path, "w") as cfg_file:
+        cfg_file.write('{"root": ":fork:/cvsroot"}')
+
+    first = config.load(path)
+    first["root"] = "changed by the caller"
+    assert config.load(path) == {"root": ":fork:/cvsroot"}
+
+    with open(path, "w") as cfg_file:
+        cfg_file.write('{"root": ":pserver:host:/cvs", "jobs": 8}')
+    os.utime(path, ns=(0, 0))
+    assert config.load(path) == {"root": ":pserver:host:/cvs", "jobs": 8}
+
+def test_profile_is_not_sent_to_the_daemon(mocker, tmp_path):
+    socket_path = tmp_path / "pycvs.sock"
+    socket_path.touch()
+    mocker.patch.object(config, 'SOCKET_PATH', str(socket_path))
+    mocker.patch.object(sys, 'argv', ['pycvs', 'status', '--profile'])
+    run_client = mocker.patch('pycvs.daemon.run_client', return_value=0)
+    init = mocker.patch.object(PyCvs, '__init__', return_value=None)
+    process = mocker.patch.object(PyCvs, 'process')
+
+    assert commands.main() == 0
+
+    assert not run_client.called
+    assert init.called and process.called
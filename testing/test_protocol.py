@@ -0,0 +1,165 @@
+import pytest
+from pycvs import protocol
+from pycvs.cli import PyCvs
+from pycvs.local import WorkingCopy, read_entries
+from pycvs.parser import StatusParser
+
+# Imports for mocking
+import os
+import time
+
+import fake_cvs
+
+
+def get_client(repository):
+    rfile, wfile, server = fake_cvs.start(repository)
+    connection = protocol.Connection(rfile, wfile)
+    return protocol.CvsClient(":fork:/cvsroot", connection=connection), server
+
+
+def checkout(tmp_path, repository):
+    client, server = get_client(repository)
+    output = list(client.run(["cvs", "co", "module"], cwd=str(tmp_path)))
+    # Let the checkout timestamps get older than the files touched later
+    past = time.time() - 10
+    for path, dirs, names in os.walk(str(tmp_path)):
+        for name in names:
+            if "CVS" not in path:
+                os.utime(os.path.join(path, name), (past, past))
+    for path, dirs, names in os.walk(str(tmp_path)):
+        if not os.path.isfile(os.path.join(path, "CVS", "Entries")):
+            continue
+        entries = read_entries(path)
+        for name, entry in entries.items():
+            if not entry.is_dir:
+                stamp = time.asctime(time.gmtime(past))
+                entries[name] = entry._replace(timestamp=stamp)
+        with open(os.path.join(path, "CVS", "Entries"), "w") as f:
+            for entry in entries.values():
+                f.write("{0}/{1}/{2}/{3}/{4}/{5}\n".format(
+                    "D" if entry.is_dir else "", entry.name, entry.revision,
+                    entry.timestamp, entry.options, entry.tag))
+    return output
+
+
+def test_parse_root():
+    root = protocol.parse_root(":pserver:joe@cvs.example.com:2402/var/cvs")
+
+    assert root.method == "pserver"
+    assert root.user == "joe"
+    assert root.host == "cvs.example.com"
+    assert root.port == 2402
+    assert root.path == "/var/cvs"
+    assert protocol.parse_root("joe@host:/var/cvs").method == "ext"
+    assert protocol.parse_root("/var/cvs").method == "local"
+
+
+def test_split_command_line():
+    parts = protocol.split_command_line(["cvs", "-q", "-d", "/root", "up",
+                                         "-dP", "-r", "BRANCH", "file.c"])
+
+    assert parts == ([("-q", None), ("-d", "/root")], "update",
+                     [("-d", None), ("-P", None), ("-r", "BRANCH")],
+                     ["file.c"])
+
+
+def test_checkout(tmp_path):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n",
+                                          "module/sub/b.c": b"b\n"})
+
+    output = checkout(tmp_path, repository)
+
+    assert ("M", "U module/a.c") in output
+    assert ("E", "cvs server: Updating module/sub") in output
+    assert (tmp_path / "module" / "sub" / "b.c").read_bytes() == b"b\n"
+    assert (tmp_path / "module" / "CVS" / "Repository").read_text() == \
+        "module\n"
+    entries = read_entries(str(tmp_path / "module"))
+    assert entries["a.c"].revision == "1.1"
+    assert entries["sub"].is_dir
+    assert WorkingCopy(str(tmp_path / "module")).status().modified == []
+
+
+def test_status(tmp_path):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n",
+                                          "module/b.c": b"b\n"})
+    checkout(tmp_path, repository)
+    (tmp_path / "module" / "a.c").write_text("changed\n")
+    (tmp_path / "module" / "new.c").write_text("new\n")
+    repository.commit("module/b.c", b"b2\n")
+
+    client, server = get_client(repository)
+    events = client.run(["cvs", "status"], cwd=str(tmp_path / "module"))
+    session = protocol.Session(events, stream=True)
+    files = StatusParser().parse(session)
+
+    assert [name.strip() for name in files.modified] == ["./a.c"]
+    assert [name.strip() for name in files.outdated] == ["./b.c"]
+    assert files.new == ["new.c"]
+    assert "Is-modified a.c" in server.requests
+
+
+def test_update(tmp_path):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n"})
+    checkout(tmp_path, repository)
+    repository.commit("module/a.c", b"a2\n")
+
+    client, server = get_client(repository)
+    output = list(client.run(["cvs", "up"], cwd=str(tmp_path / "module")))
+
+    assert ("M", "U a.c") in output
+    assert (tmp_path / "module" / "a.c").read_bytes() == b"a2\n"
+    assert read_entries(str(tmp_path / "module"))["a.c"].revision == "1.2"
+
+
+def test_add(tmp_path):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n"})
+    checkout(tmp_path, repository)
+    (tmp_path / "module" / "new.c").write_text("new\n")
+
+    client, server = get_client(repository)
+    output = list(client.run(["cvs", "add", "new.c"],
+                             cwd=str(tmp_path / "module")))
+
+    assert ("E", "cvs server: scheduling file `new.c' for addition") in output
+    assert read_entries(str(tmp_path / "module"))["new.c"].revision == "0"
+
+
+def test_compressed_diff(tmp_path):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n" * 1000})
+    checkout(tmp_path, repository)
+    (tmp_path / "module" / "a.c").write_text("b\n" * 1000)
+    measures = []
+
+    client, server = get_client(repository)
+    client.monitor = lambda *measure: measures.append(measure)
+    output = list(client.run(["cvs", "-z6", "diff", "-u"],
+                             cwd=str(tmp_path / "module")))
+
+    assert "Gzip-stream 6" in server.requests
+    assert ("M", "+b") in output
+    assert client.failed
+    level, received, wire, _ = measures[0]
+    assert level == 6
+    assert wire < received / 10
+
+
+def test_cli_uses_protocol(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n"})
+    rfile, wfile, server = fake_cvs.start(repository)
+    mocker.patch.object(protocol.Connection, 'open',
+                        return_value=protocol.Connection(rfile, wfile))
+    spawn = mocker.patch('pexpect.spawn')
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev"}
+    pint = mocker.patch('builtins.print')
+    monkeypatch.chdir(str(tmp_path))
+
+    obj._checkout(["module"])
+
+    spawn.assert_not_called()
+    pint.assert_any_call("1 files checked out")
+    assert (tmp_path / "module" / "a.c").read_bytes() == b"a\n"
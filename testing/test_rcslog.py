@@ -0,0 +1,164 @@
+import pytest
+from pycvs import protocol, rcslog, stream
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import fake_cvs
+
+LOG_OUTPUT = """
+RCS file: /cvsroot/module/main.c,v
+Working file: main.c
+head: 1.3
+branch:
+locks: strict
+access list:
+symbolic names:
+\tREL_1: 1.2
+\tFEATURE: 1.2.0.2
+keyword substitution: kv
+total revisions: 4;\tselected revisions: 4
+description:
+----------------------------
+revision 1.3
+date: 2016-03-21 10:00:00 +0000;  author: bob;  state: Exp;  lines: +2 -1;  commitid: 100056F;
+Fix the build
+----------------------------
+with a line of dashes in the message
+----------------------------
+revision 1.2
+date: 2016/03/20 10:00:00;  author: alice;  state: Exp;  lines: +10 -0;
+branches:  1.2.2;
+Add main loop
+----------------------------
+revision 1.2.2.1
+date: 2016/03/20 11:00:00;  author: alice;  state: Exp;  lines: +1 -1;
+On the branch
+----------------------------
+revision 1.1
+date: 2016/03/19 10:00:00;  author: alice;  state: Exp;
+Initial revision
+=============================================================================
+""".split("\n")
+
+
+def test_parse_log():
+    logs = list(rcslog.LogParser().parse(LOG_OUTPUT))
+
+    assert len(logs) == 1
+    log = logs[0]
+    assert log.rcs_file == "/cvsroot/module/main.c,v"
+    assert log.working_file == "main.c"
+    assert log.head == "1.3"
+    assert log.symbolic_names == [("REL_1", "1.2"), ("FEATURE", "1.2.0.2")]
+    assert (log.total, log.selected) == (4, 4)
+    assert [revision.revision for revision in log.revisions] == \
+        ["1.3", "1.2", "1.2.2.1", "1.1"]
+    newest = log.revisions[0]
+    assert (newest.author, newest.state, newest.lines, newest.commitid) == \
+        ("bob", "Exp", (2, 1), "100056F")
+    assert newest.message == ("Fix the build\n" + "-" * 28 +
+                              "\nwith a line of dashes in the message")
+    assert log.revisions[1].branches == ["1.2.2"]
+    assert log.revisions[3].lines is None
+    assert rcslog.parse_date(newest.date) == \
+        rcslog.parse_date("2016/03/21 10:00:00")
+
+
+def test_format_log_round_trip():
+    log = next(rcslog.LogParser().parse(LOG_OUTPUT))
+
+    assert list(rcslog.format_log(log)) == LOG_OUTPUT[:-1]
+
+
+def test_cache(tmp_path):
+    log = next(rcslog.LogParser().parse(LOG_OUTPUT))
+    cache = rcslog.LogCache(":pserver:dev@host:/cvsroot", str(tmp_path))
+    header = log._replace(selected=None, description=None, revisions=[],
+                          working_file="module/main.c")
+
+    assert cache.get(header) is None
+    assert cache.put(log)
+
+    cached = cache.get(header)
+    assert cached.revisions == log.revisions
+    assert cached.working_file == "module/main.c"
+    assert cache.get(header._replace(head="1.4")) is None
+    assert cache.get(header._replace(total=5)) is None
+    assert rcslog.LogCache("/other", str(tmp_path)).get(header) is None
+
+
+@pytest.fixture
+def working_copy(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({"module/top.c": b"top\n",
+                                          "module/a/x.c": b"x\n"})
+    repository.commit("module/a/x.c", b"x2\n", author="bob")
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev",
+                       "log_cache_dir": str(tmp_path / "cache")}
+    monkeypatch.chdir(str(tmp_path))
+    mocker.patch('builtins.print')
+    obj._checkout(["module"])
+    monkeypatch.chdir(str(tmp_path / "module"))
+
+    spawned = []
+    access_cvs = obj._access_cvs
+
+    def spy(cmd, *args, **kwargs):
+        spawned.append(cmd)
+        return access_cvs(cmd, *args, **kwargs)
+    obj._access_cvs = spy
+
+    return obj, repository, spawned
+
+
+def test_log_uses_the_cache(working_copy, capsys):
+    obj, repository, spawned = working_copy
+    obj.credentials["log_cache"] = False
+    obj._log(["--no-pager"])
+    plain = capsys.readouterr().out
+    # On by default
+    del obj.credentials["log_cache"]
+
+    obj._log(["--no-pager"])
+    first = capsys.readouterr().out
+    obj._log(["--no-pager"])
+    second = capsys.readouterr().out
+
+    # The messages of cvs are kept as well
+    assert "cvs server: Logging a\n" in plain
+    assert first == plain
+    assert second == plain
+    assert spawned == ["cvs log ", "cvs log -h", "cvs log top.c a/x.c",
+                       "cvs log -h"]
+
+
+def test_log_fetches_changed_files(working_copy, capsys):
+    obj, repository, spawned = working_copy
+    obj._log(["--no-pager"])
+    repository.commit("module/top.c", b"top2\n", message="new top")
+    del spawned[:]
+
+    obj._log(["--no-pager"])
+
+    assert spawned == ["cvs log -h", "cvs log top.c"]
+    assert "new top" in capsys.readouterr().out
+
+
+def test_log_falls_back_in_the_same_pager(working_copy, mocker, capsys):
+    obj, repository, spawned = working_copy
+    mocker.patch('pycvs.commands.log._log_cached', return_value=False)
+    pager = mocker.spy(stream.Pager, '__init__')
+
+    obj._log(["--no-pager"])
+
+    assert pager.call_count == 1
+    assert "RCS file: /cvsroot/module/top.c,v" in capsys.readouterr().out
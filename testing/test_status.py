@@ -1,5 +1,6 @@
 import pytest
 from pycvs.cli import PyCvs
+from pycvs.data import FILE_ADDED, FILE_NEW, FileStatus
 
 # Imports for mocking
 import os.path
@@ -23,18 +24,18 @@ def test_no_tag_file(mocker):
 
     pint.assert_called_once_with('On branch HEAD')
 
-def test_no_output(mocker):
+def test_no_output(mocker, capsys):
     obj = get_class(mocker)
     ac_mock = mocker.patch.object(PyCvs, '_access_cvs')
     ac_mock.before = b"\n"
     mocker.patch.object(os.path, 'isfile', return_value=False)
-    pint = mocker.patch('builtins.print')
 
     obj._status()
 
-    pint.assert_has_calls([mocker.call('On branch HEAD'), mocker.call('nothing to commit, working directory clean')])
+    assert capsys.readouterr().out == ('On branch HEAD\n'
+                                       'nothing to commit, working directory clean\n')
 
-def test_locally_modified_crlf(mocker):
+def test_locally_modified_crlf(mocker, capsys):
     obj = get_class(mocker)
     cvs_mock = mocker.MagicMock()
     cvs_mock.before = b"""
@@ -49,17 +50,16 @@ File: EMDG.exe         	Status: Locally Modified\r
    Sticky Options:	-kb\r\n"""
     mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
     mocker.patch.object(os.path, 'isfile', return_value=False)
-    pint = mocker.patch('builtins.print')
 
     obj._status()
 
-    pint.assert_has_calls([mocker.call('Changes staged for commit:'),
-                           mocker.call(' (use cvs commit... to check them in)\n'),
-                           mocker.call(Fore.GREEN, '\tmodified:\t', end=''),
-                           mocker.call('application/3rd_party/EMDG/EMDG.exe         '),
-                           mocker.call(Style.RESET_ALL, '')])
+    assert capsys.readouterr().out == ('On branch HEAD\n'
+                                       'Changes staged for commit:\n'
+                                       ' (use cvs commit... to check them in)\n\n' +
+                                       Fore.GREEN + ' \tmodified:\tapplication/3rd_party/EMDG/EMDG.exe         \n' +
+                                       Style.RESET_ALL + ' \n')
 
-def test_had_conflicts_crlf(mocker):
+def test_had_conflicts_crlf(mocker, capsys):
     obj = get_class(mocker)
     cvs_mock = mocker.MagicMock()
     cvs_mock.before = b"""
@@ -74,17 +74,16 @@ File: EMDG.exe         	Status: File had conflicts on merge\r
    Sticky Options:	-kb\r\n"""
     mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
     mocker.patch.object(os.path, 'isfile', return_value=False)
-    pint = mocker.patch('builtins.print')
 
     obj._status()
 
-    pint.assert_has_calls([mocker.call('Files that had conflicts and need to be committed:'),
-                           mocker.call(' (use cvs commit <file>... to check them in)\n'),
-                           mocker.call(Fore.GREEN, '\tmerged:\t', end=''),
-                           mocker.call('application/3rd_party/EMDG/EMDG.exe         '),
-                           mocker.call(Style.RESET_ALL, '')])
+    assert capsys.readouterr().out == ('On branch HEAD\n'
+                                       'Files that had conflicts and need to be committed:\n'
+                                       ' (use cvs commit <file>... to check them in)\n\n' +
+                                       Fore.GREEN + ' \tmerged:\tapplication/3rd_party/EMDG/EMDG.exe         \n' +
+                                       Style.RESET_ALL + ' \n')
 
-def test_multiple_had_conflicts(mocker):
+def test_multiple_had_conflicts(mocker, capsys):
     obj = get_class(mocker)
     cvs_mock = mocker.MagicMock()
     cvs_mock.before = b"""
@@ -108,19 +107,17 @@ File: rpxl.py         	Status: File had conflicts on merge
    Sticky Options:	-kb\n"""
     mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
     mocker.patch.object(os.path, 'isfile', return_value=False)
-    pint = mocker.patch('builtins.print')
 
     obj._status()
 
-    pint.assert_has_calls([mocker.call('Files that had conflicts and need to be committed:'),
-                           mocker.call(' (use cvs commit <file>... to check them in)\n'),
-                           mocker.call(Fore.GREEN, '\tmerged:\t', end=''),
-                           mocker.call('application/3rd_party/EMDG/EMDG.exe         '),
-                           mocker.call(Fore.GREEN, '\tmerged:\t', end=''),
-                           mocker.call('application/2nd_party/ERP/rpxl.py         '),
-                           mocker.call(Style.RESET_ALL, '')])
+    assert capsys.readouterr().out == ('On branch HEAD\n'
+                                       'Files that had conflicts and need to be committed:\n'
+                                       ' (use cvs commit <file>... to check them in)\n\n' +
+                                       Fore.GREEN + ' \tmerged:\tapplication/3rd_party/EMDG/EMDG.exe         \n' +
+                                       Fore.GREEN + ' \tmerged:\tapplication/2nd_party/ERP/rpxl.py         \n' +
+                                       Style.RESET_ALL + ' \n')
 
-def test_locally_removed_crlf(mocker):
+def test_locally_removed_crlf(mocker, capsys):
     obj = get_class(mocker)
     cvs_mock = mocker.MagicMock()
     cvs_mock.before = b"""
@@ -135,17 +132,16 @@ File: EMDG.exe         	Status: Locally Removed\r
    Sticky Options:	-kb\r\n"""
     mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
     mocker.patch.object(os.path, 'isfile', return_value=False)
-    pint = mocker.patch('builtins.print')
 
     obj._status()
 
-    pint.assert_has_calls([mocker.call('Removed files staged for commit:'),
-                           mocker.call(' (use cvs commit <file>... to check them in)\n'),
-                           mocker.call(Fore.YELLOW, '\tremoved:\t', end=''),
-                           mocker.call('application/3rd_party/EMDG/EMDG.exe         '),
-                           mocker.call(Style.RESET_ALL, '')])
+    assert capsys.readouterr().out == ('On branch HEAD\n'
+                                       'Removed files staged for commit:\n'
+                                       ' (use cvs commit <file>... to check them in)\n\n' +
+                                       Fore.YELLOW + ' \tremoved:\tapplication/3rd_party/EMDG/EMDG.exe         \n' +
+                                       Style.RESET_ALL + ' \n')
 
-def test_multiple_locally_removed(mocker):
+def test_multiple_locally_removed(mocker, capsys):
     obj = get_class(mocker)
     cvs_mock = mocker.MagicMock()
     cvs_mock.before = b"""
@@ -169,15 +165,57 @@ File: rpxl.py         	Status: Locally Removed
    Sticky Options:	-kb\n"""
     mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
     mocker.patch.object(os.path, 'isfile', return_value=False)
-    pint = mocker.patch('builtins.print')
 
     obj._status()
 
-    pint.assert_has_calls([mocker.call('Removed files staged for commit:'),
-                           mocker.call(' (use cvs commit <file>... to check them in)\n'),
-                           mocker.call(Fore.YELLOW, '\tremoved:\t', end=''),
-                           mocker.call('application/3rd_party/EMDG/EMDG.exe         '),
-                           mocker.call(Fore.YELLOW, '\tremoved:\t', end=''),
-                           mocker.call('application/2nd_party/ERP/rpxl.py         '),
-                           mocker.call(Style.RESET_ALL, '')])
+    assert capsys.readouterr().out == ('On branch HEAD\n'
+                                       'Removed files staged for commit:\n'
+                                       ' (use cvs commit <file>... to check them in)\n\n' +
+                                       Fore.YELLOW + ' \tremoved:\tapplication/3rd_party/EMDG/EMDG.exe         \n' +
+                                       Fore.YELLOW + ' \tremoved:\tapplication/2nd_party/ERP/rpxl.py         \n' +
+                                       Style.RESET_ALL + ' \n')
+
+def test_ndjson(mocker, capsys):
+    obj = get_class(mocker)
+    cvs_mock = mocker.MagicMock()
+    cvs_mock.before = b"""? notes.txt\r
+cvs server: Examining lib\r
+===================================================================\r
+File: a.py             \tStatus: Locally Modified\r
+===================================================================\r
+File: b.py             \tStatus: Up-to-date\r
+"""
+    mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
+    mocker.patch.object(os.path, 'isfile', return_value=False)
 
+    obj._status(["--format=ndjson"])
+
+    assert capsys.readouterr().out == (
+        '{"kind": "branch", "name": "HEAD"}\n'
+        '{"kind": "new", "path": "notes.txt"}\n'
+        '{"kind": "modified", "path": "lib/a.py"}\n')
+
+def test_files_grouped_by_directory(capsys):
+    files = FileStatus()
+    files.add(FILE_ADDED, "lib/", "new.py")
+    files.add(FILE_ADDED, "lib/", "sub", is_dir=True)
+    files.add_file(FILE_ADDED, "top.py")
+    files.add_file(FILE_NEW, "lib/scratch.txt")
+
+    files.print_files()
+
+    assert files.added == ["lib/new.py", "lib/sub", "top.py"]
+    assert files.count(FILE_ADDED) == 3
+    assert files.is_dir("lib/sub") and not files.is_dir("lib/new.py")
+    assert files._groups[FILE_NEW] == {"lib/": ["scratch.txt"]}
+    assert capsys.readouterr().out == (
+        'Untracked files:\n'
+        ' (use pycvs add <file>... to add them for commit)\n\n' +
+        Fore.RED + ' \tlib/scratch.txt\n' +
+        Style.RESET_ALL + ' \n'
+        'New files staged for commit:\n'
+        ' (use cvs commit... to check them in)\n\n' +
+        Fore.RED + ' \tnew file:\tlib/new.py\n' +
+        Fore.RED + ' \tnew directory:\tlib/sub\n' +
+        Fore.RED + ' \tnew file:\ttop.py\n' +
+        Style.RESET_ALL + ' \n')
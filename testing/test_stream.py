@@ -0,0 +1,139 @@
+import pytest
+from pycvs import protocol, stream
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import io
+from colorama import Fore
+
+
+def get_class(mocker):
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {}
+
+    return obj
+
+
+def test_protocol_streams_are_kept_apart():
+    events = iter([("E", "cvs server: Updating module"),
+                   ("M", "U module/a.c")])
+    session = protocol.Session(events, stream=True)
+
+    lines = stream.output_lines(session)
+
+    assert next(lines) == ("E", "cvs server: Updating module")
+    assert next(lines) == ("M", "U module/a.c")
+    assert list(lines) == []
+    assert session.exitstatus == 0
+
+
+def test_protocol_lines_are_decoded():
+    # Bytes that are not UTF-8 come as surrogates from the protocol
+    events = iter([("M", "caf\u00e9"), ("M", "bad \udcff"), ("M", "plain")])
+    session = protocol.Session(events, stream=True)
+
+    assert list(stream.output_lines(session)) == [
+        ("M", "caf\u00e9"), ("M", "bad \ufffd"), ("M", "plain")]
+
+
+def test_terminal_lines_are_classified(mocker):
+    cvs_mock = mocker.MagicMock()
+    cvs_mock.before = (b"cvs diff: Diffing .\r\n"
+                       b"+print('cvs server: done')\r\n"
+                       b"cvs [diff aborted]: no repository\r\n")
+
+    lines = list(stream.output_lines(cvs_mock))
+
+    assert lines == [("E", "cvs diff: Diffing ."),
+                     ("M", "+print('cvs server: done')"),
+                     ("E", "cvs [diff aborted]: no repository")]
+
+
+def test_diff_keeps_lines_mentioning_cvs(mocker, monkeypatch, capsys):
+    obj = get_class(mocker)
+    cvs_mock = mocker.MagicMock()
+    cvs_mock.before = (b"cvs diff: Diffing .\r\n"
+                       b"@@ -1 +1 @@\r\n"
+                       b"-old\r\n"
+                       b"+print('cvs server: done')\r\n")
+    mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
+    monkeypatch.setenv("PYCVS_COLOR", "always")
+
+    obj._diff([])
+
+    assert capsys.readouterr().out == "\n".join([
+        Fore.CYAN + "@@ -1 +1 @@", Fore.RED + "-old",
+        Fore.GREEN + "+print('cvs server: done')", ""])
+
+
+def test_diff_stops_when_the_pager_is_closed(mocker):
+    obj = get_class(mocker)
+    cvs_mock = mocker.MagicMock()
+    cvs_mock.before = b"@@ -1 +1 @@\r\n-old\r\n+new\r\n"
+    mocker.patch.object(PyCvs, '_access_cvs', return_value=cvs_mock)
+    pager = mocker.patch.object(stream, 'Pager')
+    pager.return_value.write.side_effect = BrokenPipeError
+
+    obj._diff(["--no-pager"])
+
+    pager.assert_called_once_with(False)
+    cvs_mock.terminate.assert_called_once_with(force=True)
+    pager.return_value.close.assert_called_once_with()
+
+
+def test_pager(tmp_path, monkeypatch):
+    monkeypatch.delenv("PYCVS_COLOR", raising=False)
+    out = io.StringIO()
+    out.isatty = lambda: True
+    paged = tmp_path / "paged"
+    pager = stream.Pager(out=out, cmd="sh -c 'cat > {0}'".format(paged))
+
+    pager.write("Index: a.c")
+    pager.write("+new")
+    pager.close()
+
+    assert pager.colors
+    assert paged.read_text() == "Index: a.c\n+new\n"
+    assert out.getvalue() == ""
+
+
+def test_progress():
+    out = io.StringIO()
+    out.isatty = lambda: True
+    progress = stream.Progress("updated", out=out, interval=0)
+
+    progress(files=1)
+    progress(dirs=1)
+    progress.done()
+
+    assert out.getvalue() == ("\r1 files / 0 dirs updated"
+                              "\r1 files / 1 dirs updated\r\033[K")
+    assert (progress.files, progress.dirs) == (1, 1)
+
+
+LOGIN = ("sh -c 'printf \"CVS password: \"; read password; "
+         "if [ \"$password\" != secret ]; then "
+         "echo \"cvs [login aborted]: Permission denied\"; exit 1; fi; "
+         "echo \"cvs server: Updating .\"; echo \"U a.c\"'")
+
+
+def test_streamed_login(mocker):
+    obj = PyCvs({"transport": "pexpect", "password": "secret",
+                 "user": "dev"})
+
+    cvs_obj = obj._access_cvs(LOGIN, stream=True)
+
+    # Nothing of the prompt nor of the echoed password
+    assert list(stream.output_lines(cvs_obj)) == [
+        ("E", "cvs server: Updating ."), ("M", "U a.c")]
+
+
+def test_streamed_wrong_password(mocker):
+    obj = PyCvs({"transport": "pexpect", "password": "wrong",
+                 "user": "dev"})
+    pint = mocker.patch('builtins.print')
+
+    assert obj._access_cvs(LOGIN, stream=True) is None
+    pint.assert_called_once_with("Invalid password for dev (~/.pycvs)")
@@ -0,0 +1,77 @@
+import pytest
+from pycvs import protocol, tracing
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import json
+import sys
+
+import fake_cvs
+from test_protocol import checkout
+
+
+def test_disabled():
+    lines = [b"a\n"]
+
+    assert tracing.timed(lines, "cvs.output") is lines
+    with tracing.span("status"):
+        tracing.count("files classified")
+    assert not tracing.enabled()
+
+
+def test_spans_and_counters(mocker):
+    clock = mocker.patch('time.perf_counter')
+    clock.side_effect = [0.0, 1.0, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5,
+                         7.0, 10.0]
+    recorder = tracing.enable()
+    try:
+        with tracing.span("status"):
+            with tracing.span("status.parse"):
+                lines = list(tracing.timed([b"ab\n", b"c\n"], "cvs.output"))
+            tracing.count("files classified", 2)
+    finally:
+        tracing.disable()
+
+    assert lines == [b"ab\n", b"c\n"]
+    # The spans start at 1 and 2, the lines are waited for 3 times 0.5s
+    assert dict(recorder.totals) == {"cvs.output": [1, 1.5, 1.5],
+                                     "status.parse": [1, 5.0, 3.5],
+                                     "status": [1, 9.0, 4.0]}
+    assert dict(recorder.counters) == {"cvs.output lines": 2,
+                                       "cvs.output bytes": 5,
+                                       "files classified": 2}
+    assert recorder.summary()[1].split() == ["status", "1", "9.000",
+                                             "4.000"]
+
+
+def test_profile_and_trace(tmp_path, mocker, monkeypatch, capsys):
+    repository = fake_cvs.FakeRepository({"module/a.c": b"a\n",
+                                          "module/b.c": b"b\n"})
+    checkout(tmp_path, repository)
+    (tmp_path / "module" / "a.c").write_text("changed\n")
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    monkeypatch.chdir(str(tmp_path / "module"))
+    monkeypatch.setattr(sys, "argv", ["pycvs", "status", "--profile"])
+    trace = tmp_path / "trace.json"
+    monkeypatch.setenv("PYCVS_TRACE", str(trace))
+
+    PyCvs({"root": ":fork:/cvsroot", "password": "", "user": "dev"}).process()
+
+    captured = capsys.readouterr()
+    assert "./a.c" in captured.out
+    phases = [line.split()[0] for line in captured.err.splitlines()[1:]
+              if line]
+    for phase in ["status", "status.parse", "status.render", "cvs.connect",
+                  "cvs.send", "cvs.output", "conflicts.scan", "counter"]:
+        assert phase in phases
+    assert "files classified               1" in captured.err
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert {event["name"] for event in events} >= {"status", "cvs.output",
+                                                   "counters"}
+    assert events[-1]["args"]["files classified"] == 1
+    assert not tracing.enabled()
@@ -0,0 +1,124 @@
+import pytest
+from pycvs import protocol, tuning
+from pycvs.cli import PyCvs
+
+# Imports for mocking
+import json
+
+import fake_cvs
+
+ROOT = ":pserver:dev@host:/cvsroot"
+
+
+def get_pycvs(mocker, credentials):
+    servers = []
+
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(fake_cvs.FakeRepository(
+            {"module/a.c": b"a\n"}))
+        servers.append(server)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = dict({"root": ROOT, "password": "secret",
+                            "user": "dev"}, **credentials)
+    return obj, servers
+
+
+def test_choose_level():
+    assert tuning.choose_level(None) == tuning.DEFAULT_LEVEL
+    # A slow link is worth the best compression, a fast one none
+    assert tuning.choose_level({"throughput": 100 * 1024, "gain": 2}) == 6
+    assert tuning.choose_level({"throughput": 100 * 2 ** 20,
+                                "gain": 2}) == 0
+    # Data that does not compress is not worth it either
+    assert tuning.choose_level({"throughput": 2 ** 20, "gain": 0.01}) == 0
+    assert tuning.choose_level({"throughput": None}) == 0
+
+
+def test_settings():
+    tuned = tuning.Tuning({"compression": 1, "timeout": 60,
+                           "roots": {ROOT: {"compression": 9,
+                                            "timeout": 0}}})
+
+    assert tuned.compression(ROOT) == 9
+    assert tuned.timeout(ROOT) is None
+    assert tuned.compression(":pserver:dev@other:/cvsroot") == 1
+    assert tuned.timeout(":pserver:dev@other:/cvsroot") == 60
+    assert tuning.Tuning({}).timeout(ROOT) == tuning.DEFAULT_TIMEOUT
+
+
+def test_auto_compression(tmp_path):
+    path = str(tmp_path / "tuning.json")
+    tuned = tuning.Tuning({}, path)
+    assert tuned.compression(ROOT) == tuning.DEFAULT_LEVEL
+    assert tuned.compression(":fork:/cvsroot") == 0
+
+    # Too small to measure anything
+    tuned.record(ROOT, 3, 1000, 300, 10.0)
+    assert not (tmp_path / "tuning.json").exists()
+
+    # 4 MB compressed to 1 MB in 10s: a slow link
+    tuned.record(ROOT, 3, 4 * 2 ** 20, 2 ** 20, 10.0)
+    assert tuned.compression(ROOT) == 6
+    with open(path) as stats_file:
+        measures = json.load(stats_file)["roots"][ROOT]
+    assert measures["runs"] == 1
+    assert measures["throughput"] == 2 ** 20 / 10.0
+
+    # zlib was the bottleneck: try without compression, then keep going
+    # without it on a fast link
+    tuned.record(ROOT, 6, 200 * 2 ** 20, 50 * 2 ** 20, 10.0)
+    assert tuned.compression(ROOT) == 0
+    tuned.record(ROOT, 0, 500 * 2 ** 20, 500 * 2 ** 20, 1.0)
+    assert tuned.compression(ROOT) == 0
+
+
+def test_with_compression():
+    assert tuning.with_compression("cvs -d /root co module", 3) == \
+        "cvs -z3 -d /root co module"
+    assert tuning.with_compression("cvs -z9 up", 3) == "cvs -z9 up"
+    assert tuning.with_compression("cvs -d /root -z 9 up", 3) == \
+        "cvs -d /root -z 9 up"
+    assert tuning.with_compression("cvs up", 0) == "cvs up"
+
+
+def test_commands_compress(tmp_path, mocker, monkeypatch):
+    obj, servers = get_pycvs(mocker, {
+        "tuning_file": str(tmp_path / "tuning.json")})
+    mocker.patch('builtins.print')
+    monkeypatch.chdir(str(tmp_path))
+
+    obj._checkout(["module"])
+
+    assert "Gzip-stream 3" in servers[0].requests
+    assert (tmp_path / "module" / "a.c").read_bytes() == b"a\n"
+
+
+def test_compression_override(tmp_path, mocker, monkeypatch):
+    obj, servers = get_pycvs(mocker, {"roots": {ROOT: {"compression": 0}}})
+    mocker.patch('builtins.print')
+    monkeypatch.chdir(str(tmp_path))
+
+    obj._checkout(["module"])
+
+    assert not any(request.startswith("Gzip-stream")
+                   for request in servers[0].requests)
+
+
+def test_inactivity_timeout(mocker):
+    obj = PyCvs({"transport": "pexpect", "password": "secret",
+                 "timeout": 0.3})
+    pint = mocker.patch('builtins.print')
+
+    # Longer than the timeout, but never silent for that long
+    cvs_obj = obj._access_cvs(
+        "sh -c 'echo password:; read password; "
+        "for i in 1 2 3 4 5 6; do echo line $i; sleep 0.1; done'")
+    assert b"line 6" in cvs_obj.before
+
+    assert obj._access_cvs("sh -c 'echo start; sleep 5'") is None
+    pint.assert_called_once_with("cvs did not answer for 0.3 seconds")
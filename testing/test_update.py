@@ -0,0 +1,118 @@
+import pytest
+from pycvs import incremental, protocol
+from pycvs.cli import PyCvs
+from pycvs.local import read_entries
+
+# Imports for mocking
+import os
+import time
+
+import fake_cvs
+
+
+def get_pycvs(mocker, repository):
+    def connect(*args):
+        rfile, wfile, server = fake_cvs.start(repository)
+        return protocol.Connection(rfile, wfile)
+
+    mocker.patch.object(protocol.Connection, 'open', side_effect=connect)
+    init = mocker.patch.object(PyCvs, '__init__')
+    init.return_value = None
+    obj = PyCvs()
+    obj.credentials = {"root": ":pserver:dev@host:/cvsroot",
+                       "password": "secret", "user": "dev"}
+    return obj
+
+
+def now():
+    return time.strftime("%Y/%m/%d %H:%M:%S", time.gmtime())
+
+
+@pytest.fixture
+def working_copy(tmp_path, mocker, monkeypatch):
+    repository = fake_cvs.FakeRepository({"module/top.c": b"top\n",
+                                          "module/a/x.c": b"x\n",
+                                          "module/b/y.c": b"y\n"})
+    obj = get_pycvs(mocker, repository)
+    monkeypatch.chdir(str(tmp_path))
+    mocker.patch('builtins.print')
+    obj._checkout(["module"])
+    monkeypatch.chdir(str(tmp_path / "module"))
+    obj._update([])
+    return obj, repository
+
+
+def test_update_records_state(working_copy):
+    obj, repository = working_copy
+
+    state = incremental.load_update(":pserver:dev@host:/cvsroot")
+
+    assert state is not None
+    assert state["repository"] == "module"
+    assert state["tag"] == ""
+
+
+def test_incremental_update(working_copy, mocker):
+    obj, repository = working_copy
+    repository.commit("module/b/y.c", b"y2\n", date=now())
+    spy = mocker.spy(PyCvs, '_update_directory')
+    pint = mocker.patch('builtins.print')
+
+    obj._update(["--incremental"])
+
+    assert [call[0][1:4] for call in spy.call_args_list] == \
+        [("b", "", ["y.c"])]
+    pint.assert_any_call("1 files updated")
+    assert open(os.path.join("b", "y.c"), "rb").read() == b"y2\n"
+
+
+def test_incremental_update_conflict(working_copy, mocker):
+    obj, repository = working_copy
+    with open(os.path.join("a", "x.c"), "w") as changed:
+        changed.write("mine\n")
+    past = time.time() - 3600
+    os.utime(os.path.join("a", "x.c"), (past, past))
+    repository.commit("module/a/x.c", b"theirs\n", date=now())
+    pint = mocker.patch('builtins.print')
+
+    obj._update(["--incremental"])
+
+    pint.assert_any_call("Conflict on file a/x.c")
+    pint.assert_any_call("1 conflicted files", end="")
+
+
+def test_incremental_update_new_directory(working_copy, mocker):
+    obj, repository = working_copy
+    repository.commit("module/c/z.c", b"z\n", date=now())
+    pint = mocker.patch('builtins.print')
+
+    obj._update(["-d", "--incremental"])
+
+    pint.assert_any_call("1 files updated")
+    assert open(os.path.join("c", "z.c"), "rb").read() == b"z\n"
+    assert read_entries(".")["c"].is_dir
+
+
+def test_incremental_update_after_branch_switch(working_copy, mocker):
+    obj, repository = working_copy
+    with open(os.path.join("CVS", "Tag"), "w") as tag:
+        tag.write("TBRANCH\n")
+    spy = mocker.spy(PyCvs, '_update_directory')
+    pint = mocker.patch('builtins.print')
+
+    obj._update(["--incremental"])
+
+    pint.assert_any_call("No usable record of the last update, updating "
+                         "everything")
+    assert [call[0][1:3] for call in spy.call_args_list] == [(".", "")]
+
+
+def test_update_merge_option(working_copy, mocker):
+    obj, repository = working_copy
+    update = mocker.patch.object(PyCvs, '_update_directory')
+    update.return_value = None
+
+    # -j REV is the merge of cvs, not the jobs of --incremental
+    obj._update(["-j", "BRANCH"])
+
+    assert update.call_args[0][:2] == (".", "-j BRANCH")